@@ -0,0 +1,150 @@
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointments_status.services.availability_index import AvailabilityIndex, availability_index, clock
+from appointments_status.services.batch_scheduler_service import BatchSchedulerService
+from patients_diagnoses.models import Patient
+
+# Ventanas horarias de las solicitudes sintéticas: (desde, hasta, peso)
+WINDOWS = [
+    (None, None, 0.4),        # cualquier hora
+    (datetime.strptime('08:00', '%H:%M').time(), datetime.strptime('13:00', '%H:%M').time(), 0.3),
+    (datetime.strptime('14:00', '%H:%M').time(), datetime.strptime('20:00', '%H:%M').time(), 0.3),
+]
+# Duraciones de las solicitudes sintéticas (minutos) y su peso (como en los datos reales)
+DURATIONS = [(60, 0.5), (45, 0.3), (30, 0.2)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del agendador por lotes sobre una semana completa de la clínica: genera solicitudes "
+        "sintéticas hasta llenar una fracción de la capacidad de los consultorios, las resuelve en modo "
+        "simulación (no guarda nada) y compara primer horario libre, voraz y voraz + búsqueda local. "
+        "Verifica que ninguna asignación se cruce con citas existentes ni con otra asignación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--week", default=None, help="Lunes de la semana (YYYY-MM-DD). Por defecto, el próximo lunes")
+        parser.add_argument("--fill", type=float, default=0.85,
+                            help="Fracción de las horas-consultorio libres a pedir (0-1.2)")
+        parser.add_argument("--window-days", type=int, default=2, help="Días de la ventana de cada solicitud")
+        parser.add_argument("--time-limit", type=float, default=5.0, help="Segundos máximos del agendador")
+        parser.add_argument("--seed", type=int, default=0, help="Semilla de las solicitudes y de la búsqueda local")
+
+    def handle(self, *args, **opt):
+        if not 0 < opt["fill"] <= 1.2 or opt["window_days"] < 1 or opt["time_limit"] <= 0:
+            raise CommandError("--fill debe estar entre 0 y 1.2; --window-days y --time-limit deben ser positivos")
+        week = self._week(opt["week"])
+        rows = self._requests(week, opt["fill"], opt["window_days"], opt["seed"])
+        service = BatchSchedulerService()
+        self.stdout.write(f"Semana {week} - {week + timedelta(days=6)}: {len(rows)} solicitudes")
+
+        results = []
+        started = time.perf_counter()
+        scheduler, requests = service.build(rows, opt["time_limit"], opt["seed"])
+        scheduler.first_fit(requests)
+        results.append(("Primer horario libre", scheduler.stats["final"], (time.perf_counter() - started) * 1000))
+        self._verify(scheduler, requests)
+
+        started = time.perf_counter()
+        scheduler, requests = service.plan(rows, opt["time_limit"], opt["seed"])
+        elapsed = (time.perf_counter() - started) * 1000
+        results.append(("Voraz", scheduler.stats["greedy"], scheduler.stats["greedy_ms"]))
+        results.append(("Voraz + búsqueda local", scheduler.stats["final"], elapsed))
+        self._verify(scheduler, requests)
+
+        self.stdout.write(
+            f"{'Estrategia':<24} {'Asignadas':>10} {'Sin ubicar':>10} {'Ocio terap.':>12} "
+            f"{'Ocio consult.':>14} {'Jornadas':>9} {'ms':>9}"
+        )
+        for name, summary, ms in results:
+            self.stdout.write(
+                f"{name:<24} {summary['assigned']:>10} {summary['unassigned']:>10} "
+                f"{summary['therapist_idle_minutes']:>12} {summary['room_idle_minutes']:>14} "
+                f"{summary['therapist_days']:>9} {ms:>9.0f}"
+            )
+        self.stdout.write(
+            f"Búsqueda local: {scheduler.stats['local_search_passes']} pasadas, "
+            f"{scheduler.stats['local_search_moves']} movimientos, "
+            f"límite de tiempo alcanzado: {'sí' if scheduler.stats['time_limit_reached'] else 'no'}"
+        )
+        self.stdout.write(self.style.SUCCESS("Sin cruces entre asignaciones ni con citas existentes"))
+
+    @staticmethod
+    def _week(value):
+        if value:
+            try:
+                week = date.fromisoformat(value)
+            except ValueError:
+                raise CommandError("--week debe tener el formato YYYY-MM-DD")
+        else:
+            today = timezone.localdate()
+            week = today + timedelta(days=7 - today.weekday())
+        if week.weekday() != 0 or week <= timezone.localdate():
+            raise CommandError("--week debe ser un lunes futuro")
+        return week
+
+    @staticmethod
+    def _requests(week, fill, window_days, seed):
+        """Solicitudes sintéticas que piden `fill` de las horas-consultorio libres de la semana."""
+        rng = random.Random(seed)
+        opening, closing, working_days = AvailabilityIndex.working_hours()
+        days = [week + timedelta(days=offset) for offset in range(7) if offset in working_days]
+        rooms = list(getattr(settings, 'APPOINTMENT_ROOMS', range(1, 7)))
+        intervals = availability_index.days(days[0], days[-1])
+        free = sum(
+            (closing - opening) - sum(min(end, closing) - max(start, opening)
+                                      for start, end in intervals[day].busy(room=room)
+                                      if end > opening and start < closing)
+            for day in days for room in rooms
+        )
+        patients = list(Patient.objects.filter(deleted_at__isnull=True).order_by('id').values_list('id', flat=True)[:5000])
+        if not patients:
+            raise CommandError("No hay pacientes para generar solicitudes")
+
+        rows, requested = [], 0
+        while requested < free * fill:
+            duration = rng.choices([value for value, _ in DURATIONS], [weight for _, weight in DURATIONS])[0]
+            earliest, latest, _ = rng.choices(WINDOWS, [weight for *_, weight in WINDOWS])[0]
+            first = rng.randrange(len(days))
+            rows.append({
+                'patient_id': rng.choice(patients),
+                'duration_minutes': duration,
+                'start_date': days[first],
+                'end_date': days[min(first + window_days - 1, len(days) - 1)],
+                'earliest_hour': earliest,
+                'latest_hour': latest,
+            })
+            requested += duration
+        return rows
+
+    def _verify(self, scheduler, requests):
+        """Revisa ventanas y cruces de cada asignación contra las citas existentes y las demás asignaciones."""
+        placed = defaultdict(list)
+        for request in requests:
+            placement = scheduler.placements.get(request.index)
+            if placement is None:
+                continue
+            if placement.day not in request.days or placement.start < request.earliest or placement.end > request.latest:
+                raise CommandError(f"La solicitud {request.index} quedó fuera de su ventana")
+            for kind, key in (('therapist', placement.therapist_id), ('room', placement.room), ('patient', request.patient_id)):
+                placed[(kind, key, placement.day)].append((placement.start, placement.end, request.index))
+
+        for (kind, key, day), intervals in placed.items():
+            existing = [(start, end, None) for start, end in scheduler.busy(kind, key, day)]
+            ordered = sorted(intervals)
+            for (start, end, index), (next_start, _, other) in zip(ordered, ordered[1:]):
+                if next_start < end:
+                    raise CommandError(f"Cruce de {kind} {key} el {day}: solicitudes {index} y {other}")
+            for start, end, index in intervals:
+                for busy_start, busy_end, _ in existing:
+                    if busy_start < end and start < busy_end:
+                        raise CommandError(
+                            f"La solicitud {index} se cruza con una cita existente de {kind} {key} "
+                            f"el {day} a las {clock(busy_start)}"
+                        )
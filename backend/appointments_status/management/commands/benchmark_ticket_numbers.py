@@ -0,0 +1,93 @@
+import re
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from appointments_status.models import Ticket, TicketNumberCounter
+from appointments_status.services.ticket_number_allocator import TicketNumberAllocator
+
+
+def legacy_ticket_number():
+    """Implementación anterior de TicketService.generate_ticket_number (último ticket + regex)."""
+    last_ticket = Ticket.objects.order_by('-id').first()
+    match = re.search(r'TKT-(\d+)', last_ticket.ticket_number) if last_ticket else None
+    return f"TKT-{int(match.group(1)) + 1 if match else 1:03d}"
+
+
+class CountingAllocator(TicketNumberAllocator):
+    """Asignador que cuenta las reservas de bloque hechas en la base de datos."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reservations = 0
+
+    def _reserve(self, needed):
+        self.reservations += 1
+        return super()._reserve(needed)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rendimiento de TicketNumberAllocator: varios hilos, cada uno con su propio asignador (como "
+        "procesos distintos), piden números en paralelo y se mide cuántos números por segundo se "
+        "entregan. Usa un prefijo propio para no consumir la secuencia TKT real. La unicidad y el "
+        "orden se verifican en appointments_status.tests.test_ticket_number_allocator."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16, help="Hilos creadores en paralelo")
+        parser.add_argument("--per-worker", type=int, default=2000, help="Números que pide cada hilo")
+        parser.add_argument("--block-size", type=int, default=None,
+                            help="Números por reserva. Por defecto, TICKET_NUMBER_BLOCK_SIZE")
+        parser.add_argument("--prefix", default="BENCH-", help="Prefijo de la secuencia de prueba")
+        parser.add_argument("--legacy", type=int, default=200,
+                            help="Llamadas a la implementación anterior para comparar (0 para omitir)")
+
+    def handle(self, *args, **opt):
+        if opt["workers"] < 1 or opt["per_worker"] < 1:
+            raise CommandError("--workers y --per-worker deben ser positivos")
+
+        results = [None] * opt["workers"]
+        errors = []
+        allocators = [CountingAllocator(prefix=opt["prefix"], block_size=opt["block_size"]) for _ in results]
+        barrier = threading.Barrier(opt["workers"])
+
+        def creator(index):
+            try:
+                barrier.wait()
+                results[index] = [allocators[index].allocate() for _ in range(opt["per_worker"])]
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=creator, args=(index,)) for index in range(opt["workers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f"Error en un hilo creador: {errors[0]}")
+
+        numbers = [number for worker in results for number in worker]
+        reservations = sum(allocator.reservations for allocator in allocators)
+
+        self.stdout.write(
+            f"{len(numbers)} números en {elapsed * 1000:.0f} ms con {opt['workers']} hilos "
+            f"({len(numbers) / elapsed:,.0f} números/s); {reservations} reservas de bloque en la base de datos"
+        )
+        last_value = TicketNumberCounter.objects.filter(prefix=opt["prefix"]).values_list("last_value", flat=True).first()
+        self.stdout.write(f"Contador {opt['prefix']}: {last_value}")
+
+        if opt["legacy"]:
+            started = time.perf_counter()
+            for _ in range(opt["legacy"]):
+                legacy_ticket_number()
+            legacy_elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Implementación anterior: {opt['legacy'] / legacy_elapsed:,.0f} números/s "
+                f"(una consulta por número y sin reserva: dos creadores simultáneos reciben el mismo número)"
+            )
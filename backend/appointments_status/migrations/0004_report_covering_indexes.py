@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0003_rename_appointments_appointment_date_hour_idx_appointment_appoint_7d154e_idx_and_more'),
+        ('histories_configurations', '0003_alter_paymentstatus_table'),
+        ('patients_diagnoses', '0001_initial'),
+        ('therapists', '0002_alter_therapist_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'therapist', 'payment', 'payment_type'], name='appointment_appoint_091629_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['payment_date', 'status', 'is_active', 'amount', 'payment_method'], name='tickets_payment_205a83_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0004_report_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20, unique=True, verbose_name='Prefijo')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Último número reservado')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Contador de números de ticket',
+                'verbose_name_plural': 'Contadores de números de ticket',
+                'db_table': 'ticket_number_counters',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0005_ticket_number_counter'),
+        ('histories_configurations', '0003_alter_paymentstatus_table'),
+        ('patients_diagnoses', '0001_initial'),
+        ('therapists', '0002_alter_therapist_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room', models.IntegerField(blank=True, null=True, verbose_name='Habitación/Consultorio')),
+                ('hour', models.TimeField(verbose_name='Hora de las citas')),
+                ('duration_minutes', models.IntegerField(blank=True, null=True, verbose_name='Duración de las citas (minutos)')),
+                ('appointment_type', models.CharField(blank=True, max_length=255, null=True, verbose_name='Tipo de cita')),
+                ('payment', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Pago por cita')),
+                ('frequency', models.CharField(choices=[('DAILY', 'Diaria'), ('WEEKLY', 'Semanal')], default='WEEKLY', max_length=10, verbose_name='Frecuencia')),
+                ('interval', models.PositiveSmallIntegerField(default=1, verbose_name='Cada cuántos días/semanas')),
+                ('weekdays', models.JSONField(blank=True, default=list, verbose_name='Días de la semana (0=lunes)')),
+                ('start_date', models.DateField(verbose_name='Fecha de inicio')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Fecha de fin')),
+                ('occurrence_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='Cantidad de citas')),
+                ('excluded_dates', models.JSONField(blank=True, default=list, verbose_name='Fechas excluidas')),
+                ('materialized_until', models.DateField(blank=True, null=True, verbose_name='Citas creadas hasta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de eliminación')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='patients_diagnoses.patient', verbose_name='Paciente')),
+                ('payment_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='histories_configurations.paymenttype', verbose_name='Tipo de pago')),
+                ('therapist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='therapists.therapist', verbose_name='Terapeuta')),
+            ],
+            options={
+                'verbose_name': 'Serie de citas',
+                'verbose_name_plural': 'Series de citas',
+                'db_table': 'appointment_series',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='appointments_status.appointmentseries', verbose_name='Serie'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['series', 'appointment_date'], name='appointment_series__b70339_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0006_appointment_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentDayVersion',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='Día')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Versión de citas del día',
+                'verbose_name_plural': 'Versiones de citas del día',
+                'db_table': 'appointment_day_versions',
+                'ordering': ['day'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0007_appointment_day_version'),
+        ('histories_configurations', '0003_alter_paymentstatus_table'),
+        ('patients_diagnoses', '0001_initial'),
+        ('therapists', '0002_alter_therapist_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'updated_at'], name='appointment_appoint_d09012_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['payment_date', 'updated_at'], name='tickets_payment_683d3e_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.utils import timezone
+
+TASK_NAME = 'Extender series de citas recurrentes'
+TASK = 'appointments_status.tasks.extend_appointment_series'
+
+
+def schedule_extend_series(apps, schema_editor):
+    """Programa extend_appointment_series una vez por día en django_celery_beat (DatabaseScheduler)."""
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+
+    crontab, _ = CrontabSchedule.objects.get_or_create(
+        minute='0', hour='5', day_of_week='*', day_of_month='*', month_of_year='*', timezone='UTC',
+    )
+    PeriodicTask.objects.get_or_create(
+        name=TASK_NAME,
+        defaults={
+            'task': TASK,
+            'crontab': crontab,
+            'description': 'Crea las citas de las series recurrentes hasta APPOINTMENT_SERIES_HORIZON_DAYS.',
+        },
+    )
+    # Los modelos históricos no ejecutan PeriodicTask.save(): se avisa al beat en ejecución a mano
+    PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+def unschedule_extend_series(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    PeriodicTask.objects.filter(name=TASK_NAME, task=TASK).delete()
+    PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0008_report_watermark_indexes'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_extend_series, unschedule_extend_series),
+    ]
@@ -1,8 +1,11 @@
 from .appointment import Appointment
+from .appointment_day_version import AppointmentDayVersion
+from .appointment_series import AppointmentSeries
 from .appointment_status import AppointmentStatus
 from .ticket import Ticket
+from .ticket_number_counter import TicketNumberCounter
 from patients_diagnoses.models import Patient
 from therapists.models import Therapist
 
 
-__all__ = ['Appointment', 'AppointmentStatus', 'Ticket']
+__all__ = ['Appointment', 'AppointmentDayVersion', 'AppointmentSeries', 'AppointmentStatus', 'Ticket', 'TicketNumberCounter']
@@ -13,6 +13,7 @@ class Appointment(models.Model):
     history = models.ForeignKey('histories_configurations.History', on_delete=models.CASCADE, null=True, blank=True, verbose_name="Historial")
     patient = models.ForeignKey('patients_diagnoses.Patient', on_delete=models.CASCADE, verbose_name="Paciente")
     therapist = models.ForeignKey('therapists.Therapist', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Terapeuta")
+    series = models.ForeignKey('AppointmentSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments', verbose_name="Serie")
     
     # Campos principales de la cita
     appointment_date = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de la cita")
@@ -108,6 +109,12 @@ class Appointment(models.Model):
         indexes = [
             models.Index(fields=['appointment_date', 'hour']),
             models.Index(fields=['appointment_status']),
+            # Índice de cobertura para los reportes por día (conteos por terapeuta y caja)
+            models.Index(fields=['appointment_date', 'therapist', 'payment', 'payment_type']),
+            # Citas de una serie desde una fecha ("esta y las siguientes")
+            models.Index(fields=['series', 'appointment_date']),
+            # Marca de agua de los reportes (conteo y máximo updated_at del rango) solo con el índice
+            models.Index(fields=['appointment_date', 'updated_at']),
         ]
     
     def __str__(self):
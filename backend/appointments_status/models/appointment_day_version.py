@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class AppointmentDayVersion(models.Model):
+    """
+    Versión de las citas de un día para el índice de disponibilidad en memoria.
+    Las señales de Appointment la incrementan al confirmar cada escritura;
+    las filas nunca se eliminan (un día sin fila tiene versión 0).
+    """
+
+    day = models.DateField(primary_key=True, verbose_name="Día")
+    version = models.PositiveIntegerField(default=0, verbose_name="Versión")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        db_table = 'appointment_day_versions'
+        verbose_name = "Versión de citas del día"
+        verbose_name_plural = "Versiones de citas del día"
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.day} v{self.version}"
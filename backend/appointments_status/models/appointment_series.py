@@ -0,0 +1,92 @@
+from datetime import timedelta
+from django.db import models
+
+
+class AppointmentSeries(models.Model):
+    """
+    Serie de citas recurrentes (p. ej. sesiones semanales de un tratamiento).
+
+    La regla (frecuencia, intervalo, días de la semana y fin por fecha o por
+    cantidad) se expande de forma perezosa con iter_occurrences(); solo se
+    crean citas hasta `materialized_until` y el resto se genera a medida que
+    se acerca (ver AppointmentSeriesService.extend).
+    """
+
+    FREQUENCY_DAILY = 'DAILY'
+    FREQUENCY_WEEKLY = 'WEEKLY'
+    FREQUENCY_CHOICES = [
+        (FREQUENCY_DAILY, 'Diaria'),
+        (FREQUENCY_WEEKLY, 'Semanal'),
+    ]
+
+    patient = models.ForeignKey('patients_diagnoses.Patient', on_delete=models.CASCADE, verbose_name="Paciente")
+    therapist = models.ForeignKey('therapists.Therapist', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Terapeuta")
+    room = models.IntegerField(blank=True, null=True, verbose_name="Habitación/Consultorio")
+    hour = models.TimeField(verbose_name="Hora de las citas")
+    duration_minutes = models.IntegerField(blank=True, null=True, verbose_name="Duración de las citas (minutos)")
+    appointment_type = models.CharField(max_length=255, blank=True, null=True, verbose_name="Tipo de cita")
+    payment = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True, verbose_name="Pago por cita")
+    payment_type = models.ForeignKey('histories_configurations.PaymentType', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Tipo de pago")
+
+    # Regla de recurrencia
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=FREQUENCY_WEEKLY, verbose_name="Frecuencia")
+    interval = models.PositiveSmallIntegerField(default=1, verbose_name="Cada cuántos días/semanas")
+    weekdays = models.JSONField(default=list, blank=True, verbose_name="Días de la semana (0=lunes)")
+    start_date = models.DateField(verbose_name="Fecha de inicio")
+    end_date = models.DateField(blank=True, null=True, verbose_name="Fecha de fin")
+    occurrence_count = models.PositiveIntegerField(blank=True, null=True, verbose_name="Cantidad de citas")
+    excluded_dates = models.JSONField(default=list, blank=True, verbose_name="Fechas excluidas")
+
+    # Último día hasta el que ya se crearon las citas
+    materialized_until = models.DateField(blank=True, null=True, verbose_name="Citas creadas hasta")
+
+    # Campos de auditoría
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+    deleted_at = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de eliminación")
+
+    class Meta:
+        db_table = 'appointment_series'
+        verbose_name = "Serie de citas"
+        verbose_name_plural = "Series de citas"
+        ordering = ['-start_date']
+
+    def __str__(self):
+        return f"Serie {self.id} - {self.get_frequency_display()} desde {self.start_date}"
+
+    def iter_occurrences(self, start=None, end=None):
+        """
+        Genera las fechas de la serie en orden, entre `start` y `end` inclusive
+        (por defecto, desde el inicio y sin límite si la serie no tiene fin).
+        La cantidad de citas se cuenta desde el inicio de la serie; las fechas
+        excluidas no se generan pero sí cuentan.
+        """
+        last = min(filter(None, [self.end_date, end]), default=None)
+        excluded = set(self.excluded_dates or [])
+        produced = 0
+        for day in self._iter_rule():
+            if (last is not None and day > last) or (
+                self.occurrence_count is not None and produced >= self.occurrence_count
+            ):
+                return
+            produced += 1
+            if (start is None or day >= start) and day.isoformat() not in excluded:
+                yield day
+
+    def _iter_rule(self):
+        """Fechas de la regla sin límite de fin."""
+        step = max(self.interval or 1, 1)
+        if self.frequency == self.FREQUENCY_DAILY:
+            day = self.start_date
+            while True:
+                yield day
+                day += timedelta(days=step)
+
+        weekdays = sorted(set(self.weekdays or [self.start_date.weekday()]))
+        week = self.start_date - timedelta(days=self.start_date.weekday())
+        while True:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if day >= self.start_date:
+                    yield day
+            week += timedelta(weeks=step)
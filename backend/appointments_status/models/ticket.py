@@ -70,6 +70,10 @@ class Ticket(models.Model):
             models.Index(fields=['payment_date']),
             models.Index(fields=['status']),
             models.Index(fields=['appointment']),  # Índice para la foreign key
+            # Índice de cobertura para los reportes de caja por día de pago
+            models.Index(fields=['payment_date', 'status', 'is_active', 'amount', 'payment_method']),
+            # Marca de agua de los reportes (conteo y máximo updated_at del rango) solo con el índice
+            models.Index(fields=['payment_date', 'updated_at']),
         ]
     
     def __str__(self):
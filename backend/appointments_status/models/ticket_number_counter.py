@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class TicketNumberCounter(models.Model):
+    """
+    Último número reservado de cada secuencia de tickets (una fila por prefijo).
+    TicketNumberAllocator la incrementa por bloques y entrega los números desde memoria.
+    """
+
+    prefix = models.CharField(max_length=20, unique=True, verbose_name="Prefijo")
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name="Último número reservado")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        db_table = 'ticket_number_counters'
+        verbose_name = "Contador de números de ticket"
+        verbose_name_plural = "Contadores de números de ticket"
+
+    def __str__(self):
+        return f"{self.prefix}{self.last_value}"
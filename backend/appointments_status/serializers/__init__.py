@@ -1,5 +1,6 @@
-from .appointment import AppointmentSerializer
+from .appointment import AppointmentSerializer, AppointmentBulkItemSerializer, AppointmentScheduleRequestSerializer
+from .appointment_series import AppointmentSeriesSerializer, AppointmentSeriesFollowingSerializer
 from .appointment_status import AppointmentStatusSerializer
 from .ticket import TicketSerializer
 
-__all__ = ['AppointmentSerializer', 'AppointmentStatusSerializer', 'TicketSerializer']
+__all__ = ['AppointmentSerializer', 'AppointmentBulkItemSerializer', 'AppointmentScheduleRequestSerializer', 'AppointmentSeriesSerializer', 'AppointmentSeriesFollowingSerializer', 'AppointmentStatusSerializer', 'TicketSerializer']
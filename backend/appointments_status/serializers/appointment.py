@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from architect.middleware.query_metrics import TimedSerializerMixin
 from ..models import Appointment
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para el modelo Appointment.
     Basado en la estructura actualizada del modelo.
@@ -94,3 +95,77 @@ class AppointmentSerializer(serializers.ModelSerializer):
             pass
         
         return data
+
+
+class AppointmentBulkItemSerializer(serializers.Serializer):
+    """
+    Una cita dentro de un alta masiva (POST /appointments/bulk/).
+    Los ids de paciente, terapeuta y tipo de pago se validan para todo el lote
+    en AppointmentService.bulk_create con una consulta por tabla.
+    """
+
+    patient_id = serializers.IntegerField(min_value=1)
+    therapist_id = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    appointment_date = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'])
+    hour = serializers.TimeField(input_formats=['%H:%M', '%H:%M:%S'])
+    duration_minutes = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    room = serializers.IntegerField(required=False, allow_null=True)
+    appointment_type = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    observation = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    payment = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=0, required=False, allow_null=True)
+    payment_type_id = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    appointment_status = serializers.ChoiceField(
+        choices=Appointment.APPOINTMENT_STATUS_CHOICES, required=False, default='PENDIENTE'
+    )
+
+    def validate_appointment_date(self, value):
+        """Misma regla que AppointmentSerializer: no se agendan citas en días pasados."""
+        from django.utils import timezone
+        if value.date() < timezone.now().date():
+            raise serializers.ValidationError(
+                "La fecha de la cita no puede ser anterior a hoy."
+            )
+        return value
+
+
+class AppointmentScheduleRequestSerializer(serializers.Serializer):
+    """
+    Una solicitud del agendador por lotes (POST /appointments/schedule/).
+    Indica el paciente, la duración y la ventana de días y horas en la que se
+    acepta la cita; terapeuta y consultorio son opcionales (si se indican, se
+    respetan). Los ids se validan para todo el lote en BatchSchedulerService.
+    """
+
+    patient_id = serializers.IntegerField(min_value=1)
+    duration_minutes = serializers.IntegerField(min_value=5, max_value=480, required=False, default=60)
+    start_date = serializers.DateField(input_formats=['%Y-%m-%d'])
+    end_date = serializers.DateField(input_formats=['%Y-%m-%d'], required=False, allow_null=True)
+    earliest_hour = serializers.TimeField(input_formats=['%H:%M', '%H:%M:%S'], required=False, allow_null=True)
+    latest_hour = serializers.TimeField(input_formats=['%H:%M', '%H:%M:%S'], required=False, allow_null=True)
+    therapist_id = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    room = serializers.IntegerField(required=False, allow_null=True)
+    appointment_type = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    observation = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    payment = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=0, required=False, allow_null=True)
+    payment_type_id = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+    def validate_start_date(self, value):
+        from django.utils import timezone
+        if value < timezone.localdate():
+            raise serializers.ValidationError("La fecha de inicio no puede ser anterior a hoy.")
+        return value
+
+    def validate(self, data):
+        """La ventana debe ser válida y de como máximo 31 días."""
+        end_date = data.get('end_date') or data['start_date']
+        if end_date < data['start_date']:
+            raise serializers.ValidationError({'end_date': "La fecha de fin no puede ser anterior a la de inicio."})
+        if (end_date - data['start_date']).days > 30:
+            raise serializers.ValidationError({'end_date': "La ventana puede ser de como máximo 31 días."})
+        data['end_date'] = end_date
+        earliest, latest = data.get('earliest_hour'), data.get('latest_hour')
+        if earliest and latest and earliest >= latest:
+            raise serializers.ValidationError({'latest_hour': "La hora máxima debe ser posterior a la mínima."})
+        return data
@@ -0,0 +1,102 @@
+from rest_framework import serializers
+from ..models import AppointmentSeries, Therapist
+
+
+class AppointmentSeriesSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el modelo AppointmentSeries.
+    Valida la regla de recurrencia; las citas las crea AppointmentSeriesService.
+    """
+
+    patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
+    therapist_name = serializers.CharField(source='therapist.get_full_name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = AppointmentSeries
+        fields = [
+            'id',
+            'patient',
+            'patient_name',
+            'therapist',
+            'therapist_name',
+            'room',
+            'hour',
+            'duration_minutes',
+            'appointment_type',
+            'payment',
+            'payment_type',
+            'frequency',
+            'interval',
+            'weekdays',
+            'start_date',
+            'end_date',
+            'occurrence_count',
+            'excluded_dates',
+            'materialized_until',
+            'created_at',
+            'updated_at',
+            'deleted_at',
+        ]
+        read_only_fields = ['id', 'materialized_until', 'created_at', 'updated_at', 'deleted_at']
+
+    def validate_start_date(self, value):
+        """La serie no puede empezar antes de hoy."""
+        from django.utils import timezone
+        if value < timezone.localdate():
+            raise serializers.ValidationError("La fecha de inicio no puede ser anterior a hoy.")
+        return value
+
+    def validate_interval(self, value):
+        if not 1 <= value <= 52:
+            raise serializers.ValidationError("El intervalo debe estar entre 1 y 52.")
+        return value
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(not isinstance(day, int) or not 0 <= day <= 6 for day in value):
+            raise serializers.ValidationError("Use una lista de días de 0 (lunes) a 6 (domingo).")
+        return sorted(set(value))
+
+    def validate_excluded_dates(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Use una lista de fechas YYYY-MM-DD.")
+        field = serializers.DateField(input_formats=['%Y-%m-%d'])
+        return sorted({field.to_internal_value(day).isoformat() for day in value})
+
+    def validate(self, data):
+        """Validación a nivel de objeto"""
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError(
+                {'end_date': "La fecha de fin no puede ser anterior a la de inicio."}
+            )
+        if data.get('weekdays') and data.get('frequency', AppointmentSeries.FREQUENCY_WEEKLY) != AppointmentSeries.FREQUENCY_WEEKLY:
+            raise serializers.ValidationError(
+                {'weekdays': "Los días de la semana solo aplican a series semanales."}
+            )
+        if data.get('occurrence_count') == 0:
+            raise serializers.ValidationError(
+                {'occurrence_count': "La cantidad de citas debe ser mayor que cero."}
+            )
+        return data
+
+
+class AppointmentSeriesFollowingSerializer(serializers.Serializer):
+    """
+    Datos de "esta y las siguientes": fecha desde la que aplica y, al editar,
+    los campos a cambiar en las citas de la serie.
+    """
+
+    from_date = serializers.DateField(input_formats=['%Y-%m-%d'])
+    hour = serializers.TimeField(required=False)
+    duration_minutes = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    therapist = serializers.PrimaryKeyRelatedField(
+        queryset=Therapist.objects.filter(deleted_at__isnull=True), required=False, allow_null=True
+    )
+    room = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if 'therapist' in data:
+            therapist = data.pop('therapist')
+            data['therapist_id'] = therapist.pk if therapist else None
+        return data
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from architect.middleware.query_metrics import TimedSerializerMixin
 from ..models import Ticket
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer para el modelo Ticket.
     Basado en la estructura actualizada del modelo.
@@ -1,5 +1,7 @@
 from .appointment_service import AppointmentService
+from .appointment_series_service import AppointmentSeriesService
+from .batch_scheduler_service import BatchSchedulerService
 from .appointment_status_service import AppointmentStatusService
 from .ticket_service import TicketService
 
-__all__ = ['AppointmentService', 'AppointmentStatusService', 'TicketService']
+__all__ = ['AppointmentService', 'AppointmentSeriesService', 'AppointmentStatusService', 'BatchSchedulerService', 'TicketService']
@@ -0,0 +1,429 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from ..models import Appointment, AppointmentSeries, Ticket
+from ..serializers.appointment_series import AppointmentSeriesSerializer
+from .appointment_service import AppointmentService
+from .availability_index import (
+    CANCELLED_STATUS, DEFAULT_DURATION_MINUTES, AvailabilityIndex, appointment_day, day_start, minutes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Campos que se pueden cambiar en "esta y las siguientes"
+FOLLOWING_FIELDS = ('hour', 'duration_minutes', 'therapist_id', 'room')
+
+
+class AppointmentSeriesService:
+    """
+    Servicio para las series de citas recurrentes.
+
+    - Las fechas salen de la regla de la serie (AppointmentSeries.iter_occurrences)
+      sin consultar la base de datos; solo se crean citas hasta
+      APPOINTMENT_SERIES_HORIZON_DAYS desde hoy y la tarea
+      extend_appointment_series crea las siguientes a medida que se acercan.
+    - Los choques de todas las fechas con citas existentes (mismo terapeuta,
+      consultorio o paciente) se buscan con una sola consulta por rango, con
+      los días bloqueados (AvailabilityIndex.lock_days) hasta crear o cambiar
+      las citas: dos series, o una serie y el agendador por lotes, sobre los
+      mismos días se confirman de a una.
+    - Las citas se insertan con AppointmentService.insert_with_tickets (bulk).
+    - "Esta y las siguientes" divide la serie en la fecha indicada y cambia las
+      citas ya creadas con un solo UPDATE; cancelar hace lo mismo con el estado.
+    """
+
+    def __init__(self):
+        self.appointment_service = AppointmentService()
+
+    @staticmethod
+    def horizon():
+        """Último día hasta el que se crean citas por adelantado."""
+        return timezone.localdate() + timedelta(days=getattr(settings, 'APPOINTMENT_SERIES_HORIZON_DAYS', 90))
+
+    # ---------- Consulta ----------
+
+    def preview(self, data):
+        """
+        Fechas que crearía una serie nueva hasta el horizonte y sus choques,
+        sin guardar nada.
+        """
+        series = AppointmentSeries(**data)
+        days = list(series.iter_occurrences(end=self.horizon()))
+        conflicts = self.find_conflicts(series, days)
+        return Response({
+            'occurrences': [day.isoformat() for day in days],
+            'conflicts': self._conflict_list(conflicts),
+            'horizon': self.horizon().isoformat(),
+        }, status=status.HTTP_200_OK)
+
+    def occurrences(self, series, start, end):
+        """
+        Fechas de la serie entre `start` y `end` (expansión perezosa de la regla)
+        con la cita creada para cada una, si ya existe.
+        """
+        appointments = {
+            appointment_day(row['appointment_date']): row
+            for row in (
+                Appointment.objects
+                .filter(
+                    series=series,
+                    deleted_at__isnull=True,
+                    appointment_date__gte=day_start(start),
+                    appointment_date__lt=day_start(end + timedelta(days=1)),
+                )
+                .values('id', 'appointment_date', 'hour', 'appointment_status', 'ticket_number')
+            )
+        }
+        result = []
+        for day in series.iter_occurrences(start, end):
+            appointment = appointments.get(day)
+            result.append({
+                'date': day.isoformat(),
+                'appointment_id': appointment['id'] if appointment else None,
+                'hour': (appointment['hour'] if appointment else series.hour).strftime('%H:%M'),
+                'appointment_status': appointment['appointment_status'] if appointment else None,
+                'ticket_number': appointment['ticket_number'] if appointment else None,
+            })
+        return Response({
+            'series_id': series.pk,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'materialized_until': series.materialized_until.isoformat() if series.materialized_until else None,
+            'occurrences': result,
+        }, status=status.HTTP_200_OK)
+
+    def find_conflicts(self, series, days, exclude_series=None):
+        """
+        Choques de la serie en `days` con citas activas del mismo terapeuta,
+        consultorio o paciente, en una sola consulta por rango de fechas.
+        Retorna {día: [{appointment_id, hour, resources}]}.
+        """
+        if not days:
+            return {}
+        resources = Q(patient_id=series.patient_id)
+        if series.therapist_id:
+            resources |= Q(therapist_id=series.therapist_id)
+        if series.room is not None:
+            resources |= Q(room=series.room)
+
+        queryset = (
+            Appointment.objects
+            .filter(
+                resources,
+                deleted_at__isnull=True,
+                appointment_date__gte=day_start(min(days)),
+                appointment_date__lt=day_start(max(days) + timedelta(days=1)),
+                hour__isnull=False,
+            )
+            .exclude(appointment_status=CANCELLED_STATUS)
+        )
+        if exclude_series is not None:
+            queryset = queryset.exclude(series_id=exclude_series)
+
+        by_day = defaultdict(list)
+        for row in queryset.values('id', 'appointment_date', 'hour', 'duration_minutes', 'therapist_id', 'room', 'patient_id'):
+            by_day[appointment_day(row['appointment_date'])].append(row)
+
+        start = minutes(series.hour)
+        end = start + (series.duration_minutes or DEFAULT_DURATION_MINUTES)
+        conflicts = {}
+        for day in days:
+            found = []
+            for row in by_day.get(day, ()):
+                row_start = minutes(row['hour'])
+                if row_start >= end or start >= row_start + (row['duration_minutes'] or DEFAULT_DURATION_MINUTES):
+                    continue
+                shared = [
+                    name for name, same in (
+                        ('therapist', series.therapist_id and row['therapist_id'] == series.therapist_id),
+                        ('room', series.room is not None and row['room'] == series.room),
+                        ('patient', row['patient_id'] == series.patient_id),
+                    ) if same
+                ]
+                found.append({'appointment_id': row['id'], 'hour': row['hour'].strftime('%H:%M'), 'resources': shared})
+            if found:
+                conflicts[day] = found
+        return conflicts
+
+    # ---------- Alta y extensión ----------
+
+    def create(self, data, skip_conflicts=False):
+        """
+        Crea la serie y sus citas hasta el horizonte. Con choques responde 409,
+        salvo que `skip_conflicts` indique omitir esas fechas (quedan como excluidas).
+        """
+        try:
+            with transaction.atomic():
+                series = AppointmentSeries(**data)
+                until = self.horizon()
+                days = list(series.iter_occurrences(end=until))
+                if not days:
+                    return Response(
+                        {'error': 'La regla de la serie no genera citas'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                AvailabilityIndex.lock_days(days)
+                conflicts = self.find_conflicts(series, days)
+                if conflicts and not skip_conflicts:
+                    return Response(
+                        {'error': 'Hay citas que se cruzan con la serie', 'conflicts': self._conflict_list(conflicts)},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                self._exclude(series, conflicts)
+                series.materialized_until = until
+                series.save()
+                appointments = self._materialize(series, [day for day in days if day not in conflicts])
+
+            return Response({
+                'message': 'Serie creada exitosamente',
+                'series': AppointmentSeriesSerializer(series).data,
+                'created': len(appointments),
+                'skipped': self._conflict_list(conflicts),
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Error al crear la serie: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def extend(self, series, until=None):
+        """
+        Crea las citas de la serie entre materialized_until y `until` (por
+        defecto el horizonte). Las fechas con choques se omiten y se registran
+        como excluidas. Debe llamarse dentro de una transacción (bloquea los
+        días). Retorna (citas creadas, fechas omitidas).
+        """
+        until = until or self.horizon()
+        start = series.materialized_until + timedelta(days=1) if series.materialized_until else series.start_date
+        if start > until:
+            return 0, []
+        days = list(series.iter_occurrences(start, until))
+        AvailabilityIndex.lock_days(days)
+        conflicts = self.find_conflicts(series, days)
+        if conflicts:
+            logger.warning(
+                "Serie %s: se omiten %s fechas con choques (%s)",
+                series.pk, len(conflicts), ", ".join(day.isoformat() for day in sorted(conflicts)),
+            )
+        self._exclude(series, conflicts)
+        series.materialized_until = until
+        series.save(update_fields=['excluded_dates', 'materialized_until', 'updated_at'])
+        appointments = self._materialize(series, [day for day in days if day not in conflicts])
+        return len(appointments), sorted(conflicts)
+
+    def extend_all(self, until=None):
+        """Extiende hasta el horizonte todas las series activas que no terminaron (tarea periódica)."""
+        until = until or self.horizon()
+        pending = (
+            AppointmentSeries.objects
+            .filter(deleted_at__isnull=True)
+            .filter(Q(materialized_until__isnull=True) | Q(materialized_until__lt=until))
+            .filter(Q(materialized_until__isnull=True) | Q(end_date__isnull=True) | Q(end_date__gt=F('materialized_until')))
+            .values_list('id', flat=True)
+        )
+        created = skipped = 0
+        for series_id in list(pending):
+            with transaction.atomic():
+                series = AppointmentSeries.objects.select_for_update().get(pk=series_id)
+                count, omitted = self.extend(series, until)
+            created += count
+            skipped += len(omitted)
+        return {'created': created, 'skipped': skipped}
+
+    def _materialize(self, series, days):
+        """Inserta las citas de la serie en `days` (con sus tickets)."""
+        rows = [
+            {
+                'series_id': series.pk,
+                'patient_id': series.patient_id,
+                'therapist_id': series.therapist_id,
+                'room': series.room,
+                'appointment_date': day_start(day),
+                'hour': series.hour,
+                'duration_minutes': series.duration_minutes,
+                'appointment_type': series.appointment_type,
+                'payment': series.payment,
+                'payment_type_id': series.payment_type_id,
+                'initial_date': series.start_date,
+                'final_date': series.end_date,
+            }
+            for day in days
+        ]
+        return self.appointment_service.insert_with_tickets(rows)
+
+    @staticmethod
+    def _exclude(series, conflicts):
+        if conflicts:
+            series.excluded_dates = sorted(set(series.excluded_dates or []) | {day.isoformat() for day in conflicts})
+
+    @staticmethod
+    def _conflict_list(conflicts):
+        return [
+            {'date': day.isoformat(), **conflict}
+            for day in sorted(conflicts)
+            for conflict in conflicts[day]
+        ]
+
+    # ---------- "Esta y las siguientes" ----------
+
+    def update_following(self, series_id, from_date, changes):
+        """
+        Cambia hora, duración, terapeuta o consultorio de la cita de `from_date`
+        y las siguientes. Si `from_date` no es el inicio, la serie se divide:
+        la original termina el día anterior y una nueva serie, con los cambios,
+        sigue desde la primera fecha >= `from_date`. Las citas ya creadas se
+        actualizan con un solo UPDATE. Con choques responde 409 sin cambiar nada.
+        """
+        changes = {field: value for field, value in changes.items() if field in FOLLOWING_FIELDS}
+        if not changes:
+            return Response(
+                {'error': f'Indique al menos un cambio: {", ".join(FOLLOWING_FIELDS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            with transaction.atomic():
+                series = self._locked(series_id)
+                if series is None:
+                    return Response({'error': 'Serie no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+                first = next(series.iter_occurrences(start=max(from_date, series.start_date)), None)
+                if first is None:
+                    return Response(
+                        {'error': 'La serie no tiene citas desde esa fecha'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                following = self._following(series, first)
+                target = self._split(series, first) if first > series.start_date else series
+                for field, value in changes.items():
+                    setattr(target, field, value)
+
+                days = sorted({appointment_day(value) for value in following.values_list('appointment_date', flat=True)})
+                AvailabilityIndex.lock_days(days)
+                conflicts = self.find_conflicts(target, days, exclude_series=series.pk)
+                if conflicts:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {'error': 'Hay citas que se cruzan con los cambios', 'conflicts': self._conflict_list(conflicts)},
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+                target.save()
+                if target is not series:
+                    series.save()
+                affected = list(following.only('id', 'appointment_date'))
+                updated = following.update(series=target, updated_at=timezone.now(), **changes)
+                self._notify(affected)
+
+            return Response({
+                'message': 'Citas actualizadas exitosamente',
+                'series': AppointmentSeriesSerializer(target).data,
+                'updated': updated,
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Error al actualizar la serie: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def cancel_following(self, series_id, from_date):
+        """
+        Cancela la cita de `from_date` y las siguientes con un solo UPDATE (y sus
+        tickets pendientes) y termina la serie el día anterior; si `from_date`
+        es el inicio, la serie queda eliminada.
+        """
+        try:
+            with transaction.atomic():
+                series = self._locked(series_id)
+                if series is None:
+                    return Response({'error': 'Serie no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+                from_date = max(from_date, series.start_date)
+
+                following = self._following(series, from_date)
+                affected = list(following.only('id', 'appointment_date'))
+                cancelled = following.update(appointment_status=CANCELLED_STATUS, updated_at=timezone.now())
+                Ticket.objects.filter(
+                    appointment_id__in=[appointment.pk for appointment in affected], status='pending'
+                ).update(status='cancelled', updated_at=timezone.now())
+
+                if from_date <= series.start_date:
+                    series.deleted_at = timezone.now()
+                else:
+                    series.end_date = from_date - timedelta(days=1)
+                    if series.materialized_until and series.materialized_until > series.end_date:
+                        series.materialized_until = series.end_date
+                series.save()
+                self._notify(affected)
+
+            return Response({
+                'message': 'Citas canceladas exitosamente',
+                'cancelled': cancelled,
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Error al cancelar la serie: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @staticmethod
+    def _locked(series_id):
+        return AppointmentSeries.objects.select_for_update().filter(pk=series_id, deleted_at__isnull=True).first()
+
+    @staticmethod
+    def _following(series, from_date):
+        """Citas activas de la serie desde `from_date` inclusive."""
+        return (
+            Appointment.objects
+            .filter(series=series, deleted_at__isnull=True, appointment_date__gte=day_start(from_date))
+            .exclude(appointment_status=CANCELLED_STATUS)
+        )
+
+    @staticmethod
+    def _split(series, first):
+        """
+        Nueva serie (sin guardar) que continúa `series` desde `first`, una fecha
+        de la regla (así las semanas alternas conservan su fase). La original
+        queda terminando el día anterior.
+        """
+        continuation = AppointmentSeries(
+            **{
+                field.attname: getattr(series, field.attname)
+                for field in AppointmentSeries._meta.concrete_fields
+                if not field.primary_key and field.attname not in ('created_at', 'updated_at')
+            }
+        )
+        continuation.start_date = first
+        if series.occurrence_count is not None:
+            used = sum(1 for _ in series.iter_occurrences(end=first - timedelta(days=1))) + sum(
+                1 for day in series.excluded_dates or [] if day < first.isoformat()
+            )
+            continuation.occurrence_count = max(series.occurrence_count - used, 1)
+        continuation.excluded_dates = [day for day in series.excluded_dates or [] if day >= first.isoformat()]
+
+        series.end_date = first - timedelta(days=1)
+        series.excluded_dates = [day for day in series.excluded_dates or [] if day < first.isoformat()]
+        if series.materialized_until and series.materialized_until > series.end_date:
+            continuation.materialized_until = series.materialized_until
+            series.materialized_until = series.end_date
+        return continuation
+
+    @staticmethod
+    def _notify(appointments):
+        """Avisa a los reportes de los cambios masivos (sin post_save por fila)."""
+        if not appointments:
+            return
+        from appointments_status.signals import appointments_bulk_changed
+        tickets = list(
+            Ticket.objects
+            .filter(appointment_id__in=[appointment.pk for appointment in appointments])
+            .only('id', 'payment_date')
+        )
+        appointments_bulk_changed.send(sender=Appointment, appointments=appointments, tickets=tickets)
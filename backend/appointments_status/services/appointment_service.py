@@ -1,5 +1,6 @@
 # appointments_status/services/appointment_service.py
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Max
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
@@ -7,7 +8,13 @@ from ..models import Appointment, Ticket
 from decimal import Decimal
 from appointments_status.models.appointment import Appointment
 from appointments_status.services.ghl_service import GHLService
-from appointments_status.serializers.appointment import AppointmentSerializer
+from appointments_status.serializers.appointment import AppointmentSerializer, AppointmentBulkItemSerializer
+from appointments_status.services.availability_index import availability_index, clock
+from appointments_status.services.ticket_number_allocator import ticket_number_allocator
+from django.conf import settings
+from histories_configurations.models import PaymentType
+from patients_diagnoses.models import Patient
+from therapists.models import Therapist
 
 
 
@@ -163,6 +170,155 @@ class AppointmentService:
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    BULK_BATCH_SIZE = 500
+
+    def bulk_create(self, items):
+        """
+        Crea varias citas en una sola petición (p. ej. las sesiones de un plan
+        de tratamiento), cada una con su ticket automático.
+
+        - Valida el lote completo: formato de cada cita, existencia de pacientes,
+          terapeutas y tipos de pago (una consulta por tabla) y citas repetidas
+          (mismo paciente, fecha y hora) dentro del lote.
+        - Los números de ticket se reservan juntos en TicketNumberAllocator y se
+          asignan a las citas antes de insertarlas.
+        - Citas y tickets se insertan con bulk_create, sin las señales post_save
+          por fila; al final se envía appointments_bulk_changed para que los
+          reportes invaliden los días afectados.
+        Si algo falla no se crea ninguna cita. No sincroniza con GHL.
+
+        Args:
+            items (list): Citas a crear (ver AppointmentBulkItemSerializer)
+
+        Returns:
+            Response: Respuesta con las citas creadas o los errores por posición
+        """
+        max_items = getattr(settings, 'APPOINTMENT_BULK_MAX_ITEMS', 500)
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Se requiere una lista de citas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {'error': f'Se pueden crear como máximo {max_items} citas por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = AppointmentBulkItemSerializer(data=items, many=True)
+        if serializer.is_valid():
+            errors = self._bulk_errors(serializer.validated_data)
+        else:
+            errors = [{'index': index, **item} for index, item in enumerate(serializer.errors) if item]
+        if errors:
+            return Response(
+                {'error': 'Hay citas con datos inválidos', 'details': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                appointments = self.insert_with_tickets(serializer.validated_data)
+
+            created = (
+                Appointment.objects
+                .filter(pk__in=[appointment.pk for appointment in appointments])
+                .select_related('patient', 'therapist', 'payment_type', 'payment_status')
+                .order_by('appointment_date', 'hour', 'id')
+            )
+            return Response({
+                'message': f'{len(appointments)} citas creadas exitosamente con ticket automático',
+                'count': len(appointments),
+                'appointments': AppointmentSerializer(created, many=True).data
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Error al crear las citas: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def insert_with_tickets(self, rows):
+        """
+        Inserta citas ya validadas (dicts de campos del modelo) con sus tickets
+        usando bulk_create, dentro de la transacción del llamador, y envía
+        appointments_bulk_changed. Retorna las citas creadas con su id.
+        """
+        if not rows:
+            return []
+        ticket_numbers = ticket_number_allocator.allocate_many(len(rows))
+        appointments = [
+            Appointment(**row, ticket_number=ticket_number)
+            for row, ticket_number in zip(rows, ticket_numbers)
+        ]
+        returns_ids = connection.features.can_return_rows_from_bulk_insert
+        last_id = None if returns_ids else Appointment.objects.aggregate(last=Max('id'))['last'] or 0
+        Appointment.objects.bulk_create(appointments, batch_size=self.BULK_BATCH_SIZE)
+
+        if not returns_ids:
+            # MySQL no retorna los ids de bulk_create: se recuperan por el número de ticket
+            # (que no es único) solo entre las citas insertadas después del mayor id previo
+            found = list(
+                Appointment.objects
+                .filter(pk__gt=last_id, ticket_number__in=ticket_numbers)
+                .values_list('ticket_number', 'id')
+            )
+            ids = dict(found)
+            if len(found) != len(appointments) or len(ids) != len(appointments):
+                raise RuntimeError('No se pudieron identificar las citas insertadas por su número de ticket')
+            for appointment in appointments:
+                appointment.pk = ids[appointment.ticket_number]
+
+        tickets = [
+            Ticket(
+                appointment_id=appointment.pk,
+                ticket_number=appointment.ticket_number,
+                amount=appointment.payment or 0,
+                payment_method='efectivo',
+                description=f'Ticket generado automáticamente para cita #{appointment.pk}',
+                status='pending',
+            )
+            for appointment in appointments
+        ]
+        Ticket.objects.bulk_create(tickets, batch_size=self.BULK_BATCH_SIZE)
+
+        from appointments_status.signals import appointments_bulk_changed
+        appointments_bulk_changed.send(sender=Appointment, appointments=appointments, tickets=tickets)
+        return appointments
+
+    @staticmethod
+    def _bulk_errors(rows):
+        """
+        Errores por posición del lote: ids de paciente, terapeuta o tipo de pago
+        inexistentes y citas repetidas (mismo paciente, fecha y hora).
+        """
+        references = [
+            ('patient_id', Patient.objects.filter(deleted_at__isnull=True), 'No existe el paciente'),
+            ('therapist_id', Therapist.objects.filter(deleted_at__isnull=True), 'No existe el terapeuta'),
+            ('payment_type_id', PaymentType.objects.filter(deleted_at__isnull=True), 'No existe el tipo de pago'),
+        ]
+        existing = {}
+        for field, queryset, _ in references:
+            ids = {row[field] for row in rows if row.get(field) is not None}
+            existing[field] = set(queryset.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+
+        errors = []
+        seen = {}
+        for index, row in enumerate(rows):
+            row_errors = {}
+            for field, _, message in references:
+                value = row.get(field)
+                if value is not None and value not in existing[field]:
+                    row_errors[field] = [f'{message} {value}']
+            slot = (row['patient_id'], row['appointment_date'], row['hour'])
+            if slot in seen:
+                row_errors['non_field_errors'] = [f'Cita repetida con la posición {seen[slot]}']
+            else:
+                seen[slot] = index
+            if row_errors:
+                errors.append({'index': index, **row_errors})
+        return errors
+
     def get_by_id(self, appointment_id):
         """
         Obtiene una cita por su ID.
@@ -424,43 +580,74 @@ class AppointmentService:
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def check_availability(self, date, hour, duration=60):
+    def check_availability(self, date, hour, duration=60, therapist_id=None, room=None, exclude_id=None):
         """
-        Verifica la disponibilidad para una cita.
+        Verifica la disponibilidad para una cita con el índice de disponibilidad
+        en memoria (ver services/availability_index.py).
         
         Args:
             date (date): Fecha de la cita
             hour (time): Hora de la cita
             duration (int): Duración en minutos
+            therapist_id (int): Terapeuta; si no se indica terapeuta ni consultorio
+                se consideran todas las citas del día
+            room (int): Consultorio
+            exclude_id (int): Cita que no se cuenta como choque (p. ej. al reprogramarla)
             
         Returns:
             Response: Respuesta con la disponibilidad
         """
         try:
-            # Convertir la hora de inicio a datetime
-            from datetime import datetime, timedelta
-            start_datetime = datetime.combine(date, hour)
-            end_datetime = start_datetime + timedelta(minutes=duration)
-            
-            # Buscar citas que se solapen
-            conflicting_appointments = Appointment.objects.filter(
-                appointment_date=date,
-                deleted_at__isnull=True
-            ).exclude(
-                hour__gte=end_datetime.time()
-            ).exclude(
-                hour__lte=start_datetime.time()
+            conflicts = availability_index.conflicts(
+                date, hour, duration, therapist_id=therapist_id, room=room, exclude=exclude_id
             )
+            return Response({
+                'is_available': not conflicts,
+                'conflicting_appointments': len(conflicts),
+                'conflicting_appointment_ids': conflicts,
+            }, status=status.HTTP_200_OK)
             
-            is_available = not conflicting_appointments.exists()
+        except Exception as e:
+            return Response(
+                {'error': f'Error al verificar disponibilidad: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def free_slots(self, start_date, end_date, duration=60, therapist_id=None, room=None, limit=10, step=None):
+        """
+        Próximos horarios libres para un terapeuta y/o consultorio.
+        
+        Args:
+            start_date (date): Primer día de la búsqueda
+            end_date (date): Último día de la búsqueda
+            duration (int): Duración en minutos
+            therapist_id (int): Terapeuta
+            room (int): Consultorio
+            limit (int): Cantidad máxima de horarios
+            step (int): Minutos entre horarios (por defecto APPOINTMENT_SLOT_MINUTES)
             
+        Returns:
+            Response: Respuesta con los horarios libres
+        """
+        try:
+            slots = availability_index.free_slots(
+                start_date, end_date, duration,
+                therapist_id=therapist_id, room=room, limit=limit, step=step,
+                not_before=timezone.now(),
+            )
             return Response({
-                'is_available': is_available,
-                'conflicting_appointments': conflicting_appointments.count() if not is_available else 0
+                'therapist_id': therapist_id,
+                'room': room,
+                'duration': duration,
+                'count': len(slots),
+                'slots': [
+                    {'date': day.isoformat(), 'start': clock(start), 'end': clock(end)}
+                    for day, start, end in slots
+                ],
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
-                {'error': f'Error al verificar disponibilidad: {str(e)}'},
+                {'error': f'Error al buscar horarios libres: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -0,0 +1,335 @@
+"""
+Índice de disponibilidad de citas en memoria.
+
+Estructura
+    Por cada día cargado se guarda un DayIntervals con los intervalos ocupados
+    [inicio, fin) en minutos del día, ordenados por inicio, agrupados por
+    terapeuta, por consultorio y de toda la clínica. Se arman con
+    appointment_date, hour y duration_minutes (60 minutos si no tiene) de las
+    citas activas (sin deleted_at ni CANCELADO). Los intervalos de cada recurso
+    también se guardan fusionados (sin solapes), así un choque se resuelve con
+    bisect y los huecos libres se recorren en orden.
+
+Invalidación
+    Las señales de Appointment incrementan la versión del día
+    (AppointmentDayVersion) al confirmar la transacción, también en las altas y
+    cambios masivos (appointments_bulk_changed). Cada consulta lee las versiones
+    del rango con una sola consulta y recarga, con otra consulta, solo los días
+    cuya versión cambió; la versión se lee antes que las citas, así una
+    escritura concurrente nunca queda oculta detrás de una versión nueva.
+    Cada proceso (worker de gunicorn) tiene su propio índice y conserva como
+    máximo AVAILABILITY_INDEX_MAX_DAYS días (los menos usados se descartan).
+
+Horario
+    Los huecos libres se buscan entre APPOINTMENT_OPENING_HOUR y
+    APPOINTMENT_CLOSING_HOUR de APPOINTMENT_WORKING_DAYS, en pasos de
+    APPOINTMENT_SLOT_MINUTES desde la apertura.
+"""
+import bisect
+import heapq
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date as date_type, datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from ..models import Appointment, AppointmentDayVersion
+
+# Duración asumida de una cita sin duration_minutes
+DEFAULT_DURATION_MINUTES = 60
+CANCELLED_STATUS = 'CANCELADO'
+# Días que se cargan juntos al buscar huecos libres
+SEARCH_CHUNK_DAYS = 14
+
+_pending = threading.local()
+
+
+def day_start(day):
+    """Inicio del día en la zona horaria local (como se guarda appointment_date)."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def appointment_day(value):
+    """Día local de un appointment_date (datetime, date o string); None si no se puede interpretar."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value if isinstance(value, date_type) else None
+
+
+def minutes(hour):
+    return hour.hour * 60 + hour.minute
+
+
+def clock(value):
+    """Minutos del día en formato HH:MM."""
+    return f'{value // 60:02d}:{value % 60:02d}'
+
+
+def _merge(intervals):
+    """Fusiona intervalos (inicio, fin) ordenados por inicio en intervalos sin solapes."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class DayIntervals:
+    """Intervalos ocupados de un día por terapeuta, consultorio y de toda la clínica."""
+
+    __slots__ = ('_raw', '_merged', '_starts')
+
+    def __init__(self, rows=()):
+        raw = defaultdict(list)
+        for row in rows:
+            start = minutes(row['hour'])
+            interval = (start, start + (row['duration_minutes'] or DEFAULT_DURATION_MINUTES), row['id'])
+            raw[('all', None)].append(interval)
+            if row['therapist_id'] is not None:
+                raw[('therapist', row['therapist_id'])].append(interval)
+            if row['room'] is not None:
+                raw[('room', row['room'])].append(interval)
+        self._raw = {key: sorted(intervals) for key, intervals in raw.items()}
+        self._merged = {key: _merge((start, end) for start, end, _ in intervals) for key, intervals in self._raw.items()}
+        self._starts = {key: [start for start, _ in merged] for key, merged in self._merged.items()}
+
+    @staticmethod
+    def _keys(therapist_id, room):
+        keys = []
+        if therapist_id is not None:
+            keys.append(('therapist', therapist_id))
+        if room is not None:
+            keys.append(('room', room))
+        return keys or [('all', None)]
+
+    def is_free(self, start, end, therapist_id=None, room=None):
+        """Si [start, end) no se cruza con ninguna cita del terapeuta ni del consultorio."""
+        for key in self._keys(therapist_id, room):
+            merged = self._merged.get(key)
+            if not merged:
+                continue
+            index = bisect.bisect_left(self._starts[key], end) - 1
+            if index >= 0 and merged[index][1] > start:
+                return False
+        return True
+
+    def conflicts(self, start, end, therapist_id=None, room=None, exclude=None):
+        """Ids de las citas que se cruzan con [start, end)."""
+        found = set()
+        for key in self._keys(therapist_id, room):
+            for busy_start, busy_end, appointment_id in self._raw.get(key, ()):
+                if busy_start >= end:
+                    break
+                if busy_end > start and appointment_id != exclude:
+                    found.add(appointment_id)
+        return sorted(found)
+
+    def busy(self, therapist_id=None, room=None):
+        """Intervalos ocupados (fusionados) del terapeuta y/o consultorio."""
+        lists = [self._merged.get(key, []) for key in self._keys(therapist_id, room)]
+        return lists[0] if len(lists) == 1 else _merge(heapq.merge(*lists))
+
+
+class AvailabilityIndex:
+    """Intervalos ocupados por día en memoria, validados contra AppointmentDayVersion."""
+
+    def __init__(self, max_days=None):
+        self.max_days = max_days or getattr(settings, 'AVAILABILITY_INDEX_MAX_DAYS', 400)
+        self._lock = threading.Lock()
+        self._days = OrderedDict()  # día -> (versión, DayIntervals)
+
+    # ---------- Carga e invalidación ----------
+
+    def days(self, start, end):
+        """DayIntervals de cada día entre `start` y `end` inclusive (recarga solo los días que cambiaron)."""
+        wanted = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        versions = dict(
+            AppointmentDayVersion.objects
+            .filter(day__range=[start, end])
+            .values_list('day', 'version')
+        )
+        result = {}
+        with self._lock:
+            for day in wanted:
+                cached = self._days.get(day)
+                if cached is not None and cached[0] == versions.get(day, 0):
+                    self._days.move_to_end(day)
+                    result[day] = cached[1]
+
+        stale = [day for day in wanted if day not in result]
+        if stale:
+            loaded = self.load(stale)
+            with self._lock:
+                for day in stale:
+                    result[day] = loaded[day]
+                    self._days[day] = (versions.get(day, 0), loaded[day])
+                    self._days.move_to_end(day)
+                while len(self._days) > self.max_days:
+                    self._days.popitem(last=False)
+        return result
+
+    def day(self, day):
+        return self.days(day, day)[day]
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    @staticmethod
+    def load(days):
+        """
+        Citas activas de `days` agrupadas por día, en una sola consulta por rango.
+        Lee siempre la base de datos, sin pasar por la caché del índice.
+        """
+        rows = defaultdict(list)
+        queryset = (
+            Appointment.objects
+            .filter(
+                deleted_at__isnull=True,
+                hour__isnull=False,
+                appointment_date__gte=day_start(min(days)),
+                appointment_date__lt=day_start(max(days) + timedelta(days=1)),
+            )
+            .exclude(appointment_status=CANCELLED_STATUS)
+            .values('id', 'appointment_date', 'hour', 'duration_minutes', 'therapist_id', 'room')
+        )
+        for row in queryset.iterator(chunk_size=2000):
+            rows[appointment_day(row['appointment_date'])].append(row)
+        return {day: DayIntervals(rows.get(day, ())) for day in days}
+
+    @staticmethod
+    def bump_days(days):
+        """Incrementa la versión de los días indicados (invalida el índice de todos los procesos)."""
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+        AppointmentDayVersion.objects.bulk_create(
+            [AppointmentDayVersion(day=day) for day in days], ignore_conflicts=True
+        )
+        AppointmentDayVersion.objects.filter(day__in=days).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def lock_days(days):
+        """
+        Bloquea las filas de AppointmentDayVersion de los días hasta el fin de la
+        transacción (se crean si faltan). Quien verifica choques y crea citas
+        sobre esos días (agendador por lotes, series) espera al anterior y
+        verifica ya con las citas que este confirmó.
+        """
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+        AppointmentDayVersion.objects.bulk_create(
+            [AppointmentDayVersion(day=day) for day in days], ignore_conflicts=True
+        )
+        list(
+            AppointmentDayVersion.objects
+            .select_for_update()
+            .filter(day__in=days)
+            .order_by('day')
+            .values_list('day', flat=True)
+        )
+
+    @classmethod
+    def schedule_bump(cls, days):
+        """Acumula días y los invalida una sola vez al confirmar la transacción."""
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+        if getattr(_pending, 'days', None) is None:
+            _pending.days = set()
+        _pending.days.update(days)
+        transaction.on_commit(cls._flush_pending_days)
+
+    @classmethod
+    def _flush_pending_days(cls):
+        days = getattr(_pending, 'days', None)
+        if not days:
+            return
+        _pending.days = set()
+        cls.bump_days(days)
+
+    # ---------- Consultas ----------
+
+    def conflicts(self, day, hour, duration=DEFAULT_DURATION_MINUTES, therapist_id=None, room=None, exclude=None):
+        """
+        Ids de las citas activas que se cruzan con la cita propuesta, del mismo
+        terapeuta o consultorio (de toda la clínica si no se indica ninguno).
+        """
+        start = minutes(hour)
+        return self.day(day).conflicts(start, start + duration, therapist_id, room, exclude)
+
+    def free_slots(self, start_date, end_date, duration=DEFAULT_DURATION_MINUTES, therapist_id=None,
+                   room=None, limit=10, step=None, not_before=None):
+        """
+        Próximos `limit` horarios libres de `duration` minutos para el terapeuta
+        y/o consultorio entre `start_date` y `end_date`, dentro del horario de
+        atención. `not_before` (datetime) descarta los horarios ya pasados.
+        Retorna una lista de (día, inicio, fin) con inicio y fin en minutos.
+        """
+        step = step or getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 15)
+        opening, closing, working_days = self.working_hours()
+        not_before = timezone.localtime(not_before) if not_before else None
+
+        slots = []
+        chunk_start = start_date
+        while chunk_start <= end_date and len(slots) < limit:
+            chunk_end = min(chunk_start + timedelta(days=SEARCH_CHUNK_DAYS - 1), end_date)
+            intervals = self.days(chunk_start, chunk_end)
+            for day in sorted(intervals):
+                if day.weekday() not in working_days:
+                    continue
+                earliest = opening
+                if not_before is not None:
+                    if day < not_before.date():
+                        continue
+                    if day == not_before.date():
+                        earliest = max(opening, minutes(not_before) + (1 if not_before.second else 0))
+                for start in self._day_slots(intervals[day].busy(therapist_id, room), opening, earliest, closing, duration, step):
+                    slots.append((day, start, start + duration))
+                    if len(slots) >= limit:
+                        return slots
+            chunk_start = chunk_end + timedelta(days=1)
+        return slots
+
+    @staticmethod
+    def _day_slots(busy, opening, earliest, closing, duration, step):
+        """Inicios libres del día alineados a `step` minutos desde la apertura."""
+        free_from = earliest
+        for busy_start, busy_end in [*busy, (closing, closing)]:
+            gap_end = min(busy_start, closing)
+            # Primer inicio de la grilla dentro del hueco
+            start = opening + -(-(free_from - opening) // step) * step
+            while start + duration <= gap_end:
+                yield start
+                start += step
+            free_from = max(free_from, busy_end)
+            if free_from >= closing:
+                return
+
+    @staticmethod
+    def working_hours():
+        """(apertura, cierre) en minutos del día y días de atención (0=lunes)."""
+        def setting_minutes(name, default):
+            value = getattr(settings, name, default)
+            return minutes(value if isinstance(value, time) else datetime.strptime(value, '%H:%M').time())
+        return (
+            setting_minutes('APPOINTMENT_OPENING_HOUR', '08:00'),
+            setting_minutes('APPOINTMENT_CLOSING_HOUR', '20:00'),
+            set(getattr(settings, 'APPOINTMENT_WORKING_DAYS', range(6))),
+        )
+
+
+# Índice compartido por el proceso
+availability_index = AvailabilityIndex()
@@ -0,0 +1,434 @@
+"""
+Asignación por lotes de terapeuta, consultorio y horario a solicitudes de cita.
+
+Solicitudes
+    Cada solicitud (ScheduleRequest) trae el paciente, la duración, los días
+    posibles, la ventana horaria [earliest, latest) en minutos del día y los
+    terapeutas y consultorios admitidos (todos, si no se fijó uno).
+
+Objetivo
+    1. Ubicar la mayor cantidad de solicitudes.
+    2. Minimizar los minutos ociosos entre citas de cada terapeuta en el día
+       (los huecos entre la primera y la última cita). Abrir la jornada de un
+       terapeuta que no tenía citas ese día cuesta EMPTY_DAY_PENALTY minutos,
+       así las citas se concentran en lugar de repartirse una por terapeuta.
+    3. Con peso ROOM_WEIGHT, lo mismo para los consultorios.
+    Además, cada día cuesta PRESSURE_WEIGHT por su presión (minutos pedidos
+    por las solicitudes pendientes que pueden ir ese día, repartidos entre sus
+    días posibles, sobre los minutos libres de los consultorios). Así las
+    solicitudes flexibles no llenan los días que las más restringidas necesitan.
+    Entre opciones de igual costo se prefiere el día y la hora más temprana.
+
+Algoritmo
+    - Voraz: las solicitudes más restringidas primero (menos días, ventana
+      más corta, menos terapeutas; a igualdad, la más larga). Para cada una se
+      evalúan solo los inicios que pegan la cita a los bordes de la ventana o a
+      las citas ya ubicadas del terapeuta (los únicos que pueden no abrir
+      huecos), alineados a la grilla de `step` minutos; si ninguno sirve se
+      recorre toda la grilla de la ventana.
+    - Búsqueda local mientras quede tiempo: se saca cada cita y se vuelve a
+      ubicar en su mejor posición con las demás fijas (nunca empeora, porque la
+      posición anterior también es candidata), y para cada solicitud sin ubicar
+      se intenta mover una de las citas que ocupan su ventana (mismo día y
+      terapeuta o consultorio posible) para hacerle lugar (expulsión de
+      profundidad 1, como máximo MAX_EJECTION_CANDIDATES intentos).
+    - Todo el proceso respeta `time_limit` segundos: el voraz deja sin ubicar lo
+      que no alcanzó a procesar y la búsqueda local se corta al vencer el plazo.
+    Las citas existentes entran como intervalos ocupados fijos de cada
+    terapeuta, consultorio y paciente.
+"""
+import bisect
+import random
+import time
+from collections import defaultdict
+
+# Costo de abrir la jornada de un terapeuta sin citas ese día (minutos ociosos equivalentes)
+EMPTY_DAY_PENALTY = 60
+# Peso de los huecos de los consultorios frente a los de los terapeutas
+ROOM_WEIGHT = 0.25
+# Costo (minutos equivalentes) por unidad de presión del día: demanda pendiente / capacidad libre
+PRESSURE_WEIGHT = 120
+# Citas que se prueban mover para ubicar una solicitud pendiente
+MAX_EJECTION_CANDIDATES = 25
+
+
+class ScheduleRequest:
+    """Solicitud de cita a ubicar (tiempos en minutos del día)."""
+
+    __slots__ = ('index', 'patient_id', 'duration', 'days', 'earliest', 'latest', 'therapist_ids', 'rooms')
+
+    def __init__(self, index, patient_id, duration, days, earliest, latest, therapist_ids, rooms):
+        self.index = index
+        self.patient_id = patient_id
+        self.duration = duration
+        self.days = sorted(days)
+        self.earliest = earliest
+        self.latest = latest
+        self.therapist_ids = tuple(therapist_ids)
+        self.rooms = tuple(rooms)
+
+    def flexibility(self):
+        return len(self.days) * max(self.latest - self.earliest - self.duration, 0) * len(self.therapist_ids)
+
+
+class Placement:
+    """Día, inicio, terapeuta y consultorio asignados a una solicitud."""
+
+    __slots__ = ('day', 'start', 'end', 'therapist_id', 'room')
+
+    def __init__(self, day, start, end, therapist_id, room):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.therapist_id = therapist_id
+        self.room = room
+
+
+class Timeline:
+    """Intervalos ocupados (inicio, fin) de un recurso en un día, ordenados y sin solapes."""
+
+    __slots__ = ('intervals',)
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals)
+
+    def _around(self, start):
+        index = bisect.bisect_left(self.intervals, (start, start))
+        previous = self.intervals[index - 1] if index else None
+        following = self.intervals[index] if index < len(self.intervals) else None
+        return previous, following
+
+    def fits(self, start, end):
+        previous, following = self._around(start)
+        return (previous is None or previous[1] <= start) and (following is None or following[0] >= end)
+
+    def idle_delta(self, start, end, empty_penalty=0):
+        """Minutos ociosos que agrega [start, end): parte un hueco o alarga la jornada."""
+        previous, following = self._around(start)
+        if previous is None and following is None:
+            return empty_penalty
+        before = following[0] - previous[1] if previous and following else 0
+        after = (start - previous[1] if previous else 0) + (following[0] - end if following else 0)
+        return after - before
+
+    def idle(self):
+        """Minutos ociosos entre la primera y la última cita."""
+        if not self.intervals:
+            return 0
+        return (self.intervals[-1][1] - self.intervals[0][0]) - sum(end - start for start, end in self.intervals)
+
+    def add(self, start, end):
+        bisect.insort(self.intervals, (start, end))
+
+    def remove(self, start, end):
+        self.intervals.remove((start, end))
+
+
+def _merged(intervals):
+    """Ordena y fusiona intervalos que se solapan (las citas existentes pueden cruzarse entre sí)."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class BatchScheduler:
+    """
+    Resuelve un lote de solicitudes sobre los intervalos ocupados existentes.
+
+    `busy(kind, key, day)` retorna los intervalos ocupados existentes de un
+    terapeuta ('therapist'), consultorio ('room') o paciente ('patient'); se
+    consulta una sola vez por recurso y día.
+    """
+
+    def __init__(self, busy, opening, closing, step=15, time_limit=2.0, seed=0,
+                 empty_day_penalty=EMPTY_DAY_PENALTY, room_weight=ROOM_WEIGHT, pressure_weight=PRESSURE_WEIGHT):
+        self.busy = busy
+        self.opening = opening
+        self.closing = closing
+        self.step = step
+        self.time_limit = time_limit
+        self.empty_day_penalty = empty_day_penalty
+        self.room_weight = room_weight
+        self.pressure_weight = pressure_weight
+        self._random = random.Random(seed)
+        self._demand = defaultdict(float)
+        self._capacity = {}
+        self._timelines = {}
+        self.placements = {}
+        self.stats = {}
+
+    # ---------- Estado ----------
+
+    def timeline(self, kind, key, day):
+        timeline = self._timelines.get((kind, key, day))
+        if timeline is None:
+            timeline = self._timelines[(kind, key, day)] = Timeline(_merged(self.busy(kind, key, day)))
+        return timeline
+
+    def _place(self, request, placement):
+        self.placements[request.index] = placement
+        for kind, key in (('therapist', placement.therapist_id), ('room', placement.room), ('patient', request.patient_id)):
+            self.timeline(kind, key, placement.day).add(placement.start, placement.end)
+        self._track(request, placement, -1)
+
+    def _unplace(self, request):
+        placement = self.placements.pop(request.index)
+        for kind, key in (('therapist', placement.therapist_id), ('room', placement.room), ('patient', request.patient_id)):
+            self.timeline(kind, key, placement.day).remove(placement.start, placement.end)
+        self._track(request, placement, 1)
+        return placement
+
+    def _track(self, request, placement, sign):
+        """Actualiza la demanda pendiente de los días de la solicitud y la capacidad libre del día asignado."""
+        for day in request.days:
+            self._demand[day] += sign * request.duration / len(request.days)
+        if placement.day in self._capacity:
+            self._capacity[placement.day] += sign * request.duration
+
+    def _start_tracking(self, requests):
+        """Demanda de todas las solicitudes y minutos libres de los consultorios en cada día."""
+        rooms = {room for request in requests for room in request.rooms}
+        for request in requests:
+            for day in request.days:
+                self._demand[day] += request.duration / len(request.days)
+        for day in self._demand:
+            self._capacity[day] = sum(
+                (self.closing - self.opening) - sum(
+                    min(end, self.closing) - max(start, self.opening)
+                    for start, end in self.timeline('room', room, day).intervals
+                    if end > self.opening and start < self.closing
+                )
+                for room in rooms
+            )
+
+    def _pressure(self, day):
+        return self.pressure_weight * max(self._demand[day], 0) / max(self._capacity.get(day, 0), self.step)
+
+    # ---------- Evaluación ----------
+
+    def _ceil(self, value):
+        return self.opening + -(-(value - self.opening) // self.step) * self.step
+
+    def _floor(self, value):
+        return self.opening + (value - self.opening) // self.step * self.step
+
+    def _starts(self, request, *timelines):
+        """Inicios que pegan la cita a los bordes de la ventana o a las citas de los recursos."""
+        low, high = request.earliest, request.latest - request.duration
+        starts = {self._ceil(low), self._floor(high)}
+        for timeline in timelines:
+            for busy_start, busy_end in timeline.intervals:
+                if busy_end >= low and busy_start - request.duration <= high:
+                    starts.add(self._ceil(busy_end))
+                    starts.add(self._floor(busy_start - request.duration))
+        return [start for start in starts if low <= start <= high]
+
+    def _grid(self, request):
+        return range(self._ceil(request.earliest), request.latest - request.duration + 1, self.step)
+
+    def _best_room(self, request, day, start, end):
+        """Consultorio libre que menos huecos agrega y su costo ponderado."""
+        best = None
+        for room in request.rooms:
+            timeline = self.timeline('room', room, day)
+            if timeline.fits(start, end):
+                cost = self.room_weight * timeline.idle_delta(start, end)
+                if best is None or cost < best[0]:
+                    best = (cost, room)
+        return best
+
+    def _best(self, request, full_grid=False, include=None):
+        """
+        Mejor ubicación (costo, Placement) de la solicitud con el resto fijo, o
+        None si no hay lugar. `include` agrega una posición a evaluar (la actual).
+        """
+        best = None
+        for position, day in enumerate(request.days):
+            patient = self.timeline('patient', request.patient_id, day)
+            pressure = self._pressure(day)
+            # Bordes de los consultorios: comunes a todos los terapeutas del día
+            room_starts = set(self._starts(request, *(self.timeline('room', room, day) for room in request.rooms)))
+            candidates = []
+            empty_seen = False
+            for therapist_id in request.therapist_ids:
+                therapist = self.timeline('therapist', therapist_id, day)
+                if not therapist.intervals:
+                    # Los terapeutas sin citas ese día son intercambiables: basta evaluar uno
+                    if empty_seen:
+                        continue
+                    empty_seen = True
+                starts = self._grid(request) if full_grid else room_starts.union(self._starts(request, therapist))
+                candidates.extend((therapist_id, start) for start in starts)
+            if include is not None and include.day == day:
+                candidates.append((include.therapist_id, include.start))
+            rooms = {}
+            for therapist_id, start in candidates:
+                end = start + request.duration
+                therapist = self.timeline('therapist', therapist_id, day)
+                if not therapist.fits(start, end) or not patient.fits(start, end):
+                    continue
+                if start not in rooms:
+                    rooms[start] = self._best_room(request, day, start, end)
+                if rooms[start] is None:
+                    continue
+                room_cost, room = rooms[start]
+                cost = therapist.idle_delta(start, end, self.empty_day_penalty) + room_cost + pressure + self._tie(position, start)
+                if best is None or cost < best[0]:
+                    best = (cost, Placement(day, start, end, therapist_id, room))
+        return best
+
+    @staticmethod
+    def _tie(position, start):
+        """Desempate por el día y la hora más tempranos (siempre menor a un minuto)."""
+        return position * 1e-5 + start * 1e-8
+
+    def _insert(self, request, fallback=True):
+        """
+        Ubica la solicitud en su mejor posición; False si no hay lugar. Con
+        `fallback`, si ningún borde sirve recorre toda la grilla de la ventana.
+        """
+        best = self._best(request)
+        if best is None and fallback:
+            best = self._best(request, full_grid=True)
+        if best is None:
+            return False
+        self._place(request, best[1])
+        return True
+
+    # ---------- Resolución ----------
+
+    def solve(self, requests):
+        """
+        Ubica las solicitudes y retorna (placements {índice: Placement}, índices sin ubicar).
+        Deja en `stats` los minutos ociosos del voraz y del resultado final.
+        """
+        started = time.monotonic()
+        deadline = started + self.time_limit
+        by_index = {request.index: request for request in requests}
+        pending = []
+        self._start_tracking(requests)
+
+        for request in sorted(requests, key=lambda item: (item.flexibility(), -item.duration, item.index)):
+            if time.monotonic() >= deadline or not self._insert(request):
+                pending.append(request.index)
+        greedy_seconds = time.monotonic() - started
+        greedy = self.idle_summary(requests)
+
+        moves = passes = 0
+        improved = True
+        while improved and time.monotonic() < deadline:
+            improved = False
+            passes += 1
+            placed = list(self.placements)
+            self._random.shuffle(placed)
+            for index in placed:
+                if time.monotonic() >= deadline:
+                    break
+                if self._relocate(by_index[index]):
+                    moves += 1
+                    improved = True
+            for index in list(pending):
+                if time.monotonic() >= deadline:
+                    break
+                if self._insert(by_index[index]) or self._eject_for(by_index[index], by_index, deadline):
+                    pending.remove(index)
+                    moves += 1
+                    improved = True
+
+        self.stats = {
+            'greedy': greedy,
+            'final': self.idle_summary(requests),
+            'greedy_ms': round(greedy_seconds * 1000, 1),
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+            'local_search_passes': passes,
+            'local_search_moves': moves,
+            'time_limit_reached': time.monotonic() >= deadline,
+        }
+        return self.placements, sorted(pending)
+
+    def first_fit(self, requests):
+        """
+        Asignación de referencia para comparar: en orden de llegada, el primer
+        día y horario libre con el primer terapeuta y consultorio disponibles.
+        """
+        for request in requests:
+            placement = next((
+                Placement(day, start, start + request.duration, therapist_id, room)
+                for day in request.days
+                for start in self._grid(request)
+                if self.timeline('patient', request.patient_id, day).fits(start, start + request.duration)
+                for therapist_id in request.therapist_ids
+                if self.timeline('therapist', therapist_id, day).fits(start, start + request.duration)
+                for room in request.rooms
+                if self.timeline('room', room, day).fits(start, start + request.duration)
+            ), None)
+            if placement is not None:
+                self._place(request, placement)
+        self.stats = {'final': self.idle_summary(requests)}
+        return self.placements
+
+    def _relocate(self, request):
+        """Saca la cita y la vuelve a ubicar en su mejor posición; True si bajó el costo."""
+        current = self._unplace(request)
+        current_cost = (
+            self.timeline('therapist', current.therapist_id, current.day).idle_delta(current.start, current.end, self.empty_day_penalty)
+            + self.room_weight * self.timeline('room', current.room, current.day).idle_delta(current.start, current.end)
+            + self._pressure(current.day)
+            + self._tie(request.days.index(current.day), current.start)
+        )
+        best = self._best(request, include=current)
+        if best is None or best[0] >= current_cost - 1e-6:
+            self._place(request, current)
+            return False
+        self._place(request, best[1])
+        return True
+
+    def _eject_for(self, request, by_index, deadline):
+        """
+        Mueve una cita que ocupa la ventana de la solicitud (terapeuta o
+        consultorio) para hacerle lugar; prueba primero las más flexibles.
+        """
+        days = set(request.days)
+        victims = sorted(
+            (
+                index for index, placement in self.placements.items()
+                if placement.day in days and placement.start < request.latest and placement.end > request.earliest
+                and (placement.therapist_id in request.therapist_ids or placement.room in request.rooms)
+            ),
+            key=lambda index: -by_index[index].flexibility(),
+        )
+        for index in victims[:MAX_EJECTION_CANDIDATES]:
+            if time.monotonic() >= deadline:
+                return False
+            victim = by_index[index]
+            previous = self._unplace(victim)
+            if self._insert(request, fallback=False):
+                if self._insert(victim, fallback=False):
+                    return True
+                self._unplace(request)
+            self._place(victim, previous)
+        return False
+
+    def idle_summary(self, requests):
+        """Minutos ociosos de los terapeutas y consultorios en los días de las solicitudes."""
+        days = {day for request in requests for day in request.days}
+        therapist_idle = room_idle = therapist_days = 0
+        for (kind, _, day), timeline in self._timelines.items():
+            if day not in days or not timeline.intervals:
+                continue
+            if kind == 'therapist':
+                therapist_idle += timeline.idle()
+                therapist_days += 1
+            elif kind == 'room':
+                room_idle += timeline.idle()
+        return {
+            'assigned': len(self.placements),
+            'unassigned': len(requests) - len(self.placements),
+            'therapist_idle_minutes': therapist_idle,
+            'room_idle_minutes': room_idle,
+            'therapist_days': therapist_days,
+        }
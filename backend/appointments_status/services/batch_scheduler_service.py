@@ -0,0 +1,289 @@
+from collections import defaultdict
+from datetime import time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from histories_configurations.models import PaymentType
+from patients_diagnoses.models import Patient
+from therapists.models import Therapist
+from ..models import Appointment
+from ..serializers import AppointmentScheduleRequestSerializer
+from .appointment_service import AppointmentService
+from .availability_index import (
+    CANCELLED_STATUS, DEFAULT_DURATION_MINUTES, AvailabilityIndex, appointment_day, availability_index,
+    clock, day_start, minutes,
+)
+from .batch_scheduler import BatchScheduler, ScheduleRequest
+
+# Días que puede abarcar un lote completo (de la primera a la última ventana)
+MAX_BATCH_RANGE_DAYS = 62
+
+
+class BatchSchedulerService:
+    """
+    Servicio del agendador por lotes: asigna terapeuta, consultorio y horario
+    a un conjunto de solicitudes de cita (ver services/batch_scheduler.py).
+
+    - Las citas existentes salen del índice de disponibilidad en memoria
+      (terapeutas y consultorios) y de una consulta por rango para los pacientes.
+    - Se consideran los terapeutas activos y los consultorios de
+      APPOINTMENT_ROOMS, dentro del horario de atención y desde mañana.
+    - Por defecto es una simulación (dry_run): no guarda nada. Sin dry_run, las
+      citas asignadas se crean con sus tickets en una sola transacción, después
+      de volver a verificar que terapeuta, consultorio y paciente sigan libres.
+      La verificación se hace con las filas de versión de los días bloqueadas,
+      así dos agendados simultáneos sobre los mismos días se confirman de a
+      uno (las series de citas toman el mismo bloqueo). Las altas individuales
+      y masivas no lo toman: una cita creada por esas vías durante la
+      verificación todavía puede cruzarse.
+    """
+
+    def __init__(self):
+        self.appointment_service = AppointmentService()
+
+    def schedule(self, items, dry_run=True, time_limit=None, seed=0):
+        """
+        Resuelve el lote y, si no es simulación, crea las citas.
+
+        Args:
+            items (list): Solicitudes (ver AppointmentScheduleRequestSerializer)
+            dry_run (bool): Solo calcular la asignación
+            time_limit (float): Segundos máximos del agendador (como máximo
+                APPOINTMENT_SCHEDULER_TIME_LIMIT)
+            seed (int): Semilla de la búsqueda local (resultados reproducibles)
+
+        Returns:
+            Response: Asignaciones, solicitudes sin ubicar y estadísticas
+        """
+        max_items = getattr(settings, 'APPOINTMENT_BULK_MAX_ITEMS', 500)
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Se requiere una lista de solicitudes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {'error': f'Se pueden agendar como máximo {max_items} solicitudes por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = AppointmentScheduleRequestSerializer(data=items, many=True)
+        if serializer.is_valid():
+            errors = self._errors(serializer.validated_data)
+        else:
+            errors = [{'index': index, **item} for index, item in enumerate(serializer.errors) if item]
+        if errors:
+            return Response(
+                {'error': 'Hay solicitudes con datos inválidos', 'details': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = serializer.validated_data
+        first = min(row['start_date'] for row in rows)
+        last = max(row['end_date'] for row in rows)
+        if (last - first).days >= MAX_BATCH_RANGE_DAYS:
+            return Response(
+                {'error': f'Las ventanas del lote deben caber en {MAX_BATCH_RANGE_DAYS} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = getattr(settings, 'APPOINTMENT_SCHEDULER_TIME_LIMIT', 2.0)
+            scheduler, requests = self.plan(rows, min(time_limit or limit, limit), seed)
+            placements = scheduler.placements
+            pending = [request.index for request in requests if request.index not in placements]
+            result = {
+                'dry_run': dry_run,
+                'assigned': len(placements),
+                'assignments': [self._assignment(index, rows[index], placement) for index, placement in sorted(placements.items())],
+                'unassigned': [{'index': index, 'reason': self._reason(requests[index])} for index in pending],
+                'stats': scheduler.stats,
+            }
+            if dry_run or not placements:
+                return Response(result, status=status.HTTP_200_OK)
+
+            with transaction.atomic():
+                AvailabilityIndex.lock_days({placement.day for placement in placements.values()})
+                conflicts = self._conflicts(rows, placements)
+                if conflicts:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {'error': 'Algunos horarios se ocuparon mientras se calculaba la asignación; vuelva a intentar',
+                         'conflicts': conflicts},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                appointments = self.appointment_service.insert_with_tickets([
+                    self._appointment_row(rows[index], placement) for index, placement in sorted(placements.items())
+                ])
+            for assignment, appointment in zip(result['assignments'], appointments):
+                assignment['appointment_id'] = appointment.pk
+                assignment['ticket_number'] = appointment.ticket_number
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Error al agendar las solicitudes: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def plan(self, rows, time_limit, seed=0):
+        """
+        Arma las solicitudes del agendador y las resuelve (solo lecturas).
+        Retorna (BatchScheduler con la asignación, lista de ScheduleRequest por posición).
+        """
+        scheduler, requests = self.build(rows, time_limit, seed)
+        scheduler.solve([request for request in requests if request.days])
+        return scheduler, requests
+
+    def build(self, rows, time_limit, seed=0, therapist_ids=None, rooms=None):
+        """
+        Arma el agendador (con las citas existentes como intervalos ocupados) y
+        las solicitudes, sin resolver. Retorna (BatchScheduler, lista de ScheduleRequest).
+        """
+        opening, closing, working_days = AvailabilityIndex.working_hours()
+        step = getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 15)
+        if therapist_ids is None:
+            therapist_ids = list(
+                Therapist.objects.filter(deleted_at__isnull=True, is_active=True).order_by('id').values_list('id', flat=True)
+            )
+        rooms = rooms or list(getattr(settings, 'APPOINTMENT_ROOMS', range(1, 7)))
+        tomorrow = timezone.localdate() + timedelta(days=1)
+
+        requests = []
+        for index, row in enumerate(rows):
+            days = [
+                row['start_date'] + timedelta(days=offset)
+                for offset in range((row['end_date'] - row['start_date']).days + 1)
+            ]
+            requests.append(ScheduleRequest(
+                index=index,
+                patient_id=row['patient_id'],
+                duration=row.get('duration_minutes') or DEFAULT_DURATION_MINUTES,
+                days=[day for day in days if day >= tomorrow and day.weekday() in working_days],
+                earliest=max(opening, minutes(row['earliest_hour'])) if row.get('earliest_hour') else opening,
+                latest=min(closing, minutes(row['latest_hour'])) if row.get('latest_hour') else closing,
+                therapist_ids=[row['therapist_id']] if row.get('therapist_id') else therapist_ids,
+                rooms=[row['room']] if row.get('room') is not None else rooms,
+            ))
+
+        days = {day for request in requests for day in request.days}
+        intervals = availability_index.days(min(days), max(days)) if days else {}
+        patients = self._patient_busy({request.patient_id for request in requests}, days)
+
+        def busy(kind, key, day):
+            if kind == 'patient':
+                return patients.get((key, day), ())
+            if kind == 'therapist':
+                return intervals[day].busy(therapist_id=key)
+            return intervals[day].busy(room=key)
+
+        return BatchScheduler(busy, opening, closing, step=step, time_limit=time_limit, seed=seed), requests
+
+    @staticmethod
+    def _patient_busy(patient_ids, days):
+        """Citas activas de los pacientes en los días del lote: {(paciente, día): [(inicio, fin)]}."""
+        busy = defaultdict(list)
+        if not patient_ids or not days:
+            return busy
+        queryset = (
+            Appointment.objects
+            .filter(
+                patient_id__in=patient_ids,
+                deleted_at__isnull=True,
+                hour__isnull=False,
+                appointment_date__gte=day_start(min(days)),
+                appointment_date__lt=day_start(max(days) + timedelta(days=1)),
+            )
+            .exclude(appointment_status=CANCELLED_STATUS)
+            .values_list('patient_id', 'appointment_date', 'hour', 'duration_minutes')
+        )
+        for patient_id, appointment_date, hour, duration in queryset:
+            start = minutes(hour)
+            busy[(patient_id, appointment_day(appointment_date))].append((start, start + (duration or DEFAULT_DURATION_MINUTES)))
+        return busy
+
+    @staticmethod
+    def _errors(rows):
+        """Errores por posición: ids de paciente, terapeuta o tipo de pago inexistentes."""
+        references = [
+            ('patient_id', Patient.objects.filter(deleted_at__isnull=True), 'No existe el paciente'),
+            ('therapist_id', Therapist.objects.filter(deleted_at__isnull=True, is_active=True), 'No existe el terapeuta activo'),
+            ('payment_type_id', PaymentType.objects.filter(deleted_at__isnull=True), 'No existe el tipo de pago'),
+        ]
+        existing = {}
+        for field, queryset, _ in references:
+            ids = {row[field] for row in rows if row.get(field) is not None}
+            existing[field] = set(queryset.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+
+        errors = []
+        for index, row in enumerate(rows):
+            row_errors = {
+                field: [f'{message} {row[field]}']
+                for field, _, message in references
+                if row.get(field) is not None and row[field] not in existing[field]
+            }
+            if row_errors:
+                errors.append({'index': index, **row_errors})
+        return errors
+
+    @classmethod
+    def _conflicts(cls, rows, placements):
+        """
+        Asignaciones que ya no están libres: terapeuta o consultorio ocupados, o
+        paciente con otra cita a esa hora. Las citas se leen de la base y no del
+        índice en memoria: quien acaba de confirmar puede no haber incrementado
+        todavía la versión del día.
+        """
+        days = sorted({placement.day for placement in placements.values()})
+        intervals = AvailabilityIndex.load(days)
+        patients = cls._patient_busy({rows[index]['patient_id'] for index in placements}, days)
+        conflicts = []
+        for index, placement in sorted(placements.items()):
+            day = intervals[placement.day]
+            taken = set(day.conflicts(placement.start, placement.end, therapist_id=placement.therapist_id))
+            taken.update(day.conflicts(placement.start, placement.end, room=placement.room))
+            patient_busy = any(
+                start < placement.end and placement.start < end
+                for start, end in patients.get((rows[index]['patient_id'], placement.day), ())
+            )
+            if taken or patient_busy:
+                conflicts.append({'index': index, 'appointment_ids': sorted(taken), 'patient_busy': patient_busy})
+        return conflicts
+
+    @staticmethod
+    def _reason(request):
+        if not request.days:
+            return 'La ventana no tiene días de atención desde mañana'
+        if request.latest - request.earliest < request.duration:
+            return 'La ventana horaria es más corta que la cita'
+        return 'No hay terapeuta, consultorio y horario libres en la ventana'
+
+    @staticmethod
+    def _assignment(index, row, placement):
+        return {
+            'index': index,
+            'patient_id': row['patient_id'],
+            'therapist_id': placement.therapist_id,
+            'room': placement.room,
+            'date': placement.day.isoformat(),
+            'hour': clock(placement.start),
+            'end': clock(placement.end),
+            'duration_minutes': placement.end - placement.start,
+        }
+
+    @staticmethod
+    def _appointment_row(row, placement):
+        return {
+            'patient_id': row['patient_id'],
+            'therapist_id': placement.therapist_id,
+            'room': placement.room,
+            'appointment_date': day_start(placement.day),
+            'hour': time(placement.start // 60, placement.start % 60),
+            'duration_minutes': placement.end - placement.start,
+            'appointment_type': row.get('appointment_type'),
+            'title': row.get('title'),
+            'observation': row.get('observation'),
+            'payment': row.get('payment'),
+            'payment_type_id': row.get('payment_type_id'),
+        }
@@ -0,0 +1,116 @@
+import re
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+from django.utils import timezone
+from ..models import Ticket, TicketNumberCounter
+
+TICKET_PREFIX = 'TKT-'
+# Motores en los que una segunda conexión puede escribir mientras otra tiene una transacción abierta
+CONCURRENT_WRITE_VENDORS = {'mysql', 'postgresql'}
+
+
+class TicketNumberAllocator:
+    """
+    Asigna números de ticket TKT-NNN únicos sin consultar la tabla de tickets.
+
+    - La secuencia vive en una fila de TicketNumberCounter. Cada proceso reserva
+      un bloque de TICKET_NUMBER_BLOCK_SIZE números con un solo UPDATE
+      (`last_value = last_value + bloque`), que toma el bloqueo de la fila: dos
+      procesos nunca reciben el mismo bloque.
+    - Los números del bloque se entregan desde memoria (protegidos por un lock
+      entre hilos); solo se vuelve a la base de datos al agotarse el bloque.
+    - La reserva se hace en la conexión TICKET_NUMBER_DB_ALIAS, que confirma su
+      propia transacción aunque la petición siga dentro de la suya. Si el alias
+      no existe o su motor no admite escrituras concurrentes (SQLite: la
+      reserva esperaría al bloqueo de la transacción de la petición), se usa
+      'default'. Si esa conexión ya está dentro de una transacción, un
+      rollback desharía la reserva: se reserva solo lo pedido y no se guarda
+      sobrante en memoria.
+    - Los números sobrantes de un proceso que termina se pierden: la secuencia
+      es única y creciente por proceso, pero puede tener huecos.
+    """
+
+    def __init__(self, prefix=TICKET_PREFIX, block_size=None, using=None):
+        self.prefix = prefix
+        self.block_size = block_size or getattr(settings, 'TICKET_NUMBER_BLOCK_SIZE', 50)
+        self.using = using
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def allocate(self):
+        """Siguiente número de ticket (str)."""
+        return self.allocate_many(1)[0]
+
+    def allocate_many(self, count):
+        """Lista de `count` números de ticket únicos y crecientes."""
+        numbers = []
+        with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    self._next, self._end, keep = self._reserve(count - len(numbers))
+                    if not keep:
+                        numbers.extend(range(self._next, self._end))
+                        self._next = self._end
+                        break
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return [self.format(value) for value in numbers]
+
+    def format(self, value):
+        """Número con el formato TKT-001, TKT-002, ..., TKT-1000."""
+        return f'{self.prefix}{value:03d}'
+
+    def _alias(self):
+        alias = self.using or getattr(settings, 'TICKET_NUMBER_DB_ALIAS', DEFAULT_DB_ALIAS)
+        if alias not in connections.databases or connections[alias].vendor not in CONCURRENT_WRITE_VENDORS:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def _reserve(self, needed):
+        """
+        Reserva un bloque en la base de datos.
+        Retorna (primer número, fin exclusivo, si el sobrante se puede guardar en memoria).
+        """
+        alias = self._alias()
+        keep = not connections[alias].in_atomic_block
+        size = max(needed, self.block_size) if keep else needed
+        counters = TicketNumberCounter.objects.using(alias).filter(prefix=self.prefix)
+
+        while True:
+            with transaction.atomic(using=alias):
+                updated = counters.update(last_value=F('last_value') + size, updated_at=timezone.now())
+                if updated:
+                    last_value = counters.values_list('last_value', flat=True).get()
+                    return last_value - size + 1, last_value + 1, keep
+            self._create_counter(alias)
+
+    def _create_counter(self, alias):
+        """Crea la fila de la secuencia continuando desde el mayor número TKT existente."""
+        last_value = self.last_existing_number(alias)
+        try:
+            with transaction.atomic(using=alias):
+                TicketNumberCounter.objects.using(alias).create(prefix=self.prefix, last_value=last_value)
+        except IntegrityError:
+            # Otro proceso la creó al mismo tiempo
+            pass
+
+    def last_existing_number(self, using=DEFAULT_DB_ALIAS):
+        """Mayor número con el prefijo ya usado en tickets (el más largo y, entre iguales, el mayor)."""
+        last = (
+            Ticket.objects.using(using)
+            .filter(ticket_number__regex=rf'^{re.escape(self.prefix)}[0-9]+$')
+            .annotate(number_length=Length('ticket_number'))
+            .order_by('-number_length', '-ticket_number')
+            .values_list('ticket_number', flat=True)
+            .first()
+        )
+        return int(last[len(self.prefix):]) if last else 0
+
+
+# Asignador compartido por el proceso (cada worker de gunicorn tiene su bloque)
+ticket_number_allocator = TicketNumberAllocator()
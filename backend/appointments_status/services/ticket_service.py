@@ -3,8 +3,8 @@ from rest_framework import status
 from rest_framework.response import Response
 from ..models import Ticket
 from ..serializers import TicketSerializer
+from .ticket_number_allocator import ticket_number_allocator
 from django.utils import timezone
-import re
 
 
 class TicketService:
@@ -358,26 +358,5 @@ class TicketService:
         Returns:
             str: Número de ticket único
         """
-        # Obtener el último ticket creado
-        last_ticket = Ticket.objects.order_by('-id').first()
-        
-        if last_ticket:
-            # Extraer el número del último ticket
-            try:
-                # Buscar el patrón TKT-XXX en el número del ticket
-                match = re.search(r'TKT-(\d+)', last_ticket.ticket_number)
-                if match:
-                    last_number = int(match.group(1))
-                    next_number = last_number + 1
-                else:
-                    # Si no encuentra el patrón, empezar desde 1
-                    next_number = 1
-            except (ValueError, AttributeError):
-                # Si hay algún error, empezar desde 1
-                next_number = 1
-        else:
-            # Si no hay tickets, empezar desde 1
-            next_number = 1
-        
-        # Formatear el número con ceros a la izquierda (ej: 001, 002, 010, 100)
-        return f'TKT-{next_number:03d}'
+        # Sale del bloque reservado por el proceso (sin consultar el último ticket)
+        return ticket_number_allocator.allocate()
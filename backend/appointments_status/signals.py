@@ -1,10 +1,16 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
 from django.utils import timezone
 from django.db import transaction
 from .models import Appointment, Ticket
+from .services.availability_index import AvailabilityIndex, appointment_day
 from .services.ticket_service import TicketService
 
+# Altas y cambios masivos de citas (AppointmentService.bulk_create, series de citas),
+# que no disparan post_save por fila.
+# Argumentos: appointments (citas creadas o modificadas) y tickets (sus tickets).
+appointments_bulk_changed = Signal()
+
 @receiver(post_save, sender=Appointment)
 def create_ticket_for_appointment(sender, instance, created, **kwargs):
     """
@@ -64,4 +70,34 @@ def update_ticket_when_appointment_changes(sender, instance, created, **kwargs):
 
     if instance.payment is not None and ticket.amount != instance.payment:
         ticket.amount = instance.payment
-        ticket.save(update_fields=['amount', 'updated_at'])
\ No newline at end of file
+        ticket.save(update_fields=['amount', 'updated_at'])
+
+
+# ---------- Índice de disponibilidad (services/availability_index.py) ----------
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_date(sender, instance, **kwargs):
+    """Guarda la fecha original de la cita para invalidar también el día anterior al reprogramar."""
+    instance._availability_original_date = instance.__dict__.get('appointment_date')
+
+
+@receiver(post_save, sender=Appointment)
+def invalidate_availability_on_save(sender, instance, **kwargs):
+    AvailabilityIndex.schedule_bump({
+        appointment_day(getattr(instance, '_availability_original_date', None)),
+        appointment_day(instance.appointment_date),
+    })
+    instance._availability_original_date = instance.appointment_date
+
+
+@receiver(post_delete, sender=Appointment)
+def invalidate_availability_on_delete(sender, instance, **kwargs):
+    AvailabilityIndex.schedule_bump({
+        appointment_day(getattr(instance, '_availability_original_date', None)),
+        appointment_day(instance.appointment_date),
+    })
+
+
+@receiver(appointments_bulk_changed)
+def invalidate_availability_on_bulk_change(sender, appointments=(), **kwargs):
+    AvailabilityIndex.schedule_bump({appointment_day(appointment.appointment_date) for appointment in appointments})
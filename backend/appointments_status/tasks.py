@@ -0,0 +1,8 @@
+from celery import shared_task
+from appointments_status.services.appointment_series_service import AppointmentSeriesService
+
+
+@shared_task
+def extend_appointment_series():
+    """Crea las citas de las series recurrentes hasta el horizonte (programada a diario por la migración 0009)."""
+    return AppointmentSeriesService().extend_all()
@@ -0,0 +1,137 @@
+from datetime import time, timedelta
+from unittest.mock import PropertyMock, patch
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments_status.models import Appointment, Ticket
+from appointments_status.services.appointment_service import AppointmentService
+from appointments_status.services.availability_index import day_start
+from appointments_status.services.ticket_number_allocator import TICKET_PREFIX
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+
+class AppointmentBulkCreateTests(TestCase):
+    """AppointmentService.bulk_create: validación por posición y una cita con su ticket por elemento."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=3)
+        SyntheticDataset(appointments=20, patients=5, therapists=2, days=7, start=cls.day).create()
+        cls.patient_id, cls.therapist_id = (
+            Appointment.objects.filter(therapist__isnull=False).values_list("patient_id", "therapist_id").first()
+        )
+
+    def items(self, count):
+        return [
+            {
+                "patient_id": self.patient_id,
+                "therapist_id": self.therapist_id,
+                "appointment_date": (self.day + timedelta(days=index // 4)).isoformat(),
+                "hour": f"{8 + index % 4:02d}:00",
+                "duration_minutes": 45,
+                "payment": "50.00",
+            }
+            for index in range(count)
+        ]
+
+    def assertCreatedWithTickets(self, response, count):
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["count"], count)
+        ids = [appointment["id"] for appointment in response.data["appointments"]]
+        appointments = {appointment.pk: appointment for appointment in Appointment.objects.filter(pk__in=ids)}
+        self.assertEqual(len(appointments), count)
+
+        tickets = list(Ticket.objects.filter(appointment_id__in=ids))
+        self.assertEqual(sorted(ticket.appointment_id for ticket in tickets), sorted(ids))
+        numbers = [ticket.ticket_number for ticket in tickets]
+        self.assertEqual(len(set(numbers)), count)
+        self.assertFalse(Ticket.objects.filter(ticket_number__in=numbers).exclude(appointment_id__in=ids).exists())
+        for ticket in tickets:
+            self.assertRegex(ticket.ticket_number, rf"^{TICKET_PREFIX}\d{{3,}}$")
+            self.assertEqual(ticket.ticket_number, appointments[ticket.appointment_id].ticket_number)
+            self.assertEqual(ticket.amount, appointments[ticket.appointment_id].payment)
+        return appointments
+
+    def test_creates_one_ticket_per_appointment(self):
+        self.assertCreatedWithTickets(AppointmentService().bulk_create(self.items(12)), 12)
+
+    def test_maps_ids_by_ticket_number_when_backend_does_not_return_them(self):
+        # Como en MySQL: bulk_create no asigna los ids. Una cita anterior con el
+        # mismo número de ticket no debe confundirse con las insertadas.
+        numbers = [f"{TICKET_PREFIX}9{index:03d}" for index in range(3)]
+        older = Appointment.objects.bulk_create([
+            Appointment(
+                patient_id=self.patient_id,
+                appointment_date=day_start(self.day),
+                hour=time(19),
+                ticket_number=numbers[1],
+            )
+        ])[0]
+
+        with patch.object(type(connection.features), "can_return_rows_from_bulk_insert",
+                          new_callable=PropertyMock, return_value=False), \
+                patch("appointments_status.services.appointment_service.ticket_number_allocator.allocate_many",
+                      return_value=numbers):
+            appointments = AppointmentService().insert_with_tickets([
+                {
+                    "patient_id": self.patient_id,
+                    "therapist_id": self.therapist_id,
+                    "appointment_date": day_start(self.day),
+                    "hour": time(8 + index),
+                    "duration_minutes": 45,
+                }
+                for index in range(3)
+            ])
+
+        self.assertEqual([appointment.ticket_number for appointment in appointments], numbers)
+        for appointment in appointments:
+            self.assertGreater(appointment.pk, older.pk)
+            stored = Appointment.objects.get(pk=appointment.pk)
+            self.assertEqual((stored.ticket_number, stored.hour), (appointment.ticket_number, appointment.hour))
+            self.assertEqual(Ticket.objects.get(appointment_id=appointment.pk).ticket_number, appointment.ticket_number)
+        self.assertFalse(Ticket.objects.filter(appointment_id=older.pk).exists())
+
+    def test_reports_errors_by_position(self):
+        items = self.items(4)
+        del items[1]["hour"]
+        items[2]["therapist_id"] = 999999
+        items[3]["payment_type_id"] = 999999
+
+        existing = Appointment.objects.count()
+        response = AppointmentService().bulk_create(items)
+
+        self.assertEqual(response.status_code, 400)
+        # El formato se valida antes que las referencias: solo falla la posición 1
+        self.assertEqual([error["index"] for error in response.data["details"]], [1])
+        self.assertIn("hour", response.data["details"][0])
+
+        del items[1]
+        response = AppointmentService().bulk_create(items)
+
+        self.assertEqual(response.status_code, 400)
+        details = {error["index"]: error for error in response.data["details"]}
+        self.assertEqual(sorted(details), [1, 2])
+        self.assertIn("therapist_id", details[1])
+        self.assertIn("payment_type_id", details[2])
+        self.assertEqual(Appointment.objects.count(), existing)
+
+    def test_rejects_repeated_slot_in_batch(self):
+        items = self.items(3)
+        items[2] = dict(items[0], therapist_id=None)
+        existing = Appointment.objects.count()
+
+        response = AppointmentService().bulk_create(items)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["details"],
+            [{"index": 2, "non_field_errors": ["Cita repetida con la posición 0"]}],
+        )
+        self.assertEqual(Appointment.objects.count(), existing)
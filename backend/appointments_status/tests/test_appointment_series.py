@@ -0,0 +1,219 @@
+from datetime import time, timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from appointments_status.models import Appointment, AppointmentDayVersion, AppointmentSeries, Ticket
+from appointments_status.services.appointment_series_service import AppointmentSeriesService
+from appointments_status.services.availability_index import CANCELLED_STATUS, AvailabilityIndex, appointment_day, day_start
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+from patients_diagnoses.models import Patient
+from therapists.models import Therapist
+
+
+@override_settings(APPOINTMENT_SERIES_HORIZON_DAYS=56)
+class AppointmentSeriesServiceTests(TestCase):
+    """Alta con bloqueo de días, "esta y las siguientes", cancelación y extensión de series."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        SyntheticDataset(appointments=1, patients=2, therapists=2, days=1, start=today - timedelta(days=30)).create()
+        cls.patient_id, cls.other_patient_id = Patient.objects.order_by("id").values_list("id", flat=True)[:2]
+        cls.therapist_id = Therapist.objects.order_by("id").values_list("id", flat=True).first()
+        # Próximo lunes a partir de mañana
+        tomorrow = today + timedelta(days=1)
+        cls.monday = tomorrow + timedelta(days=-tomorrow.weekday() % 7)
+
+    def setUp(self):
+        self.service = AppointmentSeriesService()
+
+    def series_data(self, **changes):
+        return {
+            "patient_id": self.patient_id,
+            "therapist_id": self.therapist_id,
+            "room": 2,
+            "hour": time(10),
+            "duration_minutes": 60,
+            "frequency": AppointmentSeries.FREQUENCY_WEEKLY,
+            "weekdays": [0],
+            "start_date": self.monday,
+            **changes,
+        }
+
+    def create_series(self, **changes):
+        response = self.service.create(self.series_data(**changes))
+        self.assertEqual(response.status_code, 201, response.data)
+        return AppointmentSeries.objects.get(pk=response.data["series"]["id"])
+
+    def book(self, day, hour=time(10, 30), **fields):
+        return Appointment.objects.create(
+            patient_id=self.other_patient_id,
+            therapist_id=self.therapist_id,
+            appointment_date=day_start(day),
+            hour=hour,
+            duration_minutes=30,
+            **fields,
+        )
+
+    def appointments(self, series):
+        return list(Appointment.objects.filter(series=series).order_by("appointment_date"))
+
+    def record_lock_order(self):
+        """Registra el orden de AvailabilityIndex.lock_days y find_conflicts (ambos siguen ejecutándose)."""
+        calls = []
+        lock_days = AvailabilityIndex.lock_days
+        find_conflicts = AppointmentSeriesService.find_conflicts
+
+        def locking(days):
+            calls.append(("lock", sorted(days)))
+            return lock_days(days)
+
+        def finding(service, series, days, **kwargs):
+            calls.append(("find", sorted(days)))
+            return find_conflicts(service, series, days, **kwargs)
+
+        patchers = [
+            patch.object(AvailabilityIndex, "lock_days", side_effect=locking),
+            patch.object(AppointmentSeriesService, "find_conflicts", autospec=True, side_effect=finding),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return calls
+
+    # ---------- Alta ----------
+
+    def test_create_locks_days_before_checking_conflicts(self):
+        calls = self.record_lock_order()
+
+        series = self.create_series()
+
+        days = [appointment_day(appointment.appointment_date) for appointment in self.appointments(series)]
+        self.assertEqual(len(days), 8)
+        self.assertEqual(calls, [("lock", days), ("find", days)])
+        self.assertEqual(AppointmentDayVersion.objects.filter(day__in=days).count(), len(days))
+        self.assertEqual(series.materialized_until, self.service.horizon())
+
+    def test_create_with_conflicts(self):
+        busy_day = self.monday + timedelta(weeks=2)
+        self.book(busy_day)
+
+        response = self.service.create(self.series_data())
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([conflict["date"] for conflict in response.data["conflicts"]], [busy_day.isoformat()])
+        self.assertFalse(AppointmentSeries.objects.exists())
+
+        response = self.service.create(self.series_data(), skip_conflicts=True)
+        self.assertEqual(response.status_code, 201, response.data)
+        series = AppointmentSeries.objects.get()
+        self.assertEqual(series.excluded_dates, [busy_day.isoformat()])
+        self.assertEqual(response.data["created"], 7)
+        self.assertNotIn(busy_day, [appointment_day(a.appointment_date) for a in self.appointments(series)])
+
+    # ---------- "Esta y las siguientes" ----------
+
+    def test_update_following_splits_series(self):
+        series = self.create_series()
+        split_day = self.monday + timedelta(weeks=3)
+        calls = self.record_lock_order()
+
+        response = self.service.update_following(series.pk, split_day, {"hour": time(15), "room": 4})
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["updated"], 5)
+        following_days = [split_day + timedelta(weeks=week) for week in range(5)]
+        self.assertEqual(calls, [("lock", following_days), ("find", following_days)])
+
+        series.refresh_from_db()
+        continuation = AppointmentSeries.objects.get(pk=response.data["series"]["id"])
+        self.assertEqual(series.end_date, split_day - timedelta(days=1))
+        self.assertEqual(series.materialized_until, series.end_date)
+        self.assertEqual((continuation.start_date, continuation.hour, continuation.room), (split_day, time(15), 4))
+        self.assertEqual(continuation.materialized_until, self.service.horizon())
+
+        before = self.appointments(series)
+        after = self.appointments(continuation)
+        self.assertEqual(len(before), 3)
+        self.assertTrue(all((a.hour, a.room) == (time(10), 2) for a in before))
+        self.assertEqual([appointment_day(a.appointment_date) for a in after], following_days)
+        self.assertTrue(all((a.hour, a.room) == (time(15), 4) for a in after))
+
+    def test_update_following_with_conflicts_changes_nothing(self):
+        series = self.create_series()
+        split_day = self.monday + timedelta(weeks=3)
+        self.book(split_day + timedelta(weeks=1), hour=time(15, 30))
+
+        response = self.service.update_following(series.pk, split_day, {"hour": time(15)})
+
+        self.assertEqual(response.status_code, 409)
+        series.refresh_from_db()
+        self.assertIsNone(series.end_date)
+        self.assertEqual(AppointmentSeries.objects.count(), 1)
+        self.assertTrue(all(a.hour == time(10) for a in self.appointments(series)))
+
+    def test_cancel_following(self):
+        series = self.create_series()
+        cancel_day = self.monday + timedelta(weeks=5)
+
+        response = self.service.cancel_following(series.pk, cancel_day)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["cancelled"], 3)
+        series.refresh_from_db()
+        self.assertEqual(series.end_date, cancel_day - timedelta(days=1))
+        self.assertEqual(series.materialized_until, series.end_date)
+        self.assertIsNone(series.deleted_at)
+
+        statuses = {
+            appointment_day(a.appointment_date): (a.appointment_status, Ticket.objects.get(appointment=a).status)
+            for a in self.appointments(series)
+        }
+        for day, (appointment_status, ticket_status) in statuses.items():
+            if day >= cancel_day:
+                self.assertEqual((appointment_status, ticket_status), (CANCELLED_STATUS, "cancelled"))
+            else:
+                self.assertNotEqual(appointment_status, CANCELLED_STATUS)
+                self.assertEqual(ticket_status, "pending")
+
+    def test_cancel_from_start_deletes_series(self):
+        series = self.create_series()
+
+        response = self.service.cancel_following(series.pk, self.monday)
+
+        self.assertEqual(response.data["cancelled"], 8)
+        series.refresh_from_db()
+        self.assertIsNotNone(series.deleted_at)
+        self.assertFalse(Appointment.objects.filter(series=series).exclude(appointment_status=CANCELLED_STATUS).exists())
+
+    # ---------- Extensión ----------
+
+    def test_extend_all(self):
+        with self.settings(APPOINTMENT_SERIES_HORIZON_DAYS=14):
+            series = self.create_series()
+        self.assertEqual(len(self.appointments(series)), 2)
+        ended = self.create_series(start_date=self.monday + timedelta(days=1), weekdays=[1], occurrence_count=2,
+                                   therapist_id=None, room=5)
+        busy_day = self.monday + timedelta(weeks=4)
+        self.book(busy_day)
+        calls = self.record_lock_order()
+
+        result = self.service.extend_all()
+
+        series.refresh_from_db()
+        self.assertEqual(result, {"created": 5, "skipped": 1})
+        self.assertEqual([name for name, _ in calls], ["lock", "find"])
+        self.assertEqual(series.materialized_until, self.service.horizon())
+        self.assertEqual(series.excluded_dates, [busy_day.isoformat()])
+        days = [appointment_day(a.appointment_date) for a in self.appointments(series)]
+        self.assertEqual(len(days), 7)
+        self.assertNotIn(busy_day, days)
+        self.assertEqual(len(self.appointments(ended)), 2)
+
+        self.assertEqual(self.service.extend_all(), {"created": 0, "skipped": 0})
@@ -0,0 +1,186 @@
+from datetime import time, timedelta
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments_status.models import Appointment, AppointmentDayVersion
+from appointments_status.services.appointment_service import AppointmentService
+from appointments_status.services.availability_index import (
+    CANCELLED_STATUS,
+    DEFAULT_DURATION_MINUTES,
+    AvailabilityIndex,
+    appointment_day,
+    day_start,
+    minutes,
+)
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+
+def brute_force_slots(start, end, duration, therapist_id=None, room=None, step=15):
+    """Horarios libres comparando cada inicio de la grilla contra todas las citas del rango."""
+    opening, closing, working_days = AvailabilityIndex.working_hours()
+    queryset = (
+        Appointment.objects
+        .filter(
+            deleted_at__isnull=True,
+            hour__isnull=False,
+            appointment_date__gte=day_start(start),
+            appointment_date__lt=day_start(end + timedelta(days=1)),
+        )
+        .exclude(appointment_status=CANCELLED_STATUS)
+    )
+    if therapist_id is not None or room is not None:
+        resources = Q(pk__in=[])
+        if therapist_id is not None:
+            resources |= Q(therapist_id=therapist_id)
+        if room is not None:
+            resources |= Q(room=room)
+        queryset = queryset.filter(resources)
+
+    busy = {}
+    for appointment_date, hour, duration_minutes in queryset.values_list("appointment_date", "hour", "duration_minutes"):
+        begin = minutes(hour)
+        busy.setdefault(appointment_day(appointment_date), []).append(
+            (begin, begin + (duration_minutes or DEFAULT_DURATION_MINUTES))
+        )
+
+    slots = []
+    day = start
+    while day <= end:
+        if day.weekday() in working_days:
+            for slot in range(opening, closing - duration + 1, step):
+                if all(busy_end <= slot or busy_start >= slot + duration for busy_start, busy_end in busy.get(day, ())):
+                    slots.append((day, slot, slot + duration))
+        day += timedelta(days=1)
+    return slots
+
+
+class AvailabilityIndexInvalidationTests(TestCase):
+    """
+    Un índice ya cargado debe recargar los días que tocan las altas, cambios,
+    reprogramaciones, bajas y altas masivas de citas (vía AppointmentDayVersion)
+    y dar los mismos huecos libres que una búsqueda por fuerza bruta.
+    """
+
+    DURATION = 45
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.localdate() + timedelta(days=1)
+        dataset = SyntheticDataset(appointments=250, patients=40, therapists=3, days=14, start=cls.start)
+        dataset.create()
+        cls.end = dataset.end
+        _, _, working_days = AvailabilityIndex.working_hours()
+        days = [cls.start + timedelta(days=offset) for offset in range(14)]
+        cls.day, cls.other_day = [day for day in days if day.weekday() in working_days][2:4]
+        cls.therapist_ids = sorted(
+            Appointment.objects.filter(therapist__isnull=False).values_list("therapist_id", flat=True).distinct()
+        )
+        cls.therapist_id = cls.therapist_ids[0]
+        cls.patient_id = Appointment.objects.values_list("patient_id", flat=True).first()
+
+    def setUp(self):
+        self.index = AvailabilityIndex()
+        self.index.days(self.start, self.end)
+
+    def assertMatchesBruteForce(self):
+        filters = [{}] + [{"therapist_id": therapist_id} for therapist_id in self.therapist_ids] + [{"room": 1}]
+        for kwargs in filters:
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    self.index.free_slots(self.start, self.end, self.DURATION, limit=10000, **kwargs),
+                    brute_force_slots(self.start, self.end, self.DURATION, **kwargs),
+                )
+
+    def versions(self, *days):
+        found = dict(AppointmentDayVersion.objects.filter(day__in=days).values_list("day", "version"))
+        return [found.get(day, 0) for day in days]
+
+    def free_slot(self, day):
+        return self.index.free_slots(day, day, self.DURATION, therapist_id=self.therapist_id, limit=1)[0]
+
+    def is_free(self, slot):
+        day, start, _ = slot
+        return slot in self.index.free_slots(day, day, self.DURATION, therapist_id=self.therapist_id, limit=1000)
+
+    def book(self, slot):
+        day, start, _ = slot
+        return Appointment.objects.create(
+            patient_id=self.patient_id,
+            therapist_id=self.therapist_id,
+            appointment_date=day_start(day),
+            hour=time(start // 60, start % 60),
+            duration_minutes=self.DURATION,
+        )
+
+    def test_saved_appointment(self):
+        slot = self.free_slot(self.day)
+        before = self.versions(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(slot)
+
+        self.assertGreater(self.versions(self.day), before)
+        self.assertFalse(self.is_free(slot))
+        self.assertMatchesBruteForce()
+
+    def test_rescheduled_appointment_frees_old_day_and_blocks_new_day(self):
+        slot = self.free_slot(self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(slot)
+        new_slot = self.free_slot(self.other_day)
+        self.assertFalse(self.is_free(slot))
+        before = self.versions(self.day, self.other_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = day_start(self.other_day)
+            appointment.hour = time(new_slot[1] // 60, new_slot[1] % 60)
+            appointment.save()
+
+        after = self.versions(self.day, self.other_day)
+        self.assertTrue(all(new > old for old, new in zip(before, after)), (before, after))
+        self.assertTrue(self.is_free(slot))
+        self.assertFalse(self.is_free(new_slot))
+        self.assertMatchesBruteForce()
+
+    def test_deleted_appointment(self):
+        slot = self.free_slot(self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(slot)
+        before = self.versions(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+
+        self.assertGreater(self.versions(self.day), before)
+        self.assertTrue(self.is_free(slot))
+        self.assertMatchesBruteForce()
+
+    def test_bulk_created_appointments(self):
+        slots = [self.free_slot(self.day), self.free_slot(self.other_day)]
+        before = self.versions(self.day, self.other_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = AppointmentService().bulk_create([
+                {
+                    "patient_id": self.patient_id,
+                    "therapist_id": self.therapist_id,
+                    "appointment_date": day.isoformat(),
+                    "hour": f"{start // 60:02d}:{start % 60:02d}",
+                    "duration_minutes": self.DURATION,
+                }
+                for day, start, _ in slots
+            ])
+        self.assertEqual(response.status_code, 201, response.data)
+
+        after = self.versions(self.day, self.other_day)
+        self.assertTrue(all(new > old for old, new in zip(before, after)), (before, after))
+        for slot in slots:
+            self.assertFalse(self.is_free(slot))
+        self.assertMatchesBruteForce()
@@ -0,0 +1,81 @@
+import json
+import time
+from datetime import timedelta
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from appointments_status.models import Appointment
+from appointments_status.serializers.appointment import AppointmentSerializer
+from architect.middleware.query_metrics import QueryMetricsMiddleware, serializer_timer
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+
+def server_timing(response):
+    entries = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, *fields = entry.split(";")
+        entries[name] = float(next(field for field in fields if field.startswith("dur="))[4:])
+    return entries
+
+
+@override_settings(QUERY_METRICS_ENABLED=True, QUERY_METRICS_SERVER_TIMING=True)
+class SerializerTimerTests(TestCase):
+    """El tiempo de serializers medido con TimedSerializerMixin o serializer_timer() sale en Server-Timing y en el log."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataset(appointments=30, patients=5, therapists=2, days=3,
+                         start=timezone.localdate() + timedelta(days=1)).create()
+
+    def process(self, view):
+        middleware = QueryMetricsMiddleware(view)
+        with self.assertLogs("query_metrics", level="INFO") as logs:
+            response = middleware(RequestFactory().get("/metrics/"))
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_timed_serializer_is_reported(self):
+        def view(request):
+            appointments = Appointment.objects.select_related("patient", "therapist", "payment_type")
+            return JsonResponse(AppointmentSerializer(appointments, many=True).data, safe=False)
+
+        response, line = self.process(view)
+
+        timing = server_timing(response)
+        self.assertGreater(timing["serializer"], 0)
+        self.assertGreater(line["serializer_ms"], 0)
+        self.assertLessEqual(timing["serializer"], timing["total"])
+
+    def test_nested_blocks_are_counted_once(self):
+        appointments = list(Appointment.objects.select_related("patient", "therapist", "payment_type"))
+        measured = []
+
+        def view(request):
+            started = time.perf_counter()
+            with serializer_timer():
+                # Cada to_representation de TimedSerializerMixin es un bloque anidado
+                AppointmentSerializer(appointments, many=True).data
+            measured.append((time.perf_counter() - started) * 1000)
+            return JsonResponse({})
+
+        _, line = self.process(view)
+
+        self.assertGreater(line["serializer_ms"], 0)
+        self.assertLessEqual(line["serializer_ms"], round(measured[0], 1) + 0.1)
+
+    def test_untimed_view_reports_zero(self):
+        response, line = self.process(lambda request: JsonResponse({}))
+
+        self.assertEqual(server_timing(response)["serializer"], 0.0)
+        self.assertEqual(line["serializer_ms"], 0.0)
+
+    def test_timer_outside_request_is_noop(self):
+        with serializer_timer():
+            data = AppointmentSerializer(Appointment.objects.all()[:1], many=True).data
+        self.assertEqual(len(data), 1)
@@ -0,0 +1,68 @@
+import re
+import threading
+from unittest import SkipTest
+from django.db import connection, connections
+from django.test import TransactionTestCase
+
+from appointments_status.models import TicketNumberCounter
+from appointments_status.services.ticket_number_allocator import TICKET_PREFIX, TicketNumberAllocator
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+
+class TicketNumberAllocatorConcurrencyTests(TransactionTestCase):
+    """
+    Varios hilos, cada uno con su propio asignador y su conexión (como procesos
+    distintos), piden números en paralelo sobre el mismo prefijo.
+    """
+
+    databases = "__all__"
+    WORKERS = 8
+    PER_WORKER = 150
+    BLOCK_SIZE = 10
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise SkipTest("SQLite en memoria (caché compartida) no espera los bloqueos entre conexiones")
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    def allocate_in_parallel(self):
+        results = [None] * self.WORKERS
+        errors = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def creator(index):
+            allocator = TicketNumberAllocator(block_size=self.BLOCK_SIZE)
+            try:
+                barrier.wait()
+                results[index] = [allocator.allocate() for _ in range(self.PER_WORKER)]
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=creator, args=(index,)) for index in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_parallel_allocators_never_repeat_numbers(self):
+        results = self.allocate_in_parallel()
+        numbers = [number for worker in results for number in worker]
+
+        self.assertEqual(len(numbers), self.WORKERS * self.PER_WORKER)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        pattern = re.compile(rf"^{re.escape(TICKET_PREFIX)}\d{{3,}}$")
+        for number in numbers:
+            self.assertRegex(number, pattern)
+        for worker in results:
+            values = [int(number[len(TICKET_PREFIX):]) for number in worker]
+            self.assertTrue(all(previous < current for previous, current in zip(values, values[1:])), values)
+
+        # Cada bloque reservado sale del contador: nunca se entregan números por encima de él
+        last_value = TicketNumberCounter.objects.get(prefix=TICKET_PREFIX).last_value
+        self.assertLessEqual(max(int(number[len(TICKET_PREFIX):]) for number in numbers), last_value)
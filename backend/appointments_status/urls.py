@@ -2,6 +2,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views.appointment import AppointmentViewSet
+from .views.appointment_series import AppointmentSeriesViewSet
 from .views.appointment_status import AppointmentStatusViewSet
 from .views.ticket import TicketViewSet
 
@@ -9,6 +10,7 @@ app_name = 'appointments_status'
 # Configuración del router
 router = DefaultRouter()
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
+router.register(r'appointment-series', AppointmentSeriesViewSet, basename='appointment-series')
 router.register(r'appointment-statuses', AppointmentStatusViewSet, basename='appointment-status')
 router.register(r'tickets', TicketViewSet, basename='ticket')
 
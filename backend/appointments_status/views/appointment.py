@@ -7,7 +7,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from ..models import Appointment, Patient, Therapist
 from ..serializers import AppointmentSerializer
-from ..services import AppointmentService
+from ..services import AppointmentService, BatchSchedulerService
 from django.utils import timezone
 from ..services.ghl_service import GHLService
 #agregue lso 2 de abajo
@@ -106,6 +106,46 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         
         return self.service.list_all(filters, pagination)
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Crea varias citas con sus tickets en una sola petición.
+        Acepta una lista de citas o {"appointments": [...]}.
+        """
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('appointments')
+        return self.service.bulk_create(items)
+    
+    @action(detail=False, methods=['post'])
+    def schedule(self, request):
+        """
+        Agendador por lotes: asigna terapeuta, consultorio y horario a varias
+        solicitudes minimizando los huecos en las agendas.
+        Recibe {"requests": [...], "dry_run": true, "time_limit": 2, "seed": 0};
+        con dry_run en false (por defecto true) crea las citas asignadas.
+        """
+        data = request.data if isinstance(request.data, dict) else {'requests': request.data}
+        try:
+            time_limit = float(data['time_limit']) if data.get('time_limit') not in (None, '') else None
+            seed = int(data.get('seed') or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'time_limit y seed deben ser números'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if time_limit is not None and time_limit <= 0:
+            return Response(
+                {'error': 'time_limit debe ser mayor que cero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        dry_run = data.get('dry_run', True)
+        if isinstance(dry_run, str):
+            dry_run = dry_run.lower() not in ('0', 'false', 'no')
+        return BatchSchedulerService().schedule(
+            data.get('requests'), dry_run=bool(dry_run), time_limit=time_limit, seed=seed
+        )
+    
     @action(detail=False, methods=['get'])
     def completed(self, request):
         """
@@ -158,6 +198,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def check_availability(self, request):
         """
         Verifica la disponibilidad para una cita.
+        Con therapist y/o room solo cuentan las citas de ese terapeuta o consultorio.
         """
         date = request.query_params.get('date')
         hour = request.query_params.get('hour')
@@ -179,7 +220,64 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        return self.service.check_availability(date_obj, hour_obj, int(duration))
+        try:
+            therapist_id = self._int_param(request, 'therapist')
+            room = self._int_param(request, 'room')
+        except ValueError:
+            return Response(
+                {'error': 'therapist y room deben ser números'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return self.service.check_availability(date_obj, hour_obj, int(duration), therapist_id=therapist_id, room=room)
+    
+    @action(detail=False, methods=['get'])
+    def free_slots(self, request):
+        """
+        Próximos horarios libres de un terapeuta y/o consultorio.
+        Parámetros: therapist, room, start_date y end_date (YYYY-MM-DD, por defecto
+        hoy y 30 días), duration (60), limit (10, máximo 100) y step (minutos).
+        """
+        try:
+            therapist_id = self._int_param(request, 'therapist')
+            room = self._int_param(request, 'room')
+            duration = self._int_param(request, 'duration') or 60
+            limit = min(self._int_param(request, 'limit') or 10, 100)
+            step = self._int_param(request, 'step')
+            start_date = request.query_params.get('start_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else timezone.localdate()
+            end_date = request.query_params.get('end_date')
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start_date + timedelta(days=30)
+        except ValueError:
+            return Response(
+                {'error': 'Parámetros inválidos. Use fechas YYYY-MM-DD y números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if therapist_id is None and room is None:
+            return Response(
+                {'error': 'Se requiere therapist o room'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end_date < start_date or (end_date - start_date).days > 366:
+            return Response(
+                {'error': 'El rango de fechas debe ser de 0 a 366 días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if duration <= 0 or (step is not None and step <= 0) or limit <= 0:
+            return Response(
+                {'error': 'duration, step y limit deben ser mayores que cero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return self.service.free_slots(
+            start_date, end_date, duration, therapist_id=therapist_id, room=room, limit=limit, step=step
+        )
+    
+    @staticmethod
+    def _int_param(request, name):
+        value = request.query_params.get(name)
+        return int(value) if value not in (None, '') else None
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -227,7 +325,10 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        availability = self.service.check_availability(date_obj, hour_obj)
+        availability = self.service.check_availability(
+            date_obj, hour_obj, appointment.duration_minutes or 60,
+            therapist_id=appointment.therapist_id, room=appointment.room, exclude_id=appointment.pk
+        )
         if not availability.data.get('is_available'):
             return Response(
                 {'error': 'La fecha y hora seleccionadas no están disponibles'},
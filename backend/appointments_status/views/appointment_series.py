@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ..models import AppointmentSeries
+from ..serializers import AppointmentSeriesSerializer, AppointmentSeriesFollowingSerializer
+from ..services import AppointmentSeriesService
+
+
+class AppointmentSeriesViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet para las series de citas recurrentes.
+    Las citas de la serie se consultan y modifican con las acciones
+    occurrences, update-following y cancel-following.
+    """
+
+    queryset = AppointmentSeries.objects.filter(deleted_at__isnull=True).select_related('patient', 'therapist')
+    serializer_class = AppointmentSeriesSerializer
+    filterset_fields = ['patient', 'therapist', 'room', 'frequency']
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.service = AppointmentSeriesService()
+
+    def create(self, request, *args, **kwargs):
+        """
+        Crea la serie y sus citas hasta el horizonte.
+        Con ?skip_conflicts=true omite las fechas que se cruzan en lugar de responder 409.
+        """
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        skip_conflicts = request.query_params.get('skip_conflicts', '').lower() in ('1', 'true')
+        return self.service.create(serializer.validated_data, skip_conflicts=skip_conflicts)
+
+    def destroy(self, request, *args, **kwargs):
+        """Cancela las citas de la serie desde hoy y la termina."""
+        return self.service.cancel_following(kwargs.get('pk'), timezone.localdate())
+
+    @action(detail=False, methods=['post'])
+    def preview(self, request):
+        """Fechas y choques que tendría una serie, sin guardarla."""
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return self.service.preview(serializer.validated_data)
+
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """
+        Fechas de la serie entre start_date y end_date (por defecto, los
+        próximos 90 días) con la cita creada para cada una.
+        """
+        series = self.get_object()
+        try:
+            start = self._date_param(request, 'start_date') or max(series.start_date, timezone.localdate())
+            end = self._date_param(request, 'end_date') or start + timedelta(days=90)
+        except ValueError:
+            return Response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end < start:
+            return Response(
+                {'error': 'end_date no puede ser anterior a start_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.service.occurrences(series, start, end)
+
+    @action(detail=True, methods=['post'], url_path='update-following')
+    def update_following(self, request, pk=None):
+        """Cambia hora, duración, terapeuta o consultorio desde from_date (esta y las siguientes)."""
+        serializer = AppointmentSeriesFollowingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        changes = dict(serializer.validated_data)
+        from_date = changes.pop('from_date')
+        return self.service.update_following(pk, from_date, changes)
+
+    @action(detail=True, methods=['post'], url_path='cancel-following')
+    def cancel_following(self, request, pk=None):
+        """Cancela la cita de from_date y las siguientes."""
+        serializer = AppointmentSeriesFollowingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return self.service.cancel_following(pk, serializer.validated_data['from_date'])
+
+    @staticmethod
+    def _date_param(request, name):
+        value = request.query_params.get(name)
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
@@ -1,3 +1,4 @@
 from .optional_auth import OptionalAuthenticate
+from .query_metrics import QueryMetricsMiddleware, TimedSerializerMixin, serializer_timer
 
-__all__ = ['OptionalAuthenticate'] 
\ No newline at end of file
+__all__ = ['OptionalAuthenticate', 'QueryMetricsMiddleware', 'TimedSerializerMixin', 'serializer_timer'] 
\ No newline at end of file
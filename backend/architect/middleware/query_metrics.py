@@ -0,0 +1,227 @@
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from architect.query_markers import repeats_expected
+
+logger = logging.getLogger("query_metrics")
+
+# Métricas de la petición en curso
+_current = contextvars.ContextVar("query_metrics", default=None)
+
+# Listas de parámetros de largo variable (IN (%s, %s, ...)) cuentan como la misma sentencia
+_PLACEHOLDER_LIST = re.compile(r"(?:%s|\?)(?:\s*,\s*(?:%s|\?))+")
+SQL_SAMPLE_LENGTH = 300
+
+
+def normalize_sql(sql):
+    return _PLACEHOLDER_LIST.sub("%s, ...", sql)
+
+
+class RequestMetrics:
+    """Consultas SQL, tiempo de base de datos, de la vista, de los serializers y del renderizado de una petición."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.url_name = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.statements = Counter()
+        self.view_started = None
+        self.view_ms = None
+        self.render_started = None
+        self.render_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Wrapper de `connection.execute_wrapper`: mide cada sentencia."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if not repeats_expected():
+                self.statements[normalize_sql(sql)] += 1
+            if elapsed >= self.slowest_ms:
+                self.slowest_ms = elapsed
+                self.slowest_sql = sql
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def repeated_statements(self, threshold):
+        """Sentencias idénticas ejecutadas al menos `threshold` veces (probable N+1)."""
+        return [
+            {"sql": sql[:SQL_SAMPLE_LENGTH], "count": count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self):
+        """Valor del header Server-Timing."""
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} consultas"',
+            f"db-slowest;dur={self.slowest_ms:.1f}",
+            f"view;dur={self.view_ms or 0.0:.1f}",
+            f"serializer;dur={self.serializer_ms:.1f}",
+            f"render;dur={self.render_ms:.1f}",
+            f"total;dur={self.total_ms:.1f}",
+        ])
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Suma el tiempo del bloque al de serializers de la petición en curso.
+    Los bloques anidados (serializers dentro de serializers) se cuentan una
+    sola vez; fuera de una petición instrumentada no hace nada.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedSerializerMixin:
+    """
+    Mixin para serializers de DRF: mide `to_representation` con serializer_timer().
+    Con many=True el ListSerializer llama al `to_representation` de este hijo.
+    """
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class QueryMetricsMiddleware:
+    """
+    Instrumenta cada petición con las consultas SQL ejecutadas (en todas las
+    conexiones), el tiempo total en la base de datos, la sentencia más lenta,
+    el tiempo de la vista, el de los serializers y el del renderizado de las
+    respuestas con template (Response de DRF: el renderer JSON).
+
+    - El tiempo de serializers es opcional por serializer o por vista: cuenta
+      lo medido con TimedSerializerMixin o con `with serializer_timer():` y
+      está incluido en el de la vista.
+
+    - Agrega el header Server-Timing solo con QUERY_METRICS_SERVER_TIMING
+      (por defecto, igual a DEBUG): expone tiempos internos a los clientes.
+    - Escribe una línea JSON en el logger "query_metrics".
+    - Si una misma sentencia se repite QUERY_METRICS_N_PLUS_ONE_THRESHOLD veces
+      o más, la línea se registra como WARNING con la vista y las sentencias
+      repetidas: es el patrón típico de un N+1.
+    - En respuestas en streaming el header solo cubre lo ejecutado antes de
+      enviar la respuesta; la línea de log se escribe al terminar el streaming
+      e incluye las consultas hechas mientras se generaba el contenido.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "QUERY_METRICS_ENABLED", True)
+        self.server_timing = getattr(settings, "QUERY_METRICS_SERVER_TIMING", settings.DEBUG)
+        self.threshold = getattr(settings, "QUERY_METRICS_N_PLUS_ONE_THRESHOLD", 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with self._wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if metrics.view_started is not None and metrics.view_ms is None:
+            metrics.view_ms = (time.perf_counter() - metrics.view_started) * 1000
+
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing()
+        if response.streaming:
+            response.streaming_content = self._finish_streaming(request, response, response.streaming_content, metrics)
+        else:
+            self._log(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            # Vistas basadas en clases (Django: view_class, ViewSets de DRF: cls)
+            target = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None) or view_func
+            metrics.view = f"{target.__module__}.{getattr(target, '__qualname__', type(target).__name__)}"
+            match = getattr(request, "resolver_match", None)
+            metrics.url_name = match.view_name if match else None
+            metrics.view_started = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        """La vista terminó y la respuesta se renderiza a continuación (al terminar se llama al callback)."""
+        metrics = _current.get()
+        if metrics is not None:
+            now = time.perf_counter()
+            if metrics.view_started is not None:
+                metrics.view_ms = (now - metrics.view_started) * 1000
+            metrics.render_started = now
+            response.add_post_render_callback(lambda _: self._rendered(metrics))
+        return response
+
+    @staticmethod
+    def _rendered(metrics):
+        metrics.render_ms += (time.perf_counter() - metrics.render_started) * 1000
+
+    @staticmethod
+    def _wrap_connections(metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def _finish_streaming(self, request, response, content, metrics):
+        try:
+            with self._wrap_connections(metrics):
+                yield from content
+        finally:
+            self._log(request, response, metrics)
+
+    def _log(self, request, response, metrics):
+        repeated = metrics.repeated_statements(self.threshold)
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "view": metrics.view,
+            "url_name": metrics.url_name,
+            "status": response.status_code,
+            "duration_ms": round(metrics.total_ms, 1),
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db_ms, 1),
+            "slowest_ms": round(metrics.slowest_ms, 1),
+            "slowest_sql": metrics.slowest_sql[:SQL_SAMPLE_LENGTH] if metrics.slowest_sql else None,
+            "view_ms": round(metrics.view_ms, 1) if metrics.view_ms is not None else None,
+            "serializer_ms": round(metrics.serializer_ms, 1),
+            "render_ms": round(metrics.render_ms, 1),
+        }
+        if repeated:
+            line["n_plus_one"] = repeated
+            logger.warning(json.dumps(line, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(line, ensure_ascii=False))
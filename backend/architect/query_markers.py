@@ -0,0 +1,40 @@
+import contextvars
+from contextlib import contextmanager
+
+# Profundidad de bloques con repetición esperada en el contexto actual
+_expected_depth = contextvars.ContextVar("expected_repeats_depth", default=0)
+_END = object()
+
+
+@contextmanager
+def expected_repeats():
+    """
+    Marca las consultas ejecutadas dentro del bloque como repetición
+    intencional (p. ej. la misma lectura para cada bloque de días) para que
+    las métricas por petición no las reporten como N+1.
+    El bloque debe cubrir solo esa consulta, no el procesamiento de sus filas.
+    """
+    token = _expected_depth.set(_expected_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _expected_depth.reset(token)
+
+
+def repeats_expected():
+    """Si la consulta en curso está dentro de un bloque expected_repeats()."""
+    return _expected_depth.get() > 0
+
+
+def iterate_expected(queryset, chunk_size):
+    """
+    Itera el queryset con `iterator()` marcando solo su consulta como
+    repetición esperada: la sentencia se ejecuta al pedir la primera fila.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    with expected_repeats():
+        first = next(rows, _END)
+    if first is _END:
+        return
+    yield first
+    yield from rows
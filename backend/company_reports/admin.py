@@ -1,5 +1,6 @@
 from django.contrib import admin
 from company_reports.models.company import CompanyData
+from company_reports.models.report_job import ReportJob
 
 @admin.register(CompanyData)
 class CompanyDataAdmin(admin.ModelAdmin):
@@ -18,3 +19,11 @@ class CompanyDataAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'report', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'report')
+    ordering = ('-created_at',)
+    readonly_fields = ('id', 'report', 'params', 'status', 'file', 'error', 'created_at', 'started_at', 'finished_at')
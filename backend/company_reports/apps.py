@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CompanyReportsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'company_reports'
+    verbose_name = 'Empresa y Reportes'
+
+    def ready(self):
+        """
+        Importar signals cuando la app esté lista.
+        """
+        import company_reports.signals
@@ -0,0 +1,67 @@
+import json
+import platform
+from django.db import connection
+from django.utils import timezone
+
+METRICS = ("ms", "queries", "peak_kb")
+
+
+def save_baseline(path, results, meta):
+    """Guarda los resultados de una corrida como línea base (JSON)."""
+    payload = {
+        "created_at": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "meta": meta,
+        "results": {
+            name: {metric: result[metric] for metric in METRICS}
+            for name, result in results.items()
+        },
+    }
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(payload, baseline_file, indent=2, sort_keys=True, default=str)
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare(current, baseline, tolerance=0.25, min_ms=5.0, min_kb=256.0):
+    """
+    Compara cada caso con la línea base y retorna {nombre: estado}:
+    "nuevo", "ok", "mejora" o una lista de regresiones ("tiempo", "consultas", "memoria").
+
+    - Tiempo y memoria son regresión si superan la base en más de `tolerance`
+      (fracción) y además en más de `min_ms` / `min_kb`, para no reportar ruido
+      en casos que tardan pocos milisegundos.
+    - Cualquier consulta SQL adicional es regresión.
+    """
+    statuses = {}
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            statuses[name] = "nuevo"
+            continue
+
+        regressions = []
+        if _worse(result["ms"], base.get("ms"), tolerance, min_ms):
+            regressions.append("tiempo")
+        if base.get("queries") is not None and result["queries"] > base["queries"]:
+            regressions.append("consultas")
+        if _worse(result["peak_kb"], base.get("peak_kb"), tolerance, min_kb):
+            regressions.append("memoria")
+
+        if regressions:
+            statuses[name] = regressions
+        elif _worse(base.get("ms"), result["ms"], tolerance, min_ms):
+            statuses[name] = "mejora"
+        else:
+            statuses[name] = "ok"
+    return statuses
+
+
+def _worse(value, reference, tolerance, minimum):
+    if value is None or reference is None:
+        return False
+    return value > reference * (1 + tolerance) and value - reference > minimum
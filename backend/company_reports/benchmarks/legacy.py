@@ -0,0 +1,64 @@
+"""
+Implementaciones anteriores de reportes, conservadas solo para comparar
+tiempos y resultados en benchmark_reports. No se usan en las vistas.
+"""
+from appointments_status.models.appointment import Appointment
+from company_reports.services.date_ranges import day_filter
+
+
+def patients_by_therapist_models(query_date):
+    """get_patients_by_therapist anterior: instancia citas, pacientes y terapeutas y agrupa en Python."""
+    appointments = (
+        Appointment.objects
+        .select_related("patient", "therapist")
+        .filter(day_filter("appointment_date", query_date))
+    )
+
+    report = {}
+    sin_terapeuta = {
+        "therapist_id": "",
+        "therapist": "Sin terapeuta asignado",
+        "patients": {}
+    }
+
+    for appointment in appointments:
+        patient = appointment.patient
+        therapist = appointment.therapist
+        if not patient:
+            continue
+
+        patient_data = {
+            "patient_id": patient.id,
+            "patient": f"{patient.paternal_lastname} {patient.maternal_lastname or ''} {patient.name}".strip(),
+            "appointments": 0,
+        }
+
+        if not therapist:
+            key = patient.id
+            if key not in sin_terapeuta["patients"]:
+                sin_terapeuta["patients"][key] = patient_data
+            sin_terapeuta["patients"][key]["appointments"] += 1
+        else:
+            t_id = therapist.id
+            if t_id not in report:
+                report[t_id] = {
+                    "therapist_id": t_id,
+                    # usa first_name (no existe 'name' en el modelo)
+                    "therapist": f"{therapist.last_name_paternal} {therapist.last_name_maternal or ''} {therapist.first_name}".strip(),
+                    "patients": {}
+                }
+            key = patient.id
+            if key not in report[t_id]["patients"]:
+                report[t_id]["patients"][key] = patient_data
+            report[t_id]["patients"][key]["appointments"] += 1
+
+    # Agregar grupo "sin terapeuta" si aplica
+    if sin_terapeuta["patients"]:
+        report["sinTherapist"] = sin_terapeuta
+
+    # Convertir dicts de pacientes a listas
+    for therapist_id in list(report.keys()):
+        report[therapist_id]["patients"] = list(report[therapist_id]["patients"].values())
+
+    return list(report.values())
+
@@ -0,0 +1,97 @@
+import re
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from company_reports.services.cohort_services import PatientCohortService
+from company_reports.services.export_services import AppointmentExcelExportService, MonthCloseExcelExportService
+from company_reports.services.occupancy_services import RoomOccupancyService
+from company_reports.services.report_watermark import ReportWatermark
+from company_reports.services.reports_services import ReportService
+from company_reports.services.statistics_services import StatisticsService
+
+# Tablas que nunca deben recorrerse completas en un reporte
+GUARDED_TABLES = {"appointments", "tickets"}
+
+# SQLite: "SEARCH" usa un rango del índice; "SCAN" recorre la tabla o un índice completo
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)")
+POSTGRES_SEQ_SCAN = re.compile(r"Seq Scan on (\S+)")
+
+
+def explain(sql):
+    """Plan de ejecución de una sentencia como lista de líneas legibles."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}")
+        if connection.vendor == "mysql":
+            columns = [column[0] for column in cursor.description]
+            return [
+                "{table}: type={type} key={key} rows={rows} extra={Extra}".format(**dict(zip(columns, row)))
+                for row in cursor.fetchall()
+            ]
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Tablas protegidas que el plan recorre completas (tabla o índice completo)."""
+    tables = set()
+    for line in plan:
+        if connection.vendor == "sqlite":
+            match = SQLITE_SCAN.match(line)
+        elif connection.vendor == "mysql":
+            match = re.match(r"^(\S+): type=(ALL|index) ", line)
+        else:
+            match = POSTGRES_SEQ_SCAN.search(line)
+        if match and match.group(1) in GUARDED_TABLES:
+            tables.add(match.group(1))
+    return tables
+
+
+def report_cases(day, days=30):
+    """(nombre, función) de cada reporte: los diarios sobre `day` y los de rango sobre los `days` anteriores."""
+    start = day - timedelta(days=days)
+    reports = ReportService()
+    statistics = StatisticsService()
+    daily = {"date": day}
+    ranged = {"date": day, "start_date": start, "end_date": day}
+    ranged_details = {"start_date": start, "end_date": day, "include_details": True, "page": 2, "page_size": 50}
+
+    def statistics_case(source):
+        def run():
+            with override_settings(STATISTICS_SOURCE=source):
+                statistics.get_statistics(start, day)
+        return run
+
+    cases = [
+        ("appointments_count_by_therapist", lambda: reports.get_appointments_count_by_therapist(daily)),
+        ("patients_by_therapist", lambda: reports.get_patients_by_therapist(daily)),
+        ("daily_cash", lambda: reports.get_daily_cash(daily)),
+        ("improved_daily_cash", lambda: reports.get_improved_daily_cash(daily)),
+        ("daily_paid_tickets", lambda: reports.get_daily_paid_tickets(daily)),
+        ("improved_cash_between_dates", lambda: reports.get_improved_cash_between_dates(ranged_details)),
+        ("paid_tickets_between_dates", lambda: reports.get_paid_tickets_between_dates(ranged_details)),
+        ("appointments_between_dates", lambda: reports.get_appointments_between_dates(ranged)),
+        ("excel_citas", lambda: list(AppointmentExcelExportService().iter_appointment_rows(start, day))),
+        ("excel_cierre_mes", lambda: MonthCloseExcelExportService().export_month_close(day).close()),
+        ("room_occupancy", lambda: RoomOccupancyService().get_room_occupancy(start, day)),
+        ("therapist_performance", lambda: statistics.get_rendimiento_comparativo(start, day)),
+        ("patient_cohorts", lambda: PatientCohortService().get_cohorts(start, day)),
+        ("report_watermark", lambda: ReportWatermark.compute("batch", start, day)),
+    ]
+    for source in ("appointments", "single_pass", "rollup"):
+        cases.append((f"statistics[{source}]", statistics_case(source)))
+    return cases
+
+
+def query_plans(run):
+    """Ejecuta el reporte y retorna (número, plan, tablas recorridas completas) de cada consulta."""
+    with override_settings(REPORTS_CACHE_ENABLED=False):
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+    results = []
+    for number, query in enumerate(ctx.captured_queries, start=1):
+        plan = explain(query["sql"])
+        results.append((number, plan, full_scans(plan)))
+    return results
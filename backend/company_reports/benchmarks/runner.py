@@ -0,0 +1,50 @@
+import statistics
+import time
+import tracemalloc
+from django.db import connection
+
+
+class QueryCounter:
+    """
+    Cuenta las sentencias SQL ejecutadas con `connection.execute_wrapper`.
+    A diferencia de CaptureQueriesContext no depende de `queries_log`, que
+    tiene un tope de entradas y deja de crecer en ejecuciones largas.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat=3, memory=False):
+    """
+    Ejecuta `func` varias veces y retorna la mediana del tiempo (ms),
+    la cantidad de consultas SQL de la última ejecución y su resultado.
+
+    Con `memory=True` hace una ejecución adicional bajo tracemalloc y agrega
+    el pico de memoria de Python (KB). Esa ejecución no se cronometra porque
+    tracemalloc la ralentiza.
+    """
+    timings = []
+    queries = 0
+    result = None
+    for _ in range(max(repeat, 1)):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = counter.count
+
+    peak_kb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return {"ms": statistics.median(timings), "queries": queries, "peak_kb": peak_kb, "result": result}
@@ -0,0 +1,128 @@
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from company_reports.services.cohort_services import PatientCohortService
+from company_reports.services.occupancy_services import RoomOccupancyService
+from company_reports.services.report_batch_services import ReportBatchService
+from company_reports.services.reports_services import ReportService
+from company_reports.services.statistics_services import StatisticsService
+from company_reports.views import reports_views
+
+
+def consume(response):
+    """Lee la respuesta completa (incluido el streaming) y retorna (status, bytes)."""
+    try:
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+    finally:
+        response.close()
+    return response.status_code, size
+
+
+class ReportBenchmarkSuite:
+    """
+    Casos del banco de pruebas de reportes: cada método público de ReportService,
+    StatisticsService (con sus tres motores), la ocupación de consultorios, el
+    batch y todas las vistas de exportación (PDF, Excel y CSV en streaming).
+
+    Los casos corren sin caché de reportes, respuestas condicionales, archivos
+    de exportación reutilizados ni presupuesto de consultas, y con el PDF
+    renderizado en el mismo proceso, para que tiempo, consultas y memoria
+    reflejen el trabajo completo de cada endpoint.
+    """
+
+    SETTINGS = {
+        "REPORTS_CACHE_ENABLED": False,
+        "REPORTS_CONDITIONAL_ENABLED": False,
+        "REPORTS_ARTIFACTS_ENABLED": False,
+        "REPORT_QUERY_BUDGET_ENABLED": False,
+        "PDF_RENDER_WORKERS": 0,
+    }
+
+    EXPORT_VIEWS = {
+        "pdf_citas_terapeuta": "daily",
+        "pdf_pacientes_terapeuta": "daily",
+        "pdf_resumen_caja": "daily",
+        "pdf_caja_chica_mejorada": "daily",
+        "pdf_tickets_pagados": "daily",
+        "exportar_excel_caja_chica_mejorada": "daily",
+        "exportar_excel_tickets_pagados": "daily",
+        "exportar_excel_citas": "range",
+        "exportar_excel_ocupacion_consultorios": "range",
+        "exportar_excel_cierre_mes": "daily",
+    }
+
+    def __init__(self, day, start, end):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.factory = RequestFactory()
+
+    def cases(self):
+        """Lista de (nombre, función sin argumentos) en orden de ejecución."""
+        reports = ReportService()
+        statistics = StatisticsService()
+        daily = {"date": self.day}
+        ranged = {"date": self.day, "start_date": self.start, "end_date": self.end}
+        ranged_details = {
+            "start_date": self.start, "end_date": self.end, "include_details": True, "page": 1, "page_size": 100,
+        }
+
+        cases = [
+            ("report.appointments_count_by_therapist", lambda: reports.get_appointments_count_by_therapist(daily)),
+            ("report.patients_by_therapist", lambda: reports.get_patients_by_therapist(daily)),
+            ("report.daily_cash", lambda: reports.get_daily_cash(daily)),
+            ("report.improved_daily_cash", lambda: reports.get_improved_daily_cash(daily)),
+            ("report.daily_paid_tickets", lambda: reports.get_daily_paid_tickets(daily)),
+            ("report.improved_cash_between_dates", lambda: reports.get_improved_cash_between_dates(ranged_details)),
+            ("report.paid_tickets_between_dates", lambda: reports.get_paid_tickets_between_dates(ranged_details)),
+            ("report.appointments_between_dates", lambda: reports.get_appointments_between_dates(ranged)),
+            ("report.batch", lambda: ReportBatchService().get_reports(self.day, list(ReportBatchService.REPORTS))),
+            ("report.room_occupancy", lambda: RoomOccupancyService().get_room_occupancy(self.start, self.end)),
+            ("report.therapist_performance", lambda: statistics.get_rendimiento_comparativo(self.start, self.end)),
+            ("report.patient_cohorts", lambda: PatientCohortService().get_cohorts(self.start, self.end)),
+        ]
+        for source in ("appointments", "single_pass", "rollup"):
+            cases.append((f"statistics[{source}]", self._statistics_case(statistics, source)))
+        for view_name, params in self.EXPORT_VIEWS.items():
+            cases.append((f"export.{view_name}", self._view_case(view_name, params)))
+        cases.append((
+            "export.csv_appointments_between_dates",
+            self._view_case("get_appointments_between_dates", "range", format="csv"),
+        ))
+        return cases
+
+    def run(self, measure, repeat=3, only=None):
+        """Mide cada caso (filtrando por subcadenas de `only`) y retorna {nombre: resultado}."""
+        results = {}
+        with override_settings(**self.SETTINGS):
+            for name, func in self.cases():
+                if only and not any(part in name for part in only):
+                    continue
+                result = measure(func, repeat=repeat, memory=True)
+                result.pop("result")
+                results[name] = result
+        return results
+
+    def _statistics_case(self, service, source):
+        def run():
+            with override_settings(STATISTICS_SOURCE=source):
+                return service.get_statistics(self.start, self.end)
+        return run
+
+    def _view_case(self, view_name, params, **extra):
+        if params == "daily":
+            query = {"date": self.day.isoformat()}
+        else:
+            query = {"start_date": self.start.isoformat(), "end_date": self.end.isoformat()}
+        query.update(extra)
+        view = getattr(reports_views, view_name)
+
+        def run():
+            status, size = consume(view(self.factory.get("/", query)))
+            if status != 200:
+                raise RuntimeError(f"{view_name} respondió {status}")
+            return size
+        return run
@@ -0,0 +1,216 @@
+import random
+from itertools import accumulate
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from appointments_status.models.appointment import Appointment
+from appointments_status.models.ticket import Ticket
+from appointments_status.services.ticket_number_allocator import ticket_number_allocator
+from histories_configurations.models import DocumentType, PaymentType
+from patients_diagnoses.models import Patient
+from therapists.models import Therapist
+from ubi_geo.models import Country, Region, Province, District
+
+PREFIX = "BENCH"
+
+# Distribuciones aproximadas de un centro de terapia: (valor, peso)
+PAYMENT_TYPES = [("Efectivo", 45), ("Yape", 30), ("Tarjeta", 15), ("Transferencia", 10)]
+WEEKDAY_WEIGHTS = [100, 100, 95, 95, 85, 45, 3]  # lunes a domingo
+HOUR_WEIGHTS = [
+    (8, 50), (9, 90), (10, 100), (11, 90), (12, 60), (13, 25),
+    (14, 40), (15, 75), (16, 95), (17, 100), (18, 85), (19, 50),
+]
+DURATIONS = [(30, 20), (45, 30), (60, 50)]
+AMOUNTS = [(40, 15), (50, 30), (60, 30), (80, 15), (100, 10)]
+PAST_STATUSES = [("COMPLETADO", 88), ("PENDIENTE", 4), ("ACTIVO", 2), ("CANCELADO", 6)]
+FUTURE_STATUSES = [("PENDIENTE", 85), ("ACTIVO", 10), ("CANCELADO", 5)]
+TICKET_STATUSES = [("paid", 85), ("cancelled", 10), ("refunded", 5)]
+
+# Pacientes frecuentes: el peso del paciente k es 1 / (k + 1) ** PATIENT_SKEW
+PATIENT_SKEW = 0.6
+
+
+class Distribution:
+    """Valores con pesos acumulados: cada muestra cuesta una búsqueda binaria."""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cum_weights = list(accumulate(weights))
+
+    @classmethod
+    def of(cls, pairs):
+        values, weights = zip(*pairs)
+        return cls(values, weights)
+
+    def sample(self, rnd):
+        return rnd.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+HOURS = Distribution.of(HOUR_WEIGHTS)
+DURATION_MINUTES = Distribution.of(DURATIONS)
+PAYMENTS = Distribution.of(AMOUNTS)
+PAST_STATUS = Distribution.of(PAST_STATUSES)
+FUTURE_STATUS = Distribution.of(FUTURE_STATUSES)
+TICKET_STATUS = Distribution.of(TICKET_STATUSES)
+
+
+class SyntheticDataset:
+    """
+    Genera datos sintéticos (pacientes, terapeutas, citas y tickets) con
+    bulk_create, sin disparar señales, para medir los reportes sobre volúmenes grandes.
+
+    - Las citas se reparten por día de la semana y hora según el patrón de un
+      centro real (sábados a media carga, domingos casi vacíos, picos a media
+      mañana y a la tarde). Unos pocos pacientes concentran muchas citas y la
+      carga de los terapeutas es desigual.
+    - Las citas pasadas están mayormente completadas; las futuras, pendientes.
+    - Una fracción de las citas (`ticket_ratio`) tiene ticket con el mismo número
+      TKT-NNN en la cita, como lo haría la señal. Los números se reservan en
+      TicketNumberAllocator, igual que TicketService.generate_ticket_number.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, appointments=10000, patients=2000, therapists=20, days=365, start=None, seed=1,
+                 ticket_ratio=0.9):
+        self.appointments = appointments
+        self.patients = patients
+        self.therapists = therapists
+        self.days = days
+        self.start = start or (timezone.localdate() - timedelta(days=days))
+        self.ticket_ratio = ticket_ratio
+        self.random = random.Random(seed)
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=self.days - 1)
+
+    def create(self):
+        country, _ = Country.objects.get_or_create(ISO2="ZZ", defaults={"name": f"{PREFIX} País"})
+        region, _ = Region.objects.get_or_create(name=f"{PREFIX} Región", country=country)
+        province, _ = Province.objects.get_or_create(name=f"{PREFIX} Provincia", region=region)
+        district, _ = District.objects.get_or_create(name=f"{PREFIX} Distrito", province=province)
+        document_type, _ = DocumentType.objects.get_or_create(name=f"{PREFIX} DNI")
+        payment_types = {
+            PaymentType.objects.get_or_create(name=f"{PREFIX} {name}")[0].id: name.lower()
+            for name, _ in PAYMENT_TYPES
+        }
+
+        run = self.random.randrange(10 ** 6)
+        Therapist.objects.bulk_create(
+            [
+                Therapist(
+                    document_number=f"{PREFIX}T{run}-{i}",
+                    first_name=f"Terapeuta {i}",
+                    last_name_paternal=f"{PREFIX}",
+                    last_name_maternal=f"{run}",
+                )
+                for i in range(self.therapists)
+            ],
+            batch_size=self.BATCH_SIZE,
+        )
+        Patient.objects.bulk_create(
+            (
+                Patient(
+                    document_number=f"{PREFIX}P{run}-{i}",
+                    name=f"Paciente {i}",
+                    paternal_lastname=PREFIX,
+                    maternal_lastname=f"{run}",
+                    phone1="900000000",
+                    email=f"paciente{i}@example.com",
+                    ocupation="-",
+                    health_condition="-",
+                    region=region,
+                    province=province,
+                    district=district,
+                    document_type=document_type,
+                )
+                for i in range(self.patients)
+            ),
+            batch_size=self.BATCH_SIZE,
+        )
+        therapist_ids = list(
+            Therapist.objects.filter(document_number__startswith=f"{PREFIX}T{run}-").values_list("id", flat=True)
+        )
+        patient_ids = list(
+            Patient.objects.filter(document_number__startswith=f"{PREFIX}P{run}-").values_list("id", flat=True)
+        )
+        self._prepare_choices(patient_ids, therapist_ids, list(payment_types))
+
+        created = tickets = 0
+        while created < self.appointments:
+            size = min(self.BATCH_SIZE, self.appointments - created)
+            last_id = Appointment.objects.aggregate(last=Max("id"))["last"] or 0
+            batch = [self._appointment() for _ in range(size)]
+            with_ticket = [appointment for appointment in batch if self.random.random() < self.ticket_ratio]
+            for appointment, ticket_number in zip(with_ticket, ticket_number_allocator.allocate_many(len(with_ticket))):
+                appointment.ticket_number = ticket_number
+            Appointment.objects.bulk_create(batch, batch_size=self.BATCH_SIZE)
+            tickets += self._create_tickets(last_id, payment_types)
+            created += size
+
+        return {
+            "appointments": created,
+            "tickets": tickets,
+            "patients": len(patient_ids),
+            "therapists": len(therapist_ids),
+            "start": self.start,
+            "end": self.end,
+        }
+
+    def _prepare_choices(self, patient_ids, therapist_ids, payment_type_ids):
+        rnd = self.random
+        days = [self.start + timedelta(days=offset) for offset in range(self.days)]
+        self._days = Distribution(days, [WEEKDAY_WEIGHTS[day.weekday()] for day in days])
+        self._patients = Distribution(patient_ids, [1 / (rank + 1) ** PATIENT_SKEW for rank in range(len(patient_ids))])
+        self._therapists = Distribution(therapist_ids, [rnd.uniform(0.5, 1.5) for _ in therapist_ids])
+        self._payment_types = Distribution(payment_type_ids, [weight for _, weight in PAYMENT_TYPES])
+        self._today = timezone.localdate()
+
+    def _appointment(self):
+        rnd = self.random
+        day = self._days.sample(rnd)
+        status = PAST_STATUS if day < self._today else FUTURE_STATUS
+        return Appointment(
+            patient_id=self._patients.sample(rnd),
+            therapist_id=self._therapists.sample(rnd) if rnd.random() > 0.05 else None,
+            appointment_date=timezone.make_aware(datetime.combine(day, time.min)),
+            hour=time(HOURS.sample(rnd), rnd.choice((0, 30))),
+            duration_minutes=DURATION_MINUTES.sample(rnd),
+            room=rnd.randint(1, 6),
+            payment=Decimal(PAYMENTS.sample(rnd)) if rnd.random() > 0.1 else None,
+            payment_type_id=self._payment_types.sample(rnd) if rnd.random() > 0.05 else None,
+            appointment_status=status.sample(rnd),
+        )
+
+    def _create_tickets(self, last_id, payment_types):
+        """Tickets de las citas con número creadas después de `last_id`."""
+        rnd = self.random
+        rows = (
+            Appointment.objects
+            .filter(id__gt=last_id, ticket_number__isnull=False)
+            .order_by("id")
+            .values_list("id", "ticket_number", "payment", "payment_type_id")
+        )
+        tickets = []
+        for appointment_id, ticket_number, payment, payment_type_id in rows:
+            status = TICKET_STATUS.sample(rnd) if payment else "pending"
+            tickets.append(Ticket(
+                appointment_id=appointment_id,
+                ticket_number=ticket_number,
+                amount=payment or Decimal("0.00"),
+                payment_method=payment_types.get(payment_type_id, "efectivo"),
+                status=status,
+                is_active=rnd.random() > 0.02,
+            ))
+        Ticket.objects.bulk_create(tickets, batch_size=self.BATCH_SIZE)
+
+        # payment_date es auto_now_add: se corrige después a la fecha de la cita
+        appointment_date = Appointment.objects.filter(pk=OuterRef("appointment_id")).values("appointment_date")[:1]
+        Ticket.objects.filter(appointment_id__gt=last_id).update(
+            payment_date=Subquery(appointment_date),
+            created_at=Subquery(appointment_date),
+        )
+        return len(tickets)
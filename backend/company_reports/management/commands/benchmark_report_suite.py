@@ -0,0 +1,81 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from company_reports.benchmarks.baseline import compare, load_baseline, save_baseline
+from company_reports.benchmarks.runner import measure
+from company_reports.benchmarks.suite import ReportBenchmarkSuite
+from company_reports.management.commands.rebuild_statistics_rollups import parse_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempo, consultas SQL y pico de memoria de todos los reportes y exportaciones "
+        "sobre los datos actuales (p. ej. los generados con seed_report_data) y los compara "
+        "con una línea base guardada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=parse_day, default=None,
+                            help="Fecha de los reportes diarios (YYYY-MM-DD). Por defecto, hoy")
+        parser.add_argument("--days", type=int, default=30,
+                            help="Días hacia atrás desde --date para los reportes por rango")
+        parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se usa la mediana)")
+        parser.add_argument("--only", action="append", default=[],
+                            help="Solo los casos cuyo nombre contiene este texto (repetible)")
+        parser.add_argument("--baseline", default=None, help="Archivo JSON de la línea base")
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="Guarda esta corrida como la línea base en lugar de compararla")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Fracción de aumento de tiempo o memoria tolerada antes de marcar regresión")
+        parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Termina con error si algún caso empeora respecto de la línea base")
+
+    def handle(self, *args, **opt):
+        if opt["update_baseline"] and not opt["baseline"]:
+            raise CommandError("--update-baseline requiere --baseline")
+
+        day = opt["date"] or timezone.localdate()
+        start = day - timedelta(days=opt["days"])
+        suite = ReportBenchmarkSuite(day, start, day)
+        self.stdout.write(f"Reportes diarios: {day}; por rango: {start} a {day}")
+
+        results = suite.run(measure, repeat=opt["repeat"], only=opt["only"])
+        if not results:
+            raise CommandError("Ningún caso coincide con --only")
+
+        baseline = {}
+        if opt["baseline"] and not opt["update_baseline"]:
+            if not os.path.exists(opt["baseline"]):
+                raise CommandError(f"No existe la línea base {opt['baseline']}; créela con --update-baseline")
+            baseline = load_baseline(opt["baseline"])["results"]
+        statuses = compare(results, baseline, tolerance=opt["tolerance"]) if baseline else {}
+
+        self.stdout.write(
+            f"\n{'caso':<44}{'consultas':>10}{'mediana ms':>12}{'pico KB':>12}"
+            + (f"{'base ms':>10}{'base KB':>10}  estado" if baseline else "")
+        )
+        for name, result in results.items():
+            line = f"{name:<44}{result['queries']:>10}{result['ms']:>12.1f}{result['peak_kb']:>12.0f}"
+            if baseline:
+                base = baseline.get(name, {})
+                line += f"{base.get('ms', 0):>10.1f}{base.get('peak_kb', 0):>10.0f}  {self._status(statuses[name])}"
+            self.stdout.write(line)
+
+        if opt["update_baseline"]:
+            save_baseline(opt["baseline"], results, {"date": day, "start": start, "repeat": opt["repeat"]})
+            self.stdout.write(self.style.SUCCESS(f"\nLínea base guardada en {opt['baseline']}"))
+            return
+
+        regressions = [name for name, status in statuses.items() if isinstance(status, list)]
+        if regressions:
+            message = f"Regresiones respecto de la línea base: {', '.join(regressions)}"
+            if opt["fail_on_regression"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f"\n{message}"))
+
+    def _status(self, status):
+        if isinstance(status, list):
+            return self.style.ERROR(f"REGRESIÓN ({', '.join(status)})")
+        return status
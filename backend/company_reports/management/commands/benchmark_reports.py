@@ -0,0 +1,112 @@
+import json
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from company_reports.benchmarks.legacy import patients_by_therapist_models
+from company_reports.benchmarks.runner import measure
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from company_reports.services.reports_services import ReportService
+from company_reports.services.statistics_rollup_services import StatisticsRollupService
+from company_reports.services.statistics_services import StatisticsService
+
+
+def normalize(payload):
+    """Normaliza un payload para compararlo entre motores (orden y tipos numéricos)."""
+    data = json.loads(json.dumps(payload, default=float))
+    if isinstance(data, dict) and "terapeutas" in data:
+        data["terapeutas"].sort(key=lambda t: (t["id"] is None, t["id"] or 0))
+    return data
+
+
+def normalize_patients_by_therapist(payload):
+    """Ordena grupos y pacientes para comparar get_patients_by_therapist entre implementaciones."""
+    groups = sorted(payload, key=lambda group: str(group["therapist_id"]))
+    return [
+        {**group, "patients": sorted(group["patients"], key=lambda patient: patient["patient_id"])}
+        for group in groups
+    ]
+
+
+class Command(BaseCommand):
+    help = "Mide tiempo y cantidad de consultas SQL de los reportes sobre datos sintéticos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=1000000, help="Citas sintéticas a generar")
+        parser.add_argument("--patients", type=int, default=20000, help="Pacientes sintéticos a generar")
+        parser.add_argument("--therapists", type=int, default=25, help="Terapeutas sintéticos a generar")
+        parser.add_argument("--days", type=int, default=730, help="Días que abarcan las citas")
+        parser.add_argument("--busy-day-appointments", type=int, default=5000,
+                            help="Citas adicionales en un solo día para los reportes diarios")
+        parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se usa la mediana)")
+        parser.add_argument("--keep", action="store_true",
+                            help="Conserva los datos sintéticos (por defecto se revierten al terminar)")
+
+    def handle(self, *args, **opt):
+        with transaction.atomic():
+            self.stdout.write(f"Generando {opt['appointments']} citas sintéticas…")
+            dataset = SyntheticDataset(
+                appointments=opt["appointments"],
+                patients=opt["patients"],
+                therapists=opt["therapists"],
+                days=opt["days"],
+            )
+            summary = dataset.create()
+            self.stdout.write(
+                f"Datos: {summary['appointments']} citas, {summary['patients']} pacientes, "
+                f"{summary['therapists']} terapeutas ({summary['start']} a {summary['end']})"
+            )
+
+            busy_day = summary["end"]
+            if opt["busy_day_appointments"]:
+                SyntheticDataset(
+                    appointments=opt["busy_day_appointments"],
+                    patients=min(opt["patients"], opt["busy_day_appointments"]),
+                    therapists=opt["therapists"],
+                    days=1,
+                    start=busy_day,
+                    seed=2,
+                ).create()
+                self.stdout.write(f"Día con mayor carga: {busy_day} (+{opt['busy_day_appointments']} citas)")
+
+            self.benchmark_statistics(summary["start"], summary["end"], opt["repeat"])
+            self.benchmark_patients_by_therapist(busy_day, opt["repeat"])
+
+            if not opt["keep"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Datos sintéticos revertidos.")
+
+    def benchmark_statistics(self, start, end, repeat):
+        service = StatisticsService()
+        self.stdout.write("\n/reports/statistics/ — StatisticsService.get_statistics")
+
+        rebuild = measure(lambda: StatisticsRollupService().rebuild(start, end), repeat=1)
+        self.stdout.write(f"  backfill de agregados: {rebuild['ms']:.0f} ms, {rebuild['queries']} consultas")
+
+        results = {}
+        for source in ("appointments", "single_pass", "rollup"):
+            with override_settings(STATISTICS_SOURCE=source, REPORTS_CACHE_ENABLED=False):
+                results[source] = measure(lambda: service.get_statistics(start, end), repeat=repeat)
+
+        baseline = results["appointments"]
+        self.stdout.write(f"  {'motor':<14}{'consultas':>10}{'mediana ms':>14}{'vs actual':>12}  igual")
+        for source, result in results.items():
+            speedup = baseline["ms"] / result["ms"] if result["ms"] else float("inf")
+            same = normalize(result["result"]) == normalize(baseline["result"])
+            self.stdout.write(
+                f"  {source:<14}{result['queries']:>10}{result['ms']:>14.1f}{speedup:>11.1f}x  {'sí' if same else 'NO'}"
+            )
+
+    def benchmark_patients_by_therapist(self, day, repeat):
+        self.stdout.write(f"\n/reports/patients-by-therapist/ — ReportService.get_patients_by_therapist ({day})")
+        with override_settings(REPORTS_CACHE_ENABLED=False):
+            legacy = measure(lambda: patients_by_therapist_models(day), repeat=repeat)
+            current = measure(lambda: ReportService().get_patients_by_therapist({"date": day}), repeat=repeat)
+
+        same = normalize_patients_by_therapist(current["result"]) == normalize_patients_by_therapist(legacy["result"])
+        speedup = legacy["ms"] / current["ms"] if current["ms"] else float("inf")
+        self.stdout.write(f"  {'versión':<14}{'consultas':>10}{'mediana ms':>14}{'vs modelos':>12}  igual")
+        self.stdout.write(f"  {'modelos':<14}{legacy['queries']:>10}{legacy['ms']:>14.1f}{1.0:>11.1f}x")
+        self.stdout.write(
+            f"  {'values()':<14}{current['queries']:>10}{current['ms']:>14.1f}{speedup:>11.1f}x  {'sí' if same else 'NO'}"
+        )
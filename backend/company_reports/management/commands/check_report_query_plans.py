@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from company_reports.benchmarks.query_plans import query_plans, report_cases
+from company_reports.management.commands.rebuild_statistics_rollups import parse_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre todas las consultas de los reportes en la base actual y falla si alguna "
+        "recorre completas las tablas de citas o tickets. Es la misma verificación que "
+        "company_reports.tests.test_report_query_plans, para correrla sobre un volumen de datos real: "
+        "en MySQL, con tablas pequeñas el optimizador prefiere recorridos completos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=parse_day, default=None,
+                            help="Fecha de los reportes diarios (YYYY-MM-DD). Por defecto, hoy")
+        parser.add_argument("--days", type=int, default=30,
+                            help="Días hacia atrás para los reportes por rango")
+        parser.add_argument("--verbose-plans", action="store_true", help="Muestra el plan completo de cada consulta")
+
+    def handle(self, *args, **opt):
+        day = opt["date"] or timezone.localdate()
+        failures = []
+        for name, run in report_cases(day, opt["days"]):
+            for number, plan, scanned in query_plans(run):
+                status = self.style.ERROR(f"FULL SCAN {', '.join(sorted(scanned))}") if scanned else "ok"
+                self.stdout.write(f"{name} #{number}: {status}")
+                if opt["verbose_plans"] or scanned:
+                    for line in plan:
+                        self.stdout.write(f"    {line}")
+                if scanned:
+                    failures.append(f"{name} #{number}")
+
+        if failures:
+            raise CommandError(f"Consultas con recorrido completo: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Todas las consultas de reportes usan índices."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company_reports.services.export_artifacts import ExportArtifactStore
+from company_reports.services.report_job_services import ReportJobService
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los archivos de exportación guardados sin uso reciente y, si el total supera "
+        "el presupuesto, los usados hace más tiempo (ver REPORTS_ARTIFACTS_MAX_AGE y REPORTS_ARTIFACTS_MAX_BYTES). "
+        "También borra los trabajos de reporte terminados hace más de REPORT_JOBS_MAX_AGE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age", type=int, default=None,
+                            help="Segundos sin uso tras los que se borra un archivo. Por defecto, REPORTS_ARTIFACTS_MAX_AGE")
+        parser.add_argument("--max-bytes", type=int, default=None,
+                            help="Tamaño total máximo en bytes. Por defecto, REPORTS_ARTIFACTS_MAX_BYTES")
+        parser.add_argument("--jobs-max-age", type=int, default=None,
+                            help="Segundos desde que terminó un trabajo de reporte. Por defecto, REPORT_JOBS_MAX_AGE")
+
+    def handle(self, *args, **opt):
+        if any(opt[name] is not None and opt[name] < 0 for name in ("max_age", "max_bytes", "jobs_max_age")):
+            raise CommandError("--max-age, --max-bytes y --jobs-max-age no pueden ser negativos")
+
+        result = ExportArtifactStore().evict(max_age=opt["max_age"], max_bytes=opt["max_bytes"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivos borrados: {result['removed']} ({result['freed_bytes'] / 1024:.0f} KB); "
+            f"conservados: {result['kept']} ({result['total_bytes'] / 1024:.0f} KB)"
+        ))
+        jobs = ReportJobService().purge_finished(max_age=opt["jobs_max_age"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Trabajos de reporte borrados: {jobs['removed']} ({jobs['freed_bytes'] / 1024:.0f} KB)"
+        ))
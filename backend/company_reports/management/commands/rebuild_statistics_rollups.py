@@ -0,0 +1,30 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+
+from company_reports.services.statistics_rollup_services import StatisticsRollupService
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {value}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Reconstruye las tablas de agregados diarios usadas por /reports/statistics/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_day, default=None,
+                            help="Fecha inicial (YYYY-MM-DD). Por defecto, la primera cita registrada")
+        parser.add_argument("--end", type=parse_day, default=None,
+                            help="Fecha final (YYYY-MM-DD). Por defecto, la última cita registrada")
+
+    def handle(self, *args, **opt):
+        start, end = opt["start"], opt["end"]
+        if start and end and start > end:
+            raise CommandError("--start no puede ser mayor que --end")
+
+        self.stdout.write("Reconstruyendo agregados diarios de estadísticas…")
+        days = StatisticsRollupService().rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Días procesados: {days}"))
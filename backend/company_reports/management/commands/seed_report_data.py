@@ -0,0 +1,61 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from company_reports.management.commands.rebuild_statistics_rollups import parse_day
+from company_reports.services.date_ranges import iter_days
+from company_reports.services.report_cache import ReportCache
+from company_reports.services.statistics_rollup_services import StatisticsRollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera pacientes, terapeutas, citas y tickets sintéticos con distribuciones realistas "
+        "y los conserva en la base, para medir los reportes con benchmark_report_suite. "
+        "Use solo en bases de desarrollo o de pruebas de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=100000, help="Citas sintéticas a generar")
+        parser.add_argument("--patients", type=int, default=5000, help="Pacientes sintéticos a generar")
+        parser.add_argument("--therapists", type=int, default=25, help="Terapeutas sintéticos a generar")
+        parser.add_argument("--days", type=int, default=730, help="Días que abarcan las citas")
+        parser.add_argument("--end", type=parse_day, default=None,
+                            help="Último día con citas (YYYY-MM-DD). Por defecto, hoy")
+        parser.add_argument("--ticket-ratio", type=float, default=0.9, help="Fracción de citas con ticket (0 a 1)")
+        parser.add_argument("--seed", type=int, default=1, help="Semilla del generador aleatorio")
+        parser.add_argument("--skip-rollups", action="store_true",
+                            help="No reconstruye los agregados de estadísticas del rango")
+
+    def handle(self, *args, **opt):
+        if opt["appointments"] < 1 or opt["patients"] < 1 or opt["therapists"] < 1 or opt["days"] < 1:
+            raise CommandError("--appointments, --patients, --therapists y --days deben ser mayores que 0")
+        if not 0 <= opt["ticket_ratio"] <= 1:
+            raise CommandError("--ticket-ratio debe estar entre 0 y 1")
+
+        end = opt["end"] or timezone.localdate()
+        dataset = SyntheticDataset(
+            appointments=opt["appointments"],
+            patients=opt["patients"],
+            therapists=opt["therapists"],
+            days=opt["days"],
+            start=end - timedelta(days=opt["days"] - 1),
+            seed=opt["seed"],
+            ticket_ratio=opt["ticket_ratio"],
+        )
+
+        self.stdout.write(f"Generando {opt['appointments']} citas sintéticas…")
+        with transaction.atomic():
+            summary = dataset.create()
+            # bulk_create no dispara señales: se invalidan los reportes y agregados del rango a mano
+            ReportCache.bump_days(iter_days(summary["start"], summary["end"]))
+            if not opt["skip_rollups"]:
+                StatisticsRollupService().rebuild(summary["start"], summary["end"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos: {summary['appointments']} citas, {summary['tickets']} tickets, "
+            f"{summary['patients']} pacientes, {summary['therapists']} terapeutas "
+            f"({summary['start']} a {summary['end']})"
+        ))
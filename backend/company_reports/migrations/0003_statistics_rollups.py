@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Carga inicial de los agregados a partir de las citas existentes."""
+    Appointment = apps.get_model('appointments_status', 'Appointment')
+    AppointmentDailyRollup = apps.get_model('company_reports', 'AppointmentDailyRollup')
+    PatientDailyRollup = apps.get_model('company_reports', 'PatientDailyRollup')
+
+    appointments = (
+        Appointment.objects
+        .filter(appointment_date__isnull=False)
+        .annotate(day=TruncDate('appointment_date'))
+        .order_by()
+    )
+    groups = (
+        appointments
+        .values('day', 'therapist_id', 'payment_type_id', 'appointment_status')
+        .annotate(sessions=Count('id'), revenue=Sum('payment'))
+    )
+    AppointmentDailyRollup.objects.bulk_create(
+        (AppointmentDailyRollup(**group) for group in groups), batch_size=1000
+    )
+    patients = appointments.values('day', 'patient_id').annotate(sessions=Count('id'))
+    PatientDailyRollup.objects.bulk_create(
+        (PatientDailyRollup(**row) for row in patients), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments_status', '0003_rename_appointments_appointment_date_hour_idx_appointment_appoint_7d154e_idx_and_more'),
+        ('company_reports', '0002_alter_companydata_options_remove_companydata_address_and_more'),
+        ('histories_configurations', '0003_alter_paymentstatus_table'),
+        ('patients_diagnoses', '0001_initial'),
+        ('therapists', '0002_alter_therapist_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('appointment_status', models.CharField(max_length=20, verbose_name='Estado de la cita')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Sesiones')),
+                ('revenue', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Ingresos')),
+                ('payment_type', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='histories_configurations.paymenttype', verbose_name='Tipo de pago')),
+                ('therapist', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='therapists.therapist', verbose_name='Terapeuta')),
+            ],
+            options={
+                'verbose_name': 'Agregado diario de citas',
+                'verbose_name_plural': 'Agregados diarios de citas',
+                'db_table': 'statistics_daily_rollups',
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['day', 'therapist', 'payment_type', 'appointment_status'], name='statistics__day_3206f8_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PatientDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Sesiones')),
+                ('patient', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='patients_diagnoses.patient', verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Agregado diario de pacientes',
+                'verbose_name_plural': 'Agregados diarios de pacientes',
+                'db_table': 'statistics_patient_daily_rollups',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'patient'), name='unique_patient_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company_reports', '0003_statistics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportDataVersion',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='Día')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Versión de datos de reportes',
+                'verbose_name_plural': 'Versiones de datos de reportes',
+                'db_table': 'report_data_versions',
+                'ordering': ['day'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:28
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company_reports', '0004_report_data_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report', models.CharField(max_length=50, verbose_name='Reporte')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('file', models.FileField(blank=True, null=True, upload_to='reports/jobs/', verbose_name='Archivo')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de finalización')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de reporte',
+                'verbose_name_plural': 'Trabajos de reportes',
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='report_jobs_status_f93e87_idx'), models.Index(fields=['created_at'], name='report_jobs_created_d0bc9c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.utils import timezone
+
+TASK_NAME = 'Desalojar archivos de reportes'
+TASK = 'company_reports.tasks.evict_report_artifacts'
+
+
+def schedule_evict_artifacts(apps, schema_editor):
+    """Programa evict_report_artifacts cada hora en django_celery_beat (DatabaseScheduler)."""
+    CrontabSchedule = apps.get_model('django_celery_beat', 'CrontabSchedule')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+
+    crontab, _ = CrontabSchedule.objects.get_or_create(
+        minute='30', hour='*', day_of_week='*', day_of_month='*', month_of_year='*', timezone='UTC',
+    )
+    PeriodicTask.objects.get_or_create(
+        name=TASK_NAME,
+        defaults={
+            'task': TASK,
+            'crontab': crontab,
+            'description': (
+                'Borra los archivos de exportación por sobre REPORTS_ARTIFACTS_MAX_AGE / '
+                'REPORTS_ARTIFACTS_MAX_BYTES y los trabajos de reporte vencidos (REPORT_JOBS_MAX_AGE).'
+            ),
+        },
+    )
+    # Los modelos históricos no ejecutan PeriodicTask.save(): se avisa al beat en ejecución a mano
+    PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+def unschedule_evict_artifacts(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    PeriodicTask.objects.filter(name=TASK_NAME, task=TASK).delete()
+    PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company_reports', '0005_report_jobs'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_evict_artifacts, unschedule_evict_artifacts),
+    ]
@@ -0,0 +1,6 @@
+from .company import CompanyData
+from .statistics_rollup import AppointmentDailyRollup, PatientDailyRollup
+from .report_data_version import ReportDataVersion
+from .report_job import ReportJob
+
+__all__ = ['CompanyData', 'AppointmentDailyRollup', 'PatientDailyRollup', 'ReportDataVersion', 'ReportJob']
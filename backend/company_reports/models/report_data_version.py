@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class ReportDataVersion(models.Model):
+    """
+    Versión de los datos de un día para la caché de reportes.
+    Las señales de Appointment y Ticket la incrementan al escribir;
+    las filas nunca se eliminan (un día sin fila tiene versión 0).
+    """
+
+    day = models.DateField(primary_key=True, verbose_name="Día")
+    version = models.PositiveIntegerField(default=0, verbose_name="Versión")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        db_table = 'report_data_versions'
+        verbose_name = "Versión de datos de reportes"
+        verbose_name_plural = "Versiones de datos de reportes"
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.day} v{self.version}"
@@ -0,0 +1,46 @@
+import uuid
+from django.db import models
+
+
+class ReportJob(models.Model):
+    """
+    Exportación de un reporte (Excel o PDF) ejecutada en segundo plano por Celery.
+    El archivo generado queda en MEDIA_ROOT/reports/jobs/ hasta que
+    evict_report_artifacts borra el trabajo (REPORT_JOBS_MAX_AGE).
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=50, verbose_name="Reporte")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Estado")
+    file = models.FileField(upload_to='reports/jobs/', blank=True, null=True, verbose_name="Archivo")
+    error = models.TextField(blank=True, null=True, verbose_name="Error")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de inicio")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de finalización")
+
+    class Meta:
+        db_table = 'report_jobs'
+        verbose_name = "Trabajo de reporte"
+        verbose_name_plural = "Trabajos de reportes"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.report} ({self.get_status_display()})"
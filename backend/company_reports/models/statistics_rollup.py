@@ -0,0 +1,75 @@
+from django.db import models
+
+
+class AppointmentDailyRollup(models.Model):
+    """
+    Agregado diario de citas para el dashboard de estadísticas.
+    Una fila por día, terapeuta, tipo de pago y estado de la cita.
+    Se mantiene desde las señales de Appointment (ver company_reports.signals)
+    y se reconstruye con `python manage.py rebuild_statistics_rollups`.
+    """
+
+    day = models.DateField(verbose_name="Día")
+    # Sin restricción en BD: las filas se recalculan por día desde `appointments`
+    therapist = models.ForeignKey(
+        'therapists.Therapist',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Terapeuta"
+    )
+    payment_type = models.ForeignKey(
+        'histories_configurations.PaymentType',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Tipo de pago"
+    )
+    appointment_status = models.CharField(max_length=20, verbose_name="Estado de la cita")
+    sessions = models.PositiveIntegerField(default=0, verbose_name="Sesiones")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True, verbose_name="Ingresos")
+
+    class Meta:
+        db_table = 'statistics_daily_rollups'
+        verbose_name = "Agregado diario de citas"
+        verbose_name_plural = "Agregados diarios de citas"
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['day', 'therapist', 'payment_type', 'appointment_status']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.therapist_id} - {self.payment_type_id} - {self.appointment_status}"
+
+
+class PatientDailyRollup(models.Model):
+    """
+    Pacientes atendidos por día. Permite contar pacientes distintos en un
+    rango sin recorrer la tabla `appointments`.
+    """
+
+    day = models.DateField(verbose_name="Día")
+    patient = models.ForeignKey(
+        'patients_diagnoses.Patient',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Paciente"
+    )
+    sessions = models.PositiveIntegerField(default=0, verbose_name="Sesiones")
+
+    class Meta:
+        db_table = 'statistics_patient_daily_rollups'
+        verbose_name = "Agregado diario de pacientes"
+        verbose_name_plural = "Agregados diarios de pacientes"
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'patient'], name='unique_patient_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.patient_id}"
@@ -0,0 +1,28 @@
+from django.urls import reverse
+from rest_framework import serializers
+from company_reports.models.report_job import ReportJob
+from company_reports.services.report_job_services import ReportJobService
+
+
+class ReportJobCreateSerializer(serializers.Serializer):
+    """Valida la solicitud de un trabajo de reporte."""
+
+    report = serializers.ChoiceField(choices=sorted(ReportJobService.EXPORTS))
+    params = serializers.DictField(required=False, default=dict)
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'report', 'params', 'status', 'error', 'download_url',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.STATUS_DONE or not obj.file:
+            return None
+        url = reverse('report_job_download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from datetime import datetime
 from django.utils.timezone import localtime
+from company_reports.services.report_batch_services import ReportBatchService
 
 
 class DateParameterSerializer(serializers.Serializer):
@@ -28,6 +29,52 @@ class DateParameterSerializer(serializers.Serializer):
             
         return data
 
+
+class CashRangeParameterSerializer(DateParameterSerializer):
+    """Parámetros de caja chica y tickets pagados, incluido el modo por rango."""
+
+    include_details = serializers.BooleanField(required=False, default=False)
+    page = serializers.IntegerField(required=False, default=1, min_value=1)
+    page_size = serializers.IntegerField(required=False, default=100, min_value=1, max_value=1000)
+
+    def validate(self, data):
+        data = super().validate(data)
+        if ('start_date' in data) != ('end_date' in data):
+            raise serializers.ValidationError("start_date y end_date deben enviarse juntos")
+        return data
+
+    def is_range(self):
+        """True si se pidió el reporte por rango (start_date y end_date)."""
+        return 'start_date' in self.validated_data and 'end_date' in self.validated_data
+
+    def range_params(self):
+        """Parámetros del modo por rango (sin `date`, que no aplica)."""
+        return {key: value for key, value in self.validated_data.items() if key != 'date'}
+
+class ReportBatchParameterSerializer(DateParameterSerializer):
+    """Valida la fecha y la lista de reportes del endpoint batch."""
+
+    reports = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(ReportBatchService.REPORTS)),
+        allow_empty=False,
+    )
+
+    def to_internal_value(self, data):
+        # En la query string los reportes llegan separados por comas
+        if isinstance(data.get("reports"), str):
+            data = {**data, "reports": [name.strip() for name in data["reports"].split(",") if name.strip()]}
+        return super().to_internal_value(data)
+
+    def validate_reports(self, value):
+        return list(dict.fromkeys(value))
+
+
+class OutputFormatSerializer(serializers.Serializer):
+    """Formato de salida de los reportes JSON: json (por defecto), csv o ndjson en streaming."""
+
+    format = serializers.ChoiceField(choices=["json", "csv", "ndjson"], required=False, default="json")
+
+
 class TherapistAppointmentSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     name = serializers.CharField()  # 👈 SIN source, leerá 'name' del dict
@@ -95,7 +142,8 @@ class PDFContextSerializer(serializers.Serializer):
     """Serializa contexto para templates PDF."""
     
     date = serializers.CharField()
-    data = serializers.DictField(required=False)
+    # Los reportes retornan dicts o listas según el caso
+    data = serializers.JSONField(required=False)
     title = serializers.CharField()
     total = serializers.FloatField(required=False)
 
@@ -176,4 +224,91 @@ class DailyPaidTicketsSerializer(serializers.Serializer):
     resumen_por_metodo = TicketMethodSummarySerializer(many=True)
     total_general = serializers.FloatField()
     cantidad_tickets = serializers.IntegerField()
-    metodos_pago_utilizados = serializers.ListField(child=serializers.CharField())
\ No newline at end of file
+    metodos_pago_utilizados = serializers.ListField(child=serializers.CharField())
+
+
+# Reportes de caja por rango de fechas
+
+class DailyPaymentSummarySerializer(serializers.Serializer):
+    """Serializa los totales de un día por método de pago."""
+
+    fecha = serializers.CharField()
+    resumen_por_metodo = PaymentMethodSummarySerializer(many=True)
+    total = serializers.FloatField()
+    cantidad_pagos = serializers.IntegerField()
+
+
+class PaymentDetailPageSerializer(serializers.Serializer):
+    """Serializa una página del detalle de pagos."""
+
+    page = serializers.IntegerField()
+    page_size = serializers.IntegerField()
+    count = serializers.IntegerField()
+    results = PaymentDetailSerializer(many=True)
+
+
+class ImprovedCashRangeSerializer(serializers.Serializer):
+    """Serializa la caja chica entre fechas."""
+
+    fecha_inicio = serializers.CharField()
+    fecha_fin = serializers.CharField()
+    resumen_por_dia = DailyPaymentSummarySerializer(many=True)
+    resumen_por_metodo = PaymentMethodSummarySerializer(many=True)
+    total_general = serializers.FloatField()
+    cantidad_total_pagos = serializers.IntegerField()
+    pagos_detallados = PaymentDetailPageSerializer(required=False)
+
+
+class DailyTicketSummarySerializer(serializers.Serializer):
+    """Serializa los totales de tickets de un día por método de pago."""
+
+    fecha = serializers.CharField()
+    resumen_por_metodo = TicketMethodSummarySerializer(many=True)
+    total = serializers.FloatField()
+    cantidad_tickets = serializers.IntegerField()
+
+
+class TicketDetailPageSerializer(serializers.Serializer):
+    """Serializa una página del detalle de tickets pagados."""
+
+    page = serializers.IntegerField()
+    page_size = serializers.IntegerField()
+    count = serializers.IntegerField()
+    results = TicketDetailSerializer(many=True)
+
+
+class PaidTicketsRangeSerializer(serializers.Serializer):
+    """Serializa los tickets pagados entre fechas."""
+
+    fecha_inicio = serializers.CharField()
+    fecha_fin = serializers.CharField()
+    resumen_por_dia = DailyTicketSummarySerializer(many=True)
+    resumen_por_metodo = TicketMethodSummarySerializer(many=True)
+    total_general = serializers.FloatField()
+    cantidad_tickets = serializers.IntegerField()
+    metodos_pago_utilizados = serializers.ListField(child=serializers.CharField())
+    tickets_pagados = TicketDetailPageSerializer(required=False)
+
+
+class RoomOccupancySummarySerializer(serializers.Serializer):
+    """Serializa los totales de ocupación de un consultorio."""
+
+    room = serializers.IntegerField()
+    appointments = serializers.IntegerField()
+    occupied_minutes = serializers.IntegerField()
+    occupancy_rate = serializers.FloatField()
+
+
+class RoomOccupancySerializer(serializers.Serializer):
+    """Serializa el mapa de ocupación [día de la semana][hora][consultorio]."""
+
+    start_date = serializers.CharField()
+    end_date = serializers.CharField()
+    weekdays = serializers.ListField(child=serializers.CharField())
+    hours = serializers.ListField(child=serializers.IntegerField())
+    rooms = serializers.ListField(child=serializers.IntegerField())
+    occupied_minutes = serializers.JSONField()
+    occupancy_rate = serializers.JSONField()
+    appointments = serializers.JSONField()
+    rooms_summary = RoomOccupancySummarySerializer(many=True)
+    total_appointments = serializers.IntegerField()
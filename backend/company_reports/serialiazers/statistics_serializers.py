@@ -34,4 +34,59 @@ class StatisticsResource(serializers.Serializer):
         child=serializers.IntegerField(), 
         required=False
     )
-    tipos_pacientes = TiposPacientesSerializer(required=False)
\ No newline at end of file
+    tipos_pacientes = TiposPacientesSerializer(required=False)
+
+class RendimientoPeriodoSerializer(serializers.Serializer):
+    sesiones = serializers.IntegerField()
+    ingresos = serializers.FloatField()
+    pacientes_unicos = serializers.IntegerField()
+    raiting = serializers.FloatField()
+    ranking = serializers.IntegerField()
+    ranking_sesiones = serializers.IntegerField()
+    ranking_ingresos = serializers.IntegerField()
+
+class VariacionRendimientoSerializer(serializers.Serializer):
+    # Porcentajes respecto del período anterior (null si allí era 0)
+    sesiones = serializers.FloatField(allow_null=True)
+    ingresos = serializers.FloatField(allow_null=True)
+    pacientes_unicos = serializers.FloatField(allow_null=True)
+    # Diferencia absoluta de raiting y posiciones ganadas en el ranking
+    raiting = serializers.FloatField()
+    ranking = serializers.IntegerField()
+
+class RendimientoTerapeutaSerializer(serializers.Serializer):
+    id = serializers.IntegerField(allow_null=True)
+    terapeuta = serializers.CharField()
+    actual = RendimientoPeriodoSerializer(allow_null=True)
+    anterior = RendimientoPeriodoSerializer(allow_null=True)
+    variacion = VariacionRendimientoSerializer(allow_null=True)
+
+class PeriodoSerializer(serializers.Serializer):
+    inicio = serializers.DateField()
+    fin = serializers.DateField()
+
+class RendimientoComparativoResource(serializers.Serializer):
+    periodo_actual = PeriodoSerializer()
+    periodo_anterior = PeriodoSerializer()
+    terapeutas = RendimientoTerapeutaSerializer(many=True)
+
+
+class RetencionMesSerializer(serializers.Serializer):
+    month_offset = serializers.IntegerField()
+    month = serializers.CharField()
+    active = serializers.IntegerField()
+    rate = serializers.FloatField()
+
+class CohorteSerializer(serializers.Serializer):
+    cohort = serializers.CharField()
+    patients = serializers.IntegerField()
+    returned = serializers.IntegerField()
+    return_rate = serializers.FloatField()
+    avg_days_to_return = serializers.FloatField(allow_null=True)
+    retention = RetencionMesSerializer(many=True)
+
+class CohortesResource(serializers.Serializer):
+    start_month = serializers.CharField()
+    end_month = serializers.CharField()
+    months = serializers.ListField(child=serializers.CharField())
+    cohorts = CohorteSerializer(many=True)
@@ -0,0 +1,196 @@
+import itertools
+from datetime import date
+import numpy as np
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+from appointments_status.models.appointment import Appointment
+from company_reports.services.date_ranges import month_days, range_bounds
+from company_reports.services.report_cache import ReportCache
+
+# Inicio de la historia para la versión de datos de cada mes (la cohorte depende de toda la historia previa)
+HISTORY_START = date(2000, 1, 1)
+FETCH_CHUNK_SIZE = 20000
+
+
+def month_index(day):
+    """Mes como entero consecutivo (año * 12 + mes - 1)."""
+    return day.year * 12 + day.month - 1
+
+
+def month_label(index):
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_first_day(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class PatientCohortService:
+    """
+    Retención de pacientes por cohorte: cada paciente pertenece al mes de su
+    primera cita y, para cada mes siguiente, se cuenta cuántos de la cohorte
+    volvieron a atenderse.
+
+    - La base es un par de arreglos NumPy de enteros (paciente, día), uno por
+      día distinto con cita no cancelada hasta el último mes pedido; se leen en
+      una sola consulta sin materializar modelos.
+    - Se ordena por (paciente, día) con `np.lexsort` y todo lo demás sale de
+      comparar cada fila con la anterior (inicio de paciente, primer regreso,
+      primer día en cada mes) y de `np.bincount`: no hay bucles por paciente.
+    - Cada mes de actividad cerrado se guarda en la caché de reportes con la
+      versión de datos de toda la historia hasta su último día: al pedir de
+      nuevo un rango solo se recalculan el mes en curso y los meses cuyos datos
+      cambiaron. Si falta algún mes, los arreglos se cargan una vez para todos.
+    """
+
+    REPORT = "patient_cohorts"
+
+    def __init__(self):
+        ReportCache.reports.add(self.REPORT)
+
+    def get_cohorts(self, start_month, end_month):
+        """
+        Cohortes de `start_month` a `end_month` (fechas de cualquier día del mes).
+        Para cada una: pacientes nuevos, pacientes activos y tasa de retención en
+        cada mes posterior hasta `end_month`, cuántos regresaron al menos una vez
+        y el promedio de días hasta su primer regreso.
+        """
+        first, last = month_index(start_month), month_index(end_month)
+        analysis = {}
+
+        def load():
+            # Los arreglos se cargan una sola vez aunque falten varios meses en la caché
+            if not analysis:
+                analysis.update(self.analyze(*self.load_arrays(month_days(end_month)[1]), last))
+            return analysis
+
+        month_ends = {index: month_days(month_first_day(index))[1] for index in range(first, last + 1)}
+        # Versiones de toda la historia hasta el fin de cada mes en una sola consulta
+        versions = ReportCache.range_versions(HISTORY_START, month_ends.values())
+        columns = {}
+        for index, month_end in month_ends.items():
+            columns[index] = ReportCache.get_or_compute(
+                self.REPORT, month_label(index), HISTORY_START, month_end,
+                lambda index=index: self._month_column(load(), index),
+                version=versions[month_end],
+            )
+
+        cohorts = []
+        for cohort in range(first, last + 1):
+            patients = columns[cohort].get(month_label(cohort), {}).get("active", 0)
+            retention = []
+            returned = days_to_return = 0
+            for index in range(cohort, last + 1):
+                cell = columns[index].get(month_label(cohort), {})
+                # El primer regreso puede ocurrir en el mismo mes de la primera cita
+                returned += cell.get("first_returns", 0)
+                days_to_return += cell.get("days_to_return", 0)
+                if index == cohort:
+                    continue
+                active = cell.get("active", 0)
+                retention.append({
+                    "month_offset": index - cohort,
+                    "month": month_label(index),
+                    "active": active,
+                    "rate": round(active / patients * 100, 2) if patients else 0.0,
+                })
+            cohorts.append({
+                "cohort": month_label(cohort),
+                "patients": patients,
+                "returned": returned,
+                "return_rate": round(returned / patients * 100, 2) if patients else 0.0,
+                "avg_days_to_return": round(days_to_return / returned, 1) if returned else None,
+                "retention": retention,
+            })
+
+        return {
+            "start_month": month_label(first),
+            "end_month": month_label(last),
+            "months": [month_label(index) for index in range(first, last + 1)],
+            "cohorts": cohorts,
+        }
+
+    @staticmethod
+    def load_arrays(end_day):
+        """
+        Arreglos paralelos (paciente, día como entero desde 1970-01-01) de cada
+        día distinto con citas no canceladas hasta `end_day` inclusive.
+        """
+        rows = (
+            Appointment.objects
+            .filter(appointment_date__lt=range_bounds(end_day, end_day)[1], patient__isnull=False)
+            .exclude(appointment_status="CANCELADO")
+            .annotate(
+                year=ExtractYear("appointment_date"),
+                month=ExtractMonth("appointment_date"),
+                day=ExtractDay("appointment_date"),
+            )
+            .order_by()
+            .values_list("patient_id", "year", "month", "day")
+            .distinct()
+        )
+        flat = np.fromiter(
+            itertools.chain.from_iterable(rows.iterator(chunk_size=FETCH_CHUNK_SIZE)), dtype=np.int64
+        ).reshape(-1, 4)
+
+        months = ((flat[:, 1] - 1970) * 12 + flat[:, 2] - 1).astype("datetime64[M]")
+        days = months.astype("datetime64[D]") + (flat[:, 3] - 1)
+        return flat[:, 0], days.astype(np.int64)
+
+    @staticmethod
+    def analyze(patient, day, last):
+        """
+        Matrices [cohorte][mes de actividad] (meses relativos al primero con datos)
+        de pacientes activos, primeros regresos y días hasta el primer regreso.
+        """
+        if patient.size == 0:
+            return {"base": last, "active": np.zeros((1, 1), dtype=np.int64),
+                    "first_returns": np.zeros((1, 1), dtype=np.int64), "days_to_return": np.zeros((1, 1), dtype=np.int64)}
+
+        order = np.lexsort((day, patient))
+        patient, day = patient[order], day[order]
+        month = day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+        new_patient = np.empty(patient.size, dtype=bool)
+        new_patient[0] = True
+        np.not_equal(patient[1:], patient[:-1], out=new_patient[1:])
+        group = np.cumsum(new_patient) - 1
+        first_day = day[new_patient][group]
+        cohort = month[new_patient][group]
+
+        # Primer regreso: la fila siguiente a la primera de cada paciente (los días ya son distintos)
+        first_return = np.zeros(patient.size, dtype=bool)
+        first_return[1:] = new_patient[:-1] & ~new_patient[1:]
+        # Paciente activo en un mes: su primera fila de ese mes
+        new_month = new_patient.copy()
+        new_month[1:] |= month[1:] != month[:-1]
+
+        base = int(month.min())
+        size = last - base + 1
+        cell = (cohort - base) * size + (month - base)
+
+        def matrix(mask, weights=None):
+            counts = np.bincount(cell[mask], weights=None if weights is None else weights[mask], minlength=size * size)
+            return counts.astype(np.int64).reshape(size, size)
+
+        return {
+            "base": base,
+            "active": matrix(new_month),
+            "first_returns": matrix(first_return),
+            "days_to_return": matrix(first_return, day - first_day),
+        }
+
+    @staticmethod
+    def _month_column(analysis, index):
+        """{cohorte: {active, first_returns, days_to_return}} de un mes de actividad (lo que se cachea)."""
+        base = analysis["base"]
+        position = index - base
+        if position < 0 or position >= analysis["active"].shape[1]:
+            return {}
+        column = {}
+        for row in np.flatnonzero(analysis["active"][:, position]):
+            column[month_label(base + int(row))] = {
+                "active": int(analysis["active"][row, position]),
+                "first_returns": int(analysis["first_returns"][row, position]),
+                "days_to_return": int(analysis["days_to_return"][row, position]),
+            }
+        return column
@@ -0,0 +1,89 @@
+from datetime import date, datetime, time, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def _start_of(day):
+    """Medianoche del día indicado en la zona horaria configurada."""
+    moment = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(moment, timezone.get_current_timezone())
+    return moment
+
+
+def day_bounds(day):
+    """Devuelve el intervalo semiabierto [inicio, fin) que cubre un día completo."""
+    return _start_of(day), _start_of(day + timedelta(days=1))
+
+
+def range_bounds(start_day, end_day):
+    """Devuelve el intervalo semiabierto [inicio, fin) que cubre ambos días inclusive."""
+    return _start_of(start_day), _start_of(end_day + timedelta(days=1))
+
+
+def day_filter(field, day):
+    """
+    Filtro de un día sobre un DateTimeField como rango semiabierto [inicio, fin).
+    A diferencia de `__date` o TruncDate no envuelve la columna en una función,
+    así que la base de datos puede usar los índices que empiezan por ese campo.
+    """
+    start, end = day_bounds(day)
+    return Q(**{f"{field}__gte": start, f"{field}__lt": end})
+
+
+def range_filter(field, start_day, end_day):
+    """Filtro entre dos días (ambos inclusive) sobre un DateTimeField, ver day_filter."""
+    start, end = range_bounds(start_day, end_day)
+    return Q(**{f"{field}__gte": start, f"{field}__lt": end})
+
+
+def previous_period(start_day, end_day):
+    """Período de la misma cantidad de días que termina justo antes de `start_day`."""
+    previous_end = start_day - timedelta(days=1)
+    return previous_end - (end_day - start_day), previous_end
+
+
+def month_days(day):
+    """Primer y último día del mes de `day`."""
+    first = day.replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+def iter_days(start_day, end_day):
+    """Itera los días entre dos fechas (ambas inclusive)."""
+    day = start_day
+    while day <= end_day:
+        yield day
+        day += timedelta(days=1)
+
+
+def iter_day_chunks(start_day, end_day, days):
+    """Itera bloques (inicio, fin) de hasta `days` días que cubren ambas fechas inclusive."""
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=days - 1), end_day)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+def local_day(value):
+    """
+    Convierte el valor de un DateTimeField (datetime, date o string)
+    al día local correspondiente. Retorna None si no se puede interpretar.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+        if value is None:
+            return None
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
@@ -0,0 +1,225 @@
+"""
+Archivos de exportación (PDF y Excel) ya generados, guardados en disco para
+reutilizarlos en lugar de volver a renderizarlos.
+
+Claves
+    MEDIA_ROOT/<REPORTS_ARTIFACTS_DIR>/<reporte>/<hash>/<archivo>
+
+    El hash combina los parámetros de la query string y la versión de datos de
+    los días del rango (ReportCache.range_version). Igual que la caché de
+    reportes, solo se guardan rangos de días cerrados: al cambiar una cita o un
+    ticket de esos días la versión cambia y el archivo anterior deja de usarse.
+
+Entrega
+    Con REPORTS_ARTIFACTS_ACCEL_REDIRECT la respuesta lleva solo los headers y
+    `X-Accel-Redirect`; nginx (location interna /protected-media/ en
+    nginx/default.prod.conf) envía el archivo sin pasar los bytes por gunicorn.
+    Sin nginx (desarrollo) se entrega con FileResponse.
+
+Desalojo
+    ExportArtifactStore.evict() borra los archivos sin uso en más de
+    REPORTS_ARTIFACTS_MAX_AGE segundos y, si el total supera
+    REPORTS_ARTIFACTS_MAX_BYTES, los usados hace más tiempo. Cada acierto
+    actualiza la fecha de uso. Se ejecuta con el comando evict_report_artifacts
+    o la tarea periódica company_reports.tasks.evict_report_artifacts.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from company_reports.services.report_cache import ReportCache
+
+META_FILENAME = "meta.json"
+TMP_PREFIX = ".tmp-"
+# Directorios temporales de escrituras interrumpidas que se pueden borrar
+TMP_MAX_AGE = 3600
+_FILENAME = re.compile(r'filename="?([^";]+)"?')
+
+
+def protected_file_response(path, content_type, content_disposition):
+    """
+    Respuesta para un archivo bajo MEDIA_ROOT: X-Accel-Redirect si nginx lo
+    entrega, FileResponse en caso contrario.
+    """
+    if getattr(settings, "REPORTS_ARTIFACTS_ACCEL_REDIRECT", False):
+        relative = Path(path).relative_to(settings.MEDIA_ROOT).as_posix()
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = getattr(settings, "REPORTS_ARTIFACTS_ACCEL_PREFIX", "/protected-media/") + quote(relative)
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    response["Content-Disposition"] = content_disposition
+    return response
+
+
+class ExportArtifactStore:
+    """Archivos de exportación en disco por reporte, parámetros y versión de datos."""
+
+    @staticmethod
+    def root():
+        return Path(settings.MEDIA_ROOT) / getattr(settings, "REPORTS_ARTIFACTS_DIR", "reports/artifacts")
+
+    @staticmethod
+    def key(params, start, end):
+        payload = json.dumps([sorted(params.lists()), ReportCache.range_version(start, end)])
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def lookup(self, report, key):
+        """Retorna el artefacto guardado ({path, content_type, content_disposition}) o None."""
+        directory = self.root() / report / key
+        try:
+            with open(directory / META_FILENAME, encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            path = directory / meta["filename"]
+            if not path.is_file():
+                return None
+            # La fecha de uso es el mtime de meta.json (desalojo por uso menos reciente)
+            os.utime(directory / META_FILENAME)
+        except (OSError, ValueError, KeyError):
+            return None
+        return {"path": path, "content_type": meta["content_type"], "content_disposition": meta["content_disposition"]}
+
+    def save(self, report, key, response):
+        """
+        Guarda el contenido de `response` (normal o en streaming) y la cierra.
+        Se escribe en un directorio temporal que luego se renombra: un lector
+        nunca ve un archivo a medio escribir y, si dos peticiones generan el
+        mismo artefacto a la vez, se conserva el primero.
+        """
+        content_disposition = response.get("Content-Disposition", "")
+        match = _FILENAME.search(content_disposition)
+        filename = os.path.basename(match.group(1)) if match else report
+        meta = {
+            "filename": filename,
+            "content_type": response.get("Content-Type", "application/octet-stream"),
+            "content_disposition": content_disposition,
+        }
+
+        report_dir = self.root() / report
+        report_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = report_dir / f"{TMP_PREFIX}{uuid.uuid4().hex}"
+        tmp_dir.mkdir()
+        try:
+            with open(tmp_dir / filename, "wb") as output:
+                if response.streaming:
+                    for chunk in response.streaming_content:
+                        output.write(chunk)
+                else:
+                    output.write(response.content)
+            with open(tmp_dir / META_FILENAME, "w", encoding="utf-8") as meta_file:
+                json.dump(meta, meta_file)
+            try:
+                os.rename(tmp_dir, report_dir / key)
+            except OSError:
+                # Otra petición guardó el mismo artefacto primero
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        finally:
+            response.close()
+        return self.lookup(report, key)
+
+    def evict(self, max_age=None, max_bytes=None):
+        """
+        Borra artefactos sin uso en más de `max_age` segundos y luego los menos
+        usados hasta que el total quede bajo `max_bytes`.
+        Retorna {"removed", "freed_bytes", "kept", "total_bytes"}.
+        """
+        if max_age is None:
+            max_age = getattr(settings, "REPORTS_ARTIFACTS_MAX_AGE", 7 * 86400)
+        if max_bytes is None:
+            max_bytes = getattr(settings, "REPORTS_ARTIFACTS_MAX_BYTES", 2 * 1024 ** 3)
+
+        now = time.time()
+        entries = []
+        removed = freed = 0
+        root = self.root()
+        for directory in root.glob("*/*") if root.is_dir() else ():
+            if not directory.is_dir():
+                continue
+            size, last_used = self._usage(directory)
+            temporary = directory.name.startswith(TMP_PREFIX)
+            if (temporary and now - last_used > TMP_MAX_AGE) or (not temporary and now - last_used > max_age):
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+                freed += size
+            elif not temporary:
+                entries.append((last_used, size, directory))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        while entries and total > max_bytes:
+            _, size, directory = entries.pop(0)
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+            freed += size
+            total -= size
+
+        return {"removed": removed, "freed_bytes": freed, "kept": len(entries), "total_bytes": total}
+
+    @staticmethod
+    def _usage(directory):
+        """(bytes, fecha de último uso) de un artefacto; sin meta.json vale la fecha del directorio."""
+        size = 0
+        last_used = directory.stat().st_mtime
+        for path in directory.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            size += stat.st_size
+            if path.name == META_FILENAME:
+                last_used = stat.st_mtime
+        return size, last_used
+
+
+def export_artifact(report, resolve_range):
+    """
+    Decorador para vistas de exportación (GET). `resolve_range` recibe la query
+    string y retorna (inicio, fin) o None si los parámetros no son válidos
+    (la vista responde el error normalmente).
+    Solo se guardan respuestas 200 de rangos de días cerrados.
+    """
+    counter = f"artifact:{report}"
+
+    def decorator(view):
+        ReportCache.reports.add(counter)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or not getattr(settings, "REPORTS_ARTIFACTS_ENABLED", True):
+                return view(request, *args, **kwargs)
+
+            day_range = resolve_range(request.GET)
+            if day_range is None or not ReportCache.is_closed_range(*day_range):
+                ReportCache._count(counter, "bypass")
+                return view(request, *args, **kwargs)
+
+            # La versión se lee ANTES de generar: si los datos cambian mientras
+            # tanto, el archivo queda bajo la versión anterior y no se reutiliza.
+            store = ExportArtifactStore()
+            key = store.key(request.GET, *day_range)
+            artifact = store.lookup(report, key)
+            if artifact is not None:
+                ReportCache._count(counter, "hits")
+            else:
+                ReportCache._count(counter, "misses")
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                artifact = store.save(report, key, response)
+                if artifact is None:
+                    # No se pudo leer lo guardado (p. ej. desalojado en el intento): se genera de nuevo
+                    return view(request, *args, **kwargs)
+
+            return protected_file_response(artifact["path"], artifact["content_type"], artifact["content_disposition"])
+        return wrapper
+    return decorator
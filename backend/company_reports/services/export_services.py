@@ -0,0 +1,396 @@
+import heapq
+import tempfile
+from operator import itemgetter
+import xlsxwriter
+from appointments_status.models.appointment import Appointment
+from appointments_status.models.ticket import Ticket
+from architect.query_markers import iterate_expected
+from company_reports.services.date_ranges import iter_day_chunks, iter_days, local_day, month_days, range_filter
+from company_reports.services.reports_services import PAID_TICKET_FIELDS, ReportService
+
+
+class AppointmentExcelExportService:
+    """
+    Exportación a Excel de citas entre fechas con memoria constante.
+
+    - Las citas se leen por bloques de días con `.values().iterator()`: en MySQL
+      `iterator()` no usa cursores de servidor, así que cada bloque acota lo que
+      el driver carga en memoria.
+    - xlsxwriter en modo `constant_memory` escribe cada fila a disco al avanzar.
+    - El libro se genera en un archivo temporal que la vista entrega con FileResponse.
+    """
+
+    CHUNK_DAYS = 7
+    ITERATOR_CHUNK_SIZE = 2000
+
+    HEADERS = ["ID Paciente", "DNI/Documento", "Paciente", "Teléfono", "Fecha", "Hora"]
+    COLUMN_WIDTHS = [12, 15, 40, 15, 12, 10]
+
+    def export_appointments_between_dates(self, start_date, end_date):
+        """
+        Genera el Excel de citas entre dos fechas (mismas filas que
+        ReportService.get_appointments_between_dates) y retorna el archivo temporal
+        posicionado al inicio. El llamador es responsable de cerrarlo.
+        """
+        output = tempfile.TemporaryFile(suffix=".xlsx")
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        worksheet = workbook.add_worksheet("Citas")
+
+        header_format = workbook.add_format(
+            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
+        )
+        # En modo constant_memory los anchos deben fijarse antes de escribir filas
+        for col, width in enumerate(self.COLUMN_WIDTHS):
+            worksheet.set_column(col, col, width)
+        for col, header in enumerate(self.HEADERS):
+            worksheet.write(0, col, header, header_format)
+
+        try:
+            for row, appointment in enumerate(self.iter_appointment_rows(start_date, end_date), start=1):
+                worksheet.write_row(row, 0, appointment)
+        except BaseException:
+            # p. ej. QueryBudgetExceeded a mitad de la lectura: no dejar el temporal abierto
+            output.close()
+            raise
+
+        workbook.close()
+        output.seek(0)
+        return output
+
+    def iter_appointment_rows(self, start_date, end_date):
+        """Itera las filas del reporte en orden de fecha y hora, por bloques de días."""
+        queryset = (
+            Appointment.objects
+            .filter(patient__isnull=False)
+            .values(
+                "patient_id",
+                "patient__document_number",
+                "patient__paternal_lastname",
+                "patient__maternal_lastname",
+                "patient__name",
+                "patient__phone1",
+                "appointment_date",
+                "hour",
+            )
+            .order_by("appointment_date", "hour", "id")
+        )
+
+        for chunk_start, chunk_end in iter_day_chunks(start_date, end_date, self.CHUNK_DAYS):
+            chunk = queryset.filter(range_filter("appointment_date", chunk_start, chunk_end))
+            # La misma consulta por bloque: no es un N+1
+            for row in iterate_expected(chunk, self.ITERATOR_CHUNK_SIZE):
+                yield self._to_row(row)
+
+    @staticmethod
+    def _to_row(row):
+        patient_name = " ".join(filter(None, [
+            row["patient__paternal_lastname"],
+            row["patient__maternal_lastname"],
+            row["patient__name"],
+        ]))
+        hour = row["hour"]
+        return [
+            row["patient_id"],
+            row["patient__document_number"] or "",
+            patient_name,
+            row["patient__phone1"] or "",
+            row["appointment_date"].strftime("%Y-%m-%d"),
+            hour.strftime("%H:%M") if hour else "",
+        ]
+
+
+class DailyCashExcelExportService:
+    """Exportación a Excel de los reportes diarios de caja (caja chica y tickets pagados)."""
+
+    # (encabezados, anchos, (campo, valor por defecto)) de cada reporte
+    IMPROVED_CASH_COLUMNS = (
+        ["Tipo", "ID", "Número Ticket", "Monto", "Método Pago", "Paciente", "Terapeuta", "Fecha Pago"],
+        [10, 8, 20, 12, 15, 30, 30, 12],
+        [
+            ("tipo", ""), ("id", ""), ("ticket_number", ""), ("monto", 0),
+            ("metodo_pago", ""), ("paciente", ""), ("terapeuta", ""), ("fecha_pago", ""),
+        ],
+    )
+    PAID_TICKETS_COLUMNS = (
+        [
+            "Número Ticket", "Monto", "Método Pago", "Fecha Pago", "Paciente", "Documento",
+            "Teléfono", "Terapeuta", "Licencia", "Fecha Cita", "Hora Cita", "Consultorio",
+        ],
+        [20, 12, 15, 18, 30, 15, 15, 30, 15, 12, 10, 12],
+        [
+            ("numero_ticket", ""), ("monto", 0), ("metodo_pago", ""), ("fecha_pago", ""),
+            ("paciente_nombre", ""), ("paciente_documento", ""), ("paciente_telefono", ""),
+            ("terapeuta_nombre", ""), ("terapeuta_licencia", ""), ("fecha_cita", ""),
+            ("hora_cita", ""), ("consultorio", ""),
+        ],
+    )
+
+    def export_improved_daily_cash(self, data):
+        """Genera el Excel del reporte mejorado de caja chica y retorna el archivo temporal."""
+        summary = [("Total General:", 3, data.get("total_general", 0))]
+        return self._export("Caja Chica", *self.IMPROVED_CASH_COLUMNS, data.get("pagos_detallados", []), summary)
+
+    def export_daily_paid_tickets(self, data):
+        """Genera el Excel del reporte diario de tickets pagados y retorna el archivo temporal."""
+        summary = [
+            ("Total General:", 1, data.get("total_general", 0)),
+            ("Cantidad Tickets:", 1, data.get("cantidad_tickets", 0)),
+        ]
+        return self._export("Tickets Pagados", *self.PAID_TICKETS_COLUMNS, data.get("tickets_pagados", []), summary)
+
+    @staticmethod
+    def _export(sheet_name, headers, widths, fields, rows, summary):
+        output = tempfile.TemporaryFile(suffix=".xlsx")
+        workbook = xlsxwriter.Workbook(output)
+        worksheet = workbook.add_worksheet(sheet_name)
+
+        header_format = workbook.add_format(
+            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
+        )
+        for col, header in enumerate(headers):
+            worksheet.write(0, col, header, header_format)
+
+        for row, item in enumerate(rows, start=1):
+            for col, (field, default) in enumerate(fields):
+                worksheet.write(row, col, item.get(field, default))
+
+        for col, width in enumerate(widths):
+            worksheet.set_column(col, col, width)
+
+        # Resumen al pie, dejando dos filas en blanco
+        worksheet.write(len(rows) + 3, 0, "RESUMEN:", header_format)
+        for offset, (label, col, value) in enumerate(summary, start=4):
+            worksheet.write(len(rows) + offset, 0, label)
+            worksheet.write(len(rows) + offset, col, value)
+
+        workbook.close()
+        output.seek(0)
+        return output
+
+
+class RoomOccupancyExcelExportService:
+    """Exportación a Excel del mapa de calor de ocupación de consultorios."""
+
+    def export_room_occupancy(self, data):
+        """
+        Genera el Excel de RoomOccupancyService.get_room_occupancy y retorna el
+        archivo temporal: una hoja de resumen y un bloque hora × día de la semana
+        por consultorio con escala de colores.
+        """
+        output = tempfile.TemporaryFile(suffix=".xlsx")
+        workbook = xlsxwriter.Workbook(output)
+        header_format = workbook.add_format(
+            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
+        )
+        title_format = workbook.add_format({"bold": True, "font_size": 12})
+        percent_format = workbook.add_format({"num_format": "0.0%", "border": 1})
+
+        summary = workbook.add_worksheet("Resumen")
+        summary.write(0, 0, f"Ocupación de consultorios del {data['start_date']} al {data['end_date']}", title_format)
+        headers = ["Consultorio", "Citas", "Minutos Ocupados", "Ocupación"]
+        for col, header in enumerate(headers):
+            summary.write(2, col, header, header_format)
+        for row, item in enumerate(data["rooms_summary"], start=3):
+            summary.write(row, 0, item["room"])
+            summary.write(row, 1, item["appointments"])
+            summary.write(row, 2, item["occupied_minutes"])
+            summary.write(row, 3, item["occupancy_rate"], percent_format)
+        summary.set_column(0, 3, 18)
+
+        worksheet = workbook.add_worksheet("Ocupación")
+        worksheet.set_column(0, 0, 10)
+        worksheet.set_column(1, len(data["weekdays"]), 12)
+        top = 0
+        for room_index, room in enumerate(data["rooms"]):
+            worksheet.write(top, 0, f"Consultorio {room}", title_format)
+            worksheet.write(top + 1, 0, "Hora", header_format)
+            for col, weekday in enumerate(data["weekdays"], start=1):
+                worksheet.write(top + 1, col, weekday, header_format)
+            for hour in data["hours"]:
+                row = top + 2 + hour
+                worksheet.write(row, 0, f"{hour:02d}:00")
+                for col, weekday_rates in enumerate(data["occupancy_rate"], start=1):
+                    worksheet.write(row, col, weekday_rates[hour][room_index], percent_format)
+            last_row = top + 1 + len(data["hours"])
+            worksheet.conditional_format(top + 2, 1, last_row, len(data["weekdays"]), {
+                "type": "3_color_scale",
+                "min_type": "num", "min_value": 0, "min_color": "#FFFFFF",
+                "mid_type": "num", "mid_value": 0.5, "mid_color": "#F9D976",
+                "max_type": "num", "max_value": 1, "max_color": "#E74C3C",
+            })
+            top = last_row + 2
+
+        workbook.close()
+        output.seek(0)
+        return output
+
+
+class MonthCloseExcelExportService:
+    """
+    Cierre de mes en un solo libro: citas, caja chica mejorada y tickets
+    pagados del mes (mismas columnas que sus exportaciones diarias), un resumen
+    por día y los totales por método de pago.
+
+    - Una sola lectura por tabla de origen: las citas del mes alimentan la hoja
+      de citas y los pagos de citas de la caja; los tickets pagados, la hoja de
+      tickets y los pagos de tickets de la caja. No se ejecuta cada reporte
+      diario una vez por día (~4 consultas por día del mes).
+    - Las lecturas van por bloques de días como AppointmentExcelExportService,
+      en orden de fecha, y se intercalan por día con `heapq.merge` para la hoja
+      de caja; los resúmenes se acumulan al pasar y se escriben al final.
+    - xlsxwriter en modo `constant_memory` escribe cada fila a disco al avanzar.
+    """
+
+    CHUNK_DAYS = 7
+    ITERATOR_CHUNK_SIZE = 2000
+
+    APPOINTMENT_FIELDS = (
+        "id",
+        "patient_id",
+        "patient__document_number",
+        "patient__paternal_lastname",
+        "patient__maternal_lastname",
+        "patient__name",
+        "patient__phone1",
+        "appointment_date",
+        "hour",
+        "payment",
+        "payment_type__name",
+        "ticket_number",
+        "therapist__first_name",
+        "therapist__last_name_paternal",
+        "therapist__last_name_maternal",
+    )
+    DAY_HEADERS = ["Fecha", "Citas", "Pagos Caja", "Total Caja", "Tickets Pagados", "Total Tickets"]
+    METHOD_HEADERS = ["Método Pago", "Pagos Caja", "Total Caja", "Tickets Pagados", "Total Tickets"]
+
+    @staticmethod
+    def filename(day):
+        return f"cierre_mes_{month_days(day)[0].strftime('%Y-%m')}.xlsx"
+
+    def export_month_close(self, day):
+        """Genera el libro del mes de `day` y retorna el archivo temporal posicionado al inicio."""
+        first, last = month_days(day)
+        output = tempfile.TemporaryFile(suffix=".xlsx")
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        header_format = workbook.add_format(
+            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
+        )
+        total_format = workbook.add_format({"bold": True, "top": 1})
+
+        # Las hojas de resumen van primero en el libro aunque se escriban al final
+        days_sheet = self._sheet(workbook, "Resumen diario", self.DAY_HEADERS, [12] + [15] * 5, header_format)
+        methods_sheet = self._sheet(workbook, "Totales por método", self.METHOD_HEADERS, [20] + [15] * 4, header_format)
+        appointments_sheet = self._sheet(
+            workbook, "Citas",
+            AppointmentExcelExportService.HEADERS, AppointmentExcelExportService.COLUMN_WIDTHS, header_format,
+        )
+        cash_headers, cash_widths, cash_fields = DailyCashExcelExportService.IMPROVED_CASH_COLUMNS
+        cash_sheet = self._sheet(workbook, "Caja chica", cash_headers, cash_widths, header_format)
+        ticket_headers, ticket_widths, ticket_fields = DailyCashExcelExportService.PAID_TICKETS_COLUMNS
+        tickets_sheet = self._sheet(workbook, "Tickets pagados", ticket_headers, ticket_widths, header_format)
+
+        days = {current: [0, 0, 0.0, 0, 0.0] for current in iter_days(first, last)}
+        methods = {}
+
+        try:
+            cash_rows = heapq.merge(
+                self._appointment_cash(first, last, appointments_sheet, days),
+                self._ticket_cash(first, last, tickets_sheet, ticket_fields, days, methods),
+                key=itemgetter(0),
+            )
+            cash_row = 0
+            for payment_day, item in cash_rows:
+                cash_row += 1
+                cash_sheet.write_row(cash_row, 0, [item.get(field, default) for field, default in cash_fields])
+                days[payment_day][1] += 1
+                days[payment_day][2] += item["monto"]
+                method = methods.setdefault(item["metodo_pago"], [0, 0.0, 0, 0.0])
+                method[0] += 1
+                method[1] += item["monto"]
+        except BaseException:
+            output.close()
+            raise
+
+        self._write_totals(
+            days_sheet,
+            [[current.strftime("%Y-%m-%d"), *values] for current, values in days.items()],
+            total_format,
+        )
+        self._write_totals(
+            methods_sheet,
+            [[name, *values] for name, values in sorted(methods.items(), key=lambda item: item[1][1], reverse=True)],
+            total_format,
+        )
+
+        workbook.close()
+        output.seek(0)
+        return output
+
+    @staticmethod
+    def _sheet(workbook, name, headers, widths, header_format):
+        worksheet = workbook.add_worksheet(name)
+        # En modo constant_memory los anchos deben fijarse antes de escribir filas
+        for col, width in enumerate(widths):
+            worksheet.set_column(col, col, width)
+        worksheet.write_row(0, 0, headers, header_format)
+        return worksheet
+
+    def _appointment_cash(self, first, last, worksheet, days):
+        """
+        Recorre las citas del mes: escribe la hoja de citas (las que tienen
+        paciente, como la exportación por rango) y produce (día, pago) de las
+        que tienen pago, en el formato de la caja chica.
+        """
+        queryset = Appointment.objects.values(*self.APPOINTMENT_FIELDS).order_by("appointment_date", "hour", "id")
+        row_number = 0
+        for row in self._iter_chunks(queryset, "appointment_date", first, last):
+            appointment_day = local_day(row["appointment_date"])
+            if row["patient_id"] is not None:
+                row_number += 1
+                worksheet.write_row(row_number, 0, AppointmentExcelExportService._to_row(row))
+                days[appointment_day][0] += 1
+            if row["payment"] is not None and row["payment"] > 0:
+                yield appointment_day, ReportService._appointment_cash_row(row, appointment_day)
+
+    def _ticket_cash(self, first, last, worksheet, fields, days, methods):
+        """
+        Recorre los tickets pagados del mes: escribe la hoja de tickets (los
+        activos, como el reporte de tickets pagados) y produce (día, pago) de
+        los de monto positivo, en el formato de la caja chica.
+        """
+        queryset = (
+            Ticket.objects
+            .filter(status="paid")
+            .values(*PAID_TICKET_FIELDS, "is_active")
+            .order_by("payment_date", "id")
+        )
+        row_number = 0
+        for row in self._iter_chunks(queryset, "payment_date", first, last):
+            payment_day = local_day(row["payment_date"])
+            if row["is_active"]:
+                detail = ReportService._paid_ticket_detail(row)
+                row_number += 1
+                worksheet.write_row(row_number, 0, [detail.get(field, default) for field, default in fields])
+                days[payment_day][3] += 1
+                days[payment_day][4] += detail["monto"]
+                method = methods.setdefault(detail["metodo_pago"], [0, 0.0, 0, 0.0])
+                method[2] += 1
+                method[3] += detail["monto"]
+            if row["amount"] > 0:
+                yield payment_day, ReportService._ticket_cash_row(row, payment_day)
+
+    def _iter_chunks(self, queryset, field, first, last):
+        for chunk_start, chunk_end in iter_day_chunks(first, last, self.CHUNK_DAYS):
+            chunk = queryset.filter(range_filter(field, chunk_start, chunk_end))
+            yield from iterate_expected(chunk, self.ITERATOR_CHUNK_SIZE)
+
+    @staticmethod
+    def _write_totals(worksheet, rows, total_format):
+        """Filas de resumen (etiqueta + cantidades y montos alternados) con una fila TOTAL al pie."""
+        totals = [0] * (len(rows[0]) - 1) if rows else []
+        for row_number, row in enumerate(rows, start=1):
+            values = [round(value, 2) if isinstance(value, float) else value for value in row[1:]]
+            worksheet.write_row(row_number, 0, [row[0], *values])
+            totals = [total + value for total, value in zip(totals, row[1:])]
+        worksheet.write_row(len(rows) + 1, 0, ["TOTAL", *[round(total, 2) for total in totals]], total_format)
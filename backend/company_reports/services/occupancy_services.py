@@ -0,0 +1,146 @@
+import numpy as np
+from django.db.models import Count, IntegerField, Value
+from django.db.models.functions import Coalesce, ExtractHour, ExtractIsoWeekDay, ExtractMinute
+from appointments_status.models.appointment import Appointment
+from company_reports.services.date_ranges import range_filter
+from company_reports.services.report_cache import cached_report, start_end
+
+WEEKDAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+HOURS = list(range(24))
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 24 * MINUTES_PER_HOUR
+
+# Duración asumida para citas sin duration_minutes (igual que en el resto del sistema)
+DEFAULT_DURATION_MINUTES = 60
+
+
+class RoomOccupancyService:
+    """
+    Ocupación de consultorios por día de la semana × hora × consultorio.
+
+    - La base agrupa las citas del rango por (día de la semana, hora, minuto,
+      duración, consultorio) y cuenta cuántas hay en cada grupo. Aunque el
+      rango abarque años, son a lo sumo unas miles de filas.
+    - Los grupos se cargan como arreglos NumPy de enteros y los minutos ocupados
+      de cada franja horaria se acumulan con `np.bincount` ponderado por la
+      cantidad de citas: no hay bucles de Python por cita ni por grupo.
+    - Una cita que cruza varias horas reparte sus minutos entre ellas; las que
+      pasan de medianoche se recortan al final del día.
+    - Se excluyen las citas canceladas y las que no tienen hora o consultorio.
+    """
+
+    @cached_report("room_occupancy", start_end)
+    def get_room_occupancy(self, start_date, end_date):
+        """
+        Retorna las matrices [día de la semana][hora][consultorio] de minutos
+        ocupados, tasa de ocupación y citas iniciadas, más un resumen por consultorio.
+        """
+        weekday, start, duration, room, count = self.load_arrays(start_date, end_date)
+        rooms, room_index = np.unique(room, return_inverse=True)
+        shape = (len(WEEKDAYS), len(HOURS), len(rooms))
+
+        minutes = self.occupied_minutes(weekday, start, duration, room_index, count, shape)
+        first_hour = start // MINUTES_PER_HOUR
+        appointments = np.bincount(
+            np.ravel_multi_index((weekday, first_hour, room_index), shape),
+            weights=count,
+            minlength=int(np.prod(shape)),
+        ).reshape(shape)
+
+        # Minutos disponibles de cada franja: 60 por cada vez que el día de la semana aparece en el rango
+        available = self.weekday_counts(start_date, end_date)[:, None, None] * MINUTES_PER_HOUR
+        rate = np.divide(minutes, available, out=np.zeros(shape), where=available > 0)
+
+        return {
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "weekdays": WEEKDAYS,
+            "hours": HOURS,
+            "rooms": rooms.tolist(),
+            "occupied_minutes": minutes.astype(np.int64).tolist(),
+            "occupancy_rate": np.round(rate, 4).tolist(),
+            "appointments": appointments.astype(np.int64).tolist(),
+            "rooms_summary": self._rooms_summary(rooms, minutes, appointments, available),
+            "total_appointments": int(count.sum()),
+        }
+
+    @staticmethod
+    def load_arrays(start_date, end_date):
+        """
+        Citas del rango agrupadas en arreglos paralelos:
+        (día de la semana 0-6 desde el lunes, minuto de inicio del día, duración, consultorio, cantidad).
+        """
+        rows = (
+            Appointment.objects
+            .filter(range_filter("appointment_date", start_date, end_date), hour__isnull=False, room__isnull=False)
+            .exclude(appointment_status="CANCELADO")
+            .annotate(
+                weekday=ExtractIsoWeekDay("appointment_date"),
+                start_hour=ExtractHour("hour"),
+                start_minute=ExtractMinute("hour"),
+                duration=Coalesce("duration_minutes", Value(DEFAULT_DURATION_MINUTES), output_field=IntegerField()),
+            )
+            .values("weekday", "start_hour", "start_minute", "duration", "room")
+            .annotate(count=Count("id"))
+            .order_by()
+            .values_list("weekday", "start_hour", "start_minute", "duration", "room", "count")
+        )
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 6)
+
+        weekday = data[:, 0] - 1
+        start = data[:, 1] * MINUTES_PER_HOUR + data[:, 2]
+        duration = np.where(data[:, 3] > 0, data[:, 3], DEFAULT_DURATION_MINUTES)
+        return weekday, start, duration, data[:, 4], data[:, 5]
+
+    @staticmethod
+    def occupied_minutes(weekday, start, duration, room_index, count, shape):
+        """
+        Minutos ocupados por franja. Cada iteración suma, para todas las citas a
+        la vez, la parte que cae en su k-ésima hora; las iteraciones dependen de
+        la cita más larga (en horas), no de la cantidad de citas.
+        """
+        size = int(np.prod(shape))
+        minutes = np.zeros(size)
+        if start.size == 0:
+            return minutes.reshape(shape)
+
+        end = np.minimum(start + duration, MINUTES_PER_DAY)
+        first_hour = start // MINUTES_PER_HOUR
+        spans = (end - 1) // MINUTES_PER_HOUR - first_hour + 1
+        for offset in range(int(spans.max())):
+            hour = first_hour + offset
+            overlap = (
+                np.minimum(end, (hour + 1) * MINUTES_PER_HOUR)
+                - np.maximum(start, hour * MINUTES_PER_HOUR)
+            )
+            mask = overlap > 0
+            index = np.ravel_multi_index((weekday[mask], hour[mask], room_index[mask]), shape)
+            minutes += np.bincount(index, weights=overlap[mask] * count[mask], minlength=size)
+        return minutes.reshape(shape)
+
+    @staticmethod
+    def weekday_counts(start_date, end_date):
+        """Cuántas veces aparece cada día de la semana (lunes primero) en el rango."""
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        # El 1970-01-01 fue jueves (índice 3 contando desde el lunes)
+        return np.bincount((days.astype(np.int64) + 3) % 7, minlength=len(WEEKDAYS))
+
+    @staticmethod
+    def _rooms_summary(rooms, minutes, appointments, available):
+        """
+        Totales por consultorio. La tasa se calcula sobre las franjas con alguna
+        cita en cualquier consultorio (el horario de atención observado), no sobre las 24 horas.
+        """
+        opening = minutes.sum(axis=2) > 0
+        available_per_room = (available[:, :, 0] * opening).sum()
+        occupied = minutes.sum(axis=(0, 1))
+        started = appointments.sum(axis=(0, 1))
+        return [
+            {
+                "room": int(room),
+                "appointments": int(started[index]),
+                "occupied_minutes": int(occupied[index]),
+                "occupancy_rate": round(float(occupied[index] / available_per_room), 4) if available_per_room else 0.0,
+            }
+            for index, room in enumerate(rooms)
+        ]
@@ -0,0 +1,248 @@
+import base64
+import logging
+import mimetypes
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.cache import caches
+from company_reports.models.company import CompanyData
+from company_reports.services import pdf_worker
+from company_reports.services.pdf_worker import PDFRenderError
+from company_reports.services.reports_services import ReportService
+from company_reports.serialiazers.reports_serializers import PDFContextSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class PDFRenderBusy(PDFRenderError):
+    """Todos los cupos de renderizado están ocupados."""
+
+
+class PDFRenderPool:
+    """
+    Pool acotado de procesos para convertir HTML a PDF.
+
+    - Cada proceso web mantiene hasta PDF_RENDER_WORKERS procesos de renderizado
+      ("spawn", sin conexiones heredadas). Cada uno conserva sus templates compilados.
+    - Se admiten como máximo PDF_RENDER_MAX_PENDING renders en curso o en espera.
+      Si no hay cupo en PDF_RENDER_QUEUE_TIMEOUT segundos se lanza PDFRenderBusy.
+      La vista responde 503 y sugiere /reports/jobs/.
+    - Un render que supera PDF_RENDER_TIMEOUT responde error de inmediato, pero
+      conserva su cupo hasta que su proceso termina el trabajo; así los renders
+      lentos no dejan pasar más trabajos de los que el pool puede atender.
+    - Dentro de procesos daemon (workers de Celery) y con PDF_RENDER_WORKERS=0
+      se renderiza en el mismo proceso.
+    """
+
+    _executor = None
+    _slots = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=settings.PDF_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=pdf_worker.init_worker,
+                    max_tasks_per_child=settings.PDF_RENDER_MAX_TASKS_PER_CHILD,
+                )
+                cls._slots = threading.BoundedSemaphore(settings.PDF_RENDER_MAX_PENDING)
+            return cls._executor, cls._slots
+
+    @classmethod
+    def _reset(cls, executor):
+        with cls._lock:
+            if cls._executor is executor:
+                cls._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def runs_inline():
+        return settings.PDF_RENDER_WORKERS <= 0 or multiprocessing.current_process().daemon
+
+    @classmethod
+    def render(cls, template_name, context):
+        """Retorna (bytes del PDF, ms de espera, ms de render HTML, ms de conversión a PDF)."""
+        if cls.runs_inline():
+            content, html_ms, pdf_ms = pdf_worker.render_to_pdf(template_name, context)
+            return content, 0.0, html_ms, pdf_ms
+
+        executor, slots = cls._get_executor()
+        queued = time.perf_counter()
+        if not slots.acquire(timeout=settings.PDF_RENDER_QUEUE_TIMEOUT):
+            raise PDFRenderBusy("El servicio de PDF está ocupado, intente nuevamente o use /reports/jobs/.")
+        try:
+            future = executor.submit(pdf_worker.render_to_pdf, template_name, context)
+        except BrokenProcessPool:
+            slots.release()
+            cls._reset(executor)
+            raise PDFRenderError("El proceso de renderizado PDF terminó inesperadamente")
+        except BaseException:
+            slots.release()
+            raise
+        # El cupo se libera cuando el proceso termina el render, no cuando la vista deja de esperar
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            content, html_ms, pdf_ms = future.result(timeout=settings.PDF_RENDER_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PDFRenderError(f"El PDF '{template_name}' superó {settings.PDF_RENDER_TIMEOUT} s")
+        except BrokenProcessPool:
+            cls._reset(executor)
+            raise PDFRenderError("El proceso de renderizado PDF terminó inesperadamente")
+
+        total_ms = (time.perf_counter() - queued) * 1000
+        return content, max(total_ms - html_ms - pdf_ms, 0.0), html_ms, pdf_ms
+
+
+class PDFRenderStats:
+    """Tiempos acumulados de renderizado por template (en la caché 'reports', compartidos entre procesos)."""
+
+    KEY_PREFIX = "reports:pdf-stats"
+    FIELDS = ("count", "wait_ms", "html_ms", "pdf_ms", "bytes")
+    templates = set()
+
+    @staticmethod
+    def backend():
+        return caches[getattr(settings, "REPORTS_CACHE_ALIAS", "reports")]
+
+    @classmethod
+    def record(cls, template_name, wait_ms, html_ms, pdf_ms, size):
+        logger.info(
+            "PDF %s: espera=%.0fms html=%.0fms pdf=%.0fms tamaño=%dB",
+            template_name, wait_ms, html_ms, pdf_ms, size,
+        )
+        values = {"count": 1, "wait_ms": wait_ms, "html_ms": html_ms, "pdf_ms": pdf_ms, "bytes": size}
+        backend = cls.backend()
+        for field, value in values.items():
+            key = f"{cls.KEY_PREFIX}:{template_name}:{field}"
+            backend.add(key, 0, timeout=None)
+            try:
+                backend.incr(key, int(round(value)))
+            except ValueError:
+                backend.set(key, int(round(value)), timeout=None)
+
+    @classmethod
+    def stats(cls):
+        """Promedios por template desde el inicio (o desde que la caché se vació)."""
+        result = {}
+        backend = cls.backend()
+        for template_name in sorted(cls.templates):
+            keys = {field: f"{cls.KEY_PREFIX}:{template_name}:{field}" for field in cls.FIELDS}
+            values = backend.get_many(list(keys.values()))
+            totals = {field: values.get(key, 0) for field, key in keys.items()}
+            count = totals["count"]
+            result[template_name] = {
+                "renders": count,
+                "avg_wait_ms": round(totals["wait_ms"] / count, 1) if count else 0.0,
+                "avg_html_ms": round(totals["html_ms"] / count, 1) if count else 0.0,
+                "avg_pdf_ms": round(totals["pdf_ms"] / count, 1) if count else 0.0,
+                "avg_bytes": totals["bytes"] // count if count else 0,
+            }
+        return result
+
+
+class PDFReportService:
+    """Contexto y renderizado de los reportes PDF (pdf_templates/*.html)."""
+
+    # reporte: (template, título, método de ReportService, nombre del archivo)
+    REPORTS = {
+        "citas_terapeuta": (
+            "pdf_templates/citas_terapeuta.html", "Citas por Terapeuta",
+            "get_appointments_count_by_therapist", "citas_terapeuta.pdf",
+        ),
+        "pacientes_terapeuta": (
+            "pdf_templates/pacientes_terapeuta.html", "Pacientes por Terapeuta",
+            "get_patients_by_therapist", "pacientes_por_terapeuta.pdf",
+        ),
+        "resumen_caja": (
+            "pdf_templates/resumen_caja.html", "Resumen de Caja Diaria",
+            "get_daily_cash", "resumen_caja.pdf",
+        ),
+        "caja_chica_mejorada": (
+            "pdf_templates/caja_chica_mejorada.html", "Reporte Mejorado de Caja Chica",
+            "get_improved_daily_cash", "caja_chica_mejorada.pdf",
+        ),
+        "tickets_pagados": (
+            "pdf_templates/tickets_pagados.html", "Reporte Diario de Tickets Pagados",
+            "get_daily_paid_tickets", "tickets_pagados.pdf",
+        ),
+    }
+
+    # Logo en base64 por (ruta, fecha de modificación, tamaño): se lee del disco una vez por proceso
+    _logo_cache = {}
+
+    def __init__(self, report_service=None):
+        self.report_service = report_service or ReportService()
+
+    def template_name(self, report):
+        return self.REPORTS[report][0]
+
+    def filename(self, report):
+        return self.REPORTS[report][3]
+
+    def build_context(self, report, validated_data):
+        """Obtiene los datos del reporte y arma el contexto del template (o un dict con 'error')."""
+        _, title, method, _ = self.REPORTS[report]
+        data = getattr(self.report_service, method)(validated_data)
+        if isinstance(data, dict) and "error" in data:
+            return data
+
+        context_data = {
+            "date": validated_data.get("date"),
+            "data": data,
+            "title": title,
+        }
+        if report == "resumen_caja":
+            # Calcular total correcto (sumando 'payment')
+            context_data["total"] = sum(float(item.get("payment", 0) or 0) for item in data) if data else 0.0
+        context = dict(PDFContextSerializer(context_data).data)
+        context.update(self.company_branding())
+        return context
+
+    def company_branding(self):
+        """Nombre y logo (como data URI) de la empresa para el encabezado de los PDFs."""
+        company = CompanyData.objects.order_by("id").only("company_name", "company_logo").first()
+        if company is None:
+            return {"company_name": "", "company_logo": None}
+        return {"company_name": company.company_name, "company_logo": self._logo_data_uri(company.company_logo)}
+
+    @classmethod
+    def _logo_data_uri(cls, logo):
+        if not logo:
+            return None
+        path = os.path.join(settings.MEDIA_ROOT, str(logo))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        data_uri = cls._logo_cache.get(key)
+        if data_uri is None:
+            with open(path, "rb") as logo_file:
+                encoded = base64.b64encode(logo_file.read()).decode("ascii")
+            mime_type = mimetypes.guess_type(path)[0] or "image/png"
+            data_uri = f"data:{mime_type};base64,{encoded}"
+            cls._logo_cache.clear()
+            cls._logo_cache[key] = data_uri
+        return data_uri
+
+    def render_html(self, report, context):
+        return pdf_worker.compiled_template(self.template_name(report)).render(context)
+
+    def render_pdf(self, report, context):
+        """Renderiza el reporte a PDF en el pool de procesos y retorna los bytes."""
+        template_name = self.template_name(report)
+        content, wait_ms, html_ms, pdf_ms = PDFRenderPool.render(template_name, context)
+        PDFRenderStats.record(template_name, wait_ms, html_ms, pdf_ms, len(content))
+        return content
+
+
+PDFRenderStats.templates.update(template for template, *_ in PDFReportService.REPORTS.values())
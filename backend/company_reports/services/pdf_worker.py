@@ -0,0 +1,73 @@
+"""
+Funciones que se ejecutan dentro de los procesos del pool de renderizado PDF.
+
+Este módulo no importa modelos: los procesos se crean con "spawn" y lo importan
+antes de que `init_worker` ejecute django.setup().
+"""
+import io
+import os
+import time
+from functools import lru_cache
+from django.conf import settings
+
+
+class PDFRenderError(Exception):
+    """Error de xhtml2pdf al convertir el HTML de un reporte."""
+
+
+def init_worker():
+    """Inicializa Django una sola vez por proceso del pool."""
+    import django
+    django.setup()
+
+
+@lru_cache(maxsize=None)
+def _cached_template(template_name):
+    from django.template.loader import get_template
+    return get_template(template_name)
+
+
+def compiled_template(template_name):
+    """Template compilado, reutilizado entre renders del mismo proceso (en DEBUG se relee)."""
+    if settings.DEBUG:
+        from django.template.loader import get_template
+        return get_template(template_name)
+    return _cached_template(template_name)
+
+
+def link_callback(uri, rel):
+    """Resuelve URIs de static/media a rutas locales para que xhtml2pdf no las descargue por HTTP."""
+    if uri.startswith("data:"):
+        return uri
+
+    media_url = "/" + settings.MEDIA_URL.lstrip("/")
+    static_url = "/" + settings.STATIC_URL.lstrip("/")
+    if uri.startswith(media_url):
+        path = os.path.join(settings.MEDIA_ROOT, uri[len(media_url):])
+    elif uri.startswith(static_url):
+        from django.contrib.staticfiles import finders
+        relative = uri[len(static_url):]
+        path = finders.find(relative) or os.path.join(settings.STATIC_ROOT, relative)
+    else:
+        return uri
+    return path if os.path.isfile(path) else uri
+
+
+def render_to_pdf(template_name, context):
+    """
+    Renderiza el template y lo convierte a PDF.
+    Retorna (bytes del PDF, ms de render HTML, ms de conversión a PDF).
+    """
+    from xhtml2pdf import pisa
+
+    started = time.perf_counter()
+    html = compiled_template(template_name).render(context)
+    html_done = time.perf_counter()
+
+    output = io.BytesIO()
+    result = pisa.CreatePDF(html, dest=output, encoding="utf-8", link_callback=link_callback)
+    if result.err:
+        raise PDFRenderError(f"No se pudo generar el PDF '{template_name}' ({result.err} errores)")
+
+    finished = time.perf_counter()
+    return output.getvalue(), (html_done - started) * 1000, (finished - html_done) * 1000
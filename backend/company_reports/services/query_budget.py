@@ -0,0 +1,152 @@
+"""
+Tiempo máximo de consultas SQL por reporte, aplicado por la base de datos.
+
+Presupuesto
+    REPORT_QUERY_BUDGETS define los segundos de base de datos que puede usar
+    cada reporte en una petición. Cada sentencia recibe como límite lo que
+    queda del presupuesto, así que tampoco se excede con muchas consultas
+    medianas (p. ej. la lectura por bloques de días de un Excel).
+
+Aplicación por motor
+    - MySQL: hint `/*+ MAX_EXECUTION_TIME(ms) */` en cada SELECT; el servidor
+      corta la sentencia con el error 3024.
+    - PostgreSQL: `SET statement_timeout` mientras dura el bloque (error 57014).
+    - SQLite (desarrollo): progress handler que interrumpe la sentencia.
+    En todos los casos se lanza QueryBudgetExceeded: la vista decide si pasa
+    al trabajo en segundo plano (ReportJobService) o responde un error claro,
+    sin dejar el worker de gunicorn esperando hasta su timeout.
+"""
+import re
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+MYSQL_TIMEOUT_ERRORS = (3024,)  # ER_QUERY_TIMEOUT
+POSTGRES_TIMEOUT_CODE = "57014"  # query_canceled
+# Instrucciones de la VM de SQLite entre chequeos del reloj
+SQLITE_PROGRESS_STEPS = 10000
+
+
+class QueryBudgetExceeded(Exception):
+    """Las consultas de un reporte superaron su tiempo máximo en la base de datos."""
+
+    def __init__(self, report, seconds):
+        self.report = report
+        self.seconds = seconds
+        super().__init__(
+            f"El reporte superó el tiempo máximo de consulta ({seconds} s). Reduzca el rango de fechas."
+        )
+
+
+def budget_for(report):
+    """Segundos de base de datos permitidos para el reporte (None: sin límite)."""
+    if not getattr(settings, "REPORT_QUERY_BUDGET_ENABLED", True):
+        return None
+    return getattr(settings, "REPORT_QUERY_BUDGETS", {}).get(report)
+
+
+class _Deadline:
+    def __init__(self, report, seconds):
+        self.report = report
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining_ms(self):
+        """Milisegundos restantes; lanza QueryBudgetExceeded si ya no queda tiempo."""
+        remaining = int((self.at - time.monotonic()) * 1000)
+        if remaining <= 0:
+            raise QueryBudgetExceeded(self.report, self.seconds)
+        return remaining
+
+
+class _MySQLHint:
+    """execute_wrapper que agrega MAX_EXECUTION_TIME con el tiempo restante a cada SELECT."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __call__(self, execute, sql, params, many, context):
+        remaining = self.deadline.remaining_ms()
+        if not many and "MAX_EXECUTION_TIME" not in sql:
+            sql = _SELECT.sub(f"SELECT /*+ MAX_EXECUTION_TIME({remaining}) */", sql, count=1)
+        return execute(sql, params, many, context)
+
+
+class _Checkpoint:
+    """execute_wrapper que solo corta antes de una sentencia si el presupuesto ya se agotó."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __call__(self, execute, sql, params, many, context):
+        self.deadline.remaining_ms()
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def _mysql(connection, deadline):
+    with connection.execute_wrapper(_MySQLHint(deadline)):
+        yield
+
+
+@contextmanager
+def _postgresql(connection, deadline):
+    with connection.cursor() as cursor:
+        cursor.execute("SET statement_timeout = %s", [deadline.remaining_ms()])
+    try:
+        with connection.execute_wrapper(_Checkpoint(deadline)):
+            yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SET statement_timeout = DEFAULT")
+
+
+@contextmanager
+def _sqlite(connection, deadline):
+    connection.ensure_connection()
+    raw = connection.connection
+    raw.set_progress_handler(lambda: time.monotonic() >= deadline.at, SQLITE_PROGRESS_STEPS)
+    try:
+        with connection.execute_wrapper(_Checkpoint(deadline)):
+            yield
+    finally:
+        raw.set_progress_handler(None, 0)
+
+
+_GUARDS = {"mysql": _mysql, "postgresql": _postgresql, "sqlite": _sqlite}
+
+
+def _is_timeout(vendor, exc):
+    if vendor == "mysql":
+        return bool(exc.args) and exc.args[0] in MYSQL_TIMEOUT_ERRORS
+    if vendor == "postgresql":
+        return getattr(exc.__cause__, "pgcode", None) == POSTGRES_TIMEOUT_CODE
+    if vendor == "sqlite":
+        return "interrupted" in str(exc)
+    return False
+
+
+@contextmanager
+def query_budget(report, using=DEFAULT_DB_ALIAS):
+    """
+    Limita el tiempo de base de datos de las consultas hechas dentro del bloque
+    según REPORT_QUERY_BUDGETS[report]; si se excede lanza QueryBudgetExceeded.
+    """
+    seconds = budget_for(report)
+    connection = connections[using]
+    guard = _GUARDS.get(connection.vendor)
+    if not seconds or guard is None:
+        yield
+        return
+
+    deadline = _Deadline(report, seconds)
+    try:
+        with guard(connection, deadline):
+            yield
+    except DatabaseError as exc:
+        if _is_timeout(connection.vendor, exc):
+            raise QueryBudgetExceeded(report, seconds) from exc
+        raise
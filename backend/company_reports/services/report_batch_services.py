@@ -0,0 +1,138 @@
+from collections import Counter
+from appointments_status.models.appointment import Appointment
+from appointments_status.models.ticket import Ticket
+from company_reports.services.date_ranges import day_filter
+from company_reports.services.reports_services import ReportService, PAID_TICKET_FIELDS
+
+
+def _nulls_first(value):
+    """Clave de orden con los nulos primero, como ORDER BY ascendente en MySQL/SQLite."""
+    return (value is not None, value)
+
+
+class ReportBatchService:
+    """
+    Varios reportes diarios a partir de una sola lectura de las citas y los
+    tickets pagados del día (una consulta por tabla, solo si algún reporte la usa).
+
+    Cada reporte se arma en memoria con los mismos constructores de
+    ReportService, así que el resultado coincide con el de su endpoint individual.
+    """
+
+    # Proyección única de citas: cubre citas por terapeuta, pacientes por terapeuta y caja
+    APPOINTMENT_FIELDS = (
+        "id",
+        "therapist_id",
+        "therapist__first_name",
+        "therapist__last_name_paternal",
+        "therapist__last_name_maternal",
+        "patient_id",
+        "patient__name",
+        "patient__paternal_lastname",
+        "patient__maternal_lastname",
+        "payment",
+        "payment_type",
+        "payment_type__name",
+        "ticket_number",
+    )
+
+    # reporte: (usa citas, usa tickets)
+    REPORTS = {
+        "appointments_per_therapist": (True, False),
+        "patients_by_therapist": (True, False),
+        "daily_cash": (True, False),
+        "improved_daily_cash": (True, True),
+        "daily_paid_tickets": (False, True),
+    }
+
+    def get_reports(self, query_date, reports):
+        """Retorna {reporte: datos} con el mismo formato que los métodos de ReportService."""
+        appointments = []
+        if any(self.REPORTS[report][0] for report in reports):
+            appointments = list(
+                Appointment.objects
+                .filter(day_filter("appointment_date", query_date))
+                .values(*self.APPOINTMENT_FIELDS)
+                .order_by()
+            )
+        tickets = []
+        if any(self.REPORTS[report][1] for report in reports):
+            # Tickets pagados del día; is_active separa los de tickets_pagados
+            tickets = list(
+                Ticket.objects
+                .filter(day_filter("payment_date", query_date), status='paid')
+                .values(*PAID_TICKET_FIELDS, "is_active")
+                .order_by()
+            )
+        return {report: getattr(self, f"_{report}")(query_date, appointments, tickets) for report in reports}
+
+    @staticmethod
+    def _appointments_per_therapist(query_date, appointments, tickets):
+        counts = Counter()
+        therapists = {}
+        for row in appointments:
+            if row["therapist_id"] is not None:
+                counts[row["therapist_id"]] += 1
+                therapists.setdefault(row["therapist_id"], row)
+        rows = [
+            {
+                "therapist_id": therapist_id,
+                "therapist__first_name": therapists[therapist_id]["therapist__first_name"],
+                "therapist__last_name_paternal": therapists[therapist_id]["therapist__last_name_paternal"],
+                "therapist__last_name_maternal": therapists[therapist_id]["therapist__last_name_maternal"],
+                "appointments_count": count,
+            }
+            for therapist_id, count in counts.items()
+        ]
+        return ReportService._therapist_appointments_payload(rows)
+
+    @staticmethod
+    def _patients_by_therapist(query_date, appointments, tickets):
+        groups = {}
+        for row in appointments:
+            if row["patient_id"] is None:
+                continue
+            key = (row["therapist_id"], row["patient_id"])
+            if key not in groups:
+                groups[key] = {**row, "appointments": 0}
+            groups[key]["appointments"] += 1
+
+        # Mismo orden que ReportService._patients_by_therapist_rows
+        rows = sorted(groups.values(), key=lambda row: [
+            _nulls_first(row[field]) for field in (
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+                "therapist__first_name",
+                "therapist_id",
+                "patient__paternal_lastname",
+                "patient__maternal_lastname",
+                "patient__name",
+                "patient_id",
+            )
+        ])
+        return ReportService._group_patients_by_therapist(rows)
+
+    @staticmethod
+    def _daily_cash(query_date, appointments, tickets):
+        payments = [
+            row for row in appointments
+            if row["payment"] is not None and row["payment_type"] is not None
+        ]
+        payments.sort(key=lambda row: row["id"], reverse=True)
+        return [ReportService._daily_cash_row(row) for row in payments]
+
+    @staticmethod
+    def _improved_daily_cash(query_date, appointments, tickets):
+        appointment_payments = [row for row in appointments if row["payment"] is not None and row["payment"] > 0]
+        appointment_payments.sort(key=lambda row: (-row["payment"], row["id"]))
+        ticket_payments = [row for row in tickets if row["amount"] > 0]
+        ticket_payments.sort(key=lambda row: (-row["amount"], row["id"]))
+        return ReportService._improved_daily_cash_payload(query_date, appointment_payments, ticket_payments)
+
+    @staticmethod
+    def _daily_paid_tickets(query_date, appointments, tickets):
+        paid_tickets = [row for row in tickets if row["is_active"]]
+        # -payment_date, id (mismo orden que get_daily_paid_tickets)
+        paid_tickets.sort(key=lambda row: row["id"])
+        paid_tickets.sort(key=lambda row: row["payment_date"], reverse=True)
+        return ReportService._daily_paid_tickets_payload(query_date, paid_tickets)
@@ -0,0 +1,200 @@
+"""
+Caché versionada de resultados de StatisticsService y ReportService.
+
+Claves
+    reports:v<formato>:<reporte>:<hash de argumentos>:<hash de versiones del rango>
+
+    La versión de cada día vive en la tabla `report_data_versions` y la
+    incrementan las señales de Appointment y Ticket al confirmar la transacción
+    (ver company_reports.signals). Al cambiar la versión de cualquier día del
+    rango, la clave cambia y la entrada anterior deja de ser alcanzable.
+
+Qué se cachea
+    Solo rangos formados únicamente por días cerrados (anteriores a hoy). Los
+    rangos que incluyen hoy o fechas futuras siempre se recalculan ("bypass").
+
+Política de desalojo
+    - Cada entrada expira a los REPORTS_CACHE_TIMEOUT segundos (24 h por defecto).
+    - Las entradas de versiones anteriores no se borran explícitamente: quedan
+      huérfanas hasta expirar o hasta que el backend las desaloje por LRU
+      (LocMemCache: MAX_ENTRIES/CULL_FREQUENCY; Redis: maxmemory-policy allkeys-lru).
+    - Los cambios en datos maestros (nombres de pacientes, terapeutas o tipos de
+      pago) no cambian la versión de los días: se reflejan al expirar la entrada.
+
+Contadores
+    Aciertos, fallos y bypass por reporte se guardan en el mismo backend de caché
+    (compartidos entre workers si es Redis). Ver ReportCache.stats().
+"""
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from company_reports.models.report_data_version import ReportDataVersion
+
+CACHE_FORMAT_VERSION = 1
+_MISSING = object()
+
+
+class ReportCache:
+    """Caché de resultados de reportes con invalidación por versión de día."""
+
+    KEY_PREFIX = f"reports:v{CACHE_FORMAT_VERSION}"
+    OUTCOMES = ("hits", "misses", "bypass")
+    reports = set()
+
+    @staticmethod
+    def backend():
+        return caches[getattr(settings, "REPORTS_CACHE_ALIAS", "reports")]
+
+    @staticmethod
+    def bump_days(days):
+        """Incrementa la versión de datos de los días indicados."""
+        days = {day for day in days if day is not None}
+        if not days:
+            return
+        ReportDataVersion.objects.bulk_create(
+            [ReportDataVersion(day=day) for day in days], ignore_conflicts=True
+        )
+        ReportDataVersion.objects.filter(day__in=days).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def range_version(start, end):
+        """Hash de las versiones de todos los días del rango (los días sin fila valen 0)."""
+        versions = (
+            ReportDataVersion.objects
+            .filter(day__range=[start, end], version__gt=0)
+            .order_by("day")
+            .values_list("day", "version")
+        )
+        digest = hashlib.sha1()
+        for day, version in versions:
+            digest.update(f"{day.isoformat()}={version};".encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def range_versions(start, ends):
+        """
+        range_version(start, fin) para varios fines en una sola consulta
+        (rangos que comparten el inicio, p. ej. toda la historia hasta cada mes).
+        """
+        ends = sorted(set(ends))
+        versions = (
+            ReportDataVersion.objects
+            .filter(day__range=[start, ends[-1]], version__gt=0)
+            .order_by("day")
+            .values_list("day", "version")
+        ) if ends else ()
+        digest = hashlib.sha1()
+        result = {}
+        pending = iter(ends)
+        end = next(pending, None)
+        for day, version in versions:
+            while end is not None and day > end:
+                result[end] = digest.hexdigest()
+                end = next(pending, None)
+            digest.update(f"{day.isoformat()}={version};".encode())
+        while end is not None:
+            result[end] = digest.hexdigest()
+            end = next(pending, None)
+        return result
+
+    @staticmethod
+    def is_closed_range(start, end):
+        return start is not None and end is not None and start <= end < timezone.localdate()
+
+    @classmethod
+    def get_or_compute(cls, report, args_key, start, end, compute, version=None):
+        """
+        Retorna el resultado cacheado del reporte o lo calcula y lo guarda.
+        `version` permite pasar range_version(start, end) ya calculada (ver range_versions).
+        """
+        if not getattr(settings, "REPORTS_CACHE_ENABLED", True) or not cls.is_closed_range(start, end):
+            cls._count(report, "bypass")
+            return compute()
+
+        # La versión se lee ANTES de calcular: si los datos cambian durante el
+        # cálculo, el resultado queda bajo la versión anterior y no se reutiliza.
+        key = f"{cls.KEY_PREFIX}:{report}:{args_key}:{version or cls.range_version(start, end)}"
+        backend = cls.backend()
+        value = backend.get(key, _MISSING)
+        if value is not _MISSING:
+            cls._count(report, "hits")
+            return value
+
+        cls._count(report, "misses")
+        value = compute()
+        backend.set(key, value, timeout=getattr(settings, "REPORTS_CACHE_TIMEOUT", 86400))
+        return value
+
+    @classmethod
+    def stats(cls):
+        """Contadores de aciertos/fallos/bypass por reporte."""
+        keys = {
+            (report, outcome): f"{cls.KEY_PREFIX}:stats:{report}:{outcome}"
+            for report in sorted(cls.reports)
+            for outcome in cls.OUTCOMES
+        }
+        values = cls.backend().get_many(list(keys.values()))
+        result = {}
+        for (report, outcome), key in keys.items():
+            result.setdefault(report, {})[outcome] = values.get(key, 0)
+        for counters in result.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        return result
+
+    @classmethod
+    def _count(cls, report, outcome):
+        key = f"{cls.KEY_PREFIX}:stats:{report}:{outcome}"
+        backend = cls.backend()
+        backend.add(key, 0, timeout=None)
+        try:
+            backend.incr(key)
+        except ValueError:
+            # La clave fue desalojada entre add() e incr()
+            backend.set(key, 1, timeout=None)
+
+
+def _args_key(args, kwargs):
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def cached_report(report, resolve_range):
+    """
+    Decorador para métodos de servicios de reportes.
+    `resolve_range` recibe los mismos argumentos que el método y retorna (inicio, fin).
+    """
+    def decorator(method):
+        ReportCache.reports.add(report)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start, end = resolve_range(*args, **kwargs)
+            return ReportCache.get_or_compute(
+                report, _args_key(args, kwargs), start, end,
+                lambda: method(self, *args, **kwargs),
+            )
+        return wrapper
+    return decorator
+
+
+def single_date(validated_data):
+    """Rango de un reporte diario (parámetro `date`)."""
+    day = validated_data.get("date")
+    return day, day
+
+
+def date_range(validated_data):
+    """Rango de un reporte entre fechas (parámetros `start_date` y `end_date`)."""
+    return validated_data.get("start_date"), validated_data.get("end_date")
+
+
+def start_end(start, end):
+    """Rango de un método que recibe (start, end) directamente."""
+    return start, end
@@ -0,0 +1,225 @@
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from company_reports.models.report_job import ReportJob
+from company_reports.serialiazers.reports_serializers import DateParameterSerializer
+from company_reports.services.export_services import (
+    AppointmentExcelExportService,
+    DailyCashExcelExportService,
+    MonthCloseExcelExportService,
+    RoomOccupancyExcelExportService,
+)
+from company_reports.services.occupancy_services import RoomOccupancyService
+from company_reports.services.pdf_services import PDFReportService
+from company_reports.services.reports_services import ReportService
+
+logger = logging.getLogger(__name__)
+
+
+class ReportJobError(Exception):
+    """Error de negocio al generar el archivo de un trabajo de reporte."""
+
+
+class ReportQueueUnavailable(Exception):
+    """No se pudo encolar el trabajo (broker de Celery caído o inaccesible)."""
+
+
+class ReportJobService:
+    """
+    Crea y ejecuta trabajos de exportación en segundo plano.
+    La vista registra el trabajo y el worker de la cola 'reports'
+    (company_reports.tasks.run_report_job) genera el archivo.
+    """
+
+    # Reportes disponibles: nombre -> método que retorna (contenido, nombre de archivo)
+    EXPORTS = {
+        "excel_citas": "_export_excel_citas",
+        "excel_caja_chica_mejorada": "_export_excel_caja_chica_mejorada",
+        "excel_tickets_pagados": "_export_excel_tickets_pagados",
+        "excel_ocupacion_consultorios": "_export_excel_ocupacion_consultorios",
+        "excel_cierre_mes": "_export_excel_cierre_mes",
+        "pdf_citas_terapeuta": "_export_pdf",
+        "pdf_pacientes_terapeuta": "_export_pdf",
+        "pdf_resumen_caja": "_export_pdf",
+        "pdf_caja_chica_mejorada": "_export_pdf",
+        "pdf_tickets_pagados": "_export_pdf",
+    }
+
+    # Parámetros obligatorios por reporte ('date' toma el día actual si falta)
+    REQUIRED_PARAMS = {
+        "excel_citas": ("start_date", "end_date"),
+        "excel_ocupacion_consultorios": ("start_date", "end_date"),
+    }
+
+    def __init__(self):
+        self.report_service = ReportService()
+        self.pdf_service = PDFReportService(self.report_service)
+
+    def submit(self, report, params):
+        """
+        Valida los parámetros, registra el trabajo y lo encola al confirmar la transacción.
+        Lanza ReportQueueUnavailable si no hay transacción abierta y el broker rechaza el
+        envío; dentro de una transacción el fallo solo queda registrado en el trabajo.
+        """
+        if report not in self.EXPORTS:
+            return {"error": f"Reporte no soportado: {report}"}
+
+        serializer = DateParameterSerializer(data=params)
+        if not serializer.is_valid():
+            return {"error": serializer.errors}
+        try:
+            self._require_params(report, serializer.validated_data)
+        except ReportJobError as exc:
+            return {"error": str(exc)}
+
+        job = ReportJob.objects.create(
+            report=report,
+            params={key: value.isoformat() for key, value in serializer.validated_data.items() if value},
+        )
+        job_id = str(job.pk)
+        queued = []
+        transaction.on_commit(lambda: queued.append(self.enqueue(job_id)))
+        if queued == [False]:
+            raise ReportQueueUnavailable("No se pudo encolar el reporte; intente nuevamente más tarde.")
+        return job
+
+    def enqueue(self, job_id):
+        """Envía el trabajo a la cola. Si el broker falla, el trabajo queda 'failed' con el error."""
+        # Import diferido: tasks.py importa este servicio
+        from company_reports.tasks import run_report_job
+
+        try:
+            run_report_job.delay(job_id)
+        except Exception as exc:
+            logger.exception("No se pudo encolar el trabajo de reporte %s", job_id)
+            ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_PENDING).update(
+                status=ReportJob.STATUS_FAILED,
+                error=f"No se pudo encolar el trabajo: {exc}",
+                finished_at=timezone.now(),
+            )
+            return False
+        return True
+
+    def run(self, job_id):
+        """Genera el archivo de un trabajo. Los errores quedan registrados en el trabajo."""
+        job = ReportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            logger.warning("Trabajo de reporte %s no encontrado", job_id)
+            return None
+        if job.status == ReportJob.STATUS_DONE:
+            # Reentrega de Celery (task_acks_late) de un trabajo ya terminado
+            return job
+
+        job.status = ReportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+
+        try:
+            serializer = DateParameterSerializer(data=job.params)
+            if not serializer.is_valid():
+                raise ReportJobError(f"Parámetros inválidos: {serializer.errors}")
+            self._require_params(job.report, serializer.validated_data)
+
+            content, filename = getattr(self, self.EXPORTS[job.report])(job.report, serializer.validated_data)
+            if isinstance(content, bytes):
+                content = ContentFile(content)
+            else:
+                content = File(content)
+            with content:
+                job.file.save(f"{job.pk}/{filename}", content, save=False)
+            job.status = ReportJob.STATUS_DONE
+            job.error = None
+        except ReportJobError as exc:
+            logger.warning("Trabajo de reporte %s (%s) rechazado: %s", job.pk, job.report, exc)
+            job.status = ReportJob.STATUS_FAILED
+            job.error = str(exc)
+        except Exception as exc:
+            logger.exception("Error generando el trabajo de reporte %s (%s)", job.pk, job.report)
+            job.status = ReportJob.STATUS_FAILED
+            job.error = str(exc)
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "file", "error", "finished_at"])
+        return job
+
+    def purge_finished(self, max_age=None):
+        """
+        Borra los trabajos terminados (completados o fallidos) hace más de `max_age`
+        segundos junto con su archivo en MEDIA_ROOT/reports/jobs/.
+        Retorna {"removed", "freed_bytes"}.
+        """
+        if max_age is None:
+            max_age = getattr(settings, "REPORT_JOBS_MAX_AGE", 7 * 86400)
+        expired = ReportJob.objects.filter(
+            status__in=[ReportJob.STATUS_DONE, ReportJob.STATUS_FAILED],
+            finished_at__lt=timezone.now() - timedelta(seconds=max_age),
+        )
+        removed_ids = []
+        freed = 0
+        for job in expired.only("pk", "file").iterator():
+            if job.file:
+                directory = os.path.dirname(job.file.path)
+                try:
+                    freed += job.file.size
+                except OSError:
+                    pass
+                job.file.delete(save=False)
+                try:
+                    # Cada trabajo guarda su archivo en su propio directorio (<id>/)
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+            removed_ids.append(job.pk)
+        ReportJob.objects.filter(pk__in=removed_ids).delete()
+        return {"removed": len(removed_ids), "freed_bytes": freed}
+
+    @classmethod
+    def _require_params(cls, report, validated_data):
+        required = cls.REQUIRED_PARAMS.get(report, ())
+        if any(not validated_data.get(name) for name in required):
+            raise ReportJobError(f"Parámetros {' y '.join(repr(name) for name in required)} son requeridos.")
+
+    @staticmethod
+    def _check(data):
+        if isinstance(data, dict) and "error" in data:
+            raise ReportJobError(data["error"])
+        return data
+
+    def _export_excel_citas(self, report, validated_data):
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+        output = AppointmentExcelExportService().export_appointments_between_dates(start_date, end_date)
+        return output, f"citas_{start_date}_a_{end_date}.xlsx"
+
+    def _export_excel_caja_chica_mejorada(self, report, validated_data):
+        data = self._check(self.report_service.get_improved_daily_cash(validated_data))
+        output = DailyCashExcelExportService().export_improved_daily_cash(data)
+        return output, f"caja_chica_mejorada_{validated_data.get('date')}.xlsx"
+
+    def _export_excel_tickets_pagados(self, report, validated_data):
+        data = self._check(self.report_service.get_daily_paid_tickets(validated_data))
+        output = DailyCashExcelExportService().export_daily_paid_tickets(data)
+        return output, f"tickets_pagados_{validated_data.get('date')}.xlsx"
+
+    def _export_excel_ocupacion_consultorios(self, report, validated_data):
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+        data = RoomOccupancyService().get_room_occupancy(start_date, end_date)
+        output = RoomOccupancyExcelExportService().export_room_occupancy(data)
+        return output, f"ocupacion_consultorios_{start_date}_a_{end_date}.xlsx"
+
+    def _export_excel_cierre_mes(self, report, validated_data):
+        day = validated_data.get("date") or timezone.localdate()
+        output = MonthCloseExcelExportService().export_month_close(day)
+        return output, MonthCloseExcelExportService.filename(day)
+
+    def _export_pdf(self, report, validated_data):
+        pdf_report = report[len("pdf_"):]
+        context = self._check(self.pdf_service.build_context(pdf_report, validated_data))
+        content = self.pdf_service.render_pdf(pdf_report, context)
+        return content, f"{pdf_report}_{validated_data.get('date')}.pdf"
@@ -0,0 +1,176 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) para los reportes y estadísticas.
+
+Marca de agua
+    Para el rango pedido se combinan, por cada tabla que alimenta el reporte
+    (citas por appointment_date, tickets por payment_date), la cantidad de filas
+    y el máximo updated_at, más las versiones de día de `report_data_versions`
+    (que además cubren los cambios hechos por señales sin tocar updated_at,
+    como la eliminación de un terapeuta). Son consultas de agregación que se
+    resuelven solo con los índices (appointment_date, updated_at) y
+    (payment_date, updated_at), mucho más baratas que el reporte.
+
+ETag
+    Hash del reporte, de los parámetros de la query string y de la marca de agua.
+    Si coincide con If-None-Match se responde 304 sin ejecutar el reporte.
+
+Alcance
+    Solo GET/HEAD. Los cambios en datos maestros (nombres de pacientes o
+    terapeutas) no cambian la marca de agua, igual que en la caché de reportes.
+"""
+import functools
+import hashlib
+import json
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.views.decorators.http import condition
+from appointments_status.models.appointment import Appointment
+from appointments_status.models.ticket import Ticket
+from company_reports.models.report_data_version import ReportDataVersion
+from company_reports.services.date_ranges import month_days, previous_period, range_filter
+
+_MISSING = object()
+
+
+class ReportWatermark:
+    """Marca de agua barata de los datos de un reporte en un rango de días."""
+
+    # tabla: (modelo, campo de fecha del reporte)
+    SOURCES = {
+        "appointments": (Appointment, "appointment_date"),
+        "tickets": (Ticket, "payment_date"),
+    }
+
+    # reporte: tablas que alimentan su resultado
+    REPORT_SOURCES = {
+        "appointments_per_therapist": ("appointments",),
+        "patients_by_therapist": ("appointments",),
+        "daily_cash": ("appointments",),
+        "improved_daily_cash": ("appointments", "tickets"),
+        "daily_paid_tickets": ("tickets",),
+        "appointments_between_dates": ("appointments",),
+        "statistics": ("appointments",),
+        "room_occupancy": ("appointments",),
+        "therapist_performance": ("appointments",),
+        "batch": ("appointments", "tickets"),
+    }
+
+    @classmethod
+    def compute(cls, report, start, end):
+        """Retorna {"token": str, "last_modified": datetime o None} para el rango."""
+        versions = (
+            ReportDataVersion.objects
+            .filter(day__range=[start, end], version__gt=0)
+            .order_by("day")
+            .values_list("day", "version", "updated_at")
+        )
+        digest = hashlib.sha1()
+        last_modified = None
+        for day, version, updated_at in versions:
+            digest.update(f"{day.isoformat()}={version};".encode())
+            last_modified = max(filter(None, (last_modified, updated_at)), default=None)
+
+        parts = [digest.hexdigest()]
+        for source in cls.REPORT_SOURCES[report]:
+            model, field = cls.SOURCES[source]
+            row = (
+                model.objects
+                .filter(range_filter(field, start, end))
+                .order_by()
+                .aggregate(count=Count("id"), last=Max("updated_at"))
+            )
+            parts.append(f"{source}={row['count']}@{row['last'].isoformat() if row['last'] else '-'}")
+            last_modified = max(filter(None, (last_modified, row["last"])), default=None)
+
+        return {"token": ";".join(parts), "last_modified": last_modified}
+
+
+def conditional_report(report, resolve_range):
+    """
+    Decorador para vistas de reportes (funciones o métodos con method_decorator).
+    `resolve_range` recibe la query string y retorna (inicio, fin) o None si los
+    parámetros no son válidos (la vista responde el error normalmente).
+    """
+    def decorator(view):
+        def watermark(request):
+            mark = getattr(request, "_report_watermark", _MISSING)
+            if mark is _MISSING:
+                day_range = resolve_range(request.GET)
+                mark = ReportWatermark.compute(report, *day_range) if day_range else None
+                request._report_watermark = mark
+            return mark
+
+        def etag(request, *args, **kwargs):
+            mark = watermark(request)
+            if mark is None:
+                return None
+            payload = json.dumps([report, sorted(request.GET.lists()), mark["token"]])
+            return hashlib.sha1(payload.encode()).hexdigest()
+
+        def last_modified(request, *args, **kwargs):
+            mark = watermark(request)
+            return mark["last_modified"] if mark else None
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or not getattr(settings, "REPORTS_CONDITIONAL_ENABLED", True):
+                return view(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def date_param(params):
+    """Rango de un reporte diario (`date`, por defecto hoy)."""
+    if not params.get("date"):
+        today = timezone.localdate()
+        return today, today
+    day = _parse_day(params.get("date"))
+    return (day, day) if day else None
+
+
+def month_param(params):
+    """Rango del mes completo que contiene `date` (por defecto el mes actual)."""
+    day_range = date_param(params)
+    return month_days(day_range[0]) if day_range else None
+
+
+def range_param(start_key, end_key):
+    """Rango de un reporte entre fechas con los nombres de parámetro indicados."""
+    def resolve(params):
+        start = _parse_day(params.get(start_key))
+        end = _parse_day(params.get(end_key))
+        if start is None or end is None or start > end:
+            return None
+        return start, end
+    return resolve
+
+
+def comparison_range_param(start_key, end_key):
+    """Como range_param, extendido hacia atrás para cubrir el período anterior de igual duración."""
+    resolve_current = range_param(start_key, end_key)
+
+    def resolve(params):
+        current = resolve_current(params)
+        if current is None:
+            return None
+        return previous_period(*current)[0], current[1]
+    return resolve
+
+
+def date_or_range_param(params):
+    """Rango de los reportes de caja: `start_date`/`end_date` si vienen ambos, si no `date`."""
+    if params.get("start_date") or params.get("end_date"):
+        return range_param("start_date", "end_date")(params)
+    return date_param(params)
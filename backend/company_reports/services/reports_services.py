@@ -1,15 +1,55 @@
 from datetime import datetime
 from django.utils.timezone import localtime
-from django.db.models import Count, Q, CharField, Value, Sum
-from django.db.models.functions import Concat, TruncDate
+from django.db.models import Count, Q, CharField, Value, Sum, F
+from django.db.models.functions import Concat, Coalesce, TruncDate
 from appointments_status.models.appointment import Appointment
+from architect.query_markers import iterate_expected
 from appointments_status.models.ticket import Ticket
 from therapists.models.therapist import Therapist
-
+from company_reports.services.date_ranges import day_filter, range_filter, iter_days, iter_day_chunks, local_day
+from company_reports.services.report_cache import cached_report, single_date, date_range
+
+# Días por bloque y filas por lectura al iterar reportes para streaming
+STREAM_CHUNK_DAYS = 7
+ITERATOR_CHUNK_SIZE = 2000
+
+# Tamaño de página por defecto del detalle en los reportes por rango
+DETAIL_PAGE_SIZE = 100
+
+# Columnas de los tickets pagados (detalle de tickets_pagados)
+PAID_TICKET_FIELDS = (
+    'id',
+    'ticket_number',
+    'amount',
+    'payment_method',
+    'payment_date',
+    'description',
+    'appointment__id',
+    'appointment__appointment_date',
+    'appointment__hour',
+    'appointment__room',
+    'appointment__payment_type__name',
+    'appointment__patient__name',
+    'appointment__patient__paternal_lastname',
+    'appointment__patient__maternal_lastname',
+    'appointment__patient__document_number',
+    'appointment__patient__phone1',
+    'appointment__therapist__first_name',
+    'appointment__therapist__last_name_paternal',
+    'appointment__therapist__last_name_maternal',
+)
+
+# Columnas comunes de pagos de citas y de tickets en el detalle por rango
+PAYMENT_DETAIL_FIELDS = (
+    "tipo", "registro", "numero", "monto", "metodo", "fecha",
+    "paciente_nombre", "paciente_paterno", "paciente_materno",
+    "terapeuta_nombre", "terapeuta_paterno", "terapeuta_materno",
+)
 
 # from django.db import models  # 👈 no se usa
 
 class ReportService:
+    @cached_report("appointments_count_by_therapist", single_date)
     def get_appointments_count_by_therapist(self, validated_data):
         """
         Conteo de TODAS las citas por terapeuta para una fecha dada.
@@ -17,14 +57,9 @@ class ReportService:
         """
         query_date = validated_data.get("date")
 
-        # Si appointment_date es DateField, basta con igualdad.
-        # Si es DateTimeField, usamos TruncDate para comparar el día.
-        # Esta versión funciona en ambos casos (TruncDate ⇒ date-only).
         qs = (
             Appointment.objects
-            .filter(therapist__isnull=False)
-            .annotate(day=TruncDate("appointment_date"))
-            .filter(day=query_date)
+            .filter(day_filter("appointment_date", query_date), therapist__isnull=False)
             .values(
                 "therapist_id",
                 "therapist__first_name",
@@ -34,6 +69,20 @@ class ReportService:
             .annotate(appointments_count=Count("id"))
         )
 
+        return self._therapist_appointments_payload(qs)
+
+    @cached_report("patients_by_therapist", single_date)
+    def get_patients_by_therapist(self, validated_data):
+        """
+        Pacientes agrupados por terapeuta para una fecha dada.
+        Una sola consulta agrupada por terapeuta y paciente (sin instanciar modelos);
+        las citas sin terapeuta van al grupo "Sin terapeuta asignado".
+        """
+        return self._group_patients_by_therapist(self._patients_by_therapist_rows(validated_data.get("date")))
+
+    @staticmethod
+    def _therapist_appointments_payload(rows):
+        """Arma el reporte de citas por terapeuta desde filas agrupadas (therapist_*, appointments_count)."""
         therapists = [
             {
                 "id": row["therapist_id"],
@@ -42,7 +91,7 @@ class ReportService:
                 "last_name_maternal": row["therapist__last_name_maternal"],
                 "appointments_count": row["appointments_count"],
             }
-            for row in qs
+            for row in rows
         ]
 
         # Ordenar por mayor número de citas (como antes)
@@ -55,96 +104,90 @@ class ReportService:
             "total_appointments_count": total_appointments,
         }
 
-    def get_patients_by_therapist(self, validated_data):
-        """Pacientes agrupados por terapeuta para una fecha dada."""
-        query_date = validated_data.get("date")
-
-        appointments = (
-            Appointment.objects
-            .select_related("patient", "therapist")
-            .annotate(day=TruncDate("appointment_date"))
-            .filter(day=query_date)
-        )
-
+    @classmethod
+    def _group_patients_by_therapist(cls, rows):
+        """Agrupa filas (terapeuta, paciente, appointments) en el formato de get_patients_by_therapist."""
         report = {}
         sin_terapeuta = {
             "therapist_id": "",
             "therapist": "Sin terapeuta asignado",
-            "patients": {}
+            "patients": []
         }
 
-        for appointment in appointments:
-            patient = appointment.patient
-            therapist = appointment.therapist
-            if not patient:
-                continue
+        for row in rows:
+            item = cls._patient_by_therapist_row(row)
+            patient_data = {key: item[key] for key in ("patient_id", "patient", "appointments")}
 
-            patient_data = {
-                "patient_id": patient.id,
-                "patient": f"{patient.paternal_lastname} {patient.maternal_lastname or ''} {patient.name}".strip(),
-                "appointments": 0,
-            }
+            t_id = row["therapist_id"]
+            if t_id is None:
+                sin_terapeuta["patients"].append(patient_data)
+                continue
 
-            if not therapist:
-                key = patient.id
-                if key not in sin_terapeuta["patients"]:
-                    sin_terapeuta["patients"][key] = patient_data
-                sin_terapeuta["patients"][key]["appointments"] += 1
-            else:
-                t_id = therapist.id
-                if t_id not in report:
-                    report[t_id] = {
-                        "therapist_id": t_id,
-                        # usa first_name (no existe 'name' en el modelo)
-                        "therapist": f"{therapist.last_name_paternal} {therapist.last_name_maternal or ''} {therapist.first_name}".strip(),
-                        "patients": {}
-                    }
-                key = patient.id
-                if key not in report[t_id]["patients"]:
-                    report[t_id]["patients"][key] = patient_data
-                report[t_id]["patients"][key]["appointments"] += 1
+            if t_id not in report:
+                report[t_id] = {
+                    "therapist_id": t_id,
+                    "therapist": item["therapist"],
+                    "patients": []
+                }
+            report[t_id]["patients"].append(patient_data)
 
         # Agregar grupo "sin terapeuta" si aplica
         if sin_terapeuta["patients"]:
             report["sinTherapist"] = sin_terapeuta
 
-        # Convertir dicts de pacientes a listas
-        for therapist_id in list(report.keys()):
-            report[therapist_id]["patients"] = list(report[therapist_id]["patients"].values())
-
         return list(report.values())
 
-    def get_daily_cash(self, validated_data):
-        """Resumen diario de efectivo detallado por cita."""
-        query_date = validated_data.get("date")
-
-        payments = (
+    @staticmethod
+    def _patients_by_therapist_rows(query_date):
+        """Citas del día agrupadas por terapeuta y paciente (una fila por par, sin instanciar modelos)."""
+        return (
             Appointment.objects
-            .filter(
-                appointment_date=query_date,
-                payment__isnull=False,
-                payment_type__isnull=False
-            )
+            .filter(day_filter("appointment_date", query_date), patient__isnull=False)
             .values(
-                'id',
-                'payment',
-                'payment_type',
-                'payment_type__name'
+                "therapist_id",
+                "therapist__first_name",
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+                "patient_id",
+                "patient__name",
+                "patient__paternal_lastname",
+                "patient__maternal_lastname",
+            )
+            .annotate(appointments=Count("id"))
+            .order_by(
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+                "therapist__first_name",
+                "therapist_id",
+                "patient__paternal_lastname",
+                "patient__maternal_lastname",
+                "patient__name",
+                "patient_id",
             )
-            .order_by('-id')
         )
 
-        result = [
-            {
-                "id_cita": p['id'],
-                "payment": p['payment'],
-                "payment_type": p['payment_type'],
-                "payment_type_name": p['payment_type__name']
-            }
-            for p in payments
-        ]
-        return result
+    @staticmethod
+    def _patient_by_therapist_row(row):
+        """Fila de _patients_by_therapist_rows con nombres formateados."""
+        if row["therapist_id"] is None:
+            therapist = "Sin terapeuta asignado"
+        else:
+            # usa first_name (no existe 'name' en el modelo)
+            therapist = f"{row['therapist__last_name_paternal']} {row['therapist__last_name_maternal'] or ''} {row['therapist__first_name']}".strip()
+        return {
+            "therapist_id": row["therapist_id"] if row["therapist_id"] is not None else "",
+            "therapist": therapist,
+            "patient_id": row["patient_id"],
+            "patient": f"{row['patient__paternal_lastname']} {row['patient__maternal_lastname'] or ''} {row['patient__name']}".strip(),
+            "appointments": row["appointments"],
+        }
+
+    @cached_report("daily_cash", single_date)
+    def get_daily_cash(self, validated_data):
+        """Resumen diario de efectivo detallado por cita."""
+        return list(self.iter_daily_cash(validated_data.get("date")))
 
+    @cached_report("improved_daily_cash", single_date)
     def get_improved_daily_cash(self, validated_data):
         """
         Reporte mejorado de caja chica con información detallada de pagos.
@@ -156,7 +199,7 @@ class ReportService:
         appointment_payments = (
             Appointment.objects
             .filter(
-                appointment_date__date=query_date,
+                day_filter("appointment_date", query_date),
                 payment__isnull=False,
                 payment__gt=0
             )
@@ -173,14 +216,14 @@ class ReportService:
                 'therapist__last_name_maternal',
                 'ticket_number'
             )
-            .order_by('-payment')
+            .order_by('-payment', 'id')
         )
 
         # Obtener pagos de tickets
         ticket_payments = (
             Ticket.objects
             .filter(
-                payment_date__date=query_date,
+                day_filter("payment_date", query_date),
                 status='paid',
                 amount__gt=0
             )
@@ -197,42 +240,143 @@ class ReportService:
                 'appointment__therapist__last_name_paternal',
                 'appointment__therapist__last_name_maternal'
             )
-            .order_by('-amount')
+            .order_by('-amount', 'id')
         )
 
+        return self._improved_daily_cash_payload(query_date, appointment_payments, ticket_payments)
+
+    @cached_report("daily_paid_tickets", single_date)
+    def get_daily_paid_tickets(self, validated_data):
+        """
+        Reporte diario de todos los tickets PAGADOS.
+        Incluye información detallada de cada ticket pagado.
+        """
+        query_date = validated_data.get("date")
+
+        # Obtener tickets pagados del día
+        paid_tickets = self._paid_tickets(day_filter("payment_date", query_date)).order_by('-payment_date', 'id')
+
+        return self._daily_paid_tickets_payload(query_date, paid_tickets)
+
+    # ---------- Modo por rango (cierre de caja de varios días) ----------
+
+    @cached_report("improved_cash_between_dates", date_range)
+    def get_improved_cash_between_dates(self, validated_data):
+        """
+        Caja chica entre start_date y end_date con totales por día y método de pago.
+        Los totales salen de una sola consulta agrupada (UNION ALL de pagos de citas y
+        de tickets). El detalle solo se consulta con include_details y va paginado.
+        """
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+
+        appointment_totals = (
+            self._appointment_payments(start_date, end_date)
+            .annotate(dia=TruncDate("appointment_date"), metodo=Coalesce("payment_type__name", Value("No especificado")))
+            .values("dia", "metodo")
+            .annotate(cantidad=Count("id"), total=Sum("payment"))
+            .order_by()
+        )
+        ticket_totals = (
+            self._ticket_payments(start_date, end_date)
+            .annotate(dia=TruncDate("payment_date"), metodo=F("payment_method"))
+            .values("dia", "metodo")
+            .annotate(cantidad=Count("id"), total=Sum("amount"))
+            .order_by()
+        )
+        summary = self._summarize_by_day(
+            appointment_totals.union(ticket_totals, all=True), start_date, end_date, "cantidad_pagos"
+        )
+
+        result = {
+            "fecha_inicio": start_date.strftime("%Y-%m-%d"),
+            "fecha_fin": end_date.strftime("%Y-%m-%d"),
+            "resumen_por_dia": summary["dias"],
+            "resumen_por_metodo": summary["metodos"],
+            "total_general": summary["total"],
+            "cantidad_total_pagos": summary["cantidad"],
+        }
+        if validated_data.get("include_details"):
+            result["pagos_detallados"] = self._paginate(
+                self._payment_detail_rows(start_date, end_date), validated_data, self._payment_detail
+            )
+        return result
+
+    @cached_report("paid_tickets_between_dates", date_range)
+    def get_paid_tickets_between_dates(self, validated_data):
+        """
+        Tickets pagados entre start_date y end_date con totales por día y método de pago
+        (una consulta agrupada). El detalle solo se consulta con include_details y va paginado.
+        """
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+        paid_filter = range_filter("payment_date", start_date, end_date)
+
+        totals = (
+            Ticket.objects
+            .filter(paid_filter, status='paid', is_active=True)
+            .annotate(dia=TruncDate("payment_date"), metodo=F("payment_method"))
+            .values("dia", "metodo")
+            .annotate(cantidad=Count("id"), total=Sum("amount"))
+            .order_by()
+        )
+        summary = self._summarize_by_day(totals, start_date, end_date, "cantidad_tickets")
+
+        result = {
+            "fecha_inicio": start_date.strftime("%Y-%m-%d"),
+            "fecha_fin": end_date.strftime("%Y-%m-%d"),
+            "resumen_por_dia": summary["dias"],
+            "resumen_por_metodo": summary["metodos"],
+            "total_general": summary["total"],
+            "cantidad_tickets": summary["cantidad"],
+            "metodos_pago_utilizados": [item["metodo"] for item in summary["metodos"]],
+        }
+        if validated_data.get("include_details"):
+            result["tickets_pagados"] = self._paginate(
+                self._paid_tickets(paid_filter).order_by("payment_date", "id"), validated_data, self._paid_ticket_detail
+            )
+        return result
+
+    @staticmethod
+    def _appointment_cash_row(payment, query_date):
+        """Pago de una cita con el formato de pagos_detallados de la caja chica."""
+        patient_name = f"{payment['patient__paternal_lastname'] or ''} {payment['patient__maternal_lastname'] or ''} {payment['patient__name'] or ''}".strip()
+        therapist_name = f"{payment['therapist__last_name_paternal'] or ''} {payment['therapist__last_name_maternal'] or ''} {payment['therapist__first_name'] or ''}".strip()
+        return {
+            "tipo": "Cita",
+            "id": payment['id'],
+            "ticket_number": payment['ticket_number'] or f"CITA-{payment['id']}",
+            "monto": float(payment['payment']),
+            "metodo_pago": payment['payment_type__name'] or "No especificado",
+            "paciente": patient_name,
+            "terapeuta": therapist_name,
+            "fecha_pago": query_date.strftime("%Y-%m-%d")
+        }
+
+    @staticmethod
+    def _ticket_cash_row(payment, query_date):
+        """Pago de un ticket con el formato de pagos_detallados de la caja chica."""
+        patient_name = f"{payment['appointment__patient__paternal_lastname'] or ''} {payment['appointment__patient__maternal_lastname'] or ''} {payment['appointment__patient__name'] or ''}".strip()
+        therapist_name = f"{payment['appointment__therapist__last_name_paternal'] or ''} {payment['appointment__therapist__last_name_maternal'] or ''} {payment['appointment__therapist__first_name'] or ''}".strip()
+        return {
+            "tipo": "Ticket",
+            "id": payment['id'],
+            "ticket_number": payment['ticket_number'],
+            "monto": float(payment['amount']),
+            "metodo_pago": payment['payment_method'],
+            "paciente": patient_name,
+            "terapeuta": therapist_name,
+            "fecha_pago": query_date.strftime("%Y-%m-%d")
+        }
+
+    @classmethod
+    def _improved_daily_cash_payload(cls, query_date, appointment_payments, ticket_payments):
+        """Arma el reporte de caja chica de un día desde las filas de pagos de citas y de tickets."""
         # Procesar pagos de citas
-        appointment_data = []
-        for payment in appointment_payments:
-            patient_name = f"{payment['patient__paternal_lastname'] or ''} {payment['patient__maternal_lastname'] or ''} {payment['patient__name'] or ''}".strip()
-            therapist_name = f"{payment['therapist__last_name_paternal'] or ''} {payment['therapist__last_name_maternal'] or ''} {payment['therapist__first_name'] or ''}".strip()
-            
-            appointment_data.append({
-                "tipo": "Cita",
-                "id": payment['id'],
-                "ticket_number": payment['ticket_number'] or f"CITA-{payment['id']}",
-                "monto": float(payment['payment']),
-                "metodo_pago": payment['payment_type__name'] or "No especificado",
-                "paciente": patient_name,
-                "terapeuta": therapist_name,
-                "fecha_pago": query_date.strftime("%Y-%m-%d")
-            })
+        appointment_data = [cls._appointment_cash_row(payment, query_date) for payment in appointment_payments]
 
         # Procesar pagos de tickets
-        ticket_data = []
-        for payment in ticket_payments:
-            patient_name = f"{payment['appointment__patient__paternal_lastname'] or ''} {payment['appointment__patient__maternal_lastname'] or ''} {payment['appointment__patient__name'] or ''}".strip()
-            therapist_name = f"{payment['appointment__therapist__last_name_paternal'] or ''} {payment['appointment__therapist__last_name_maternal'] or ''} {payment['appointment__therapist__first_name'] or ''}".strip()
-            
-            ticket_data.append({
-                "tipo": "Ticket",
-                "id": payment['id'],
-                "ticket_number": payment['ticket_number'],
-                "monto": float(payment['amount']),
-                "metodo_pago": payment['payment_method'],
-                "paciente": patient_name,
-                "terapeuta": therapist_name,
-                "fecha_pago": query_date.strftime("%Y-%m-%d")
-            })
+        ticket_data = [cls._ticket_cash_row(payment, query_date) for payment in ticket_payments]
 
         # Combinar todos los pagos
         all_payments = appointment_data + ticket_data
@@ -268,98 +412,12 @@ class ReportService:
             "cantidad_total_pagos": len(all_payments)
         }
 
-    def get_daily_paid_tickets(self, validated_data):
-        """
-        Reporte diario de todos los tickets PAGADOS.
-        Incluye información detallada de cada ticket pagado.
-        """
-        query_date = validated_data.get("date")
-
-        # Obtener tickets pagados del día
-        paid_tickets = (
-            Ticket.objects
-            .filter(
-                payment_date__date=query_date,
-                status='paid',
-                is_active=True
-            )
-            .select_related(
-                'appointment__patient',
-                'appointment__therapist',
-                'appointment__payment_type'
-            )
-            .values(
-                'id',
-                'ticket_number',
-                'amount',
-                'payment_method',
-                'payment_date',
-                'description',
-                'appointment__id',
-                'appointment__appointment_date',
-                'appointment__hour',
-                'appointment__room',
-                'appointment__payment_type__name',
-                'appointment__patient__name',
-                'appointment__patient__paternal_lastname',
-                'appointment__patient__maternal_lastname',
-                'appointment__patient__document_number',
-                'appointment__patient__phone1',
-                'appointment__therapist__first_name',
-                'appointment__therapist__last_name_paternal',
-                'appointment__therapist__last_name_maternal',
-                'appointment__therapist__license_number'
-            )
-            .order_by('-payment_date')
-        )
-
+    @classmethod
+    def _daily_paid_tickets_payload(cls, query_date, paid_tickets):
+        """Arma el reporte de tickets pagados de un día desde filas de _paid_tickets."""
         # Procesar tickets pagados
-        tickets_data = []
-        total_amount = 0.0
-        
-        for ticket in paid_tickets:
-            # Formatear nombre del paciente
-            patient_name = f"{ticket['appointment__patient__paternal_lastname'] or ''} {ticket['appointment__patient__maternal_lastname'] or ''} {ticket['appointment__patient__name'] or ''}".strip()
-            
-            # Formatear nombre del terapeuta
-            therapist_name = f"{ticket['appointment__therapist__last_name_paternal'] or ''} {ticket['appointment__therapist__last_name_maternal'] or ''} {ticket['appointment__therapist__first_name'] or ''}".strip()
-            
-            # Formatear fecha y hora de la cita
-            appointment_datetime = ticket['appointment__appointment_date']
-            appointment_date = appointment_datetime.strftime("%Y-%m-%d") if appointment_datetime else "No programada"
-            appointment_time = ticket['appointment__hour'].strftime("%H:%M") if ticket['appointment__hour'] else "No especificada"
-            
-            # Formatear fecha de pago
-            payment_datetime = ticket['payment_date']
-            payment_date = payment_datetime.strftime("%Y-%m-%d %H:%M") if payment_datetime else "No especificada"
-            
-            ticket_info = {
-                "ticket_id": ticket['id'],
-                "numero_ticket": ticket['ticket_number'],
-                "monto": float(ticket['amount']),
-                "metodo_pago": ticket['payment_method'],
-                "fecha_pago": payment_date,
-                "descripcion": ticket['description'] or "Sin descripción",
-                
-                # Información de la cita
-                "cita_id": ticket['appointment__id'],
-                "fecha_cita": appointment_date,
-                "hora_cita": appointment_time,
-                "consultorio": ticket['appointment__room'] or "No especificado",
-                "tipo_pago_cita": ticket['appointment__payment_type__name'] or "No especificado",
-                
-                # Información del paciente
-                "paciente_nombre": patient_name,
-                "paciente_documento": ticket['appointment__patient__document_number'] or "No especificado",
-                "paciente_telefono": ticket['appointment__patient__phone1'] or "No especificado",
-                
-                # Información del terapeuta
-                "terapeuta_nombre": therapist_name,
-                "terapeuta_licencia": ticket['appointment__therapist__license_number'] or "No especificado"
-            }
-            
-            tickets_data.append(ticket_info)
-            total_amount += float(ticket['amount'])
+        tickets_data = [cls._paid_ticket_detail(ticket) for ticket in paid_tickets]
+        total_amount = sum(ticket['monto'] for ticket in tickets_data)
 
         # Calcular resumen por método de pago
         payment_methods_summary = {}
@@ -390,43 +448,287 @@ class ReportService:
             "metodos_pago_utilizados": list(payment_methods_summary.keys())
         }
 
+    @staticmethod
+    def _appointment_payments(start_date, end_date):
+        """Citas con pago entre dos fechas (mismos criterios que la caja chica diaria)."""
+        return Appointment.objects.filter(
+            range_filter("appointment_date", start_date, end_date),
+            payment__isnull=False,
+            payment__gt=0
+        )
+
+    @staticmethod
+    def _ticket_payments(start_date, end_date):
+        """Tickets pagados entre dos fechas (mismos criterios que la caja chica diaria)."""
+        return Ticket.objects.filter(
+            range_filter("payment_date", start_date, end_date),
+            status='paid',
+            amount__gt=0
+        )
+
+    def _payment_detail_rows(self, start_date, end_date):
+        """Pagos de citas y de tickets como una sola consulta (UNION ALL) ordenable y paginable."""
+        appointment_rows = (
+            self._appointment_payments(start_date, end_date)
+            .annotate(
+                tipo=Value("Cita", output_field=CharField()),
+                registro=F("id"),
+                numero=F("ticket_number"),
+                monto=F("payment"),
+                metodo=Coalesce("payment_type__name", Value("No especificado")),
+                fecha=F("appointment_date"),
+                paciente_nombre=F("patient__name"),
+                paciente_paterno=F("patient__paternal_lastname"),
+                paciente_materno=F("patient__maternal_lastname"),
+                terapeuta_nombre=F("therapist__first_name"),
+                terapeuta_paterno=F("therapist__last_name_paternal"),
+                terapeuta_materno=F("therapist__last_name_maternal"),
+            )
+            .values(*PAYMENT_DETAIL_FIELDS)
+            .order_by()
+        )
+        ticket_rows = (
+            self._ticket_payments(start_date, end_date)
+            .annotate(
+                tipo=Value("Ticket", output_field=CharField()),
+                registro=F("id"),
+                numero=F("ticket_number"),
+                monto=F("amount"),
+                metodo=F("payment_method"),
+                fecha=F("payment_date"),
+                paciente_nombre=F("appointment__patient__name"),
+                paciente_paterno=F("appointment__patient__paternal_lastname"),
+                paciente_materno=F("appointment__patient__maternal_lastname"),
+                terapeuta_nombre=F("appointment__therapist__first_name"),
+                terapeuta_paterno=F("appointment__therapist__last_name_paternal"),
+                terapeuta_materno=F("appointment__therapist__last_name_maternal"),
+            )
+            .values(*PAYMENT_DETAIL_FIELDS)
+            .order_by()
+        )
+        return appointment_rows.union(ticket_rows, all=True).order_by("fecha", "tipo", "registro")
+
+    @staticmethod
+    def _payment_detail(row):
+        """Fila de _payment_detail_rows con el formato de pagos_detallados."""
+        payment_day = local_day(row['fecha'])
+        return {
+            "tipo": row['tipo'],
+            "id": row['registro'],
+            "ticket_number": row['numero'] or f"CITA-{row['registro']}",
+            "monto": float(row['monto']),
+            "metodo_pago": row['metodo'] or "No especificado",
+            "paciente": f"{row['paciente_paterno'] or ''} {row['paciente_materno'] or ''} {row['paciente_nombre'] or ''}".strip(),
+            "terapeuta": f"{row['terapeuta_paterno'] or ''} {row['terapeuta_materno'] or ''} {row['terapeuta_nombre'] or ''}".strip(),
+            "fecha_pago": payment_day.strftime("%Y-%m-%d") if payment_day else "No especificada",
+        }
+
+    @staticmethod
+    def _paid_tickets(date_filter):
+        """Tickets pagados y activos con los datos de su cita, paciente y terapeuta."""
+        return (
+            Ticket.objects
+            .filter(
+                date_filter,
+                status='paid',
+                is_active=True
+            )
+            .values(*PAID_TICKET_FIELDS)
+        )
+
+    @staticmethod
+    def _paid_ticket_detail(ticket):
+        """Fila de _paid_tickets con el formato de tickets_pagados."""
+        # Formatear nombre del paciente
+        patient_name = f"{ticket['appointment__patient__paternal_lastname'] or ''} {ticket['appointment__patient__maternal_lastname'] or ''} {ticket['appointment__patient__name'] or ''}".strip()
+        
+        # Formatear nombre del terapeuta
+        therapist_name = f"{ticket['appointment__therapist__last_name_paternal'] or ''} {ticket['appointment__therapist__last_name_maternal'] or ''} {ticket['appointment__therapist__first_name'] or ''}".strip()
+        
+        # Formatear fecha y hora de la cita
+        appointment_datetime = ticket['appointment__appointment_date']
+        appointment_date = appointment_datetime.strftime("%Y-%m-%d") if appointment_datetime else "No programada"
+        appointment_time = ticket['appointment__hour'].strftime("%H:%M") if ticket['appointment__hour'] else "No especificada"
+        
+        # Formatear fecha de pago
+        payment_datetime = ticket['payment_date']
+        payment_date = payment_datetime.strftime("%Y-%m-%d %H:%M") if payment_datetime else "No especificada"
+
+        return {
+            "ticket_id": ticket['id'],
+            "numero_ticket": ticket['ticket_number'],
+            "monto": float(ticket['amount']),
+            "metodo_pago": ticket['payment_method'],
+            "fecha_pago": payment_date,
+            "descripcion": ticket['description'] or "Sin descripción",
+            
+            # Información de la cita
+            "cita_id": ticket['appointment__id'],
+            "fecha_cita": appointment_date,
+            "hora_cita": appointment_time,
+            "consultorio": ticket['appointment__room'] or "No especificado",
+            "tipo_pago_cita": ticket['appointment__payment_type__name'] or "No especificado",
+            
+            # Información del paciente
+            "paciente_nombre": patient_name,
+            "paciente_documento": ticket['appointment__patient__document_number'] or "No especificado",
+            "paciente_telefono": ticket['appointment__patient__phone1'] or "No especificado",
+            
+            # Información del terapeuta
+            "terapeuta_nombre": therapist_name,
+            # Therapist no tiene número de licencia; se mantiene la clave por compatibilidad
+            "terapeuta_licencia": "No especificado"
+        }
+
+    @staticmethod
+    def _summarize_by_day(grouped_rows, start_date, end_date, count_key):
+        """
+        Combina filas agrupadas (dia, metodo, cantidad, total) en resúmenes por día
+        y por método. Incluye los días del rango sin pagos.
+        """
+        days = {day: {} for day in iter_days(start_date, end_date)}
+        methods = {}
+        for row in grouped_rows:
+            metodo = row['metodo'] or "No especificado"
+            total = float(row['total'] or 0)
+            for summary in (days.setdefault(local_day(row['dia']), {}), methods):
+                entry = summary.setdefault(metodo, {'metodo': metodo, count_key: 0, 'total': 0.0})
+                entry[count_key] += row['cantidad']
+                entry['total'] += total
+
+        def as_list(summary):
+            items = sorted(summary.values(), key=lambda x: x['total'], reverse=True)
+            for item in items:
+                item['total'] = round(item['total'], 2)
+            return items
+
+        dias = []
+        for day in sorted(days):
+            metodos = as_list(days[day])
+            dias.append({
+                "fecha": day.strftime("%Y-%m-%d"),
+                "resumen_por_metodo": metodos,
+                "total": round(sum(item['total'] for item in metodos), 2),
+                count_key: sum(item[count_key] for item in metodos),
+            })
+
+        metodos = as_list(methods)
+        return {
+            "dias": dias,
+            "metodos": metodos,
+            "total": round(sum(item['total'] for item in metodos), 2),
+            "cantidad": sum(item[count_key] for item in metodos),
+        }
+
+    @staticmethod
+    def _paginate(queryset, validated_data, to_row):
+        """Página del detalle (page, page_size): solo se leen las filas de esa página."""
+        page = validated_data.get("page") or 1
+        page_size = validated_data.get("page_size") or DETAIL_PAGE_SIZE
+        offset = (page - 1) * page_size
+        return {
+            "page": page,
+            "page_size": page_size,
+            "count": queryset.count(),
+            "results": [to_row(row) for row in queryset[offset:offset + page_size]],
+        }
+
+    @cached_report("appointments_between_dates", date_range)
     def get_appointments_between_dates(self, validated_data):
         """Citas entre dos fechas dadas."""
-        start_date = validated_data.get("start_date")
-        end_date = validated_data.get("end_date")
+        return list(self.iter_appointments_between_dates(
+            validated_data.get("start_date"), validated_data.get("end_date")
+        ))
+
+    # ---------- Iteradores de filas (streaming CSV / NDJSON) ----------
+    # Leen con `.values().iterator()` por bloques de días: en MySQL iterator() no usa
+    # cursores de servidor, así que el bloque acota lo que el driver carga en memoria.
 
-        appointments = (
+    def iter_appointments_between_dates(self, start_date, end_date):
+        """Filas de get_appointments_between_dates en orden de fecha y hora."""
+        queryset = (
             Appointment.objects
-            .select_related("patient", "therapist")
-            .filter(
-                appointment_date__gte=start_date,
-                appointment_date__lte=end_date
+            .filter(patient__isnull=False)
+            .values(
+                "id",
+                "patient_id",
+                "patient__document_number",
+                "patient__paternal_lastname",
+                "patient__maternal_lastname",
+                "patient__name",
+                "patient__phone1",
+                "appointment_date",
+                "hour",
             )
-            .order_by("appointment_date", "hour")
+            .order_by("appointment_date", "hour", "id")
         )
+        for chunk_start, chunk_end in iter_day_chunks(start_date, end_date, STREAM_CHUNK_DAYS):
+            chunk = queryset.filter(range_filter("appointment_date", chunk_start, chunk_end))
+            # La misma consulta por bloque: no es un N+1
+            for row in iterate_expected(chunk, ITERATOR_CHUNK_SIZE):
+                patient_name = " ".join(filter(None, [
+                    row["patient__paternal_lastname"],
+                    row["patient__maternal_lastname"],
+                    row["patient__name"]
+                ]))
+
+                hour_val = row["hour"]
+                hour_str = hour_val if isinstance(hour_val, str) else (hour_val.strftime("%H:%M") if hour_val else "")
+
+                yield {
+                    "appointment_id": row["id"],
+                    "patient_id": row["patient_id"],
+                    "document_number_patient": row["patient__document_number"],
+                    "patient": patient_name,
+                    "phone1_patient": row["patient__phone1"],
+                    "appointment_date": row["appointment_date"].strftime("%Y-%m-%d"),
+                    "hour": hour_str,
+                }
 
-        result = []
-        for app in appointments:
-            if not app.patient:
-                continue
+    def iter_daily_cash(self, query_date):
+        """Filas de get_daily_cash."""
+        payments = (
+            Appointment.objects
+            .filter(
+                day_filter("appointment_date", query_date),
+                payment__isnull=False,
+                payment_type__isnull=False
+            )
+            .values(
+                'id',
+                'payment',
+                'payment_type',
+                'payment_type__name'
+            )
+            .order_by('-id')
+        )
+        for p in payments.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            yield self._daily_cash_row(p)
 
-            patient_name = " ".join(filter(None, [
-                app.patient.paternal_lastname,
-                app.patient.maternal_lastname,
-                app.patient.name
-            ]))
-
-            hour_val = app.hour
-            hour_str = hour_val if isinstance(hour_val, str) else (hour_val.strftime("%H:%M") if hour_val else "")
-
-            result.append({
-                "appointment_id": app.id,
-                "patient_id": app.patient.id,
-                "document_number_patient": app.patient.document_number,
-                "patient": patient_name,
-                "phone1_patient": app.patient.phone1,
-                "appointment_date": app.appointment_date.strftime("%Y-%m-%d"),
-                "hour": hour_str,
-            })
+    @staticmethod
+    def _daily_cash_row(p):
+        return {
+            "id_cita": p['id'],
+            "payment": p['payment'],
+            "payment_type": p['payment_type'],
+            "payment_type_name": p['payment_type__name']
+        }
 
-        return result
+    def iter_patients_by_therapist(self, query_date):
+        """Filas de get_patients_by_therapist, una por terapeuta y paciente."""
+        for row in self._patients_by_therapist_rows(query_date).iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            yield self._patient_by_therapist_row(row)
+
+    def iter_payment_details(self, start_date, end_date):
+        """Pagos de citas y tickets entre dos fechas con el formato de pagos_detallados."""
+        for chunk_start, chunk_end in iter_day_chunks(start_date, end_date, STREAM_CHUNK_DAYS):
+            rows = self._payment_detail_rows(chunk_start, chunk_end)
+            for row in iterate_expected(rows, ITERATOR_CHUNK_SIZE):
+                yield self._payment_detail(row)
+
+    def iter_paid_ticket_details(self, start_date, end_date):
+        """Tickets pagados entre dos fechas con el formato de tickets_pagados."""
+        for chunk_start, chunk_end in iter_day_chunks(start_date, end_date, STREAM_CHUNK_DAYS):
+            tickets = self._paid_tickets(range_filter("payment_date", chunk_start, chunk_end)).order_by("payment_date", "id")
+            for row in iterate_expected(tickets, ITERATOR_CHUNK_SIZE):
+                yield self._paid_ticket_detail(row)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Sum, Q, Min, Max
+from django.db.models.functions import TruncDate
+from appointments_status.models.appointment import Appointment
+from company_reports.models.statistics_rollup import AppointmentDailyRollup, PatientDailyRollup
+from company_reports.services.date_ranges import day_filter, range_filter, local_day
+
+
+class StatisticsRollupService:
+    """Mantiene las tablas de agregados diarios que alimentan StatisticsService."""
+
+    BACKFILL_CHUNK_DAYS = 31
+    BATCH_SIZE = 1000
+
+    def refresh_days(self, days):
+        """Recalcula por completo los agregados de los días indicados."""
+        days = sorted({day for day in days if day is not None})
+        if not days:
+            return
+
+        days_filter = Q()
+        for day in days:
+            days_filter |= day_filter("appointment_date", day)
+
+        with transaction.atomic():
+            AppointmentDailyRollup.objects.filter(day__in=days).delete()
+            PatientDailyRollup.objects.filter(day__in=days).delete()
+            self._insert_rollups(Appointment.objects.filter(days_filter))
+
+    def rebuild(self, start=None, end=None):
+        """
+        Reconstruye los agregados de un rango (backfill) en bloques de días.
+        Sin fechas, usa el rango completo de citas existentes.
+        Retorna la cantidad de días procesados.
+        """
+        if start is None or end is None:
+            limits = Appointment.objects.aggregate(first=Min("appointment_date"), last=Max("appointment_date"))
+            start = start or local_day(limits["first"])
+            end = end or local_day(limits["last"])
+        if start is None or end is None or start > end:
+            return 0
+
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=self.BACKFILL_CHUNK_DAYS - 1), end)
+            with transaction.atomic():
+                AppointmentDailyRollup.objects.filter(day__range=[chunk_start, chunk_end]).delete()
+                PatientDailyRollup.objects.filter(day__range=[chunk_start, chunk_end]).delete()
+                self._insert_rollups(
+                    Appointment.objects.filter(range_filter("appointment_date", chunk_start, chunk_end))
+                )
+            chunk_start = chunk_end + timedelta(days=1)
+
+        return (end - start).days + 1
+
+    def refresh_days_for(self, **rollup_filters):
+        """Recalcula los días en los que aparece un terapeuta o tipo de pago (p. ej. tras eliminarlo)."""
+        days = list(
+            AppointmentDailyRollup.objects
+            .filter(**rollup_filters)
+            .values_list("day", flat=True)
+            .distinct()
+        )
+        self.refresh_days(days)
+        return days
+
+    def _insert_rollups(self, queryset):
+        queryset = queryset.annotate(day=TruncDate("appointment_date")).order_by()
+
+        groups = (
+            queryset
+            .values("day", "therapist_id", "payment_type_id", "appointment_status")
+            .annotate(sessions=Count("id"), revenue=Sum("payment"))
+        )
+        AppointmentDailyRollup.objects.bulk_create(
+            (AppointmentDailyRollup(**group) for group in groups),
+            batch_size=self.BATCH_SIZE,
+        )
+
+        patients = (
+            queryset
+            .values("day", "patient_id")
+            .annotate(sessions=Count("id"))
+        )
+        PatientDailyRollup.objects.bulk_create(
+            (PatientDailyRollup(**row) for row in patients),
+            batch_size=self.BATCH_SIZE,
+        )
@@ -1,11 +1,58 @@
-from django.db.models import Count, Sum, Avg, Q, Case, When, F, Value
-from django.db.models.functions import ExtractWeekDay, Concat
+from django.conf import settings
+from django.db.models import (
+    Count, Sum, Avg, Max, Q, Case, When, F, Value, Func, Subquery, Window,
+    CharField, ExpressionWrapper, FloatField, IntegerField,
+)
+from django.db.models.functions import ExtractWeekDay, Concat, Cast, Coalesce, NullIf, Rank
 from appointments_status.models.appointment import Appointment
+from company_reports.models.statistics_rollup import AppointmentDailyRollup, PatientDailyRollup
+from company_reports.services.date_ranges import previous_period, range_bounds, range_filter
+from company_reports.services.report_cache import cached_report, start_end
+
+DIAS_SEMANA = {
+    1: "Domingo",
+    2: "Lunes",
+    3: "Martes",
+    4: "Miercoles",
+    5: "Jueves",
+    6: "Viernes",
+    7: "Sabado"
+}
+
+
+def _nombre_terapeuta(paterno, materno, nombre):
+    # Mismo formato que Concat("Apellido1 Apellido2, Nombre"): los NULL se omiten
+    return f"{paterno or ''} {materno or ''}, {nombre or ''}"
+
+
+def _rango_comparativo(start, end):
+    """Rango de días que cubre el período anterior y el actual."""
+    return previous_period(start, end)[0], end
+
+
+def _variacion_porcentual(actual, anterior):
+    if not anterior:
+        return None
+    return round((actual - anterior) / anterior * 100, 2)
+
+
+class _WindowMax(Func):
+    """MAX() como función de ventana sobre una expresión que ya contiene agregados."""
+    function = "MAX"
+    window_compatible = True
+
+
+def _sumar(acumulado, valor):
+    # Replica SUM() de SQL: NULL solo si no hubo ningún valor
+    if valor is None:
+        return acumulado
+    return valor if acumulado is None else acumulado + valor
+
 
 class StatisticsService:
     def get_metricas_principales(self, start, end):
         return Appointment.objects.filter(
-            appointment_date__range=[start, end]
+            range_filter("appointment_date", start, end)
         ).aggregate(
             ttlpacientes=Count("patient", distinct=True),
             ttlsesiones=Count("id"),
@@ -16,7 +63,7 @@ class StatisticsService:
         pagos = (
             Appointment.objects
             .filter(
-                appointment_date__range=[start, end]
+                range_filter("appointment_date", start, end)
             )
             .values("payment_type__name")
             .annotate(usos=Count("id"))
@@ -28,7 +75,7 @@ class StatisticsService:
         stats = list(
             Appointment.objects
             .filter(
-                appointment_date__range=[start, end]
+                range_filter("appointment_date", start, end)
             )
             .values("therapist__id")
             .annotate(
@@ -38,13 +85,15 @@ class StatisticsService:
                     Value(' '),
                     'therapist__last_name_maternal', 
                     Value(', '),
-                    'therapist__name'
+                    'therapist__first_name'
                 ),
                 sesiones=Count("id"),
                 ingresos=Sum("payment")
             )
         )
-        
+        return self._calcular_rendimiento(stats)
+
+    def _calcular_rendimiento(self, stats):
         if not stats:
             return []
         
@@ -53,8 +102,9 @@ class StatisticsService:
         total_ingresos = sum(float(s['ingresos'] or 0) for s in stats)  
         num_terapeutas = len(stats)
         
-        prom_sesiones = total_sesiones / num_terapeutas if num_terapeutas > 0 else 1
-        prom_ingresos = total_ingresos / num_terapeutas if num_terapeutas > 0 else 1
+        # Si no hubo ingresos (o sesiones) se usa 1 para evitar dividir entre cero
+        prom_sesiones = (total_sesiones / num_terapeutas if num_terapeutas > 0 else 1) or 1
+        prom_ingresos = (total_ingresos / num_terapeutas if num_terapeutas > 0 else 1) or 1
         
         # 3. Calcular rating original para cada terapeuta
         for stat in stats:
@@ -66,7 +116,7 @@ class StatisticsService:
             stat['raiting_original'] = rating_original
         
         # 4. Encontrar el máximo rating original
-        max_original = max(s['raiting_original'] for s in stats) if stats else 1
+        max_original = (max(s['raiting_original'] for s in stats) if stats else 1) or 1
         
         # 5. Escalar a 5 puntos y formatear resultado
         resultado = []
@@ -83,22 +133,136 @@ class StatisticsService:
         
         return resultado
 
-    def get_ingresos_por_dia_semana(self, start, end):
-        
-        dias_semana = {
-            1: "Domingo",       
-            2: "Lunes",      
-            3: "Martes",     
-            4: "Miercoles",   
-            5: "Jueves",    
-            6: "Viernes",      
-            7: "Sabado"     
+    @cached_report("therapist_performance", _rango_comparativo)
+    def get_rendimiento_comparativo(self, start, end):
+        """
+        Sesiones, ingresos, pacientes únicos, raiting (0-5) y ranking de cada
+        terapeuta en el período pedido y en el período anterior de igual duración.
+
+        Todo sale de una sola consulta agrupada por (período, terapeuta):
+        - Los totales de cada período (base de la fórmula 70% sesiones / 30% ingresos
+          de _calcular_rendimiento) son subconsultas escalares sin correlación.
+        - El raiting se escala con MAX() OVER (PARTITION BY período) y los rankings
+          son RANK() OVER (PARTITION BY período ORDER BY ...).
+        La cantidad de consultas no depende de los terapeutas ni del largo del rango.
+        """
+        previous_start, previous_end = previous_period(start, end)
+        current_from, _ = range_bounds(start, end)
+        es_actual = Q(appointment_date__gte=current_from)
+
+        def total_periodo(aggregate):
+            # Total del período de la fila; MAX() lo deja fuera del GROUP BY (es constante por grupo)
+            def subconsulta(desde, hasta):
+                return Subquery(
+                    Appointment.objects
+                    .filter(range_filter("appointment_date", desde, hasta))
+                    .order_by()
+                    .annotate(grupo=Value(1))
+                    .values("grupo")
+                    .annotate(total=aggregate)
+                    .values("total")
+                )
+            return Cast(
+                Max(Case(When(es_actual, then=subconsulta(start, end)), default=subconsulta(previous_start, previous_end))),
+                FloatField(),
+            )
+
+        sesiones = Cast(Count("id"), FloatField())
+        ingresos = Coalesce(Cast(Sum("payment"), FloatField()), Value(0.0))
+        # Mismo orden que _calcular_rendimiento: el promedio por terapeuta se simplifica al escalar por el máximo
+        raiting_base = ExpressionWrapper(
+            sesiones * Value(0.7) / NullIf(total_periodo(Count("id")), Value(0.0))
+            + Coalesce(ingresos * Value(0.3) / NullIf(total_periodo(Sum("payment")), Value(0.0)), Value(0.0)),
+            output_field=FloatField(),
+        )
+        por_periodo = [F("periodo")]
+
+        filas = (
+            Appointment.objects
+            .filter(range_filter("appointment_date", previous_start, end))
+            .annotate(periodo=Case(When(es_actual, then=Value("actual")), default=Value("anterior"), output_field=CharField()))
+            .values(
+                "periodo",
+                "therapist_id",
+                "therapist__first_name",
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+            )
+            .annotate(
+                sesiones=Count("id"),
+                ingresos=Sum("payment"),
+                pacientes_unicos=Count("patient", distinct=True),
+                raiting_base=raiting_base,
+            )
+            # Las ventanas van en un annotate aparte para que no entren al GROUP BY
+            .annotate(
+                raiting_maximo=Window(_WindowMax(raiting_base, output_field=FloatField()), partition_by=por_periodo),
+                ranking=Window(Rank(), partition_by=por_periodo, order_by=raiting_base.desc()),
+                ranking_sesiones=Window(Rank(), partition_by=por_periodo, order_by=Count("id").desc()),
+                ranking_ingresos=Window(Rank(), partition_by=por_periodo, order_by=ingresos.desc()),
+            )
+            .order_by()
+        )
+
+        terapeutas = {}
+        for fila in filas:
+            therapist_id = fila["therapist_id"]
+            terapeuta = terapeutas.setdefault(therapist_id, {
+                "id": therapist_id,
+                "terapeuta": _nombre_terapeuta(
+                    fila["therapist__last_name_paternal"],
+                    fila["therapist__last_name_maternal"],
+                    fila["therapist__first_name"],
+                ) if therapist_id is not None else "Sin terapeuta asignado",
+                "actual": None,
+                "anterior": None,
+            })
+            maximo = fila["raiting_maximo"]
+            terapeuta[fila["periodo"]] = {
+                "sesiones": fila["sesiones"],
+                "ingresos": float(fila["ingresos"]) if fila["ingresos"] else 0.0,
+                "pacientes_unicos": fila["pacientes_unicos"],
+                "raiting": round(fila["raiting_base"] / maximo * 5, 2) if maximo else 0.0,
+                "ranking": fila["ranking"],
+                "ranking_sesiones": fila["ranking_sesiones"],
+                "ranking_ingresos": fila["ranking_ingresos"],
+            }
+
+        for terapeuta in terapeutas.values():
+            terapeuta["variacion"] = self._variacion(terapeuta["actual"], terapeuta["anterior"])
+
+        # Primero por ranking actual; quienes solo trabajaron en el período anterior, al final
+        orden = sorted(terapeutas.values(), key=lambda t: (
+            t["actual"] is None,
+            (t["actual"] or t["anterior"])["ranking"],
+            t["id"] is None,
+            t["id"] or 0,
+        ))
+        return {
+            "periodo_actual": {"inicio": str(start), "fin": str(end)},
+            "periodo_anterior": {"inicio": str(previous_start), "fin": str(previous_end)},
+            "terapeutas": orden,
         }
-        
+
+    @staticmethod
+    def _variacion(actual, anterior):
+        """Cambios del período actual respecto del anterior (None si falta alguno de los dos)."""
+        if actual is None or anterior is None:
+            return None
+        return {
+            "sesiones": _variacion_porcentual(actual["sesiones"], anterior["sesiones"]),
+            "ingresos": _variacion_porcentual(actual["ingresos"], anterior["ingresos"]),
+            "pacientes_unicos": _variacion_porcentual(actual["pacientes_unicos"], anterior["pacientes_unicos"]),
+            "raiting": round(actual["raiting"] - anterior["raiting"], 2),
+            # Positivo: el terapeuta subió posiciones
+            "ranking": anterior["ranking"] - actual["ranking"],
+        }
+
+    def get_ingresos_por_dia_semana(self, start, end):
         ingresos_raw = (
             Appointment.objects
             .filter(
-                appointment_date__range=[start, end]
+                range_filter("appointment_date", start, end)
             )
             .annotate(dia_semana=ExtractWeekDay("appointment_date"))
             .values("dia_semana")
@@ -109,21 +273,16 @@ class StatisticsService:
         
         resultado = {}
         for item in ingresos_raw:
-            dia_nombre = dias_semana.get(item["dia_semana"], f"Día {item['dia_semana']}")
+            dia_nombre = DIAS_SEMANA.get(item["dia_semana"], f"Día {item['dia_semana']}")
             resultado[dia_nombre] = float(item["total"]) if item["total"] else 0.0
         
         return resultado
 
     def get_sesiones_por_dia_semana(self, start, end):
-        dias_semana = {
-            1: "Domingo", 2: "Lunes", 3: "Martes", 4: "Miercoles",
-            5: "Jueves", 6: "Viernes", 7: "Sabado"
-        }
-        
         sesiones_raw = (
             Appointment.objects
             .filter(
-                appointment_date__range=[start, end]
+                range_filter("appointment_date", start, end)
             )
             .annotate(dia_semana=ExtractWeekDay("appointment_date"))
             .values("dia_semana")
@@ -133,20 +292,28 @@ class StatisticsService:
         
         resultado = {}
         for item in sesiones_raw:
-            dia_nombre = dias_semana.get(item["dia_semana"], f"Día {item['dia_semana']}")
+            dia_nombre = DIAS_SEMANA.get(item["dia_semana"], f"Día {item['dia_semana']}")
             resultado[dia_nombre] = item["sesiones"]
         
         return resultado
 
     def get_tipos_pacientes(self, start, end):
         return Appointment.objects.filter(
-            appointment_date__range=[start, end]
+            range_filter("appointment_date", start, end)
         ).aggregate(
             c=Count("id", filter=Q(appointment_status__iexact="C")),
             cc=Count("id", filter=Q(appointment_status__iexact="CC"))
         )
 
+    @cached_report("statistics", start_end)
     def get_statistics(self, start, end):
+        # STATISTICS_SOURCE: "rollup" (tablas de agregados diarios), "single_pass"
+        # (una sola consulta agrupada sobre citas) o "appointments" (una consulta por sección)
+        source = getattr(settings, "STATISTICS_SOURCE", "rollup")
+        if source == "rollup":
+            return self.get_statistics_from_rollups(start, end)
+        if source == "single_pass":
+            return self.get_statistics_single_pass(start, end)
         return {
             "terapeutas": self.get_rendimiento_terapeutas(start, end),
             "tipos_pago": self.get_tipos_de_pago(start, end),
@@ -154,4 +321,122 @@ class StatisticsService:
             "ingresos": self.get_ingresos_por_dia_semana(start, end),
             "sesiones": self.get_sesiones_por_dia_semana(start, end),
             "tipos_pacientes": self.get_tipos_pacientes(start, end),
-        }
\ No newline at end of file
+        }
+
+    def get_statistics_from_rollups(self, start, end):
+        """
+        Construye el mismo payload que get_statistics leyendo los agregados
+        diarios (statistics_daily_rollups) en lugar de la tabla de citas.
+        """
+        grupos = (
+            AppointmentDailyRollup.objects
+            .filter(day__range=[start, end])
+            .annotate(dia_semana=ExtractWeekDay("day"))
+            .values(
+                "dia_semana",
+                "therapist_id",
+                "therapist__first_name",
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+                "payment_type__name",
+                "appointment_status",
+            )
+            .annotate(sesiones=Sum("sessions"), ingresos=Sum("revenue"))
+            .order_by()
+        )
+        ttlpacientes = (
+            PatientDailyRollup.objects
+            .filter(day__range=[start, end])
+            .aggregate(total=Count("patient", distinct=True))["total"]
+        )
+        return self._construir_estadisticas(grupos, ttlpacientes)
+
+    def get_statistics_single_pass(self, start, end):
+        """
+        Construye el payload de get_statistics con una sola consulta agrupada
+        por (dia_semana, terapeuta, tipo de pago, estado) sobre la tabla de citas.
+        Los pacientes distintos viajan en la misma sentencia como subconsulta escalar.
+        """
+        citas = Appointment.objects.filter(range_filter("appointment_date", start, end)).order_by()
+        pacientes = citas.annotate(
+            total=Func(F("patient"), function="COUNT", template="COUNT(DISTINCT %(expressions)s)", output_field=IntegerField())
+        ).values("total")
+
+        grupos = list(
+            citas
+            .annotate(dia_semana=ExtractWeekDay("appointment_date"))
+            .values(
+                "dia_semana",
+                "therapist_id",
+                "therapist__first_name",
+                "therapist__last_name_paternal",
+                "therapist__last_name_maternal",
+                "payment_type__name",
+                "appointment_status",
+            )
+            .annotate(sesiones=Count("id"), ingresos=Sum("payment"), ttlpacientes=Subquery(pacientes))
+        )
+        ttlpacientes = grupos[0]["ttlpacientes"] if grupos else 0
+        return self._construir_estadisticas(grupos, ttlpacientes)
+
+    def _construir_estadisticas(self, grupos, ttlpacientes):
+        """
+        Deriva todas las secciones del dashboard a partir de filas agrupadas por
+        (dia_semana, terapeuta, tipo de pago, estado) con sus sesiones e ingresos.
+        """
+        terapeutas = {}
+        tipos_pago = {}
+        ingresos_dia = {}
+        sesiones_dia = {}
+        metricas = {"ttlpacientes": ttlpacientes or 0, "ttlsesiones": 0, "ttlganancias": None}
+        tipos_pacientes = {"c": 0, "cc": 0}
+
+        for grupo in grupos:
+            sesiones = grupo["sesiones"] or 0
+            ingresos = grupo["ingresos"]
+
+            therapist_id = grupo["therapist_id"]
+            if therapist_id not in terapeutas:
+                terapeutas[therapist_id] = {
+                    "therapist__id": therapist_id,
+                    "terapeuta": _nombre_terapeuta(
+                        grupo["therapist__last_name_paternal"],
+                        grupo["therapist__last_name_maternal"],
+                        grupo["therapist__first_name"],
+                    ),
+                    "sesiones": 0,
+                    "ingresos": None,
+                }
+            terapeutas[therapist_id]["sesiones"] += sesiones
+            terapeutas[therapist_id]["ingresos"] = _sumar(terapeutas[therapist_id]["ingresos"], ingresos)
+
+            tipo = grupo["payment_type__name"] or "Sin tipo"
+            tipos_pago[tipo] = tipos_pago.get(tipo, 0) + sesiones
+
+            dia = grupo["dia_semana"]
+            ingresos_dia[dia] = _sumar(ingresos_dia.get(dia), ingresos)
+            sesiones_dia[dia] = sesiones_dia.get(dia, 0) + sesiones
+
+            metricas["ttlsesiones"] += sesiones
+            metricas["ttlganancias"] = _sumar(metricas["ttlganancias"], ingresos)
+
+            estado = (grupo["appointment_status"] or "").lower()
+            if estado in tipos_pacientes:
+                tipos_pacientes[estado] += sesiones
+
+        ingresos = {}
+        sesiones = {}
+        for dia in sorted(sesiones_dia):
+            dia_nombre = DIAS_SEMANA.get(dia, f"Día {dia}")
+            ingresos[dia_nombre] = float(ingresos_dia[dia]) if ingresos_dia[dia] else 0.0
+            sesiones[dia_nombre] = sesiones_dia[dia]
+
+        stats = sorted(terapeutas.values(), key=lambda s: (s["therapist__id"] is None, s["therapist__id"] or 0))
+        return {
+            "terapeutas": self._calcular_rendimiento(stats),
+            "tipos_pago": tipos_pago,
+            "metricas": metricas,
+            "ingresos": ingresos,
+            "sesiones": sesiones,
+            "tipos_pacientes": tipos_pacientes,
+        }
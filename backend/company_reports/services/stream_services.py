@@ -0,0 +1,114 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from company_reports.services.reports_services import ReportService
+
+
+class Echo:
+    """Pseudo-archivo para csv.writer: retorna cada línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+class ReportStreamService:
+    """
+    Filas de los reportes en CSV o NDJSON para StreamingHttpResponse.
+
+    - Cada reporte define sus columnas y un generador de filas (dicts). Los
+      generadores de ReportService leen la base por bloques con `.iterator()`,
+      así que las filas salen a medida que se producen y la memoria no crece
+      con el rango pedido.
+    - El streaming no pasa por la caché de reportes: el resultado nunca se
+      arma completo en memoria.
+    - Los reportes de caja usan el detalle del día o, con start_date y
+      end_date, el del rango completo.
+    """
+
+    FORMATS = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson",
+    }
+
+    COLUMNS = {
+        "appointments_per_therapist": [
+            "id", "name", "last_name_paternal", "last_name_maternal", "appointments_count", "percentage",
+        ],
+        "patients_by_therapist": ["therapist_id", "therapist", "patient_id", "patient", "appointments"],
+        "daily_cash": ["id_cita", "payment", "payment_type", "payment_type_name"],
+        "improved_daily_cash": [
+            "tipo", "id", "ticket_number", "monto", "metodo_pago", "paciente", "terapeuta", "fecha_pago",
+        ],
+        "daily_paid_tickets": [
+            "ticket_id", "numero_ticket", "monto", "metodo_pago", "fecha_pago", "descripcion",
+            "cita_id", "fecha_cita", "hora_cita", "consultorio", "tipo_pago_cita",
+            "paciente_nombre", "paciente_documento", "paciente_telefono",
+            "terapeuta_nombre", "terapeuta_licencia",
+        ],
+        "appointments_between_dates": [
+            "appointment_id", "patient_id", "document_number_patient", "patient",
+            "phone1_patient", "appointment_date", "hour",
+        ],
+    }
+
+    def __init__(self, report_service=None):
+        self.report_service = report_service or ReportService()
+
+    def rows(self, report, validated_data):
+        """Generador de filas del reporte (o un dict con 'error')."""
+        service = self.report_service
+        query_date = validated_data.get("date")
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+        has_range = start_date is not None and end_date is not None
+
+        if report == "appointments_per_therapist":
+            # Agregado pequeño (una fila por terapeuta): se calcula completo para obtener porcentajes
+            data = service.get_appointments_count_by_therapist(validated_data)
+            total = data["total_appointments_count"]
+            return (
+                {**item, "percentage": round(item["appointments_count"] / total * 100, 2) if total else 0.0}
+                for item in data["therapists_appointments"]
+            )
+        if report == "patients_by_therapist":
+            return service.iter_patients_by_therapist(query_date)
+        if report == "daily_cash":
+            return service.iter_daily_cash(query_date)
+        if report == "improved_daily_cash":
+            if has_range:
+                return service.iter_payment_details(start_date, end_date)
+            return service.iter_payment_details(query_date, query_date)
+        if report == "daily_paid_tickets":
+            if has_range:
+                return service.iter_paid_ticket_details(start_date, end_date)
+            return service.iter_paid_ticket_details(query_date, query_date)
+        if report == "appointments_between_dates":
+            if not has_range:
+                return {"error": "Parámetros 'start_date' y 'end_date' son requeridos."}
+            return service.iter_appointments_between_dates(start_date, end_date)
+        return {"error": f"Reporte no soportado: {report}"}
+
+    def encode(self, report, output_format, rows):
+        """Codifica las filas en líneas de texto del formato pedido, una por fila."""
+        if output_format == "csv":
+            return self._csv_lines(self.COLUMNS[report], rows)
+        return self._ndjson_lines(rows)
+
+    @staticmethod
+    def _csv_lines(columns, rows):
+        writer = csv.DictWriter(Echo(), fieldnames=columns, extrasaction="ignore")
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
+    @staticmethod
+    def _ndjson_lines(rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+    def filename(self, report, output_format, validated_data):
+        start_date = validated_data.get("start_date")
+        end_date = validated_data.get("end_date")
+        if start_date is not None and end_date is not None:
+            return f"{report}_{start_date}_a_{end_date}.{output_format}"
+        return f"{report}_{validated_data.get('date')}.{output_format}"
@@ -0,0 +1,124 @@
+import threading
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from appointments_status.models import Appointment, Ticket
+from appointments_status.signals import appointments_bulk_changed
+from histories_configurations.models import PaymentType
+from therapists.models import Therapist
+from company_reports.services.date_ranges import local_day
+from company_reports.services.report_cache import ReportCache
+from company_reports.services.statistics_rollup_services import StatisticsRollupService
+
+# Campos de la cita que alimentan los agregados de estadísticas
+ROLLUP_FIELDS = {'appointment_date', 'therapist', 'patient', 'payment_type', 'payment', 'appointment_status'}
+
+_pending = threading.local()
+
+
+def _schedule(rollup_days=(), version_days=()):
+    """
+    Acumula los días afectados y los procesa una sola vez al confirmar la transacción:
+    recalcula los agregados de `rollup_days` e incrementa la versión de caché de
+    `version_days`. Si la transacción se revierte, los días quedan pendientes y se
+    procesan en el siguiente commit (ambas operaciones son seguras de repetir).
+    """
+    rollup_days = {day for day in rollup_days if day is not None}
+    version_days = {day for day in version_days if day is not None}
+    if not rollup_days and not version_days:
+        return
+    if getattr(_pending, 'rollup_days', None) is None:
+        _pending.rollup_days, _pending.version_days = set(), set()
+    _pending.rollup_days.update(rollup_days)
+    _pending.version_days.update(version_days)
+    transaction.on_commit(_flush_pending_days)
+
+
+def _flush_pending_days():
+    rollup_days = getattr(_pending, 'rollup_days', None)
+    version_days = getattr(_pending, 'version_days', None)
+    if not rollup_days and not version_days:
+        return
+    _pending.rollup_days, _pending.version_days = set(), set()
+    if rollup_days:
+        StatisticsRollupService().refresh_days(rollup_days)
+    if version_days:
+        ReportCache.bump_days(version_days)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_day(sender, instance, **kwargs):
+    """Guarda el día original de la cita para detectar reprogramaciones."""
+    instance._report_original_day = local_day(instance.__dict__.get('appointment_date'))
+
+
+@receiver(post_save, sender=Appointment)
+def refresh_reports_on_appointment_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalida el día anterior y el nuevo día de la cita. Los reportes de tickets
+    muestran datos de la cita, así que también se invalidan los días de pago de sus tickets.
+    """
+    new_day = local_day(instance.appointment_date)
+    days = {getattr(instance, '_report_original_day', None), new_day}
+    if not created:
+        days.update(
+            local_day(payment_date)
+            for payment_date in Ticket.objects.filter(appointment_id=instance.pk).values_list('payment_date', flat=True)
+        )
+    refresh_rollups = not update_fields or ROLLUP_FIELDS.intersection(update_fields)
+    _schedule(rollup_days=days if refresh_rollups else (), version_days=days)
+    instance._report_original_day = new_day
+
+
+@receiver(post_delete, sender=Appointment)
+def refresh_reports_on_appointment_delete(sender, instance, **kwargs):
+    days = {getattr(instance, '_report_original_day', None), local_day(instance.appointment_date)}
+    _schedule(rollup_days=days, version_days=days)
+
+
+@receiver(post_init, sender=Ticket)
+def remember_ticket_day(sender, instance, **kwargs):
+    instance._report_original_day = local_day(instance.__dict__.get('payment_date'))
+
+
+@receiver(post_save, sender=Ticket)
+def refresh_reports_on_ticket_save(sender, instance, **kwargs):
+    """Los tickets solo alimentan reportes de caja: invalida su día de pago."""
+    new_day = local_day(instance.payment_date)
+    _schedule(version_days={getattr(instance, '_report_original_day', None), new_day})
+    instance._report_original_day = new_day
+
+
+@receiver(post_delete, sender=Ticket)
+def refresh_reports_on_ticket_delete(sender, instance, **kwargs):
+    _schedule(version_days={getattr(instance, '_report_original_day', None), local_day(instance.payment_date)})
+
+
+@receiver(appointments_bulk_changed)
+def refresh_reports_on_appointments_bulk_change(sender, appointments=(), tickets=(), **kwargs):
+    """Altas y cambios masivos sin post_save por fila: invalida los días de las citas y los de pago de sus tickets."""
+    days = {local_day(appointment.appointment_date) for appointment in appointments}
+    _schedule(
+        rollup_days=days,
+        version_days=days | {local_day(ticket.payment_date) for ticket in tickets},
+    )
+
+
+def _refresh_days_for(**rollup_filters):
+    """Recalcula e invalida los días en los que aparecía un terapeuta o tipo de pago eliminado."""
+    days = StatisticsRollupService().refresh_days_for(**rollup_filters)
+    ReportCache.bump_days(days)
+
+
+@receiver(post_delete, sender=Therapist)
+def refresh_reports_on_therapist_delete(sender, instance, **kwargs):
+    """Las citas quedan sin terapeuta (SET_NULL) sin disparar post_save."""
+    therapist_id = instance.pk
+    transaction.on_commit(lambda: _refresh_days_for(therapist_id=therapist_id))
+
+
+@receiver(post_delete, sender=PaymentType)
+def refresh_reports_on_payment_type_delete(sender, instance, **kwargs):
+    """Las citas quedan sin tipo de pago (SET_NULL) sin disparar post_save."""
+    payment_type_id = instance.pk
+    transaction.on_commit(lambda: _refresh_days_for(payment_type_id=payment_type_id))
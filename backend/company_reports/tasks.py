@@ -0,0 +1,23 @@
+from celery import shared_task
+from company_reports.services.export_artifacts import ExportArtifactStore
+from company_reports.services.report_job_services import ReportJobService
+
+
+@shared_task
+def run_report_job(job_id):
+    """Genera el archivo de un ReportJob (cola 'reports', ver settings/celery.py)."""
+    job = ReportJobService().run(job_id)
+    return job.status if job else None
+
+
+@shared_task
+def evict_report_artifacts():
+    """
+    Desaloja archivos de exportación vencidos o por sobre el presupuesto y borra
+    los trabajos de reporte terminados hace más de REPORT_JOBS_MAX_AGE.
+    Programada cada hora en django_celery_beat (migración 0006_schedule_evict_report_artifacts).
+    """
+    return {
+        "artifacts": ExportArtifactStore().evict(),
+        "jobs": ReportJobService().purge_finished(),
+    }
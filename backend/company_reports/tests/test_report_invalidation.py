@@ -0,0 +1,218 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from appointments_status.models import Appointment, Ticket
+from appointments_status.signals import appointments_bulk_changed
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from company_reports.models.report_data_version import ReportDataVersion
+from company_reports.services.reports_services import ReportService
+from company_reports.services.statistics_rollup_services import StatisticsRollupService
+from company_reports.services.statistics_services import StatisticsService
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+REPORTS_TEST_CACHE = "report-invalidation-tests"
+
+
+def aware(day, hour=0):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+@override_settings(
+    REPORTS_CACHE_ENABLED=True,
+    REPORTS_CACHE_ALIAS=REPORTS_TEST_CACHE,
+    CACHES={
+        **settings.CACHES,
+        REPORTS_TEST_CACHE: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": REPORTS_TEST_CACHE},
+    },
+)
+class ReportInvalidationTests(TestCase):
+    """
+    Cada cambio de citas o tickets debe recalcular los agregados diarios y
+    cambiar la versión de los días afectados (el anterior y el nuevo): el
+    dashboard servido desde agregados y los reportes cacheados de días cerrados
+    tienen que coincidir con un cálculo directo sobre las citas.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        # Solo días cerrados: son los únicos que se cachean
+        cls.start = timezone.localdate() - timedelta(days=30)
+        cls.end = cls.start + timedelta(days=19)
+        SyntheticDataset(appointments=400, patients=60, therapists=4, days=20, start=cls.start).create()
+        StatisticsRollupService().rebuild(cls.start, cls.end)
+        cls.day = cls.start + timedelta(days=5)
+        # Otro día de la semana: los agregados por día de la semana también deben moverse
+        cls.other_day = cls.start + timedelta(days=13)
+
+    def setUp(self):
+        caches[REPORTS_TEST_CACHE].clear()
+
+    # -- comprobaciones ------------------------------------------------------
+
+    def statistics(self, source, cached=True):
+        with override_settings(STATISTICS_SOURCE=source, REPORTS_CACHE_ENABLED=cached):
+            statistics = StatisticsService().get_statistics(self.start, self.end)
+        # El motor "appointments" ubica primero las citas sin terapeuta: se compara sin importar el orden
+        return {
+            **statistics,
+            "terapeutas": sorted(statistics["terapeutas"], key=lambda row: (row["id"] is None, row["id"] or 0)),
+        }
+
+    def assertStatisticsFresh(self):
+        """El dashboard desde agregados (y cacheado) coincide con el cálculo directo sobre citas."""
+        self.assertEqual(self.statistics("rollup"), self.statistics("appointments", cached=False))
+
+    def cash_report(self, day, cached=True):
+        with override_settings(REPORTS_CACHE_ENABLED=cached):
+            return ReportService().get_daily_paid_tickets({"date": day})
+
+    def assertCashFresh(self, *days):
+        for day in days:
+            self.assertEqual(self.cash_report(day), self.cash_report(day, cached=False))
+
+    def versions(self, *days):
+        found = dict(ReportDataVersion.objects.filter(day__in=days).values_list("day", "version"))
+        return [found.get(day, 0) for day in days]
+
+    def prime(self, *days):
+        """Llena la caché con los valores actuales y retorna las versiones de `days`."""
+        self.statistics("rollup")
+        for day in days:
+            self.cash_report(day)
+        return self.versions(*days)
+
+    def assertBumped(self, before, *days):
+        after = self.versions(*days)
+        for day, old, new in zip(days, before, after):
+            self.assertGreater(new, old, f"la versión de {day} no cambió")
+
+    def appointment_on(self, day):
+        return Appointment.objects.filter(
+            appointment_date=aware(day), therapist__isnull=False, payment__isnull=False,
+        ).order_by("id").first()
+
+    # -- citas ---------------------------------------------------------------
+
+    def test_created_appointment(self):
+        template = self.appointment_on(self.day)
+        before = self.prime(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                patient_id=template.patient_id,
+                therapist_id=template.therapist_id,
+                payment_type_id=template.payment_type_id,
+                appointment_date=aware(self.day),
+                hour=time(7),
+                payment=Decimal("75.00"),
+                appointment_status="COMPLETADO",
+            )
+
+        self.assertBumped(before, self.day)
+        self.assertStatisticsFresh()
+
+    def test_updated_appointment(self):
+        appointment = self.appointment_on(self.day)
+        before = self.prime(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.payment += Decimal("33.00")
+            appointment.appointment_status = "CANCELADO"
+            appointment.save()
+
+        self.assertBumped(before, self.day)
+        self.assertStatisticsFresh()
+        self.assertCashFresh(self.day)
+
+    def test_rescheduled_appointment_invalidates_old_and_new_day(self):
+        appointment = self.appointment_on(self.day)
+        before = self.prime(self.day, self.other_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = aware(self.other_day)
+            appointment.save(update_fields=["appointment_date"])
+
+        self.assertBumped(before, self.day, self.other_day)
+        self.assertStatisticsFresh()
+        self.assertCashFresh(self.day, self.other_day)
+
+    def test_deleted_appointment(self):
+        appointment = self.appointment_on(self.day)
+        before = self.prime(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+
+        self.assertBumped(before, self.day)
+        self.assertStatisticsFresh()
+        self.assertCashFresh(self.day)
+
+    def test_bulk_changed_appointments(self):
+        template = self.appointment_on(self.day)
+        before = self.prime(self.day, self.other_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointments = Appointment.objects.bulk_create([
+                Appointment(
+                    patient_id=template.patient_id,
+                    therapist_id=template.therapist_id,
+                    payment_type_id=template.payment_type_id,
+                    appointment_date=aware(day),
+                    hour=time(7),
+                    payment=Decimal("90.00"),
+                    appointment_status="COMPLETADO",
+                )
+                for day in (self.day, self.other_day)
+            ])
+            appointments_bulk_changed.send(sender=Appointment, appointments=appointments, tickets=[])
+
+        self.assertBumped(before, self.day, self.other_day)
+        self.assertStatisticsFresh()
+
+    # -- tickets -------------------------------------------------------------
+
+    def paid_ticket_on(self, day):
+        return Ticket.objects.filter(
+            payment_date__date=day, status="paid", is_active=True,
+        ).order_by("id").first()
+
+    def test_updated_ticket(self):
+        ticket = self.paid_ticket_on(self.day)
+        before = self.prime(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.amount += Decimal("12.50")
+            ticket.save()
+
+        self.assertBumped(before, self.day)
+        self.assertCashFresh(self.day)
+
+    def test_ticket_paid_on_another_day_invalidates_both_days(self):
+        ticket = self.paid_ticket_on(self.day)
+        before = self.prime(self.day, self.other_day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.payment_date = aware(self.other_day, hour=10)
+            ticket.save(update_fields=["payment_date"])
+
+        self.assertBumped(before, self.day, self.other_day)
+        self.assertCashFresh(self.day, self.other_day)
+
+    def test_deleted_ticket(self):
+        ticket = self.paid_ticket_on(self.day)
+        before = self.prime(self.day)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+
+        self.assertBumped(before, self.day)
+        self.assertCashFresh(self.day)
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+from kombu.exceptions import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from company_reports.models.report_job import ReportJob
+from company_reports.services.query_budget import QueryBudgetExceeded
+from company_reports.services.report_job_services import ReportJobService
+from company_reports.tasks import run_report_job
+from company_reports.views import reports_views
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+from settings import celery_app
+
+
+class EagerReportJobsMixin:
+    """
+    Trabajos ejecutados en el mismo proceso (CELERY_TASK_ALWAYS_EAGER) con
+    MEDIA_ROOT temporal, sobre las rutas de company_reports.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        eager = override_settings(
+            CELERY_TASK_ALWAYS_EAGER=True, MEDIA_ROOT=media_root, ROOT_URLCONF="company_reports.urls"
+        )
+        eager.enable()
+        cls.addClassCleanup(eager.disable)
+        # Celery copia la configuración de Django al iniciarse: se cambia también en la app
+        previous = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        cls.addClassCleanup(setattr, celery_app.conf, "task_always_eager", previous)
+
+    def post_job(self, report, params=None):
+        return self.client.post(
+            reverse("report_job_create"),
+            {"report": report, "params": params or {}},
+            content_type="application/json",
+        )
+
+
+class ReportJobAPITests(EagerReportJobsMixin, TestCase):
+
+    def submit(self, report, params=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_job(report, params)
+        self.assertEqual(response.status_code, 202, response.content)
+        return response
+
+    def test_submitted_job_finishes_and_downloads(self):
+        response = self.submit("excel_cierre_mes", {"date": "2024-03-15"})
+        self.assertEqual(response["Location"], reverse("report_job_detail", args=[response.json()["id"]]))
+
+        detail = self.client.get(response["Location"]).json()
+        self.assertEqual(detail["status"], ReportJob.STATUS_DONE)
+        self.assertIsNone(detail["error"])
+        self.assertTrue(detail["download_url"])
+
+        download = self.client.get(reverse("report_job_download", args=[detail["id"]]))
+        self.assertEqual(download.status_code, 200)
+        self.assertIn("attachment;", download["Content-Disposition"])
+        self.assertTrue(b"".join(download.streaming_content))
+
+    def test_failing_report_marks_job_failed(self):
+        with patch.object(ReportJobService, "_export_excel_cierre_mes", side_effect=RuntimeError("sin datos")):
+            response = self.submit("excel_cierre_mes")
+
+        detail = self.client.get(response["Location"]).json()
+        self.assertEqual(detail["status"], ReportJob.STATUS_FAILED)
+        self.assertEqual(detail["error"], "sin datos")
+        self.assertIsNone(detail["download_url"])
+
+        download = self.client.get(reverse("report_job_download", args=[detail["id"]]))
+        self.assertEqual(download.status_code, 409)
+        self.assertEqual(download.json()["status"], ReportJob.STATUS_FAILED)
+
+    def test_unknown_report_is_rejected(self):
+        response = self.post_job("excel_inexistente")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_missing_required_params_are_rejected_before_queueing(self):
+        for report in ReportJobService.REQUIRED_PARAMS:
+            with self.subTest(report=report):
+                response = self.post_job(report, {"start_date": "2024-03-01"})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("son requeridos", response.json()["error"])
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_broker_failure_on_commit_marks_job_failed(self):
+        with patch.object(run_report_job, "delay", side_effect=OperationalError("broker caído")):
+            response = self.submit("excel_cierre_mes")
+
+        job = ReportJob.objects.get(pk=response.json()["id"])
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertIn("broker caído", job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_purge_finished_removes_expired_jobs_and_files(self):
+        expired = ReportJob.objects.get(pk=self.submit("excel_cierre_mes").json()["id"])
+        recent = ReportJob.objects.get(pk=self.submit("excel_cierre_mes").json()["id"])
+        ReportJob.objects.filter(pk=expired.pk).update(finished_at=timezone.now() - timedelta(days=8))
+        path = expired.file.path
+
+        result = ReportJobService().purge_finished(max_age=7 * 86400)
+
+        self.assertEqual(result["removed"], 1)
+        self.assertGreater(result["freed_bytes"], 0)
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+        self.assertEqual(list(ReportJob.objects.values_list("pk", flat=True)), [recent.pk])
+        self.assertTrue(os.path.exists(recent.file.path))
+
+
+class ReportJobBrokerDownTests(EagerReportJobsMixin, TransactionTestCase):
+    """Sin transacción abierta el envío ocurre en la petición: el broker caído se responde con 503."""
+
+    def test_job_api_returns_503(self):
+        with patch.object(run_report_job, "delay", side_effect=OperationalError("broker caído")):
+            response = self.post_job("excel_cierre_mes")
+
+        self.assertEqual(response.status_code, 503)
+        job = ReportJob.objects.get()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertIn("broker caído", job.error)
+
+    def test_over_budget_export_returns_503(self):
+        over_budget = QueryBudgetExceeded("excel_citas", 5)
+        with patch.object(reports_views.excel_export_service, "export_appointments_between_dates",
+                          side_effect=over_budget), \
+                patch.object(run_report_job, "delay", side_effect=OperationalError("broker caído")):
+            response = self.client.get(
+                reverse("exportar_excel_citas"), {"start_date": "2024-03-01", "end_date": "2024-03-31"}
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("No se pudo encolar", response.json()["error"])
+        self.assertEqual(ReportJob.objects.get().status, ReportJob.STATUS_FAILED)
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from company_reports.benchmarks.query_plans import query_plans, report_cases
+from company_reports.benchmarks.synthetic import SyntheticDataset
+from histories_configurations.tests.unmanaged import create_unmanaged_tables
+
+
+class ReportQueryPlanTests(TestCase):
+    """
+    Falla si alguna consulta de los reportes recorre completas las tablas de
+    citas o tickets. Se carga un año de citas sintéticas para que el
+    optimizador tenga estadísticas y los reportes consulten un rango selectivo.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate()
+        SyntheticDataset(appointments=3000, patients=300, therapists=8, days=365,
+                         start=cls.day - timedelta(days=364)).create()
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute("ANALYZE TABLE appointments, tickets")
+            elif connection.vendor == "postgresql":
+                cursor.execute("ANALYZE appointments")
+                cursor.execute("ANALYZE tickets")
+            else:
+                cursor.execute("ANALYZE")
+
+    def test_report_queries_use_indexes(self):
+        for name, run in report_cases(self.day):
+            with self.subTest(report=name):
+                for number, plan, scanned in query_plans(run):
+                    self.assertFalse(
+                        scanned,
+                        f"{name} #{number} recorre completas: {', '.join(sorted(scanned))}\n" + "\n".join(plan),
+                    )
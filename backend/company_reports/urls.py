@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from company_reports.views.statistics_views import StatisticsViewSet, dashboard_view, GetMetricsView
+from company_reports.views.statistics_views import StatisticsViewSet, dashboard_view, GetMetricsView, TherapistPerformanceView, PatientCohortView, ReportCacheStatsView, PDFRenderStatsView
 from company_reports.views.company_views import CompanyDataViewSet
+from company_reports.views.report_jobs_views import ReportJobCreateView, ReportJobDetailView, ReportJobDownloadView
 #from company_reports.views.emails_views import dashboard_email, SendVerifyCodeAPIView, VerifyCodeAPIView
 from company_reports.views import reports_views as views
 from django.conf.urls.static import static
@@ -20,12 +21,21 @@ api_urlpatterns = [
 
 reports_urlpatterns = [
     path('reports/statistics/', GetMetricsView.as_view(), name='statistics_metrics'),
+    path('reports/therapist-performance/', TherapistPerformanceView.as_view(), name='therapist_performance'),
+    path('reports/patient-cohorts/', PatientCohortView.as_view(), name='patient_cohorts'),
+    path('reports/cache-stats/', ReportCacheStatsView.as_view(), name='report_cache_stats'),
+    path('reports/pdf-stats/', PDFRenderStatsView.as_view(), name='pdf_render_stats'),
     path('reports/appointments-per-therapist/', views.get_number_appointments_per_therapist, name='appointments_per_therapist'),
     path('reports/patients-by-therapist/', views.get_patients_by_therapist, name='patients_by_therapist'),
     path('reports/daily-cash/', views.get_daily_cash, name='daily_cash'),
     path('reports/improved-daily-cash/', views.get_improved_daily_cash, name='improved_daily_cash'),
     path('reports/daily-paid-tickets/', views.get_daily_paid_tickets, name='daily_paid_tickets'),
     path('reports/appointments-between-dates/', views.get_appointments_between_dates, name='appointments_between_dates'),
+    path('reports/batch/', views.get_reports_batch, name='reports_batch'),
+    path('reports/room-occupancy/', views.get_room_occupancy, name='room_occupancy'),
+    path('reports/jobs/', ReportJobCreateView.as_view(), name='report_job_create'),
+    path('reports/jobs/<uuid:job_id>/', ReportJobDetailView.as_view(), name='report_job_detail'),
+    path('reports/jobs/<uuid:job_id>/download/', ReportJobDownloadView.as_view(), name='report_job_download'),
 ]
 
 export_urlpatterns = [
@@ -37,6 +47,8 @@ export_urlpatterns = [
     path('exports/excel/citas-rango/', views.exportar_excel_citas, name='exportar_excel_citas'),
     path('exports/excel/caja-chica-mejorada/', views.exportar_excel_caja_chica_mejorada, name='exportar_excel_caja_chica_mejorada'),
     path('exports/excel/tickets-pagados/', views.exportar_excel_tickets_pagados, name='exportar_excel_tickets_pagados'),
+    path('exports/excel/ocupacion-consultorios/', views.exportar_excel_ocupacion_consultorios, name='exportar_excel_ocupacion_consultorios'),
+    path('exports/excel/cierre-mes/', views.exportar_excel_cierre_mes, name='exportar_excel_cierre_mes'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 '''
 views_urlpatterns = [
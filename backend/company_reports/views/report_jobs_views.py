@@ -0,0 +1,59 @@
+import mimetypes
+import os
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from company_reports.models.report_job import ReportJob
+from company_reports.serialiazers.report_job_serializers import ReportJobCreateSerializer, ReportJobSerializer
+from company_reports.services.export_artifacts import protected_file_response
+from company_reports.services.report_job_services import ReportJobService, ReportQueueUnavailable
+
+
+class ReportJobCreateView(APIView):
+    """
+    Encola la exportación de un reporte.
+    POST /reports/jobs/ {"report": "excel_citas", "params": {"start_date": "...", "end_date": "..."}}
+    """
+
+    def post(self, request):
+        serializer = ReportJobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = ReportJobService().submit(serializer.validated_data["report"], serializer.validated_data["params"])
+        except ReportQueueUnavailable as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if isinstance(job, dict) and "error" in job:
+            return Response(job, status=status.HTTP_400_BAD_REQUEST)
+
+        # Con CELERY_TASK_ALWAYS_EAGER el trabajo ya terminó al llegar aquí
+        job.refresh_from_db()
+        response = Response(ReportJobSerializer(job, context={"request": request}).data, status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse("report_job_detail", args=[job.pk])
+        return response
+
+
+class ReportJobDetailView(APIView):
+    """Estado de un trabajo de reporte."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        return Response(ReportJobSerializer(job, context={"request": request}).data)
+
+
+class ReportJobDownloadView(APIView):
+    """Descarga el archivo de un trabajo terminado."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        if job.status != ReportJob.STATUS_DONE or not job.file:
+            return Response(
+                {"error": "El reporte aún no está disponible.", "status": job.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+        filename = os.path.basename(job.file.name)
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return protected_file_response(job.file.path, content_type, f'attachment; filename="{filename}"')
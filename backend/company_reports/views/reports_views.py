@@ -1,23 +1,62 @@
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from company_reports.services.reports_services import ReportService
+from company_reports.services.pdf_services import PDFReportService, PDFRenderBusy, PDFRenderError
+from company_reports.services.export_services import (
+    AppointmentExcelExportService,
+    DailyCashExcelExportService,
+    MonthCloseExcelExportService,
+    RoomOccupancyExcelExportService,
+)
+from company_reports.services.occupancy_services import RoomOccupancyService
+from company_reports.services.stream_services import ReportStreamService
+from company_reports.services.report_batch_services import ReportBatchService
+from company_reports.services.export_artifacts import export_artifact
+from company_reports.services.query_budget import QueryBudgetExceeded, query_budget
+from company_reports.services.report_job_services import ReportJobService, ReportQueueUnavailable
+from company_reports.services.report_watermark import (
+    conditional_report,
+    date_param,
+    date_or_range_param,
+    month_param,
+    range_param,
+)
 from company_reports.serialiazers.reports_serializers import (
     DateParameterSerializer,
+    CashRangeParameterSerializer,
+    OutputFormatSerializer,
+    ReportBatchParameterSerializer,
     TherapistAppointmentSerializer,
     PatientByTherapistSerializer,
     DailyCashSerializer,
     AppointmentRangeSerializer,
-    PDFContextSerializer,
     ImprovedDailyCashSerializer,
     DailyPaidTicketsSerializer,
+    ImprovedCashRangeSerializer,
+    PaidTicketsRangeSerializer,
+    RoomOccupancySerializer,
 )
+from company_reports.serialiazers.report_job_serializers import ReportJobSerializer
+from architect.middleware.query_metrics import serializer_timer
 from django.shortcuts import render
-# from django_xhtml2pdf.utils import pdf_decorator
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-import xlsxwriter
-import io
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 report_service = ReportService()
+excel_export_service = AppointmentExcelExportService()
+daily_cash_export_service = DailyCashExcelExportService()
+month_close_export_service = MonthCloseExcelExportService()
+pdf_report_service = PDFReportService(report_service)
+report_stream_service = ReportStreamService(report_service)
+report_batch_service = ReportBatchService()
+room_occupancy_service = RoomOccupancyService()
+room_occupancy_export_service = RoomOccupancyExcelExportService()
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
 # --------- Helpers ---------
@@ -48,6 +87,97 @@ def _merge_params(request):
     return merged
 
 
+def _stream_report(report, data_in, validated_data):
+    """
+    Respuesta en streaming (CSV o NDJSON) si se pidió `format=csv|ndjson`.
+    Retorna None cuando el formato es JSON (por defecto) para seguir con la respuesta normal.
+    """
+    format_serializer = OutputFormatSerializer(data=data_in)
+    if not format_serializer.is_valid():
+        return JsonResponse(format_serializer.errors, status=400)
+    output_format = format_serializer.validated_data["format"]
+    if output_format == "json":
+        return None
+
+    rows = report_stream_service.rows(report, validated_data)
+    if isinstance(rows, dict) and "error" in rows:
+        return JsonResponse(rows, status=400)
+
+    response = StreamingHttpResponse(
+        report_stream_service.encode(report, output_format, rows),
+        content_type=ReportStreamService.FORMATS[output_format],
+    )
+    filename = report_stream_service.filename(report, output_format, validated_data)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _occupancy_range(request):
+    """Valida start_date/end_date del reporte de ocupación: retorna (rango, None) o (None, respuesta de error)."""
+    serializer = DateParameterSerializer(data=_merge_params(request))
+    if not serializer.is_valid():
+        return None, JsonResponse(serializer.errors, status=400)
+    start_date = serializer.validated_data.get("start_date")
+    end_date = serializer.validated_data.get("end_date")
+    if not start_date or not end_date:
+        return None, JsonResponse({"error": "Parámetros 'start_date' y 'end_date' son requeridos."}, status=400)
+    return (start_date, end_date), None
+
+
+def _queue_export(request, report, data_in, error):
+    """
+    Encola como trabajo en segundo plano una exportación que superó su
+    presupuesto de consultas y responde 202 con el trabajo (igual que POST /reports/jobs/).
+    Responde 503 si tampoco se puede encolar.
+    """
+    try:
+        job = ReportJobService().submit(report, data_in)
+    except ReportQueueUnavailable as exc:
+        return JsonResponse({"error": f"{error} {exc}"}, status=503)
+    if isinstance(job, dict) and "error" in job:
+        return JsonResponse({"error": str(error)}, status=503)
+    job.refresh_from_db()
+    response = JsonResponse(
+        {
+            "detail": (
+                f"El reporte superó el tiempo máximo de consulta ({error.seconds} s); "
+                "el archivo se generará en segundo plano."
+            ),
+            "job": ReportJobSerializer(job, context={"request": request}).data,
+        },
+        status=202,
+    )
+    response["Location"] = reverse("report_job_detail", args=[job.pk])
+    return response
+
+
+def _report_payload(report, data, query_date=None):
+    """JSON de un reporte diario con el serializer de respuesta de su endpoint."""
+    with serializer_timer():
+        return _serialize_report(report, data, query_date)
+
+
+def _serialize_report(report, data, query_date):
+    if report == "appointments_per_therapist":
+        response_serializer = TherapistAppointmentSerializer(
+            data["therapists_appointments"],
+            many=True,
+            context={"total_appointments": data["total_appointments_count"]},
+        )
+        return {
+            "date": str(query_date),
+            "therapists_appointments": response_serializer.data,
+            "total_appointments_count": data["total_appointments_count"],
+        }
+    if report == "patients_by_therapist":
+        return PatientByTherapistSerializer(data, many=True).data
+    if report == "daily_cash":
+        return DailyCashSerializer(data, many=True).data
+    if report == "improved_daily_cash":
+        return ImprovedDailyCashSerializer(data).data
+    return DailyPaidTicketsSerializer(data).data
+
+
 # ===========================
 #   JSON API
 # ===========================
@@ -67,24 +197,18 @@ class ReportAPIView:
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("appointments_per_therapist", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
         # Obtener datos usando parámetros validados
         data = report_service.get_appointments_count_by_therapist(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
         # Serializar respuesta (con porcentaje)
-        response_serializer = TherapistAppointmentSerializer(
-            data["therapists_appointments"],
-            many=True,
-            context={"total_appointments": data["total_appointments_count"]},
-        )
-
         return JsonResponse(
-            {
-                "date": str(serializer.validated_data.get("date")),
-                "therapists_appointments": response_serializer.data,
-                "total_appointments_count": data["total_appointments_count"],
-            }
+            _report_payload("appointments_per_therapist", data, serializer.validated_data.get("date"))
         )
 
     @staticmethod
@@ -95,12 +219,15 @@ class ReportAPIView:
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("patients_by_therapist", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
         data = report_service.get_patients_by_therapist(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        response_serializer = PatientByTherapistSerializer(data, many=True)
-        return JsonResponse(response_serializer.data, safe=False)
+        return JsonResponse(_report_payload("patients_by_therapist", data), safe=False)
 
     @staticmethod
     def get_daily_cash(request):
@@ -110,42 +237,67 @@ class ReportAPIView:
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("daily_cash", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
         data = report_service.get_daily_cash(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        response_serializer = DailyCashSerializer(data, many=True)
-        return JsonResponse(response_serializer.data, safe=False)
+        return JsonResponse(_report_payload("daily_cash", data), safe=False)
 
     @staticmethod
     def get_improved_daily_cash(request):
-        """Devuelve JSON con el reporte mejorado de caja chica."""
+        """
+        Devuelve JSON con el reporte mejorado de caja chica.
+        Con start_date y end_date retorna totales por día y método del rango;
+        el detalle se incluye paginado solo con include_details=true (page, page_size).
+        """
         data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
+        serializer = CashRangeParameterSerializer(data=data_in)
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("improved_daily_cash", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
+        if serializer.is_range():
+            data = report_service.get_improved_cash_between_dates(serializer.range_params())
+            return JsonResponse(ImprovedCashRangeSerializer(data).data, safe=False)
+
         data = report_service.get_improved_daily_cash(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        response_serializer = ImprovedDailyCashSerializer(data)
-        return JsonResponse(response_serializer.data, safe=False)
+        return JsonResponse(_report_payload("improved_daily_cash", data), safe=False)
 
     @staticmethod
     def get_daily_paid_tickets(request):
-        """Devuelve JSON con el reporte diario de todos los tickets PAGADOS."""
+        """
+        Devuelve JSON con el reporte diario de todos los tickets PAGADOS.
+        Con start_date y end_date retorna totales por día y método del rango;
+        el detalle se incluye paginado solo con include_details=true (page, page_size).
+        """
         data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
+        serializer = CashRangeParameterSerializer(data=data_in)
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("daily_paid_tickets", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
+        if serializer.is_range():
+            data = report_service.get_paid_tickets_between_dates(serializer.range_params())
+            return JsonResponse(PaidTicketsRangeSerializer(data).data, safe=False)
+
         data = report_service.get_daily_paid_tickets(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        response_serializer = DailyPaidTicketsSerializer(data)
-        return JsonResponse(response_serializer.data, safe=False)
+        return JsonResponse(_report_payload("daily_paid_tickets", data), safe=False)
 
     @staticmethod
     def get_appointments_between_dates(request):
@@ -155,6 +307,10 @@ class ReportAPIView:
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
+        streamed = _stream_report("appointments_between_dates", data_in, serializer.validated_data)
+        if streamed is not None:
+            return streamed
+
         data = report_service.get_appointments_between_dates(serializer.validated_data)
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
@@ -162,6 +318,43 @@ class ReportAPIView:
         response_serializer = AppointmentRangeSerializer(data, many=True)
         return JsonResponse(response_serializer.data, safe=False)
 
+    @staticmethod
+    def get_reports_batch(request):
+        """
+        Devuelve en una sola respuesta varios reportes diarios de la misma fecha.
+        GET  /...?date=YYYY-MM-DD&reports=daily_cash,improved_daily_cash
+        POST /... con body {"date": "YYYY-MM-DD", "reports": ["daily_cash", ...]}
+        Las citas y los tickets del día se leen una sola vez para todos los reportes.
+        """
+        data_in = _merge_params(request)
+        serializer = ReportBatchParameterSerializer(data=data_in)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        query_date = serializer.validated_data.get("date")
+        reports = serializer.validated_data["reports"]
+        results = report_batch_service.get_reports(query_date, reports)
+        return JsonResponse({
+            "date": str(query_date),
+            "reports": {
+                report: _report_payload(report, data, query_date)
+                for report, data in results.items()
+            },
+        })
+
+    @staticmethod
+    def get_room_occupancy(request):
+        """
+        Devuelve la ocupación de consultorios por día de la semana, hora y consultorio
+        entre dos fechas (minutos ocupados, tasa de ocupación y citas iniciadas).
+        """
+        day_range, error = _occupancy_range(request)
+        if error is not None:
+            return error
+
+        data = room_occupancy_service.get_room_occupancy(*day_range)
+        return JsonResponse(RoomOccupancySerializer(data).data)
+
 
 # ===========================
 #   PDF
@@ -170,113 +363,46 @@ class PDFExportView:
     """Responsable exclusivamente de la generación de PDFs."""
 
     @staticmethod
-    # @pdf_decorator(pdfname="citas_terapeuta.pdf")
-    def pdf_citas_terapeuta(request):
+    def _render(request, report):
         data_in = _merge_params(request)
         serializer = DateParameterSerializer(data=data_in)
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
-        data = report_service.get_appointments_count_by_therapist(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
+        context = pdf_report_service.build_context(report, serializer.validated_data)
+        if "error" in context:
+            return JsonResponse(context, status=400)
 
-        context_data = {
-            "date": serializer.validated_data.get("date"),
-            "data": data,
-            "title": "Citas por Terapeuta",
-        }
-        context_serializer = PDFContextSerializer(context_data)
-        context = context_serializer.data
-        return render(request, "pdf_templates/citas_terapeuta.html", context)
+        try:
+            content = pdf_report_service.render_pdf(report, context)
+        except PDFRenderBusy as e:
+            return JsonResponse({"error": str(e)}, status=503)
+        except PDFRenderError as e:
+            return JsonResponse({"error": str(e)}, status=500)
 
-    @staticmethod
-    # @pdf_decorator(pdfname="pacientes_por_terapeuta.pdf")
-    def pdf_pacientes_terapeuta(request):
-        data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
-        if not serializer.is_valid():
-            return JsonResponse(serializer.errors, status=400)
+        response = HttpResponse(content, content_type="application/pdf")
+        response["Content-Disposition"] = f'inline; filename="{pdf_report_service.filename(report)}"'
+        return response
 
-        data = report_service.get_patients_by_therapist(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
+    @staticmethod
+    def pdf_citas_terapeuta(request):
+        return PDFExportView._render(request, "citas_terapeuta")
 
-        context_data = {
-            "date": serializer.validated_data.get("date"),
-            "data": data,
-            "title": "Pacientes por Terapeuta",
-        }
-        context_serializer = PDFContextSerializer(context_data)
-        context = context_serializer.data
-        return render(request, "pdf_templates/pacientes_terapeuta.html", context)
+    @staticmethod
+    def pdf_pacientes_terapeuta(request):
+        return PDFExportView._render(request, "pacientes_terapeuta")
 
     @staticmethod
-    # @pdf_decorator(pdfname="resumen_caja.pdf")
     def pdf_resumen_caja(request):
-        data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
-        if not serializer.is_valid():
-            return JsonResponse(serializer.errors, status=400)
-
-        data = report_service.get_daily_cash(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
-
-        # Calcular total correcto (sumando 'payment')
-        total = sum(float(item.get("payment", 0) or 0) for item in data) if data else 0.0
-
-        context_data = {
-            "date": serializer.validated_data.get("date"),
-            "data": data,
-            "total": total,
-            "title": "Resumen de Caja Diaria",
-        }
-        context_serializer = PDFContextSerializer(context_data)
-        context = context_serializer.data
-        return render(request, "pdf_templates/resumen_caja.html", context)
+        return PDFExportView._render(request, "resumen_caja")
 
     @staticmethod
-    # @pdf_decorator(pdfname="caja_chica_mejorada.pdf")
     def pdf_caja_chica_mejorada(request):
-        data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
-        if not serializer.is_valid():
-            return JsonResponse(serializer.errors, status=400)
-
-        data = report_service.get_improved_daily_cash(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
-
-        context_data = {
-            "date": serializer.validated_data.get("date"),
-            "data": data,
-            "title": "Reporte Mejorado de Caja Chica",
-        }
-        context_serializer = PDFContextSerializer(context_data)
-        context = context_serializer.data
-        return render(request, "pdf_templates/caja_chica_mejorada.html", context)
+        return PDFExportView._render(request, "caja_chica_mejorada")
 
     @staticmethod
-    # @pdf_decorator(pdfname="tickets_pagados.pdf")
     def pdf_tickets_pagados(request):
-        data_in = _merge_params(request)
-        serializer = DateParameterSerializer(data=data_in)
-        if not serializer.is_valid():
-            return JsonResponse(serializer.errors, status=400)
-
-        data = report_service.get_daily_paid_tickets(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
-
-        context_data = {
-            "date": serializer.validated_data.get("date"),
-            "data": data,
-            "title": "Reporte Diario de Tickets Pagados",
-        }
-        context_serializer = PDFContextSerializer(context_data)
-        context = context_serializer.data
-        return render(request, "pdf_templates/tickets_pagados.html", context)
+        return PDFExportView._render(request, "tickets_pagados")
 
 
 # ===========================
@@ -287,71 +413,32 @@ class ExcelExportView:
 
     @staticmethod
     def exportar_excel_citas(request):
+        """
+        Exporta a Excel las citas entre dos fechas.
+        El libro se escribe fila por fila en un archivo temporal (memoria constante)
+        y se entrega por streaming con FileResponse.
+        """
         data_in = _merge_params(request)
         serializer = DateParameterSerializer(data=data_in)
         if not serializer.is_valid():
             return JsonResponse(serializer.errors, status=400)
 
-        data = report_service.get_appointments_between_dates(serializer.validated_data)
-        if isinstance(data, dict) and "error" in data:
-            return JsonResponse(data, status=400)
-
-        # Crear archivo Excel
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
-        worksheet = workbook.add_worksheet("Citas")
-
-        # Formato encabezado
-        header_format = workbook.add_format(
-            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
-        )
-
-        # Encabezados alineados con AppointmentRangeSerializer
-        headers = [
-            "ID Paciente",
-            "DNI/Documento",
-            "Paciente",
-            "Teléfono",
-            "Fecha",
-            "Hora",
-        ]
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header, header_format)
-
-        # Escribir datos
-        for row, appointment in enumerate(data, start=1):
-            worksheet.write(row, 0, appointment.get("patient_id", ""))
-            worksheet.write(row, 1, appointment.get("document_number_patient", ""))
-            worksheet.write(row, 2, appointment.get("patient", ""))
-            worksheet.write(row, 3, appointment.get("phone1_patient", ""))
-            worksheet.write(row, 4, appointment.get("appointment_date", ""))
-            worksheet.write(row, 5, appointment.get("hour", ""))
-
-        # Anchos de columna
-        worksheet.set_column("A:A", 12)
-        worksheet.set_column("B:B", 15)
-        worksheet.set_column("C:C", 40)
-        worksheet.set_column("D:D", 15)
-        worksheet.set_column("E:E", 12)
-        worksheet.set_column("F:F", 10)
-
-        workbook.close()
-        output.seek(0)
-
-        # Nombre de archivo (si hay rango en query)
         start_date = serializer.validated_data.get("start_date")
         end_date = serializer.validated_data.get("end_date")
-        if start_date and end_date:
-            filename = f"citas_{start_date}_a_{end_date}.xlsx"
-        else:
-            filename = "citas.xlsx"
-
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        if not start_date or not end_date:
+            return JsonResponse({"error": "Parámetros 'start_date' y 'end_date' son requeridos."}, status=400)
+
+        try:
+            with query_budget("excel_citas"):
+                output = excel_export_service.export_appointments_between_dates(start_date, end_date)
+        except QueryBudgetExceeded as e:
+            return _queue_export(request, "excel_citas", data_in, e)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"citas_{start_date}_a_{end_date}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
         )
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
 
     @staticmethod
     def exportar_excel_caja_chica_mejorada(request):
@@ -365,69 +452,14 @@ class ExcelExportView:
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        # Crear archivo Excel
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
-        worksheet = workbook.add_worksheet("Caja Chica")
-
-        # Formato encabezado
-        header_format = workbook.add_format(
-            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
-        )
-
-        # Encabezados para el reporte de caja chica
-        headers = [
-            "Tipo",
-            "ID",
-            "Número Ticket",
-            "Monto",
-            "Método Pago",
-            "Paciente",
-            "Terapeuta",
-            "Fecha Pago",
-        ]
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header, header_format)
-
-        # Escribir datos
-        for row, payment in enumerate(data.get("pagos_detallados", []), start=1):
-            worksheet.write(row, 0, payment.get("tipo", ""))
-            worksheet.write(row, 1, payment.get("id", ""))
-            worksheet.write(row, 2, payment.get("ticket_number", ""))
-            worksheet.write(row, 3, payment.get("monto", 0))
-            worksheet.write(row, 4, payment.get("metodo_pago", ""))
-            worksheet.write(row, 5, payment.get("paciente", ""))
-            worksheet.write(row, 6, payment.get("terapeuta", ""))
-            worksheet.write(row, 7, payment.get("fecha_pago", ""))
-
-        # Anchos de columna
-        worksheet.set_column("A:A", 10)
-        worksheet.set_column("B:B", 8)
-        worksheet.set_column("C:C", 20)
-        worksheet.set_column("D:D", 12)
-        worksheet.set_column("E:E", 15)
-        worksheet.set_column("F:F", 30)
-        worksheet.set_column("G:G", 30)
-        worksheet.set_column("H:H", 12)
-
-        # Agregar resumen
-        worksheet.write(len(data.get("pagos_detallados", [])) + 3, 0, "RESUMEN:", header_format)
-        worksheet.write(len(data.get("pagos_detallados", [])) + 4, 0, "Total General:")
-        worksheet.write(len(data.get("pagos_detallados", [])) + 4, 3, data.get("total_general", 0))
-
-        workbook.close()
-        output.seek(0)
-
-        # Nombre de archivo
+        output = daily_cash_export_service.export_improved_daily_cash(data)
         date = serializer.validated_data.get("date")
-        filename = f"caja_chica_mejorada_{date}.xlsx"
-
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"caja_chica_mejorada_{date}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
         )
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
 
     @staticmethod
     def exportar_excel_tickets_pagados(request):
@@ -441,83 +473,60 @@ class ExcelExportView:
         if isinstance(data, dict) and "error" in data:
             return JsonResponse(data, status=400)
 
-        # Crear archivo Excel
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
-        worksheet = workbook.add_worksheet("Tickets Pagados")
-
-        # Formato encabezado
-        header_format = workbook.add_format(
-            {"bold": True, "bg_color": "#2c3e50", "font_color": "white", "border": 1}
+        output = daily_cash_export_service.export_daily_paid_tickets(data)
+        date = serializer.validated_data.get("date")
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"tickets_pagados_{date}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
         )
 
-        # Encabezados para el reporte de tickets pagados
-        headers = [
-            "Número Ticket",
-            "Monto",
-            "Método Pago",
-            "Fecha Pago",
-            "Paciente",
-            "Documento",
-            "Teléfono",
-            "Terapeuta",
-            "Licencia",
-            "Fecha Cita",
-            "Hora Cita",
-            "Consultorio",
-        ]
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header, header_format)
-
-        # Escribir datos
-        for row, ticket in enumerate(data.get("tickets_pagados", []), start=1):
-            worksheet.write(row, 0, ticket.get("numero_ticket", ""))
-            worksheet.write(row, 1, ticket.get("monto", 0))
-            worksheet.write(row, 2, ticket.get("metodo_pago", ""))
-            worksheet.write(row, 3, ticket.get("fecha_pago", ""))
-            worksheet.write(row, 4, ticket.get("paciente_nombre", ""))
-            worksheet.write(row, 5, ticket.get("paciente_documento", ""))
-            worksheet.write(row, 6, ticket.get("paciente_telefono", ""))
-            worksheet.write(row, 7, ticket.get("terapeuta_nombre", ""))
-            worksheet.write(row, 8, ticket.get("terapeuta_licencia", ""))
-            worksheet.write(row, 9, ticket.get("fecha_cita", ""))
-            worksheet.write(row, 10, ticket.get("hora_cita", ""))
-            worksheet.write(row, 11, ticket.get("consultorio", ""))
-
-        # Anchos de columna
-        worksheet.set_column("A:A", 20)  # Número Ticket
-        worksheet.set_column("B:B", 12)  # Monto
-        worksheet.set_column("C:C", 15)  # Método Pago
-        worksheet.set_column("D:D", 18)  # Fecha Pago
-        worksheet.set_column("E:E", 30)  # Paciente
-        worksheet.set_column("F:F", 15)  # Documento
-        worksheet.set_column("G:G", 15)  # Teléfono
-        worksheet.set_column("H:H", 30)  # Terapeuta
-        worksheet.set_column("I:I", 15)  # Licencia
-        worksheet.set_column("J:J", 12)  # Fecha Cita
-        worksheet.set_column("K:K", 10)  # Hora Cita
-        worksheet.set_column("L:L", 12)  # Consultorio
-
-        # Agregar resumen
-        worksheet.write(len(data.get("tickets_pagados", [])) + 3, 0, "RESUMEN:", header_format)
-        worksheet.write(len(data.get("tickets_pagados", [])) + 4, 0, "Total General:")
-        worksheet.write(len(data.get("tickets_pagados", [])) + 4, 1, data.get("total_general", 0))
-        worksheet.write(len(data.get("tickets_pagados", [])) + 5, 0, "Cantidad Tickets:")
-        worksheet.write(len(data.get("tickets_pagados", [])) + 5, 1, data.get("cantidad_tickets", 0))
-
-        workbook.close()
-        output.seek(0)
-
-        # Nombre de archivo
-        date = serializer.validated_data.get("date")
-        filename = f"tickets_pagados_{date}.xlsx"
+    @staticmethod
+    def exportar_excel_cierre_mes(request):
+        """
+        Exporta a Excel el cierre del mes de `date` (por defecto el mes actual):
+        resumen diario, totales por método de pago, citas, caja chica y tickets
+        pagados, generados en una sola pasada por las citas y los tickets del mes.
+        """
+        data_in = _merge_params(request)
+        serializer = DateParameterSerializer(data=data_in)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
 
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        day = serializer.validated_data.get("date") or timezone.localdate()
+        try:
+            with query_budget("excel_cierre_mes"):
+                output = month_close_export_service.export_month_close(day)
+        except QueryBudgetExceeded as e:
+            return _queue_export(request, "excel_cierre_mes", data_in, e)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=month_close_export_service.filename(day),
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+    @staticmethod
+    def exportar_excel_ocupacion_consultorios(request):
+        """Exporta a Excel el mapa de calor de ocupación de consultorios entre dos fechas."""
+        day_range, error = _occupancy_range(request)
+        if error is not None:
+            return error
+
+        try:
+            with query_budget("excel_ocupacion_consultorios"):
+                data = room_occupancy_service.get_room_occupancy(*day_range)
+        except QueryBudgetExceeded as e:
+            return _queue_export(request, "excel_ocupacion_consultorios", _merge_params(request), e)
+        output = room_occupancy_export_service.export_room_occupancy(data)
+        start_date, end_date = day_range
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"ocupacion_consultorios_{start_date}_a_{end_date}.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
         )
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
 
 
 # ===========================
@@ -529,6 +538,7 @@ excel_export = ExcelExportView()
 
 
 @csrf_exempt
+@conditional_report("appointments_per_therapist", date_param)
 def get_number_appointments_per_therapist(request):
     try:
         return report_api.get_number_appointments_per_therapist(request)
@@ -544,6 +554,7 @@ def get_number_appointments_per_therapist(request):
 
 
 @csrf_exempt
+@conditional_report("patients_by_therapist", date_param)
 def get_patients_by_therapist(request):
     try:
         return report_api.get_patients_by_therapist(request)
@@ -559,6 +570,7 @@ def get_patients_by_therapist(request):
 
 
 @csrf_exempt
+@conditional_report("daily_cash", date_param)
 def get_daily_cash(request):
     try:
         return report_api.get_daily_cash(request)
@@ -574,6 +586,7 @@ def get_daily_cash(request):
 
 
 @csrf_exempt
+@conditional_report("improved_daily_cash", date_or_range_param)
 def get_improved_daily_cash(request):
     try:
         return report_api.get_improved_daily_cash(request)
@@ -589,6 +602,7 @@ def get_improved_daily_cash(request):
 
 
 @csrf_exempt
+@conditional_report("daily_paid_tickets", date_or_range_param)
 def get_daily_paid_tickets(request):
     try:
         return report_api.get_daily_paid_tickets(request)
@@ -604,6 +618,7 @@ def get_daily_paid_tickets(request):
 
 
 @csrf_exempt
+@conditional_report("appointments_between_dates", range_param("start_date", "end_date"))
 def get_appointments_between_dates(request):
     try:
         return report_api.get_appointments_between_dates(request)
@@ -618,37 +633,75 @@ def get_appointments_between_dates(request):
         )
 
 
+@csrf_exempt
+@conditional_report("batch", date_param)
+def get_reports_batch(request):
+    try:
+        return report_api.get_reports_batch(request)
+    except Exception:
+        logger.exception("Error en get_reports_batch")
+        return JsonResponse({"error": "Error interno del servidor"}, status=500)
+
+
+@csrf_exempt
+@conditional_report("room_occupancy", range_param("start_date", "end_date"))
+def get_room_occupancy(request):
+    try:
+        return report_api.get_room_occupancy(request)
+    except Exception:
+        logger.exception("Error en get_room_occupancy")
+        return JsonResponse({"error": "Error interno del servidor"}, status=500)
+
+
 def reports_dashboard(request):
     return render(request, "reports.html")
 
 
+@export_artifact("pdf_citas_terapeuta", date_param)
 def pdf_citas_terapeuta(request):
     return pdf_export.pdf_citas_terapeuta(request)
 
 
+@export_artifact("pdf_pacientes_terapeuta", date_param)
 def pdf_pacientes_terapeuta(request):
     return pdf_export.pdf_pacientes_terapeuta(request)
 
 
+@export_artifact("pdf_resumen_caja", date_param)
 def pdf_resumen_caja(request):
     return pdf_export.pdf_resumen_caja(request)
 
 
+@export_artifact("pdf_caja_chica_mejorada", date_param)
 def pdf_caja_chica_mejorada(request):
     return pdf_export.pdf_caja_chica_mejorada(request)
 
 
+@export_artifact("pdf_tickets_pagados", date_param)
 def pdf_tickets_pagados(request):
     return pdf_export.pdf_tickets_pagados(request)
 
 
+@export_artifact("excel_citas", range_param("start_date", "end_date"))
 def exportar_excel_citas(request):
     return excel_export.exportar_excel_citas(request)
 
 
+@export_artifact("excel_caja_chica_mejorada", date_param)
 def exportar_excel_caja_chica_mejorada(request):
     return excel_export.exportar_excel_caja_chica_mejorada(request)
 
 
+@export_artifact("excel_tickets_pagados", date_param)
 def exportar_excel_tickets_pagados(request):
     return excel_export.exportar_excel_tickets_pagados(request)
+
+
+@export_artifact("excel_ocupacion_consultorios", range_param("start_date", "end_date"))
+def exportar_excel_ocupacion_consultorios(request):
+    return excel_export.exportar_excel_ocupacion_consultorios(request)
+
+
+@export_artifact("excel_cierre_mes", month_param)
+def exportar_excel_cierre_mes(request):
+    return excel_export.exportar_excel_cierre_mes(request)
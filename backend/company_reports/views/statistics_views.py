@@ -4,50 +4,158 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from datetime import datetime
 from company_reports.services.statistics_services import StatisticsService
-from company_reports.serialiazers.statistics_serializers import StatisticsResource
+from company_reports.services.cohort_services import PatientCohortService, month_first_day, month_index
+from company_reports.services.report_cache import ReportCache
+from company_reports.services.pdf_services import PDFRenderStats
+from company_reports.services.query_budget import QueryBudgetExceeded, query_budget
+from company_reports.serialiazers.statistics_serializers import StatisticsResource, RendimientoComparativoResource, CohortesResource
+from company_reports.services.report_watermark import conditional_report, comparison_range_param, range_param
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+
+def _parse_period(request):
+    """Lee y valida `start`/`end`; retorna (start_date, end_date, respuesta de error o None)."""
+    start = request.query_params.get("start")
+    end = request.query_params.get("end")
+
+    if not start or not end:
+        return None, None, Response(
+            {"error": "Parámetros 'start' y 'end' son requeridos."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Validar formato de fechas
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end, '%Y-%m-%d').date()
+    except ValueError:
+        return None, None, Response(
+            {"error": "Formato de fecha inválido. Use YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if start_date > end_date:
+        return None, None, Response(
+            {"error": "La fecha de inicio no puede ser mayor que la fecha de fin."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return start_date, end_date, None
+
+def _budget_exceeded(error):
+    """Respuesta cuando las consultas superan REPORT_QUERY_BUDGETS: no hay versión en segundo plano."""
+    return Response(
+        {"error": str(error), "code": "query_budget_exceeded"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
 
 class GetMetricsView(APIView):
+    # ETag a partir de la marca de agua de las citas del rango: el dashboard recibe 304 si no cambiaron
+    @method_decorator(conditional_report("statistics", range_param("start", "end")))
+    def get(self, request):
+        start_date, end_date, error = _parse_period(request)
+        if error:
+            return error
+
+        try:
+            service = StatisticsService()
+            with query_budget("statistics"):
+                data = service.get_statistics(start_date, end_date)
+            
+            serializer = StatisticsResource(data)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+            
+        except QueryBudgetExceeded as e:
+            return _budget_exceeded(e)
+        except Exception as e:
+            return Response(
+                {"error": f"Error interno del servidor: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class TherapistPerformanceView(APIView):
+    """
+    Rendimiento de cada terapeuta en el rango `start`/`end` comparado con el
+    período anterior de igual duración (sesiones, ingresos, pacientes únicos,
+    raiting y ranking).
+    """
+    # La marca de agua cubre ambos períodos: un cambio en el anterior también altera la comparación
+    @method_decorator(conditional_report("therapist_performance", comparison_range_param("start", "end")))
+    def get(self, request):
+        start_date, end_date, error = _parse_period(request)
+        if error:
+            return error
+
+        try:
+            with query_budget("therapist_performance"):
+                data = StatisticsService().get_rendimiento_comparativo(start_date, end_date)
+            serializer = RendimientoComparativoResource(data)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        except QueryBudgetExceeded as e:
+            return _budget_exceeded(e)
+        except Exception as e:
+            return Response(
+                {"error": f"Error interno del servidor: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class PatientCohortView(APIView):
+    """
+    Retención de pacientes por cohorte (mes de la primera cita) entre los meses
+    `start` y `end` (YYYY-MM). Por defecto, los últimos 12 meses.
+    """
+    MAX_MONTHS = 60
+
     def get(self, request):
         start = request.query_params.get("start")
         end = request.query_params.get("end")
 
-        if not start or not end:
+        try:
+            end_month = datetime.strptime(end, '%Y-%m').date() if end else timezone.localdate().replace(day=1)
+            if start:
+                start_month = datetime.strptime(start, '%Y-%m').date()
+            else:
+                start_month = month_first_day(month_index(end_month) - 11)
+        except ValueError:
             return Response(
-                {"error": "Parámetros 'start' y 'end' son requeridos."},
+                {"error": "Formato de mes inválido. Use YYYY-MM."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Validar formato de fechas
-        try:
-            start_date = datetime.strptime(start, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end, '%Y-%m-%d').date()
-            
-            if start_date > end_date:
-                return Response(
-                    {"error": "La fecha de inicio no puede ser mayor que la fecha de fin."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-                
-        except ValueError:
+        months = month_index(end_month) - month_index(start_month) + 1
+        if months < 1:
             return Response(
-                {"error": "Formato de fecha inválido. Use YYYY-MM-DD."},
+                {"error": "El mes de inicio no puede ser mayor que el mes de fin."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if months > self.MAX_MONTHS:
+            return Response(
+                {"error": f"El rango no puede superar {self.MAX_MONTHS} meses."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            service = StatisticsService()
-            data = service.get_statistics(start_date, end_date)
-            
-            serializer = StatisticsResource(data)
+            data = PatientCohortService().get_cohorts(start_month, end_month)
+            serializer = CohortesResource(data)
             return Response(serializer.data, status=status.HTTP_200_OK)
-            
+
         except Exception as e:
             return Response(
                 {"error": f"Error interno del servidor: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class ReportCacheStatsView(APIView):
+    """Contadores de aciertos/fallos de la caché de reportes."""
+    def get(self, request):
+        return Response(ReportCache.stats(), status=status.HTTP_200_OK)
+
+class PDFRenderStatsView(APIView):
+    """Tiempos promedio de renderizado por template PDF."""
+    def get(self, request):
+        return Response(PDFRenderStats.stats(), status=status.HTTP_200_OK)
+
 class StatisticsViewSet(viewsets.ViewSet):
     @action(detail=False, methods=["get"], url_path="metricas")
     def get_statistics(self, request):
@@ -0,0 +1,15 @@
+from django.db import connections
+
+from histories_configurations.models import PaymentStatus
+
+
+def create_unmanaged_tables(using="default"):
+    """
+    Crea en la base de pruebas las tablas con managed = False que otras tablas
+    referencian (payment_status), porque las migraciones no las crean.
+    Debe llamarse fuera de una transacción (setUpClass antes de super()).
+    """
+    connection = connections[using]
+    if PaymentStatus._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(PaymentStatus)
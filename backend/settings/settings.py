@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,7 +52,7 @@ INSTALLED_APPS = [
     'therapists.apps.TherapistsConfig',
     'ubi_geo.apps.UbiGeoConfig',
     'users_profiles',
-    'company_reports',
+    'company_reports.apps.CompanyReportsConfig',
     'appointments',
 ]
 
@@ -71,6 +71,7 @@ AUTHENTICATION_BACKENDS = (
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'architect.middleware.query_metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -119,6 +120,34 @@ DATABASES = {
     }
 }
 
+# Números de ticket (appointments_status/services/ticket_number_allocator.py): cada proceso
+# reserva bloques de TICKET_NUMBER_BLOCK_SIZE números en la conexión TICKET_NUMBER_DB_ALIAS,
+# la misma base de datos con su propia transacción, para que la reserva se confirme aunque
+# la petición que crea la cita siga dentro de la suya. Solo en motores que admiten escrituras
+# concurrentes (MySQL, PostgreSQL): en SQLite la segunda conexión quedaría bloqueada por la
+# transacción de la petición, así que se reserva en 'default'.
+if DATABASES['default']['ENGINE'] in ('django.db.backends.mysql', 'django.db.backends.postgresql'):
+    DATABASES['ticket_numbers'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+TICKET_NUMBER_DB_ALIAS = 'ticket_numbers'
+TICKET_NUMBER_BLOCK_SIZE = config('TICKET_NUMBER_BLOCK_SIZE', default=50, cast=int)
+# Máximo de citas por alta masiva (POST /appointments/bulk/)
+APPOINTMENT_BULK_MAX_ITEMS = config('APPOINTMENT_BULK_MAX_ITEMS', default=500, cast=int)
+# Días hacia adelante con citas ya creadas para las series recurrentes; la tarea
+# extend_appointment_series crea las siguientes cada día (PeriodicTask "Extender series
+# de citas recurrentes", creada por la migración appointments_status 0009; requiere celery beat).
+APPOINTMENT_SERIES_HORIZON_DAYS = config('APPOINTMENT_SERIES_HORIZON_DAYS', default=90, cast=int)
+# Horario de atención para la búsqueda de horarios libres (appointments_status/services/availability_index.py)
+APPOINTMENT_OPENING_HOUR = config('APPOINTMENT_OPENING_HOUR', default='08:00')
+APPOINTMENT_CLOSING_HOUR = config('APPOINTMENT_CLOSING_HOUR', default='20:00')
+APPOINTMENT_WORKING_DAYS = config('APPOINTMENT_WORKING_DAYS', default='0,1,2,3,4,5', cast=Csv(int))  # 0=lunes
+APPOINTMENT_SLOT_MINUTES = config('APPOINTMENT_SLOT_MINUTES', default=15, cast=int)
+# Consultorios que puede asignar el agendador por lotes (POST /appointments/schedule/)
+APPOINTMENT_ROOMS = config('APPOINTMENT_ROOMS', default='1,2,3,4,5,6', cast=Csv(int))
+# Segundos máximos de cálculo del agendador por lotes por petición
+APPOINTMENT_SCHEDULER_TIME_LIMIT = config('APPOINTMENT_SCHEDULER_TIME_LIMIT', default=2.0, cast=float)
+# Días que cada proceso mantiene en el índice de disponibilidad en memoria
+AVAILABILITY_INDEX_MAX_DAYS = config('AVAILABILITY_INDEX_MAX_DAYS', default=400, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -214,6 +243,9 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_ENABLE_UTC = True
+# En pruebas locales, CELERY_TASK_ALWAYS_EAGER=True ejecuta las tareas en el mismo proceso
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
 
 # Celery Beat Configuration
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
@@ -226,10 +258,73 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
-    }
+    },
+    # Resultados de reportes (ver company_reports/services/report_cache.py).
+    # Con REPORTS_CACHE_URL (p. ej. redis://redis:6379/2) la caché se comparte entre workers.
+    "reports": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config('REPORTS_CACHE_URL'),
+    } if config('REPORTS_CACHE_URL', default='') else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "reports",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+}
+
+REPORTS_CACHE_ENABLED = config('REPORTS_CACHE_ENABLED', default=True, cast=bool)
+REPORTS_CACHE_TIMEOUT = config('REPORTS_CACHE_TIMEOUT', default=86400, cast=int)
+# ETag / Last-Modified en reportes y estadísticas (company_reports/services/report_watermark.py)
+REPORTS_CONDITIONAL_ENABLED = config('REPORTS_CONDITIONAL_ENABLED', default=True, cast=bool)
+
+# Renderizado de PDFs (company_reports/services/pdf_services.py).
+# Cada worker de gunicorn levanta hasta PDF_RENDER_WORKERS procesos; 0 renderiza en el mismo proceso.
+PDF_RENDER_WORKERS = config('PDF_RENDER_WORKERS', default=2, cast=int)
+PDF_RENDER_MAX_PENDING = config('PDF_RENDER_MAX_PENDING', default=8, cast=int)
+PDF_RENDER_QUEUE_TIMEOUT = config('PDF_RENDER_QUEUE_TIMEOUT', default=5, cast=int)
+PDF_RENDER_TIMEOUT = config('PDF_RENDER_TIMEOUT', default=60, cast=int)
+PDF_RENDER_MAX_TASKS_PER_CHILD = config('PDF_RENDER_MAX_TASKS_PER_CHILD', default=200, cast=int)
+
+# Archivos de exportación reutilizables (company_reports/services/export_artifacts.py),
+# guardados en MEDIA_ROOT/REPORTS_ARTIFACTS_DIR por reporte, parámetros y versión de datos.
+REPORTS_ARTIFACTS_ENABLED = config('REPORTS_ARTIFACTS_ENABLED', default=True, cast=bool)
+REPORTS_ARTIFACTS_DIR = 'reports/artifacts'
+REPORTS_ARTIFACTS_MAX_AGE = config('REPORTS_ARTIFACTS_MAX_AGE', default=7 * 86400, cast=int)
+REPORTS_ARTIFACTS_MAX_BYTES = config('REPORTS_ARTIFACTS_MAX_BYTES', default=2 * 1024 ** 3, cast=int)
+# Detrás de nginx (docker-compose.prod.yml) el archivo lo envía nginx vía X-Accel-Redirect
+REPORTS_ARTIFACTS_ACCEL_REDIRECT = config('REPORTS_ARTIFACTS_ACCEL_REDIRECT', default=False, cast=bool)
+REPORTS_ARTIFACTS_ACCEL_PREFIX = config('REPORTS_ARTIFACTS_ACCEL_PREFIX', default='/protected-media/')
+# Trabajos de reporte terminados (y su archivo en MEDIA_ROOT/reports/jobs/) se borran pasado este tiempo
+REPORT_JOBS_MAX_AGE = config('REPORT_JOBS_MAX_AGE', default=7 * 86400, cast=int)
+
+
+# Tiempo máximo de base de datos (segundos) por reporte (company_reports/services/query_budget.py).
+# Debe quedar bien por debajo del timeout de gunicorn (120 s). Al excederlo, las exportaciones
+# pasan a un trabajo en segundo plano y las estadísticas responden 503 pidiendo un rango menor.
+REPORT_QUERY_BUDGET_ENABLED = config('REPORT_QUERY_BUDGET_ENABLED', default=True, cast=bool)
+REPORT_QUERY_BUDGETS = {
+    "statistics": config('REPORT_QUERY_BUDGET_STATISTICS', default=20, cast=int),
+    "therapist_performance": config('REPORT_QUERY_BUDGET_STATISTICS', default=20, cast=int),
+    "excel_citas": config('REPORT_QUERY_BUDGET_EXPORTS', default=30, cast=int),
+    "excel_ocupacion_consultorios": config('REPORT_QUERY_BUDGET_EXPORTS', default=30, cast=int),
+    "excel_cierre_mes": config('REPORT_QUERY_BUDGET_EXPORTS', default=30, cast=int),
 }
 
 
+# Estadísticas del dashboard: "rollup" lee los agregados diarios
+# (ver rebuild_statistics_rollups), "single_pass" hace una sola consulta
+# agrupada sobre citas y "appointments" usa una consulta por sección
+STATISTICS_SOURCE = config('STATISTICS_SOURCE', default='rollup')
+
+
+# Métricas por petición (architect/middleware/query_metrics.py): consultas SQL y
+# tiempo en base de datos, en la vista y en el renderizado en el logger "query_metrics".
+# Una sentencia repetida N_PLUS_ONE_THRESHOLD veces se marca como N+1. El header
+# Server-Timing expone esos tiempos a los clientes: por defecto solo con DEBUG.
+QUERY_METRICS_ENABLED = config('QUERY_METRICS_ENABLED', default=True, cast=bool)
+QUERY_METRICS_SERVER_TIMING = config('QUERY_METRICS_SERVER_TIMING', default=DEBUG, cast=bool)
+QUERY_METRICS_N_PLUS_ONE_THRESHOLD = config('QUERY_METRICS_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
+
 # Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -276,6 +371,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'query_metrics': {
+            'handlers': ['console', 'file'],
+            'level': config('QUERY_METRICS_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
     },
 }
 